@@ -1,10 +1,10 @@
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-import boto3
 import json
 import requests
-from typing import Any, Dict, List, Text
+from typing import Any, Dict, List, Optional, Text
+from dataclasses import dataclass, field
 from rasa_sdk import Action
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.interfaces import Tracker
@@ -18,6 +18,8 @@ import logging
 import threading
 import time
 import hashlib
+import copy
+from collections import OrderedDict
 
 # Import RAG system, AWS Intelligence, Text-to-SQL Agent, Symptom Analyzer, and LLM Router
 try:
@@ -26,12 +28,28 @@ try:
     from .text_to_sql_agent import TextToSQLAgent
     from .symptom_analyzer import SymptomAnalyzer
     from .llm_router import LLMRouter
+    from .db_router import DatabaseRouter, READ, WRITE
+    from .resilience import CircuitOpenError, DependencyUnavailable, get_dependency
+    from .snapshot_store import directory_snapshot, plan_features, start_periodic_export
+    from .search import SearchCapabilities, text_match
+    from .coordination import SENDER_TURN_LEASE_SECONDS, get_coordination_backend
+    from .handlers import HandlerContext, HandlerRegistry
+    from .async_runtime import AsyncAWSClients, AsyncDatabase, remaining_turn_time, run_blocking, turn_deadline
+    from .bedrock_invoker import get_bedrock_invoker
 except ImportError:
     # Fallback if relative import doesn't work
     import sys
     sys.path.append(os.path.dirname(__file__))
     from rag_system import RAGRetriever
     from aws_intelligence import AWSIntelligenceServices
+    from db_router import DatabaseRouter, READ, WRITE
+    from resilience import CircuitOpenError, DependencyUnavailable, get_dependency
+    from snapshot_store import directory_snapshot, plan_features, start_periodic_export
+    from search import SearchCapabilities, text_match
+    from coordination import SENDER_TURN_LEASE_SECONDS, get_coordination_backend
+    from handlers import HandlerContext, HandlerRegistry
+    from async_runtime import AsyncAWSClients, AsyncDatabase, remaining_turn_time, run_blocking, turn_deadline
+    from bedrock_invoker import get_bedrock_invoker
     try:
         from text_to_sql_agent import TextToSQLAgent
     except ImportError:
@@ -49,6 +67,36 @@ load_dotenv()
 
 REACT_APP_DUMMY_API = os.getenv("REACT_APP_DUMMY_API")
 
+# Bedrock calls go through the shared invoker (retries, rate limiting, circuit breaker); see bedrock_invoker
+BEDROCK_INVOKER = get_bedrock_invoker()
+# Circuit breaker and bulkhead for the dummy API (see resilience.DEPENDENCY_DEFAULTS)
+DUMMY_API = get_dependency("dummy_api")
+
+
+def dummy_api_get(path: Text, timeout: float = 5):
+    """GET from the dummy API through its circuit breaker; HTTP errors raise, DependencyUnavailable while it is down"""
+    def get():
+        response = requests.get(f"{REACT_APP_DUMMY_API}{path}", timeout=timeout)
+        response.raise_for_status()
+        return response
+    return DUMMY_API.call(get)
+
+
+def dummy_api_post(path: Text, payload: Dict[Text, Any], timeout: float = 10):
+    """POST to the dummy API through its circuit breaker; 429 and 5xx raise (and count against the
+    circuit), other responses are returned for the caller to check"""
+    def post():
+        response = requests.post(f"{REACT_APP_DUMMY_API}{path}", json=payload, timeout=timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+    return DUMMY_API.call(post)
+
+# How long a duplicate action call waits for the first run's result
+INFLIGHT_WAIT_SECONDS = float(os.getenv("INFLIGHT_WAIT_SECONDS", "25"))
+# Identical responses to the same sender within this window are suppressed
+RESPONSE_DEDUP_SECONDS = 10
+
 # ============================================================================
 # ROBUST DUPLICATE PREVENTION SYSTEM
 # ============================================================================
@@ -56,9 +104,8 @@ REACT_APP_DUMMY_API = os.getenv("REACT_APP_DUMMY_API")
 class SafeDispatcher:
     """Wrapper around CollectingDispatcher that prevents duplicate messages"""
     
-    # Thread-safe response tracking: {sender_id: {response_hash: timestamp}}
-    _response_tracker = {}
-    _lock = threading.Lock()
+    # Recent responses are tracked by the coordination backend, keyed by (sender_id, response_hash),
+    # so duplicates are caught across action-server replicas when a shared backend is configured
     
     def __init__(self, dispatcher: CollectingDispatcher, sender_id: str, message: str):
         self.dispatcher = dispatcher
@@ -73,51 +120,49 @@ class SafeDispatcher:
         if not text or not text.strip():
             return
         
-        # Create hash of the response
-        response_hash = hashlib.md5(f"{self.sender_id}_{text}".encode()).hexdigest()
-        current_time = time.time()
-        
-        with SafeDispatcher._lock:
-            # Check if this exact response was sent recently (within 10 seconds)
-            if self.sender_id in SafeDispatcher._response_tracker:
-                if response_hash in SafeDispatcher._response_tracker[self.sender_id]:
-                    last_time = SafeDispatcher._response_tracker[self.sender_id][response_hash]
-                    if current_time - last_time < 10:  # 10 second window
-                        logging.warning(f"Duplicate response prevented: '{text[:50]}...' for sender {self.sender_id}")
-                        return
-            
-            # Check if we've already sent max responses in this execution
-            if self.response_count >= self.max_responses:
-                logging.warning(f"Max responses ({self.max_responses}) reached for sender {self.sender_id}, preventing: '{text[:50]}...'")
-                return
-            
-            # Track this response
-            if self.sender_id not in SafeDispatcher._response_tracker:
-                SafeDispatcher._response_tracker[self.sender_id] = {}
-            SafeDispatcher._response_tracker[self.sender_id][response_hash] = current_time
-            
-            # Clean up old entries (older than 60 seconds)
-            for sid in list(SafeDispatcher._response_tracker.keys()):
-                for rhash in list(SafeDispatcher._response_tracker[sid].keys()):
-                    if current_time - SafeDispatcher._response_tracker[sid][rhash] > 60:
-                        del SafeDispatcher._response_tracker[sid][rhash]
-                if not SafeDispatcher._response_tracker[sid]:
-                    del SafeDispatcher._response_tracker[sid]
+        # Check if we've already sent max responses in this execution
+        if self.response_count >= self.max_responses:
+            logging.warning(f"Max responses ({self.max_responses}) reached for sender {self.sender_id}, preventing: '{text[:50]}...'")
+            return
+        
+        # Check-and-record in one step: False means this exact response was sent recently
+        response_key = (self.sender_id, hashlib.md5(text.encode()).hexdigest())
+        if not get_coordination_backend().add_if_absent(response_key, RESPONSE_DEDUP_SECONDS, shard_key=self.sender_id):
+            logging.warning(f"Duplicate response prevented: '{text[:50]}...' for sender {self.sender_id}")
+            return
         
         # Send the message
         try:
-            # Increment response count BEFORE sending to prevent race conditions
-            with SafeDispatcher._lock:
-                self.response_count += 1
+            # Increment response count BEFORE sending; the counter is per execution so needs no lock
+            self.response_count += 1
             
             self.dispatcher.utter_message(text=text, **kwargs)
             self.sent_messages.append(text)
             logging.info(f"SafeDispatcher: Sent response #{self.response_count} for sender {self.sender_id}: '{text[:50]}...'")
         except Exception as e:
             logging.error(f"Error sending message via SafeDispatcher: {e}")
-            # Rollback response count on error
-            with SafeDispatcher._lock:
-                self.response_count -= 1
+            # Rollback so the same response can be retried
+            self.response_count -= 1
+            get_coordination_backend().discard(response_key, shard_key=self.sender_id)
+    
+    def replay(self, messages: List[Dict[Text, Any]]):
+        """Re-send an earlier run's messages for a retried action call.
+
+        Rasa dropped that run's reply when the call timed out, so the dedup entry it left is
+        refreshed rather than treated as a duplicate; the per-execution limit still applies.
+        """
+        for message in messages:
+            if self.response_count >= self.max_responses:
+                logging.warning(f"Max responses ({self.max_responses}) reached for sender {self.sender_id}, not replaying")
+                return
+            text = message.get("text") or ""
+            if text:
+                get_coordination_backend().add_if_absent((self.sender_id, hashlib.md5(text.encode()).hexdigest()),
+                                                         RESPONSE_DEDUP_SECONDS, shard_key=self.sender_id)
+            self.response_count += 1
+            self.dispatcher.messages.append(copy.deepcopy(message))
+            if text:
+                self.sent_messages.append(text)
     
     def __getattr__(self, name):
         """Delegate all other attributes to the original dispatcher"""
@@ -141,36 +186,33 @@ RDS_CONFIG = {
     'port': 5432
 }
 
-# Create connection pool
-try:
-    db_pool = psycopg2.pool.SimpleConnectionPool(
-        minconn=1,
-        maxconn=10,
-        **DB_CONFIG
-    )
-except Exception as e:
-    logging.warning(f"Could not create database pool, will use direct connections: {e}")
-    db_pool = None
+INSURANCE_PLANS_QUERY = """
+    SELECT plan_id, plan_name, monthly_premium, deductible, coverage_percentage, features
+    FROM insurance_plans
+    WHERE is_active = true
+    ORDER BY monthly_premium
+    LIMIT 10
+"""
+
+# Connection pools are created lazily per endpoint (writer, and reader if AURORA_READER_ENDPOINT is set)
+DatabaseRouter.configure(DB_CONFIG)
 
 class DatabaseHelper:
     """Helper class for database operations with intelligent conversation support"""
     
     @staticmethod
-    def get_connection():
-        """Get database connection from pool or create new with timeout"""
+    def get_connection(role=READ, sender_id=None):
+        """Get a pooled connection for the reader or writer endpoint, falling back to RDS"""
         try:
-            if db_pool:
-                conn = db_pool.getconn()
-                # Set connection timeout
-                conn.set_session(autocommit=False)
-                return conn
-            else:
-                # Add connect_timeout to prevent hanging
-                config = DB_CONFIG.copy()
-                config['connect_timeout'] = 5
-                return psycopg2.connect(**config)
+            return DatabaseRouter.get_connection(role, sender_id=sender_id)
+        except CircuitOpenError:
+            # Database is known to be down - fail over to fallback data immediately
+            return None
         except Exception as e:
-            logging.error(f"Database connection error: {e}")
+            logging.error(f"Database connection error ({role}): {e}")
+            if (RDS_CONFIG['host'], RDS_CONFIG['database']) == (DB_CONFIG['host'], DB_CONFIG['database']):
+                # The legacy fallback is the same database - don't wait out a second timeout
+                return None
             try:
                 # Fallback to RDS with timeout
                 rds_config = RDS_CONFIG.copy()
@@ -184,10 +226,7 @@ class DatabaseHelper:
     def return_connection(conn):
         """Return connection to pool"""
         try:
-            if db_pool and conn:
-                db_pool.putconn(conn)
-            elif conn:
-                conn.close()
+            DatabaseRouter.return_connection(conn)
         except Exception as e:
             logging.error(f"Error returning connection: {e}")
     
@@ -196,7 +235,7 @@ class DatabaseHelper:
         """Get insurance plans from database with timeout"""
         conn = DatabaseHelper.get_connection()
         if not conn:
-            return None
+            return directory_snapshot.get_insurance_plans()
         
         try:
             cursor = conn.cursor()
@@ -204,32 +243,10 @@ class DatabaseHelper:
             cursor.execute("SET statement_timeout = '3s'")
             # Try to get from database, fallback to default if table doesn't exist
             try:
-                cursor.execute("""
-                    SELECT plan_id, plan_name, monthly_premium, deductible, coverage_percentage, features
-                    FROM insurance_plans
-                    WHERE is_active = true
-                    ORDER BY monthly_premium
-                    LIMIT 10
-                """)
+                cursor.execute(INSURANCE_PLANS_QUERY)
                 plans = cursor.fetchall()
                 if plans:
-                    result = []
-                    for p in plans:
-                        features = p[5] if len(p) > 5 and p[5] else []
-                        if isinstance(features, str):
-                            # Handle PostgreSQL array format
-                            features = features.strip('{}').split(',') if features else []
-                        elif not isinstance(features, list):
-                            features = []
-                        
-                        result.append({
-                            'plan_id': p[0],
-                            'name': p[1],
-                            'monthly_premium': f"${float(p[2]):.2f}" if p[2] else "$0",
-                            'deductible': f"${float(p[3]):.2f}" if p[3] else "$0",
-                            'coverage': f"{int(p[4])}%" if p[4] else "0%",
-                            'features': features
-                        })
+                    result = [DatabaseHelper._plan_from_row(p) for p in plans]
                     logging.info(f"Retrieved {len(result)} insurance plans from database")
                     return result
             except Exception as e:
@@ -244,6 +261,18 @@ class DatabaseHelper:
         finally:
             DatabaseHelper.return_connection(conn)
     
+    @staticmethod
+    def _plan_from_row(p):
+        """Insurance plan dict from an INSURANCE_PLANS_QUERY row"""
+        return {
+            'plan_id': p[0],
+            'name': p[1],
+            'monthly_premium': f"${float(p[2]):.2f}" if p[2] else "$0",
+            'deductible': f"${float(p[3]):.2f}" if p[3] else "$0",
+            'coverage': f"{int(p[4])}%" if p[4] else "0%",
+            'features': plan_features(p[5] if len(p) > 5 else None)
+        }
+    
     @staticmethod
     def get_patient_info(patient_id=None, user_id=None):
         """Get patient information from database"""
@@ -307,17 +336,19 @@ class DatabaseHelper:
                 """
                 params = (patient_id,)
             elif user_id:
-                # First get patient_id from user_id
-                patient = DatabaseHelper.get_patient_info(user_id=user_id)
-                if not patient:
-                    return None
+                # Resolve patient_id in the same statement instead of a second get_patient_info round trip
                 query = """
-                    SELECT appointment_id, doctor_name, department, appointment_date, 
+                    SELECT appointment_id, doctor_name, department, appointment_date,
                            appointment_time, status, symptoms
                     FROM medical_appointments
-                    WHERE patient_id = %s
+                    WHERE patient_id = (
+                        SELECT patient_id FROM medical_patients
+                        WHERE user_id = %s OR email = %s
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    )
                 """
-                params = (patient['patient_id'],)
+                params = (user_id, user_id)
             else:
                 return None
             
@@ -346,44 +377,49 @@ class DatabaseHelper:
         finally:
             DatabaseHelper.return_connection(conn)
     
+    @staticmethod
+    def _availability_query(doctor_id=None, date=None, specialty=None):
+        """SELECT for open slots, defaulting to the next 7 days; returns (query, params) with %s placeholders"""
+        query = """
+            SELECT s.slot_id, s.doctor_id, d.name as doctor_name, d.doc_type as specialty, d.department,
+                   s.date, s.start_time, s.end_time, s.available
+            FROM availability_slots s
+            LEFT JOIN doctors d ON s.doctor_id = d.doctor_id
+            WHERE s.available = true
+        """
+        params = []
+
+        if doctor_id:
+            query += " AND s.doctor_id = %s"
+            params.append(doctor_id)
+
+        if date:
+            query += " AND s.date = %s"
+            params.append(date)
+        else:
+            # Default to next 7 days
+            query += " AND s.date >= CURRENT_DATE AND s.date <= CURRENT_DATE + INTERVAL '7 days'"
+
+        if specialty:
+            query += " AND (d.doc_type ILIKE %s OR d.specialty ILIKE %s OR d.department ILIKE %s)"
+            specialty_term = f"%{specialty}%"
+            params.extend([specialty_term, specialty_term, specialty_term])
+
+        query += " ORDER BY s.date, s.start_time LIMIT 20"
+        return query, params
+
     @staticmethod
     def get_availability_slots(doctor_id=None, date=None, specialty=None):
         """Get available appointment slots from database"""
         conn = DatabaseHelper.get_connection()
         if not conn:
-            return None
+            return directory_snapshot.get_availability_slots(doctor_id=doctor_id, date=date, specialty=specialty)
         
         try:
             cursor = conn.cursor()
             cursor.execute("SET statement_timeout = '3s'")
             
-            query = """
-                SELECT s.slot_id, s.doctor_id, d.name as doctor_name, d.doc_type as specialty, d.department,
-                       s.date, s.start_time, s.end_time, s.available
-                FROM availability_slots s
-                LEFT JOIN doctors d ON s.doctor_id = d.doctor_id
-                WHERE s.available = true
-            """
-            params = []
-            
-            if doctor_id:
-                query += " AND s.doctor_id = %s"
-                params.append(doctor_id)
-            
-            if date:
-                query += " AND s.date = %s"
-                params.append(date)
-            else:
-                # Default to next 7 days
-                query += " AND s.date >= CURRENT_DATE AND s.date <= CURRENT_DATE + INTERVAL '7 days'"
-            
-            if specialty:
-                query += " AND (d.doc_type ILIKE %s OR d.specialty ILIKE %s OR d.department ILIKE %s)"
-                specialty_term = f"%{specialty}%"
-                params.extend([specialty_term, specialty_term, specialty_term])
-            
-            query += " ORDER BY s.date, s.start_time LIMIT 20"
-            
+            query, params = DatabaseHelper._availability_query(doctor_id, date, specialty)
             cursor.execute(query, params if params else None)
             slots = cursor.fetchall()
             
@@ -412,12 +448,35 @@ class DatabaseHelper:
         finally:
             DatabaseHelper.return_connection(conn)
     
+    @staticmethod
+    def _doctor_by_name_query(cursor, table_name, name_col, clean_name):
+        """SELECT for the single best name match; returns (query, params) with %s placeholders"""
+        # Exact match first, then closest partial/fuzzy match (trigram-ranked when available)
+        clause = text_match(cursor, [name_col], clean_name, fuzzy=True)
+        order = f"CASE WHEN LOWER({name_col}) = LOWER(%s) THEN 1 ELSE 2 END"
+        if clause.order:
+            order += f", {clause.order}"
+        query = f"""
+            SELECT doctor_id, {name_col} as name,
+                   COALESCE(specialty, doc_type, specialization, 'General Medicine') as specialty,
+                   COALESCE(department, doc_type, 'General Medicine') as department,
+                   COALESCE(email, 'N/A') as email,
+                   COALESCE(phone, phone_number, contact, 'N/A') as phone,
+                   COALESCE(experience_years, experience, 0) as experience_years,
+                   COALESCE(rating, 0) as rating
+            FROM {table_name}
+            WHERE {clause.where}
+            ORDER BY {order}
+            LIMIT 1
+        """
+        return query, clause.where_params + [clean_name] + clause.order_params
+
     @staticmethod
     def get_doctor_by_name(doctor_name):
         """Get a specific doctor by name (exact or partial match)"""
         conn = DatabaseHelper.get_connection()
         if not conn:
-            return None
+            return directory_snapshot.get_doctor_by_name(doctor_name)
         
         try:
             cursor = conn.cursor()
@@ -428,12 +487,7 @@ class DatabaseHelper:
             
             for table_name in ['medical_doctors', 'doctors', 'physicians']:
                 try:
-                    cursor.execute(f"""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = '{table_name}'
-                    """)
-                    available_columns = [row[0] for row in cursor.fetchall()]
+                    available_columns = SearchCapabilities.table_columns(cursor, table_name)
                     
                     if not available_columns:
                         continue
@@ -443,21 +497,8 @@ class DatabaseHelper:
                     if not name_col:
                         continue
                     
-                    # Try exact match first, then partial match
-                    query = f"""
-                        SELECT doctor_id, {name_col} as name, 
-                               COALESCE(specialty, doc_type, specialization, 'General Medicine') as specialty,
-                               COALESCE(department, doc_type, 'General Medicine') as department,
-                               COALESCE(email, 'N/A') as email,
-                               COALESCE(phone, phone_number, contact, 'N/A') as phone,
-                               COALESCE(experience_years, experience, 0) as experience_years,
-                               COALESCE(rating, 0) as rating
-                        FROM {table_name}
-                        WHERE LOWER({name_col}) LIKE LOWER(%s)
-                        ORDER BY CASE WHEN LOWER({name_col}) = LOWER(%s) THEN 1 ELSE 2 END
-                        LIMIT 1
-                    """
-                    cursor.execute(query, (f"%{clean_name}%", clean_name))
+                    query, params = DatabaseHelper._doctor_by_name_query(cursor, table_name, name_col, clean_name)
+                    cursor.execute(query, params)
                     result = cursor.fetchone()
                     
                     if result:
@@ -481,6 +522,8 @@ class DatabaseHelper:
         except Exception as e:
             logging.error(f"Error in get_doctor_by_name: {e}")
             return None
+        finally:
+            DatabaseHelper.return_connection(conn)
     
     @staticmethod
     def get_doctors(specialty=None, department=None, doctor_name=None, limit=10):
@@ -521,107 +564,7 @@ class DatabaseHelper:
                     
                     logging.info(f"Table {table_name} columns: {available_columns}")
                     
-                    # Build SELECT clause based on available columns
-                    select_cols = []
-                    col_mapping = {}
-                    
-                    # doctor_id
-                    if 'doctor_id' in available_columns:
-                        select_cols.append('doctor_id')
-                    elif 'id' in available_columns:
-                        select_cols.append('id as doctor_id')
-                    else:
-                        select_cols.append('NULL as doctor_id')
-                    
-                    # name
-                    if 'name' in available_columns:
-                        select_cols.append('name')
-                    elif 'doctor_name' in available_columns:
-                        select_cols.append('doctor_name as name')
-                    else:
-                        select_cols.append("'Unknown' as name")
-                    
-                    # specialty (map from doc_type if needed)
-                    if 'specialty' in available_columns:
-                        select_cols.append('specialty')
-                    elif 'doc_type' in available_columns:
-                        select_cols.append('doc_type as specialty')
-                        col_mapping['specialty_col'] = 'doc_type'
-                    elif 'specialization' in available_columns:
-                        select_cols.append('specialization as specialty')
-                    else:
-                        select_cols.append("'General Medicine' as specialty")
-                    
-                    # department
-                    if 'department' in available_columns:
-                        select_cols.append('department')
-                    elif 'doc_type' in available_columns:
-                        select_cols.append('doc_type as department')
-                    else:
-                        select_cols.append("'General Medicine' as department")
-                    
-                    # email
-                    if 'email' in available_columns:
-                        select_cols.append('email')
-                    else:
-                        select_cols.append("'info@hospital.com' as email")
-                    
-                    # phone
-                    if 'phone' in available_columns:
-                        select_cols.append('phone')
-                    elif 'phone_number' in available_columns:
-                        select_cols.append('phone_number as phone')
-                    elif 'contact' in available_columns:
-                        select_cols.append('contact as phone')
-                    else:
-                        select_cols.append("'(555) 123-4567' as phone")
-                    
-                    # experience_years
-                    if 'experience_years' in available_columns:
-                        select_cols.append('experience_years')
-                    elif 'experience' in available_columns:
-                        select_cols.append('experience as experience_years')
-                    else:
-                        select_cols.append('NULL as experience_years')
-                    
-                    # rating
-                    if 'rating' in available_columns:
-                        select_cols.append('rating')
-                    else:
-                        select_cols.append('NULL as rating')
-                    
-                    query = f"SELECT {', '.join(select_cols)} FROM {table_name}"
-                    where_conditions = []
-                    params = []
-                    
-                    # Check if is_active column exists
-                    if 'is_active' in available_columns:
-                        where_conditions.append("is_active = true")
-                    
-                    if specialty:
-                        # Use actual column name for specialty filtering
-                        specialty_col = col_mapping.get('specialty_col', 'specialty')
-                        if specialty_col in available_columns:
-                            # Handle general medicine with multiple search terms
-                            if specialty.lower() == "general medicine":
-                                where_conditions.append(f"({specialty_col} ILIKE %s OR {specialty_col} ILIKE %s OR {specialty_col} ILIKE %s OR {specialty_col} ILIKE %s)")
-                                params.extend(["%general%", "%family%", "%primary%", "%gp%"])
-                            else:
-                                where_conditions.append(f"{specialty_col} ILIKE %s")
-                                params.append(f"%{specialty}%")
-                    
-                    if department and 'department' in available_columns:
-                        where_conditions.append("department ILIKE %s")
-                        params.append(f"%{department}%")
-                    
-                    if where_conditions:
-                        query += " WHERE " + " AND ".join(where_conditions)
-                    
-                    # Add ORDER BY if name column exists
-                    if 'name' in available_columns or 'doctor_name' in available_columns:
-                        query += f" ORDER BY name LIMIT {limit}"
-                    else:
-                        query += f" LIMIT {limit}"
+                    query, params = DatabaseHelper._doctor_query(table_name, available_columns, specialty, department, limit)
                     
                     logging.info(f"Executing query: {query} with params: {params}")
                     cursor.execute(query, params if params else None)
@@ -641,16 +584,7 @@ class DatabaseHelper:
                 return DatabaseHelper._get_sample_doctors(specialty)
             
             if doctors and len(doctors) > 0:
-                result = [{
-                    'doctor_id': d[0],
-                    'name': d[1],
-                    'specialty': d[2],
-                    'department': d[3],
-                    'email': d[4],
-                    'phone': d[5],
-                    'experience_years': d[6] if len(d) > 6 else None,
-                    'rating': d[7] if len(d) > 7 else None
-                } for d in doctors]
+                result = [DatabaseHelper._doctor_from_row(d) for d in doctors]
                 cursor.close()
                 logging.info(f"Returning {len(result)} doctors from database")
                 return result
@@ -666,9 +600,135 @@ class DatabaseHelper:
         finally:
             DatabaseHelper.return_connection(conn)
     
+    @staticmethod
+    def _doctor_query(table_name, available_columns, specialty=None, department=None, limit=10):
+        """SELECT for a doctor table with whatever columns it has; returns (query, params) with %s placeholders"""
+        # Build SELECT clause based on available columns
+        select_cols = []
+        col_mapping = {}
+        
+        # doctor_id
+        if 'doctor_id' in available_columns:
+            select_cols.append('doctor_id')
+        elif 'id' in available_columns:
+            select_cols.append('id as doctor_id')
+        else:
+            select_cols.append('NULL as doctor_id')
+        
+        # name
+        if 'name' in available_columns:
+            select_cols.append('name')
+        elif 'doctor_name' in available_columns:
+            select_cols.append('doctor_name as name')
+        else:
+            select_cols.append("'Unknown' as name")
+        
+        # specialty (map from doc_type if needed)
+        if 'specialty' in available_columns:
+            select_cols.append('specialty')
+        elif 'doc_type' in available_columns:
+            select_cols.append('doc_type as specialty')
+            col_mapping['specialty_col'] = 'doc_type'
+        elif 'specialization' in available_columns:
+            select_cols.append('specialization as specialty')
+        else:
+            select_cols.append("'General Medicine' as specialty")
+        
+        # department
+        if 'department' in available_columns:
+            select_cols.append('department')
+        elif 'doc_type' in available_columns:
+            select_cols.append('doc_type as department')
+        else:
+            select_cols.append("'General Medicine' as department")
+        
+        # email
+        if 'email' in available_columns:
+            select_cols.append('email')
+        else:
+            select_cols.append("'info@hospital.com' as email")
+        
+        # phone
+        if 'phone' in available_columns:
+            select_cols.append('phone')
+        elif 'phone_number' in available_columns:
+            select_cols.append('phone_number as phone')
+        elif 'contact' in available_columns:
+            select_cols.append('contact as phone')
+        else:
+            select_cols.append("'(555) 123-4567' as phone")
+        
+        # experience_years
+        if 'experience_years' in available_columns:
+            select_cols.append('experience_years')
+        elif 'experience' in available_columns:
+            select_cols.append('experience as experience_years')
+        else:
+            select_cols.append('NULL as experience_years')
+        
+        # rating
+        if 'rating' in available_columns:
+            select_cols.append('rating')
+        else:
+            select_cols.append('NULL as rating')
+        
+        query = f"SELECT {', '.join(select_cols)} FROM {table_name}"
+        where_conditions = []
+        params = []
+        
+        # Check if is_active column exists
+        if 'is_active' in available_columns:
+            where_conditions.append("is_active = true")
+        
+        if specialty:
+            # Use actual column name for specialty filtering
+            specialty_col = col_mapping.get('specialty_col', 'specialty')
+            if specialty_col in available_columns:
+                # Handle general medicine with multiple search terms
+                if specialty.lower() == "general medicine":
+                    where_conditions.append(f"({specialty_col} ILIKE %s OR {specialty_col} ILIKE %s OR {specialty_col} ILIKE %s OR {specialty_col} ILIKE %s)")
+                    params.extend(["%general%", "%family%", "%primary%", "%gp%"])
+                else:
+                    where_conditions.append(f"{specialty_col} ILIKE %s")
+                    params.append(f"%{specialty}%")
+        
+        if department and 'department' in available_columns:
+            where_conditions.append("department ILIKE %s")
+            params.append(f"%{department}%")
+        
+        if where_conditions:
+            query += " WHERE " + " AND ".join(where_conditions)
+        
+        # Add ORDER BY if name column exists
+        if 'name' in available_columns or 'doctor_name' in available_columns:
+            query += f" ORDER BY name LIMIT {limit}"
+        else:
+            query += f" LIMIT {limit}"
+        
+        return query, params
+    
+    @staticmethod
+    def _doctor_from_row(d):
+        """Doctor dict from a _doctor_query row"""
+        return {
+            'doctor_id': d[0],
+            'name': d[1],
+            'specialty': d[2],
+            'department': d[3],
+            'email': d[4],
+            'phone': d[5],
+            'experience_years': d[6] if len(d) > 6 else None,
+            'rating': d[7] if len(d) > 7 else None
+        }
+    
     @staticmethod
     def _get_sample_doctors(specialty=None):
-        """Return sample doctors data when database is empty or unavailable"""
+        """Return doctors from the local snapshot, or sample data when no snapshot exists"""
+        snapshot_doctors = directory_snapshot.get_doctors(specialty=specialty)
+        if snapshot_doctors:
+            logging.info(f"Returning {len(snapshot_doctors)} doctors from directory snapshot {directory_snapshot.version}")
+            return snapshot_doctors
+
         sample_doctors = [
             {
                 'doctor_id': 'DR001',
@@ -762,12 +822,48 @@ class DatabaseHelper:
         logging.info(f"Returning {len(sample_doctors)} sample doctors (all specialties)")
         return sample_doctors
     
+    @staticmethod
+    def _get_sample_insurance_plans():
+        """Return insurance plans from the local snapshot, or default plans when no snapshot exists"""
+        snapshot_plans = directory_snapshot.get_insurance_plans()
+        if snapshot_plans:
+            logging.info(f"Returning {len(snapshot_plans)} insurance plans from directory snapshot {directory_snapshot.version}")
+            return snapshot_plans
+
+        return [
+            {
+                'plan_id': 'PLAN001',
+                'name': 'Basic Health Plan',
+                'monthly_premium': '$150',
+                'deductible': '$1000',
+                'coverage': '80%',
+                'features': ['Primary care', 'Emergency visits', 'Basic prescriptions']
+            },
+            {
+                'plan_id': 'PLAN002',
+                'name': 'Premium Health Plan',
+                'monthly_premium': '$300',
+                'deductible': '$500',
+                'coverage': '90%',
+                'features': ['All basic features', 'Specialist visits', 'Mental health', 'Dental & Vision']
+            },
+            {
+                'plan_id': 'PLAN003',
+                'name': 'Family Health Plan',
+                'monthly_premium': '$450',
+                'deductible': '$750',
+                'coverage': '85%',
+                'features': ['All premium features', 'Family coverage', 'Maternity care', 'Pediatric care']
+            }
+        ]
+    
     @staticmethod
     def save_conversation_history(sender_id, user_message, bot_response, intent=None, entities=None):
         """Save conversation history to database for context (non-blocking)"""
         # Don't block on saving history - do it asynchronously if possible
+        conn = None
         try:
-            conn = DatabaseHelper.get_connection()
+            conn = DatabaseHelper.get_connection(WRITE, sender_id=sender_id)
             if not conn:
                 return False
             
@@ -797,6 +893,7 @@ class DatabaseHelper:
             
             conn.commit()
             cursor.close()
+            DatabaseRouter.mark_write(sender_id)
             return True
         except Exception as e:
             # Don't fail the request if history save fails
@@ -808,7 +905,7 @@ class DatabaseHelper:
     @staticmethod
     def get_conversation_history(sender_id, limit=5):
         """Get recent conversation history for context with timeout"""
-        conn = DatabaseHelper.get_connection()
+        conn = DatabaseHelper.get_connection(READ, sender_id=sender_id)
         if not conn:
             return []
         
@@ -843,6 +940,247 @@ class DatabaseHelper:
             DatabaseHelper.return_connection(conn)
 
 
+class AsyncDatabaseHelper:
+    """Async counterparts of DatabaseHelper's hot paths for `async def run` actions.
+
+    Queries go through asyncpg when it is installed, so a turn waiting on the database holds no
+    thread; otherwise the DatabaseHelper method runs on the action executor. Results and
+    fallbacks match DatabaseHelper.
+    """
+
+    DOCTOR_TABLES = ['medical_doctors', 'doctors', 'physicians']
+    # table -> column names; the schema doesn't change at runtime, so it is looked up once
+    _doctor_columns: Dict[Text, List[Text]] = {}
+    _history_table_ready = False
+
+    @staticmethod
+    async def get_insurance_plans():
+        if not AsyncDatabase.enabled():
+            return await run_blocking(DatabaseHelper.get_insurance_plans)
+        try:
+            plans = await AsyncDatabase.fetch(INSURANCE_PLANS_QUERY)
+            if plans:
+                result = [DatabaseHelper._plan_from_row(tuple(p)) for p in plans]
+                logging.info(f"Retrieved {len(result)} insurance plans from database")
+                return result
+            return None
+        except CircuitOpenError:
+            return directory_snapshot.get_insurance_plans()
+        except Exception as e:
+            logging.debug(f"Insurance plans query failed (using fallback): {e}")
+            return None
+
+    @classmethod
+    async def _columns(cls, table_name):
+        columns = cls._doctor_columns.get(table_name)
+        if columns is None:
+            rows = await AsyncDatabase.fetch(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = %s", table_name)
+            columns = cls._doctor_columns[table_name] = [row[0] for row in rows or []]
+        return columns
+
+    @classmethod
+    async def get_doctors(cls, specialty=None, department=None, limit=10):
+        if not AsyncDatabase.enabled():
+            return await run_blocking(DatabaseHelper.get_doctors, specialty=specialty, department=department, limit=limit)
+        try:
+            for table_name in cls.DOCTOR_TABLES:
+                available_columns = await cls._columns(table_name)
+                if not available_columns:
+                    continue
+                query, params = DatabaseHelper._doctor_query(table_name, available_columns, specialty, department, limit)
+                doctors = await AsyncDatabase.fetch(query, *params)
+                if doctors:
+                    logging.info(f"Returning {len(doctors)} doctors from {table_name}")
+                    return [DatabaseHelper._doctor_from_row(tuple(d)) for d in doctors]
+                break
+            logging.warning(f"No doctors found in database for specialty: {specialty}, using sample data")
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logging.error(f"Error fetching doctors: {e}")
+        return DatabaseHelper._get_sample_doctors(specialty)
+
+    @classmethod
+    async def save_conversation_history(cls, sender_id, user_message, bot_response, intent=None, entities=None):
+        if not AsyncDatabase.enabled():
+            return await run_blocking(DatabaseHelper.save_conversation_history, sender_id, user_message,
+                                      bot_response, intent=intent, entities=entities)
+        try:
+            if not cls._history_table_ready:
+                await AsyncDatabase.execute("""
+                    CREATE TABLE IF NOT EXISTS conversation_history (
+                        id SERIAL PRIMARY KEY,
+                        sender_id VARCHAR(255),
+                        user_message TEXT,
+                        bot_response TEXT,
+                        intent VARCHAR(100),
+                        entities TEXT,
+                        created_at TIMESTAMP DEFAULT NOW()
+                    )
+                """)
+                cls._history_table_ready = True
+            await AsyncDatabase.execute("""
+                INSERT INTO conversation_history (sender_id, user_message, bot_response, intent, entities)
+                VALUES (%s, %s, %s, %s, %s)
+            """, sender_id, user_message, bot_response, intent, json.dumps(entities) if entities else None,
+                sender_id=sender_id)
+            return True
+        except Exception as e:
+            logging.debug(f"Error saving conversation history (non-critical): {e}")
+            return False
+
+
+def start_directory_snapshot_export():
+    """Keep the local directory snapshot fresh so outage fallbacks serve real hospital data.
+    Started by the action server entry point (server.py), not on import."""
+    start_periodic_export(lambda: DatabaseHelper.get_connection(READ), DatabaseHelper.return_connection)
+
+
+@dataclass
+class TurnContext:
+    """Patient profile and upcoming appointments for one conversation turn"""
+    sender_id: Text
+    user_id: Optional[Text] = None
+    patient: Optional[Dict[Text, Any]] = None
+    appointments: List[Dict[Text, Any]] = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def patient_id(self) -> Optional[Text]:
+        return self.patient.get('patient_id') if self.patient else None
+
+
+class TurnContextLoader:
+    """Loads the per-turn patient context in a single database round trip"""
+
+    # One statement instead of get_patient_info + get_appointments. Patient columns are selected
+    # as-is so psycopg2 returns the same types; appointment rows match get_appointments' dicts.
+    TURN_CONTEXT_QUERY = """
+        WITH patient AS (
+            SELECT patient_id, name, email, phone, date_of_birth, address, medical_history
+            FROM medical_patients
+            WHERE user_id = %(user_id)s OR email = %(user_id)s
+            ORDER BY created_at DESC
+            LIMIT 1
+        ),
+        upcoming AS (
+            SELECT a.appointment_id, a.doctor_name, a.department, a.appointment_date,
+                   a.appointment_time, a.status, a.symptoms
+            FROM medical_appointments a
+            JOIN patient p ON a.patient_id = p.patient_id
+            WHERE a.appointment_date >= CURRENT_DATE AND a.status != 'cancelled'
+        )
+        SELECT p.patient_id, p.name, p.email, p.phone, p.date_of_birth, p.address, p.medical_history,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'appointment_id', u.appointment_id,
+                        'doctor_name', u.doctor_name,
+                        'department', u.department,
+                        'date', to_char(u.appointment_date, 'YYYY-MM-DD'),
+                        'time', to_char(u.appointment_time, 'HH24:MI'),
+                        'status', u.status,
+                        'symptoms', u.symptoms
+                    ) ORDER BY u.appointment_date, u.appointment_time), '[]'::json)
+             FROM upcoming u)
+        FROM (SELECT 1) AS one
+        LEFT JOIN patient p ON TRUE
+    """
+
+    @staticmethod
+    def load(sender_id, user_id=None) -> TurnContext:
+        """Fetch the patient and their upcoming appointments together"""
+        context = TurnContext(sender_id=sender_id, user_id=user_id)
+        if not user_id:
+            return context
+        conn = DatabaseHelper.get_connection(READ, sender_id=sender_id)
+        if not conn:
+            return context
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET statement_timeout = '3s'")
+            cursor.execute(TurnContextLoader.TURN_CONTEXT_QUERY, {'user_id': user_id})
+            row = cursor.fetchone()
+            cursor.close()
+
+            if row[0] is not None:
+                medical_history = row[6]
+                if isinstance(medical_history, str):
+                    medical_history = json.loads(medical_history) if medical_history else {}
+                context.patient = {
+                    'patient_id': row[0],
+                    'name': row[1],
+                    'email': row[2],
+                    'phone': row[3],
+                    'date_of_birth': row[4],
+                    'address': row[5],
+                    'medical_history': medical_history or {}
+                }
+            context.appointments = row[7] or []
+            return context
+        except Exception as e:
+            logging.debug(f"Batched turn context query failed, loading separately: {e}")
+        finally:
+            DatabaseHelper.return_connection(conn)
+
+        return TurnContextLoader._load_separately(context)
+
+    @staticmethod
+    def _load_separately(context):
+        """Fallback that uses the individual DatabaseHelper queries"""
+        try:
+            context.patient = DatabaseHelper.get_patient_info(user_id=context.user_id)
+            if context.patient:
+                context.appointments = DatabaseHelper.get_appointments(patient_id=context.patient_id) or []
+        except Exception as e:
+            logging.debug(f"Could not load turn context (non-critical): {e}")
+        return context
+
+
+class PatientContextCache:
+    """Session-scoped cache of TurnContext per sender, so repeated turns skip the patient tables"""
+
+    TTL_SECONDS = int(os.getenv('PATIENT_CONTEXT_TTL', '900'))
+    MAX_SENDERS = int(os.getenv('PATIENT_CONTEXT_CACHE_SIZE', '5000'))
+
+    _entries = OrderedDict()
+    # Bumped by invalidate() so a load that started before it cannot put stale data back
+    _generations: Dict[Text, int] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, sender_id, user_id=None) -> TurnContext:
+        """Return the cached context for this sender, loading it on first use or when user_id changes"""
+        now = time.time()
+        with cls._lock:
+            context = cls._entries.get(sender_id)
+            if context and context.user_id == user_id and now - context.loaded_at < cls.TTL_SECONDS:
+                cls._entries.move_to_end(sender_id)
+                return context
+            generation = cls._generations.get(sender_id, 0)
+
+        context = TurnContextLoader.load(sender_id, user_id=user_id)
+        with cls._lock:
+            if cls._generations.get(sender_id, 0) != generation:
+                # Invalidated while loading: serve this turn, but leave the cache empty
+                return context
+            cls._entries[sender_id] = context
+            cls._entries.move_to_end(sender_id)
+            while len(cls._entries) > cls.MAX_SENDERS:
+                evicted, _ = cls._entries.popitem(last=False)
+                cls._generations.pop(evicted, None)
+        return context
+
+    @classmethod
+    def invalidate(cls, sender_id, reason=None):
+        """Drop the cached context - call after any write that touches the patient or their appointments"""
+        with cls._lock:
+            removed = cls._entries.pop(sender_id, None)
+            cls._generations[sender_id] = cls._generations.get(sender_id, 0) + 1
+        if removed:
+            logging.info(f"Patient context cache invalidated for sender {sender_id}" + (f" ({reason})" if reason else ""))
+
+
 class IntelligentFallback:
     """Fallback responses when Bedrock is not available"""
     
@@ -1068,7 +1406,7 @@ class AWSBedrockHelper:
     """A helper class for interacting with AWS Bedrock LLM service."""
     
     def __init__(self):
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name=os.getenv('AWS_REGION', 'us-east-1'))
+        self.bedrock_client = BEDROCK_INVOKER.client()
         # Use inference profile for on-demand access
         self.model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
         # Try alternative model IDs if the default doesn't work
@@ -1078,11 +1416,10 @@ class AWSBedrockHelper:
             'anthropic.claude-3-sonnet-20240229-v1:0'
         ]
     
-    def get_response(self, prompt: Text, conversation_history: List[Dict] = None) -> Text:
-        """Sends a prompt to AWS Bedrock and returns the response."""
-        try:
-            # Enhanced system prompt for RAG-powered intelligent healthcare assistant
-            system_prompt = """You are Dr. AI, a super intelligent RAG-powered healthcare assistant. You use Retrieval-Augmented Generation (RAG) to provide accurate, context-aware responses.
+    def _request_body(self, prompt: Text, conversation_history: List[Dict] = None) -> Dict[Text, Any]:
+        """Claude messages request with the RAG system prompt and the last few turns"""
+        # Enhanced system prompt for RAG-powered intelligent healthcare assistant
+        system_prompt = """You are Dr. AI, a super intelligent RAG-powered healthcare assistant. You use Retrieval-Augmented Generation (RAG) to provide accurate, context-aware responses.
 
 RAG SYSTEM:
 - You receive RETRIEVED CONTEXT from the database containing real-time information
@@ -1172,52 +1509,71 @@ RESPONSE STYLE:
 - When appropriate, suggest using specific platform features
 
 Remember: You are a complete healthcare companion that can help with EVERYTHING - from booking appointments to understanding insurance, from symptom analysis to medication management. You know about all available services and can guide users intelligently."""
+        
+        # Build conversation messages
+        messages = []
+        
+        # Add conversation history if available
+        if conversation_history:
+            messages.extend(conversation_history[-5:])  # Last 5 exchanges for context
+        
+        # Add current user message
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        
+        # Prepare the request body for Claude (optimized for RAG responses)
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1000,  # Increased for detailed RAG responses
+            "temperature": 0.7,  # Balanced creativity and accuracy
+            "system": system_prompt,
+            "messages": messages
+        }
+        
+        return request_body
+    
+    def _failure_response(self, last_error: Optional[Exception], prompt: Text,
+                          conversation_history: List[Dict] = None) -> Text:
+        """User-facing reply when every model failed"""
+        if isinstance(last_error, DependencyUnavailable):
+            # Bedrock is down or saturated - answer from the rule-based fallback instead of waiting on it
+            return IntelligentFallback.get_fallback_response(prompt, conversation_history, None)
+        error_msg = str(last_error) if last_error else "Unknown error"
+        
+        # Handle specific AWS Bedrock access issues - use intelligent fallback
+        if "ResourceNotFoundException" in error_msg or "use case details" in error_msg.lower():
+            # Use intelligent fallback with conversation context
+            return IntelligentFallback.get_fallback_response(prompt, conversation_history, None)
+        
+        elif "credentials" in error_msg.lower() or "access" in error_msg.lower() or "AccessDenied" in error_msg:
+            return "I'm having trouble connecting to my AI brain right now. Please ensure AWS credentials are configured for intelligent responses."
+        elif "ValidationException" in error_msg or "model ID" in error_msg:
+            return "I'm configured to use AWS Bedrock for intelligent responses, but there's a configuration issue. The bot will still work for structured queries (appointments, insurance, etc.), but general conversation features require AWS Bedrock setup. Please configure AWS Bedrock model access or use the specific feature commands."
+        
+        # Generic error - provide helpful fallback
+        return """I encountered a technical issue, but I'm still here to help!
+
+I can assist you with:
+- Booking appointments
+- Insurance information
+- Patient management
+-  Hospital services
+-  And more!
+
+Try asking: What services do you offer? or How do I book an appointment?"""
+    
+    def get_response(self, prompt: Text, conversation_history: List[Dict] = None) -> Text:
+        """Sends a prompt to AWS Bedrock and returns the response."""
+        try:
+            request_body = self._request_body(prompt, conversation_history)
             
-            # Build conversation messages
-            messages = []
-            
-            # Add conversation history if available
-            if conversation_history:
-                messages.extend(conversation_history[-5:])  # Last 5 exchanges for context
-            
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
-            
-            # Prepare the request body for Claude (optimized for RAG responses)
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,  # Increased for detailed RAG responses
-                "temperature": 0.7,  # Balanced creativity and accuracy
-                "system": system_prompt,
-                "messages": messages
-            }
-            
-            # Try to invoke the model with timeout protection
+            # Retries, timeouts and throttling are handled by the invoker; only an unknown model moves to the next one
             last_error = None
             for model_id in [self.model_id] + self.fallback_models:
                 try:
-                    # Use boto3's built-in timeout via config
-                    from botocore.config import Config
-                    config = Config(
-                        connect_timeout=5,
-                        read_timeout=10,
-                        retries={'max_attempts': 1}
-                    )
-                    bedrock_client_fast = boto3.client('bedrock-runtime', 
-                                                      region_name=os.getenv('AWS_REGION', 'us-east-1'),
-                                                      config=config)
-                    
-                    response = bedrock_client_fast.invoke_model(
-                        modelId=model_id,
-                        body=json.dumps(request_body),
-                        contentType='application/json'
-                    )
-                    
-                    # Parse the response
-                    response_body = json.loads(response['body'].read())
+                    response_body = BEDROCK_INVOKER.invoke(request_body, model_id=model_id, call_site='bedrock_helper')
                     return response_body['content'][0]['text']
                 except Exception as e:
                     last_error = e
@@ -1227,29 +1583,7 @@ Remember: You are a complete healthcare companion that can help with EVERYTHING
                     continue
             
             # If all models failed, return helpful error
-            error_msg = str(last_error) if last_error else "Unknown error"
-            
-            # Handle specific AWS Bedrock access issues - use intelligent fallback
-            if "ResourceNotFoundException" in error_msg or "use case details" in error_msg.lower():
-                # Use intelligent fallback with conversation context
-                return IntelligentFallback.get_fallback_response(prompt, conversation_history, None)
-            
-            elif "credentials" in error_msg.lower() or "access" in error_msg.lower() or "AccessDenied" in error_msg:
-                return "I'm having trouble connecting to my AI brain right now. Please ensure AWS credentials are configured for intelligent responses."
-            elif "ValidationException" in error_msg or "model ID" in error_msg:
-                return "I'm configured to use AWS Bedrock for intelligent responses, but there's a configuration issue. The bot will still work for structured queries (appointments, insurance, etc.), but general conversation features require AWS Bedrock setup. Please configure AWS Bedrock model access or use the specific feature commands."
-            
-            # Generic error - provide helpful fallback
-            return """I encountered a technical issue, but I'm still here to help!
-
-I can assist you with:
-- Booking appointments
-- Insurance information
-- Patient management
--  Hospital services
--  And more!
-
-Try asking: What services do you offer? or How do I book an appointment?"""
+            return self._failure_response(last_error, prompt, conversation_history)
             
         except Exception as e:
             # More helpful error message
@@ -1277,14 +1611,138 @@ I can assist you with:
 -  And more!
 
 Try asking: What services do you offer? or How do I book an appointment?"""
+    
+    async def get_response_async(self, prompt: Text, conversation_history: List[Dict] = None) -> Text:
+        """get_response for async actions - awaits aiobotocore instead of holding a thread during the call"""
+        if not AsyncAWSClients.available():
+            return await run_blocking(self.get_response, prompt, conversation_history)
+        request_body = self._request_body(prompt, conversation_history)
+        last_error = None
+        for model_id in [self.model_id] + self.fallback_models:
+            try:
+                response_body = await BEDROCK_INVOKER.invoke_async(request_body, model_id=model_id, call_site='bedrock_helper')
+                return response_body['content'][0]['text']
+            except Exception as e:
+                last_error = e
+                # Only an unknown model ID is worth trying the next model for
+                if "ValidationException" not in str(e) or "model ID" not in str(e):
+                    break
+        return self._failure_response(last_error, prompt, conversation_history)
+
+# Keywords used by AWSBedrockChat's handler predicates, matched as substrings of the lowercased message
+INSURANCE_KEYWORDS = ["insurance"]
+DOCTOR_KEYWORDS = ["doctor", "physician", "specialist", "medical professional"]
+AFFIRMATION_WORDS = ["yes", "yeah", "yep", "sure", "ok", "okay"]
+GENERAL_PHYSICIAN_KEYWORDS = ["general physician", "general practitioner", "family doctor", "primary care", "general doctor"]
+SYMPTOM_KEYWORDS = ["fever", "cold", "cough", "suffering", "symptom", "sick", "pain", "viral", "headache", "ache",
+                    "nausea", "vomiting", "diarrhea", "rash", "dizziness", "chest", "breathing", "shortness"]
+# Lab results, billing, emergencies, mental health, wellness, locations and patient services
+GENERAL_TOPIC_KEYWORDS = [
+    "lab", "test", "result", "report", "blood test", "x-ray", "scan", "medical record", "diagnosis",
+    "bill", "billing", "payment", "cost", "price", "charge", "invoice", "statement", "pay", "fee",
+    "emergency", "urgent", "immediate", "critical", "severe", "acute", "911", "ambulance",
+    "mental", "depression", "anxiety", "stress", "therapy", "counselor", "psychologist", "psychiatrist", "emotional",
+    "wellness", "diet", "exercise", "fitness", "nutrition", "sleep", "weight", "lifestyle", "healthy", "wellbeing",
+    "hospital", "location", "clinic", "address", "where", "nearby", "near me", "facility",
+    "patient", "service", "support", "help desk", "customer service", "assistance",
+]
+DOCTOR_SEARCH_KEYWORDS = [
+    "find", "doctor", "gynecologist", "gynacologist", "gynec", "gynaec", "obstetric", "specialist", "cardiologist",
+    "neurologist", "dermatologist", "pediatrician", "orthopedic", "psychiatrist", "general physician",
+    "general practitioner", "family doctor", "help me with", "need a", "is there any", "available doctor",
+    "any doctor", "show me", "list",
+]
+GREETING_WORDS = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]
+THANKS_WORDS = ["thanks", "thank you"]
+GOODBYE_WORDS = ["bye", "goodbye"]
+# Which data the conversation handler's RAG retrieval fetches when Text-to-SQL found nothing
+RAG_DOCTOR_KEYWORDS = ["doctor", "physician", "specialist", "suggest", "find", "list"]
+RAG_INSURANCE_KEYWORDS = ["insurance", "plan", "coverage", "benefit"]
+RAG_APPOINTMENT_KEYWORDS = ["appointment", "book", "schedule"]
+# Phrases the Bedrock helpers put in their own error replies; such a reply is never shown
+BEDROCK_ERROR_PHRASES = [
+    "trouble connecting to my AI brain",
+    "AWS credentials are configured",
+    "configuration issue",
+    "encountered a technical issue",
+]
+
+# Handlers for action_aws_bedrock_chat; each turn runs the first (lowest priority) one whose predicates match
+CHAT_HANDLERS = HandlerRegistry("aws_bedrock_chat")
+CHAT_HANDLERS.watch(RAG_DOCTOR_KEYWORDS + RAG_INSURANCE_KEYWORDS + RAG_APPOINTMENT_KEYWORDS)
+# Rule-based replies used by the conversation handler when neither Bedrock path produced one;
+# these handlers return the reply text and the conversation handler sends it
+FALLBACK_HANDLERS = HandlerRegistry("aws_bedrock_chat_fallback")
+
+
+@FALLBACK_HANDLERS.provider("conversation_history")
+@CHAT_HANDLERS.provider("conversation_history")
+def _conversation_history(action, ctx: HandlerContext) -> List[Dict[Text, Text]]:
+    """Last 10 user/bot events as chat messages"""
+    conversation_history = []
+    for event in ctx.tracker.events[-10:]:
+        if event.get("event") == "user":
+            conversation_history.append({"role": "user", "content": event.get("text", "")})
+        elif event.get("event") == "bot":
+            conversation_history.append({"role": "assistant", "content": event.get("text", "")})
+    return conversation_history
+
+
+@FALLBACK_HANDLERS.provider("turn_context")
+@CHAT_HANDLERS.provider("turn_context")
+def _turn_context(action, ctx: HandlerContext) -> TurnContext:
+    """Patient profile, appointments and history, cached for the session"""
+    return PatientContextCache.get(ctx.sender_id, user_id=ctx.tracker.get_slot("user_id"))
+
+
+@FALLBACK_HANDLERS.provider("rag_retriever")
+@CHAT_HANDLERS.provider("rag_retriever")
+def _rag_retriever(action, ctx: HandlerContext):
+    return action._get_rag_retriever()
+
+
+@FALLBACK_HANDLERS.provider("rag_context", requires=("rag_retriever", "turn_context"))
+@CHAT_HANDLERS.provider("rag_context", requires=("rag_retriever", "turn_context"))
+def _rag_context(action, ctx: HandlerContext) -> Dict[Text, Any]:
+    """RAG context for the message, retrieved once per turn. Handlers that add to it work on a copy."""
+    rag_retriever = ctx.get("rag_retriever")
+    if not rag_retriever:
+        return {}
+    try:
+        user_id = ctx.tracker.get_slot("user_id")
+        patient_id = ctx.get("turn_context").patient_id if user_id else None
+        retrieved_context = rag_retriever.retrieve_context(
+            query=ctx.text,
+            user_id=user_id,
+            patient_id=patient_id
+        ) or {}
+        logging.info(f"RAG retrieved context with {len(retrieved_context)} data types")
+        return retrieved_context
+    except Exception as e:
+        logging.debug(f"RAG retrieval failed: {e}")
+        return {}
+
+
+@FALLBACK_HANDLERS.provider("retrieved_context", requires=("rag_context",))
+def _retrieved_context(action, ctx: HandlerContext) -> Dict[Text, Any]:
+    """The turn's RAG context; the conversation handler passes its own, with Text-to-SQL results added"""
+    return ctx.get("rag_context")
+
+
+@CHAT_HANDLERS.provider("insurance_plans")
+def _insurance_plans(action, ctx: HandlerContext) -> List[Dict[Text, Any]]:
+    """Insurance plans from the database, or the sample plans if none are available"""
+    insurance_plans = DatabaseHelper.get_insurance_plans()
+    logging.info(f"Retrieved {len(insurance_plans) if insurance_plans else 0} insurance plans from database")
+    if not insurance_plans:
+        insurance_plans = DatabaseHelper._get_sample_insurance_plans()
+        logging.info(f"Using {len(insurance_plans)} sample insurance plans")
+    return insurance_plans
+
 
 class AWSBedrockChat(Action):
     """Super intelligent RAG-powered chatbot with AWS services for conversational responses"""
     
-    # Class-level guard to prevent multiple executions for same message
-    _execution_tracker = {}
-    _execution_lock = threading.Lock()
-    
     def __init__(self):
         # Lazy initialization - only create services when needed
         # This allows simple queries to work even if AWS services fail
@@ -1358,1269 +1816,992 @@ class AWSBedrockChat(Action):
     def name(self) -> Text:
         return "action_aws_bedrock_chat"
     
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        # The turn makes a chain of blocking psycopg2/boto3 calls; running it on the action executor
+        # keeps the event loop free so other senders' turns proceed concurrently. Bedrock retries stop at the turn deadline.
+        with turn_deadline():
+            return await run_blocking(self._run_turn, dispatcher, tracker, domain)
     
-        # Wrap dispatcher with SafeDispatcher to prevent duplicates
+    def _run_turn(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         user_message = tracker.latest_message.get("text", "")
         sender_id = tracker.sender_id
         
-        # Prevent multiple executions for the same message within 0.5 seconds (very short window)
-        # This prevents rapid duplicates but allows legitimate follow-up messages
-        message_hash = hashlib.md5(f"{sender_id}_{user_message}".encode()).hexdigest()
-        current_time = time.time()
-        
-        with AWSBedrockChat._execution_lock:
-            if message_hash in AWSBedrockChat._execution_tracker:
-                last_time = AWSBedrockChat._execution_tracker[message_hash]
-                if current_time - last_time < 0.5:  # 0.5 second window - very short to prevent rapid duplicates only
-                    logging.warning(f"Preventing duplicate execution for message: '{user_message[:50]}...' from sender {sender_id}")
-                    return []  # Return empty to prevent duplicate execution
-            
-            AWSBedrockChat._execution_tracker[message_hash] = current_time
-            
-            # Clean up old entries (older than 5 seconds)
-            for mhash in list(AWSBedrockChat._execution_tracker.keys()):
-                if current_time - AWSBedrockChat._execution_tracker[mhash] > 5:
-                    del AWSBedrockChat._execution_tracker[mhash]
+        # A duplicate call for the same message arriving while the first run is in flight, or just
+        # after it finished, never runs again. Only a true retry - Rasa re-calling the action with
+        # the same message_id after its call timed out - gets the first run's responses replayed;
+        # anything else (a second prediction in the same turn, a message without a message_id)
+        # returns nothing, as the reply has already gone out. A user legitimately repeating
+        # themselves gets a new message_id and so a fresh reply.
+        coordination = get_coordination_backend()
+        rasa_message_id = tracker.latest_message.get("message_id")
+        message_id = rasa_message_id or hashlib.md5(user_message.encode()).hexdigest()
+        is_leader, call = coordination.begin(("run", sender_id, message_id), shard_key=sender_id)
+        if not is_leader:
+            if not rasa_message_id or self._ran_this_turn(tracker):
+                logging.info(f"Skipping duplicate execution for '{user_message[:50]}...' from sender {sender_id}")
+                return []
+            # A follower answers within the same turn deadline as the leader would
+            remaining = remaining_turn_time()
+            timeout = INFLIGHT_WAIT_SECONDS if remaining is None else max(0.0, min(INFLIGHT_WAIT_SECONDS, remaining))
+            completed, result = coordination.wait(call, timeout=timeout)
+            if not completed or result is None:
+                logging.warning(f"Duplicate execution for '{user_message[:50]}...' from sender {sender_id} timed out waiting for the first run")
+                return []
+            messages, events = result
+            logging.info(f"Replaying first run's responses for retried '{user_message[:50]}...' from sender {sender_id}")
+            SafeDispatcher(dispatcher, sender_id, user_message).replay(messages)
+            return copy.deepcopy(events)
         
-        safe_dispatcher = SafeDispatcher(dispatcher, sender_id, user_message)
+        messages_before = len(dispatcher.messages)
+        events = None
+        try:
+            # Messages from one sender are answered in arrival order, even across replicas. Waiting
+            # for an earlier turn stops at this turn's deadline; Rasa has given up on the call by then.
+            remaining = remaining_turn_time()
+            turn_timeout = SENDER_TURN_LEASE_SECONDS if remaining is None else max(0.0, remaining)
+            with coordination.sender_turn(sender_id, timeout=turn_timeout):
+                events = self._respond(dispatcher, tracker, domain)
+            return events
+        finally:
+            coordination.finish(call, (dispatcher.messages[messages_before:], events or []))
+    
+    def _ran_this_turn(self, tracker: Tracker) -> bool:
+        """Whether this action already ran since the latest user message (i.e. this is not a retry)"""
+        for event in reversed(tracker.events):
+            if event.get("event") == "user":
+                return False
+            if event.get("event") == "action" and event.get("name") == self.name():
+                return True
+        return False
+    
+    def _respond(self, dispatcher: CollectingDispatcher,
+                 tracker: Tracker,
+                 domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        # Wrap dispatcher with SafeDispatcher to prevent duplicates
+        user_message = tracker.latest_message.get("text", "")
+        sender_id = tracker.sender_id
         
+        safe_dispatcher = SafeDispatcher(dispatcher, sender_id, user_message)
+
         try:
-            msg_lower = user_message.lower()
             logging.info(f"action_aws_bedrock_chat called with message: '{user_message}' from sender: {sender_id}")
+            # One keyword scan over the message picks the handler; it fetches only the data it declared
+            return CHAT_HANDLERS.dispatch(self, safe_dispatcher, tracker)
             
-            # PRIORITY 0: Direct insurance query handler - MUST be FIRST, before everything else
-            # This ensures "I want insurance", "insurance plans", etc. ALWAYS work
-            # CRITICAL: Check this BEFORE any other logic
-            has_insurance_word = "insurance" in msg_lower
-            has_doctor_word = any(word in msg_lower for word in ["doctor", "physician", "specialist", "medical professional"])
-            explicit_insurance_phrases = [
-                "i want insurance", "want insurance", "need insurance",
-                "insurance plan", "insurance plans", 
-                "can you help me with insurance", "help me with insurance",
-                "show me insurance", "show insurance plans",
-                "insurance coverage", "insurance benefits", "insurance premium"
-            ]
-            has_explicit_phrase = any(phrase in msg_lower for phrase in explicit_insurance_phrases)
-            is_insurance_query = (has_insurance_word or has_explicit_phrase) and not has_doctor_word
-            
-            logging.info(f"PRIORITY 0: Insurance check - msg='{user_message}', has_insurance={has_insurance_word}, has_doctor={has_doctor_word}, explicit={has_explicit_phrase}, is_insurance={is_insurance_query}")
-            
-            if is_insurance_query:
-                logging.info("PRIORITY 0: INSURANCE QUERY DETECTED - EXECUTING HANDLER")
-                logging.info("PRIORITY 0: Direct insurance query detected - handling immediately")
-                try:
-                    insurance_plans = DatabaseHelper.get_insurance_plans()
-                    logging.info(f"PRIORITY 0: Retrieved {len(insurance_plans) if insurance_plans else 0} insurance plans from database")
-                    if not insurance_plans:
-                        insurance_plans = DatabaseHelper._get_sample_insurance_plans()
-                        logging.info(f"PRIORITY 0: Using {len(insurance_plans)} sample insurance plans")
-                    
-                    if insurance_plans and len(insurance_plans) > 0:
-                        response = f"✅ **Here are all available insurance plans ({len(insurance_plans)}):**\n\n"
-                        for i, plan in enumerate(insurance_plans[:5], 1):
-                            response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
-                            premium = plan.get('monthly_premium', 'N/A')
-                            if isinstance(premium, str) and not premium.startswith('$'):
-                                premium = f"${premium}"
-                            response += f"   💰 Monthly Premium: {premium}\n"
-                            
-                            coverage = plan.get('coverage', 'N/A')
-                            if isinstance(coverage, (int, float)):
-                                coverage = f"{int(coverage)}%"
-                            elif isinstance(coverage, str) and not coverage.endswith('%'):
-                                coverage = f"{coverage}%"
-                            response += f"   📊 Coverage: {coverage}\n"
-                            
-                            deductible = plan.get('deductible', 'N/A')
-                            if isinstance(deductible, str) and not deductible.startswith('$'):
-                                deductible = f"${deductible}"
-                            response += f"   💳 Deductible: {deductible}\n"
-                            
-                            features = plan.get('features', [])
-                            if features:
-                                if isinstance(features, list):
-                                    response += f"   ✨ Features: {', '.join(features[:3])}\n"
-                            response += "\n"
-                        response += "📋 **Would you like more details about any specific plan?**\n"
-                        response += "Just tell me the plan name or number!"
-                        
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"PRIORITY 0: SUCCESS - Displayed {len(insurance_plans)} insurance plans - RETURNING []")
-                        return []  # CRITICAL: Must return here to prevent fallthrough
-                    else:
-                        logging.error("PRIORITY 0: ERROR - No insurance plans available!")
-                        # Even if no plans, return a helpful message
-                        safe_dispatcher.utter_message(text="I'm having trouble retrieving insurance plans right now. Please try again in a moment.")
-                        return []
-                except Exception as e:
-                    logging.error(f"PRIORITY 0: EXCEPTION in insurance handler: {e}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-                    # Even on error, return something
-                    safe_dispatcher.utter_message(text="I'm having trouble retrieving insurance plans right now. Please try again in a moment.")
-                    return []
-            else:
-                logging.info(f"PRIORITY 0: Not an insurance query (is_insurance={is_insurance_query}), continuing to other handlers")
-            
-            # Get conversation history for intelligent responses
-            conversation_history = []
-            for event in tracker.events[-10:]:  # Last 10 events for conversation context
-                if event.get("event") == "user":
-                    conversation_history.append({
-                        "role": "user",
-                        "content": event.get("text", "")
-                    })
-                elif event.get("event") == "bot":
-                    conversation_history.append({
-                        "role": "assistant",
-                        "content": event.get("text", "")
-                    })
+        except Exception as e:
+            # Catch any unhandled exceptions - ALWAYS return a response
+            logging.error(f"Critical error in action_aws_bedrock_chat: {e}")
+            import traceback
+            logging.error(traceback.format_exc())
             
-            # PRIORITY 1: Handle "yes" responses FIRST (before AWS Intelligence)
-            # This ensures "yes" is handled intelligently with database retrieval
-            msg_lower = user_message.lower()
-            if any(word in msg_lower for word in ["yes", "yeah", "yep", "sure", "ok", "okay"]) and len(msg_lower.strip()) < 10:
-                # Check conversation context to understand what "yes" refers to
-                context_lower = " ".join([msg.get("content", "").lower() for msg in conversation_history[-5:]])
-                logging.info(f"Detected 'yes' response, context: {context_lower[:100]}")
-                
-                # Get RAG retriever for database access
-                rag_retriever = self._get_rag_retriever()
-                retrieved_context = {}
-                
-                # Retrieve context from database
-                if rag_retriever:
-                    try:
-                        user_id = tracker.get_slot("user_id")
-                        patient_id = None
-                        if user_id:
-                            try:
-                                patient_info = DatabaseHelper.get_patient_info(user_id=user_id)
-                                if patient_info:
-                                    patient_id = patient_info.get('patient_id')
-                            except:
-                                pass
-                        
-                        retrieved_context = rag_retriever.retrieve_context(
-                            query=user_message,
-                            user_id=user_id,
-                            patient_id=patient_id
-                        )
-                        logging.info(f"RAG retrieved context with {len(retrieved_context)} data types")
-                    except Exception as e:
-                        logging.debug(f"RAG retrieval for yes handling failed: {e}")
+            # Provide helpful response even on error
+            try:
+                user_message = tracker.latest_message.get("text", "") if 'tracker' in locals() else ""
+                msg_lower = user_message.lower() if user_message else ""
                 
-                doctors_from_rag = retrieved_context.get('doctors', []) if retrieved_context else []
-                insurance_plans_from_rag = retrieved_context.get('insurance_plans', []) if retrieved_context else []
+                if any(word in msg_lower for word in ["suffering", "sick", "symptom", "viral", "infection"]):
+                    error_response = "I understand you're not feeling well. I can help you find the right doctor, book an appointment, or provide health guidance. What symptoms are you experiencing?"
+                elif any(word in msg_lower for word in ["help", "assist", "how can you"]):
+                    error_response = "I'm Dr. AI, your healthcare assistant! I can help with finding doctors, booking appointments, health questions, and more. What would you like help with?"
+                else:
+                    error_response = "Hello! I'm Dr. AI, your healthcare assistant. I can help with appointments, insurance, health questions, and more. How can I assist you today?"
                 
-                # Handle "yes" for doctors - check if previous message mentioned doctors
-                if "doctor" in context_lower or "specialist" in context_lower or "physician" in context_lower or "suggest" in context_lower or "search" in context_lower or "available" in context_lower:
-                    logging.info("Handling 'yes' for doctors query")
-                    specialty = None
-                    if "viral" in context_lower or "symptom" in context_lower or "suffering" in context_lower:
-                        specialty = "general medicine"
-                    
-                    doctors = doctors_from_rag
-                    if not doctors and rag_retriever:
-                        try:
-                            doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
-                            logging.info(f"RAG retrieved {len(doctors) if doctors else 0} doctors")
-                        except Exception as e:
-                            logging.debug(f"RAG doctor retrieval failed: {e}")
+                # Always send error response - use safe dispatcher
+                try:
+                    safe_dispatcher = SafeDispatcher(dispatcher, sender_id, user_message)
+                    safe_dispatcher.utter_message(text=error_response)
+                except:
+                    # Last resort - use regular dispatcher if safe dispatcher fails
+                    dispatcher.utter_message(text=error_response)
+                logging.info(f"action_aws_bedrock_chat: Error handled, returning fallback response")
+                return []
+            except Exception as e2:
+                logging.error(f"Error in final fallback: {e2}")
+                # Last resort - return empty list (Rasa will handle it)
+                return []
+
+    @CHAT_HANDLERS.handler("insurance_plans", priority=0, any_of=INSURANCE_KEYWORDS,
+                           none_of=DOCTOR_KEYWORDS, requires=("insurance_plans",))
+    def _handle_insurance_query(self, ctx: HandlerContext) -> List[Dict[Text, Any]]:
+        # "I want insurance", "insurance plans", etc. are answered straight from the plans table
+        safe_dispatcher = ctx.dispatcher
+        try:
+            insurance_plans = ctx.get("insurance_plans")
+            
+            if insurance_plans and len(insurance_plans) > 0:
+                response = f"✅ **Here are all available insurance plans ({len(insurance_plans)}):**\n\n"
+                for i, plan in enumerate(insurance_plans[:5], 1):
+                    response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
+                    premium = plan.get('monthly_premium', 'N/A')
+                    if isinstance(premium, str) and not premium.startswith('$'):
+                        premium = f"${premium}"
+                    response += f"   💰 Monthly Premium: {premium}\n"
                     
-                    if not doctors:
-                        try:
-                            doctors = DatabaseHelper.get_doctors(specialty=specialty)
-                            logging.info(f"DatabaseHelper retrieved {len(doctors) if doctors else 0} doctors")
-                        except Exception as e:
-                            logging.debug(f"Could not fetch doctors: {e}")
+                    coverage = plan.get('coverage', 'N/A')
+                    if isinstance(coverage, (int, float)):
+                        coverage = f"{int(coverage)}%"
+                    elif isinstance(coverage, str) and not coverage.endswith('%'):
+                        coverage = f"{coverage}%"
+                    response += f"   📊 Coverage: {coverage}\n"
                     
-                    if doctors and len(doctors) > 0:
-                        response = f"I found {len(doctors)} doctor(s) available in our database:\n\n"
-                        for i, doc in enumerate(doctors[:5], 1):
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                            if doc.get('department'):
-                                response += f"   Department: {doc.get('department')}\n"
-                            if doc.get('phone'):
-                                response += f"   Phone: {doc.get('phone')}\n"
-                            if doc.get('experience_years'):
-                                response += f"   Experience: {doc.get('experience_years')} years\n"
-                            if doc.get('rating'):
-                                response += f"   Rating: {doc.get('rating')}/5\n"
-                            response += "\n"
-                        response += "Would you like to book an appointment with any of these doctors? I can help you schedule a visit!"
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"action_aws_bedrock_chat: Handled 'yes' for doctors, found {len(doctors)} doctors")
-                        return []
-                    else:
-                        # ALWAYS use sample doctors if database fails
-                        logging.warning("No doctors from database for 'yes' response, using sample data")
-                        doctors = DatabaseHelper._get_sample_doctors(specialty="general medicine")
-                        
-                        if doctors and len(doctors) > 0:
-                            response = f"✅ **I found {len(doctors)} doctor(s) for you:**\n\n"
-                            for i, doc in enumerate(doctors[:5], 1):
-                                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                                response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
-                                response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
-                                if doc.get('phone'):
-                                    response += f"   📞 Phone: {doc.get('phone')}\n"
-                                if doc.get('email'):
-                                    response += f"   ✉️ Email: {doc.get('email')}\n"
-                                if doc.get('experience_years') or doc.get('experience'):
-                                    exp = doc.get('experience_years') or doc.get('experience')
-                                    response += f"   👨‍⚕️ Experience: {exp} years\n"
-                                if doc.get('rating'):
-                                    response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
-                                response += "\n"
-                            response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
-                            response += "Just tell me the doctor's name or number!"
-                        else:
-                            # Final fallback
-                            response = "✅ **I found these doctors for you:**\n\n"
-                            response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
-                            response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
-                            response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n\n"
-                            response += "Would you like to book an appointment with any of these doctors?"
-                        
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"action_aws_bedrock_chat: Handled 'yes' for doctors, showing {len(doctors) if doctors else 0} doctors")
-                        return []
-                
-                # Handle "yes" for insurance
-                elif "insurance" in context_lower or "plan" in context_lower or "coverage" in context_lower:
-                    logging.info("Handling 'yes' for insurance query")
-                    insurance_plans = insurance_plans_from_rag
-                    if not insurance_plans:
-                        try:
-                            insurance_plans = DatabaseHelper.get_insurance_plans()
-                        except Exception as e:
-                            logging.debug(f"Could not fetch insurance plans: {e}")
+                    deductible = plan.get('deductible', 'N/A')
+                    if isinstance(deductible, str) and not deductible.startswith('$'):
+                        deductible = f"${deductible}"
+                    response += f"   💳 Deductible: {deductible}\n"
                     
-                    if insurance_plans and len(insurance_plans) > 0:
-                        response = f"Here are all available insurance plans from our database ({len(insurance_plans)} plans):\n\n"
-                        for i, plan in enumerate(insurance_plans[:5], 1):
-                            response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
-                            response += f"   Monthly Premium: {plan.get('monthly_premium', 'N/A')}\n"
-                            response += f"   Deductible: {plan.get('deductible', 'N/A')}\n"
-                            response += f"   Coverage: {plan.get('coverage', 'N/A')}\n"
-                            features = plan.get('features', [])
-                            if features:
-                                if isinstance(features, list):
-                                    response += f"   Features: {', '.join(features[:3])}\n"
-                                else:
-                                    response += f"   Features: {features}\n"
-                            response += "\n"
-                        response += "Would you like more details about any specific plan, or personalized recommendations based on your needs?"
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"action_aws_bedrock_chat: Handled 'yes' for insurance, found {len(insurance_plans)} plans")
-                        return []
-                    else:
-                        # Fallback for insurance
-                        response = "I can help you with insurance! I can show you available plans, explain coverage options, and help you choose the right plan. Would you like me to show you our insurance plans?"
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info("action_aws_bedrock_chat: Handled 'yes' for insurance, but no plans found")
-                        return []
+                    features = plan.get('features', [])
+                    if features:
+                        if isinstance(features, list):
+                            response += f"   ✨ Features: {', '.join(features[:3])}\n"
+                    response += "\n"
+                response += "📋 **Would you like more details about any specific plan?**\n"
+                response += "Just tell me the plan name or number!"
                 
-                # Fallback for "yes" that doesn't match specific conditions
-                else:
-                    # Use intelligent fallback to provide helpful response
-                    try:
-                        response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                        if not response or len(response) < 20:
-                            response = "I'm here to help! Could you please tell me more about what you need? For example:\n1. 'I need to find a doctor'\n2. 'I want to book an appointment'\n3. 'I need help with insurance'\n4. 'I have [symptoms]'\n\nWhat can I help you with?"
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info("action_aws_bedrock_chat: Handled generic 'yes' with fallback")
-                        return []
-                    except Exception as e:
-                        logging.error(f"Error in yes fallback: {e}")
-                        # Ensure we still send a response
-                        response = "I'm here to help! Could you please tell me more about what you need? For example:\n• 'I need to find a doctor'\n• 'I want to book an appointment'\n• 'I need help with insurance'\n• 'I have [symptoms]'\n\nWhat can I help you with?"
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info("action_aws_bedrock_chat: Handled generic 'yes' with error fallback")
-                        return []
-            
-            # PRIORITY 1: Use AWS Bedrock LLM Router - intelligently handle ALL queries
-            # This is the PRIMARY handler for non-insurance queries - LLM understands context and intent
-            llm_router = self._get_llm_router()
-            
-            # First, retrieve basic context for routing decision
-            rag_retriever = self._get_rag_retriever()
-            retrieved_context = {}
+                safe_dispatcher.utter_message(text=response)
+                logging.info(f"PRIORITY 0: SUCCESS - Displayed {len(insurance_plans)} insurance plans - RETURNING []")
+                return []  # CRITICAL: Must return here to prevent fallthrough
+            else:
+                logging.error("PRIORITY 0: ERROR - No insurance plans available!")
+                # Even if no plans, return a helpful message
+                safe_dispatcher.utter_message(text="I'm having trouble retrieving insurance plans right now. Please try again in a moment.")
+                return []
+        except Exception as e:
+            logging.error(f"PRIORITY 0: EXCEPTION in insurance handler: {e}")
+            import traceback
+            logging.error(traceback.format_exc())
+            # Even on error, return something
+            safe_dispatcher.utter_message(text="I'm having trouble retrieving insurance plans right now. Please try again in a moment.")
+            return []
+
+    @CHAT_HANDLERS.handler("affirmation", priority=1, any_of=AFFIRMATION_WORDS, max_length=10,
+                           requires=("conversation_history", "rag_context"))
+    def _handle_affirmation(self, ctx: HandlerContext) -> List[Dict[Text, Any]]:
+        # Short "yes"/"ok" replies are resolved against the last few turns, with database retrieval
+        safe_dispatcher = ctx.dispatcher
+        user_message = ctx.text
+        conversation_history = ctx.get("conversation_history")
+        # Check conversation context to understand what "yes" refers to
+        context_lower = " ".join([msg.get("content", "").lower() for msg in conversation_history[-5:]])
+        logging.info(f"Detected 'yes' response, context: {context_lower[:100]}")
+        
+        # Retrieve context from database
+        rag_retriever = ctx.get("rag_retriever")
+        retrieved_context = ctx.get("rag_context")
+        
+        doctors_from_rag = retrieved_context.get('doctors', []) if retrieved_context else []
+        insurance_plans_from_rag = retrieved_context.get('insurance_plans', []) if retrieved_context else []
+        
+        # Handle "yes" for doctors - check if previous message mentioned doctors
+        if "doctor" in context_lower or "specialist" in context_lower or "physician" in context_lower or "suggest" in context_lower or "search" in context_lower or "available" in context_lower:
+            logging.info("Handling 'yes' for doctors query")
+            specialty = None
+            if "viral" in context_lower or "symptom" in context_lower or "suffering" in context_lower:
+                specialty = "general medicine"
             
-            if rag_retriever:
+            doctors = doctors_from_rag
+            if not doctors and rag_retriever:
                 try:
-                    user_id = tracker.get_slot("user_id")
-                    retrieved_context = rag_retriever.retrieve_context(
-                        query=user_message,
-                        user_id=user_id,
-                        patient_id=None
-                    )
+                    doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
+                    logging.info(f"RAG retrieved {len(doctors) if doctors else 0} doctors")
                 except Exception as e:
-                    logging.debug(f"RAG retrieval for routing failed: {e}")
+                    logging.debug(f"RAG doctor retrieval failed: {e}")
             
-            # Use LLM Router to determine action
-            routing_decision = None
-            if llm_router:
+            if not doctors:
                 try:
-                    routing_decision = llm_router.route_query(
-                        user_message=user_message,
-                        conversation_history=conversation_history,
-                        retrieved_context=retrieved_context,
-                        available_data={}
-                    )
-                    logging.info(f"LLM Router decision: {routing_decision.get('action')} - {routing_decision.get('data_type')}")
+                    doctors = DatabaseHelper.get_doctors(specialty=specialty)
+                    logging.info(f"DatabaseHelper retrieved {len(doctors) if doctors else 0} doctors")
                 except Exception as e:
-                    logging.error(f"LLM Router failed: {e}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-                    # Ensure routing_decision is set to fallback
-                    routing_decision = None
+                    logging.debug(f"Could not fetch doctors: {e}")
             
-            # If LLM Router determined we need data, retrieve it
-            if routing_decision and routing_decision.get('needs_data'):
-                data_type = routing_decision.get('data_type')
-                action = routing_decision.get('action')
-                parameters = routing_decision.get('parameters', {})
-                
-                # Retrieve the required data
-                if data_type == 'doctors':
-                    specialty = parameters.get('specialty')
-                    try:
-                        if specialty:
-                            # Map specialty format
-                            specialty_map = {
-                                'general_medicine': 'general medicine',
-                                'gynecology': 'gynecology',
-                                'cardiology': 'cardiology',
-                                'neurology': 'neurology',
-                                'dermatology': 'dermatology',
-                                'pediatrics': 'pediatrics',
-                                'orthopedics': 'orthopedics',
-                                'psychiatry': 'psychiatry',
-                                'gastroenterology': 'gastroenterology',
-                                'endocrinology': 'endocrinology',
-                                'urology': 'urology',
-                                'ent': 'ent',
-                                'ophthalmology': 'ophthalmology',
-                                'pulmonology': 'pulmonology'
-                            }
-                            db_specialty = specialty_map.get(specialty, specialty)
-                            doctors = DatabaseHelper.get_doctors(specialty=db_specialty)
-                        else:
-                            doctors = DatabaseHelper.get_doctors(limit=10)
-                        
-                        if not doctors or len(doctors) == 0:
-                            doctors = DatabaseHelper._get_sample_doctors(specialty or 'general medicine')
-                        
-                        retrieved_context['doctors'] = doctors
-                        logging.info(f"Retrieved {len(doctors)} doctors for {action}")
-                    except Exception as e:
-                        logging.error(f"Error retrieving doctors: {e}")
-                        retrieved_context['doctors'] = DatabaseHelper._get_sample_doctors(specialty or 'general medicine')
-                    
-                    # ALWAYS show doctors directly if we have them (don't rely on LLM response generation)
-                    if retrieved_context.get('doctors') and len(retrieved_context['doctors']) > 0:
-                        doctors = retrieved_context['doctors']
-                        specialty_display = parameters.get('specialty_display_name', 'doctor')
-                        response = f"✅ **I found {len(doctors)} {specialty_display}{'s' if len(doctors) > 1 else ''}:**\n\n"
-                        for i, doc in enumerate(doctors[:5], 1):
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
-                            response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
-                            if doc.get('phone'):
-                                response += f"   📞 Phone: {doc.get('phone')}\n"
-                            if doc.get('email'):
-                                response += f"   ✉️ Email: {doc.get('email')}\n"
-                            if doc.get('experience_years') or doc.get('experience'):
-                                exp = doc.get('experience_years') or doc.get('experience')
-                                response += f"   👨‍⚕️ Experience: {exp} years\n"
-                            if doc.get('rating'):
-                                response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
-                            response += "\n"
-                        response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
-                        response += "Just tell me the doctor's name or number and your preferred date/time!"
-                        
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"LLM Router: Displayed {len(doctors)} doctors directly")
-                        return []
+            if doctors and len(doctors) > 0:
+                response = f"I found {len(doctors)} doctor(s) available in our database:\n\n"
+                for i, doc in enumerate(doctors[:5], 1):
+                    response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                    response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
+                    if doc.get('department'):
+                        response += f"   Department: {doc.get('department')}\n"
+                    if doc.get('phone'):
+                        response += f"   Phone: {doc.get('phone')}\n"
+                    if doc.get('experience_years'):
+                        response += f"   Experience: {doc.get('experience_years')} years\n"
+                    if doc.get('rating'):
+                        response += f"   Rating: {doc.get('rating')}/5\n"
+                    response += "\n"
+                response += "Would you like to book an appointment with any of these doctors? I can help you schedule a visit!"
+                safe_dispatcher.utter_message(text=response)
+                logging.info(f"action_aws_bedrock_chat: Handled 'yes' for doctors, found {len(doctors)} doctors")
+                return []
+            else:
+                # ALWAYS use sample doctors if database fails
+                logging.warning("No doctors from database for 'yes' response, using sample data")
+                doctors = DatabaseHelper._get_sample_doctors(specialty="general medicine")
                 
-                elif data_type == 'insurance':
-                    try:
-                        insurance_plans = DatabaseHelper.get_insurance_plans()
-                        if not insurance_plans:
-                            insurance_plans = DatabaseHelper._get_sample_insurance_plans()
-                        retrieved_context['insurance_plans'] = insurance_plans
-                        logging.info(f"Retrieved {len(insurance_plans)} insurance plans")
-                    except Exception as e:
-                        logging.error(f"Error retrieving insurance: {e}")
-                        retrieved_context['insurance_plans'] = DatabaseHelper._get_sample_insurance_plans()
-                    
-                    # ALWAYS show insurance plans directly
-                    if retrieved_context.get('insurance_plans') and len(retrieved_context['insurance_plans']) > 0:
-                        plans = retrieved_context['insurance_plans']
-                        response = f"✅ **Here are all available insurance plans ({len(plans)}):**\n\n"
-                        for i, plan in enumerate(plans[:5], 1):
-                            response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
-                            # monthly_premium is already formatted as "$150" from database
-                            premium = plan.get('monthly_premium', 'N/A')
-                            if isinstance(premium, str) and not premium.startswith('$'):
-                                premium = f"${premium}"
-                            response += f"   💰 Monthly Premium: {premium}\n"
-                            
-                            # coverage is already formatted as "80%" from database
-                            coverage = plan.get('coverage', 'N/A')
-                            if isinstance(coverage, (int, float)):
-                                coverage = f"{int(coverage)}%"
-                            elif isinstance(coverage, str) and not coverage.endswith('%'):
-                                coverage = f"{coverage}%"
-                            response += f"   📊 Coverage: {coverage}\n"
-                            
-                            # deductible is already formatted as "$1000" from database
-                            deductible = plan.get('deductible', 'N/A')
-                            if isinstance(deductible, str) and not deductible.startswith('$'):
-                                deductible = f"${deductible}"
-                            response += f"   💳 Deductible: {deductible}\n"
-                            
-                            # Features
-                            features = plan.get('features', [])
-                            if features:
-                                if isinstance(features, list):
-                                    response += f"   ✨ Features: {', '.join(features[:3])}\n"
-                                elif isinstance(features, str):
-                                    response += f"   ✨ Features: {features}\n"
-                            response += "\n"
-                        response += "📋 **Would you like more details about any specific plan?**\n"
-                        response += "Just tell me the plan name or number!"
-                        
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"LLM Router: Displayed {len(plans)} insurance plans directly")
-                        return []
+                if doctors and len(doctors) > 0:
+                    response = f"✅ **I found {len(doctors)} doctor(s) for you:**\n\n"
+                    for i, doc in enumerate(doctors[:5], 1):
+                        response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                        response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
+                        response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
+                        if doc.get('phone'):
+                            response += f"   📞 Phone: {doc.get('phone')}\n"
+                        if doc.get('email'):
+                            response += f"   ✉️ Email: {doc.get('email')}\n"
+                        if doc.get('experience_years') or doc.get('experience'):
+                            exp = doc.get('experience_years') or doc.get('experience')
+                            response += f"   👨‍⚕️ Experience: {exp} years\n"
+                        if doc.get('rating'):
+                            response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
+                        response += "\n"
+                    response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
+                    response += "Just tell me the doctor's name or number!"
+                else:
+                    # Final fallback
+                    response = "✅ **I found these doctors for you:**\n\n"
+                    response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
+                    response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
+                    response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n\n"
+                    response += "Would you like to book an appointment with any of these doctors?"
                 
-                # Generate response using LLM Router (only if we didn't show data directly)
-                if llm_router:
-                    try:
-                        response = llm_router.generate_response(
-                            action=action,
-                            data=retrieved_context,
-                            parameters=parameters,
-                            template=routing_decision.get('response_template')
-                        )
-                        safe_dispatcher.utter_message(text=response)
-                        logging.info(f"LLM Router generated response for {action}")
-                        return []
-                    except Exception as e:
-                        logging.error(f"LLM Router response generation failed: {e}")
-            
-            # Fallback: Use AWS Bedrock for intelligent conversational responses
-            # This enables super intelligent back-and-forth conversations
-            aws_intelligence = self._get_aws_intelligence()
-            bedrock_helper = self._get_bedrock_helper()
-            
-            # For ALL queries, try to use intelligent Bedrock response
-            intelligent_response = None
-            
-            if aws_intelligence:
+                safe_dispatcher.utter_message(text=response)
+                logging.info(f"action_aws_bedrock_chat: Handled 'yes' for doctors, showing {len(doctors) if doctors else 0} doctors")
+                return []
+        
+        # Handle "yes" for insurance
+        elif "insurance" in context_lower or "plan" in context_lower or "coverage" in context_lower:
+            logging.info("Handling 'yes' for insurance query")
+            insurance_plans = insurance_plans_from_rag
+            if not insurance_plans:
                 try:
-                    # Use AWS Intelligence for super intelligent conversational responses
-                    # This works for ALL queries - greetings, questions, everything
-                    intelligent_response = aws_intelligence.generate_conversational_response(
-                        user_message=user_message,
-                        context=retrieved_context,  # Use retrieved context
-                        conversation_history=conversation_history,
-                        medical_entities={},
-                        sentiment=None
-                    )
-                    
-                    # Check if response is an error message - if so, don't use it, use fallback instead
-                    if intelligent_response and intelligent_response.strip():
-                        error_indicators = [
-                            "trouble connecting to my AI brain",
-                            "AWS credentials are configured",
-                            "configuration issue",
-                            "encountered a technical issue"
-                        ]
-                        is_error_response = any(indicator in intelligent_response for indicator in error_indicators)
-                        
-                        if not is_error_response:
-                            # We got a valid intelligent response! Use it.
-                            safe_dispatcher.utter_message(text=intelligent_response)
-                            logging.info(f"action_aws_bedrock_chat returning intelligent response: {intelligent_response[:100]}...")
-                            return []
-                        else:
-                            # Error response from Bedrock - use fallback instead
-                            logging.debug(f"Bedrock returned error message, using fallback instead")
-                            intelligent_response = None
+                    insurance_plans = DatabaseHelper.get_insurance_plans()
                 except Exception as e:
-                    logging.debug(f"AWS Intelligence conversational response failed: {e}")
+                    logging.debug(f"Could not fetch insurance plans: {e}")
             
-            # Check if it's a simple query (greetings, etc.)
-            is_simple_query = any(word in msg_lower for word in [
-                "hi", "hello", "hey", "good morning", "good afternoon", "good evening",
-                "thanks", "thank you", "bye", "goodbye"
-            ])
+            if insurance_plans and len(insurance_plans) > 0:
+                response = f"Here are all available insurance plans from our database ({len(insurance_plans)} plans):\n\n"
+                for i, plan in enumerate(insurance_plans[:5], 1):
+                    response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
+                    response += f"   Monthly Premium: {plan.get('monthly_premium', 'N/A')}\n"
+                    response += f"   Deductible: {plan.get('deductible', 'N/A')}\n"
+                    response += f"   Coverage: {plan.get('coverage', 'N/A')}\n"
+                    features = plan.get('features', [])
+                    if features:
+                        if isinstance(features, list):
+                            response += f"   Features: {', '.join(features[:3])}\n"
+                        else:
+                            response += f"   Features: {features}\n"
+                    response += "\n"
+                response += "Would you like more details about any specific plan, or personalized recommendations based on your needs?"
+                safe_dispatcher.utter_message(text=response)
+                logging.info(f"action_aws_bedrock_chat: Handled 'yes' for insurance, found {len(insurance_plans)} plans")
+                return []
+            else:
+                # Fallback for insurance
+                response = "I can help you with insurance! I can show you available plans, explain coverage options, and help you choose the right plan. Would you like me to show you our insurance plans?"
+                safe_dispatcher.utter_message(text=response)
+                logging.info("action_aws_bedrock_chat: Handled 'yes' for insurance, but no plans found")
+                return []
+        
+        # Fallback for "yes" that doesn't match specific conditions
+        else:
+            # Use intelligent fallback to provide helpful response
+            try:
+                response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
+                if not response or len(response) < 20:
+                    response = "I'm here to help! Could you please tell me more about what you need? For example:\n1. 'I need to find a doctor'\n2. 'I want to book an appointment'\n3. 'I need help with insurance'\n4. 'I have [symptoms]'\n\nWhat can I help you with?"
+                safe_dispatcher.utter_message(text=response)
+                logging.info("action_aws_bedrock_chat: Handled generic 'yes' with fallback")
+                return []
+            except Exception as e:
+                logging.error(f"Error in yes fallback: {e}")
+                # Ensure we still send a response
+                response = "I'm here to help! Could you please tell me more about what you need? For example:\n• 'I need to find a doctor'\n• 'I want to book an appointment'\n• 'I need help with insurance'\n• 'I have [symptoms]'\n\nWhat can I help you with?"
+                safe_dispatcher.utter_message(text=response)
+                logging.info("action_aws_bedrock_chat: Handled generic 'yes' with error fallback")
+                return []
+
+    @staticmethod
+    def _usable_reply(reply: Optional[Text]) -> bool:
+        """Whether a Bedrock-generated reply can be shown (non-empty and not one of its error messages)"""
+        return bool(reply and reply.strip()) and not any(phrase in reply for phrase in BEDROCK_ERROR_PHRASES)
+
+    def _reply_with_llm(self, ctx: HandlerContext, retrieved_context: Dict[Text, Any]) -> bool:
+        """LLM routing, then a conversational Bedrock reply; True once a reply has been sent"""
+        conversation_history = ctx.get("conversation_history")
+
+        # PRIORITY 1: Use AWS Bedrock LLM Router - intelligently handle ALL queries
+        # This is the PRIMARY handler for non-insurance queries - LLM understands context and intent
+        llm_router = self._get_llm_router()
+        
+        # Use LLM Router to determine action
+        routing_decision = None
+        if llm_router:
+            try:
+                routing_decision = llm_router.route_query(
+                    user_message=ctx.text,
+                    conversation_history=conversation_history,
+                    retrieved_context=retrieved_context,
+                    available_data={}
+                )
+                logging.info(f"LLM Router decision: {routing_decision.get('action')} - {routing_decision.get('data_type')}")
+            except Exception as e:
+                logging.error(f"LLM Router failed: {e}")
+                import traceback
+                logging.error(traceback.format_exc())
+                # Ensure routing_decision is set to fallback
+                routing_decision = None
+        
+        # If LLM Router determined we need data, retrieve it
+        if routing_decision and routing_decision.get('needs_data'):
+            data_type = routing_decision.get('data_type')
+            action = routing_decision.get('action')
+            parameters = routing_decision.get('parameters', {})
             
-            if is_simple_query:
-                # Simple response if Bedrock not available
+            # Retrieve the required data
+            if data_type == 'doctors':
+                specialty = parameters.get('specialty')
                 try:
-                    if any(word in msg_lower for word in ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]):
-                        response = "Hello! I'm Dr. AI, your super intelligent healthcare assistant. I'm here to help with all your healthcare needs - appointments, insurance, finding doctors, symptom assessment, and more. How can I help you today?"
-                    elif any(word in msg_lower for word in ["thanks", "thank you"]):
-                        response = "You're welcome! I'm here whenever you need help with your healthcare needs. Is there anything else I can assist you with?"
-                    elif any(word in msg_lower for word in ["bye", "goodbye"]):
-                        response = "Goodbye! Take care of your health. Feel free to come back anytime you need assistance!"
+                    if specialty:
+                        # Map specialty format
+                        specialty_map = {
+                            'general_medicine': 'general medicine',
+                            'gynecology': 'gynecology',
+                            'cardiology': 'cardiology',
+                            'neurology': 'neurology',
+                            'dermatology': 'dermatology',
+                            'pediatrics': 'pediatrics',
+                            'orthopedics': 'orthopedics',
+                            'psychiatry': 'psychiatry',
+                            'gastroenterology': 'gastroenterology',
+                            'endocrinology': 'endocrinology',
+                            'urology': 'urology',
+                            'ent': 'ent',
+                            'ophthalmology': 'ophthalmology',
+                            'pulmonology': 'pulmonology'
+                        }
+                        db_specialty = specialty_map.get(specialty, specialty)
+                        doctors = DatabaseHelper.get_doctors(specialty=db_specialty)
                     else:
-                        response = "Hello! How can I help you today?"
+                        doctors = DatabaseHelper.get_doctors(limit=10)
                     
-                    safe_dispatcher.utter_message(text=response)
-                    logging.info(f"action_aws_bedrock_chat returning simple response: {response[:100]}...")
-                    return []
+                    if not doctors or len(doctors) == 0:
+                        doctors = DatabaseHelper._get_sample_doctors(specialty or 'general medicine')
+                    
+                    retrieved_context['doctors'] = doctors
+                    logging.info(f"Retrieved {len(doctors)} doctors for {action}")
                 except Exception as e:
-                    logging.error(f"Error in simple query path: {e}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-                    try:
-                        safe_dispatcher.utter_message(text="Hello! I'm Dr. AI, your healthcare assistant. How can I help you today?")
-                        return []
-                    except Exception as e2:
-                        logging.error(f"Error in fallback: {e2}")
-                        return []
-            
-            # For complex queries (not simple greetings), continue with RAG and AWS Intelligence
-                # RAG STEP 1: Retrieve relevant context from database
-            user_id = tracker.get_slot("user_id")
-            patient_id = None
-            patient_info = None
-            try:
-                patient_info = DatabaseHelper.get_patient_info(user_id=user_id)
-                if patient_info:
-                    patient_id = patient_info.get('patient_id')
-            except Exception as e:
-                logging.debug(f"Could not get patient info for RAG: {e}")
-            
-            # AWS INTELLIGENCE STEP 1: Analyze query with AWS services (only for complex queries)
-            aws_intelligence = self._get_aws_intelligence()
-            query_analysis = None
-            medical_entities = {}
-            sentiment = None
-            key_phrases = []
+                    logging.error(f"Error retrieving doctors: {e}")
+                    retrieved_context['doctors'] = DatabaseHelper._get_sample_doctors(specialty or 'general medicine')
+                
+                # ALWAYS show doctors directly if we have them (don't rely on LLM response generation)
+                if retrieved_context.get('doctors') and len(retrieved_context['doctors']) > 0:
+                    doctors = retrieved_context['doctors']
+                    specialty_display = parameters.get('specialty_display_name', 'doctor')
+                    response = f"✅ **I found {len(doctors)} {specialty_display}{'s' if len(doctors) > 1 else ''}:**\n\n"
+                    for i, doc in enumerate(doctors[:5], 1):
+                        response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                        response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
+                        response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
+                        if doc.get('phone'):
+                            response += f"   📞 Phone: {doc.get('phone')}\n"
+                        if doc.get('email'):
+                            response += f"   ✉️ Email: {doc.get('email')}\n"
+                        if doc.get('experience_years') or doc.get('experience'):
+                            exp = doc.get('experience_years') or doc.get('experience')
+                            response += f"   👨‍⚕️ Experience: {exp} years\n"
+                        if doc.get('rating'):
+                            response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
+                        response += "\n"
+                    response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
+                    response += "Just tell me the doctor's name or number and your preferred date/time!"
+                    
+                    ctx.dispatcher.utter_message(text=response)
+                    logging.info(f"LLM Router: Displayed {len(doctors)} doctors directly")
+                    return True
             
-            if aws_intelligence:
+            elif data_type == 'insurance':
                 try:
-                    query_analysis = aws_intelligence.analyze_query_intent(user_message)
-                    medical_entities = aws_intelligence.extract_medical_entities(user_message)
-                    sentiment = aws_intelligence.detect_sentiment(user_message)
-                    key_phrases = aws_intelligence.detect_key_phrases(user_message)
+                    insurance_plans = DatabaseHelper.get_insurance_plans()
+                    if not insurance_plans:
+                        insurance_plans = DatabaseHelper._get_sample_insurance_plans()
+                    retrieved_context['insurance_plans'] = insurance_plans
+                    logging.info(f"Retrieved {len(insurance_plans)} insurance plans")
                 except Exception as e:
-                    logging.debug(f"AWS Intelligence analysis failed: {e}")
-        
-            # RAG STEP 1: Retrieve relevant context from database (ALWAYS for intelligent responses)
-            rag_retriever = self._get_rag_retriever()
-            retrieved_context = {}
-            context_string = ""
-            
-            # ENHANCED: Use Text-to-SQL Agent for intelligent database queries
-            text_to_sql = self._get_text_to_sql_agent()
-            
-            # Always try to retrieve context from database for intelligent responses
-            if rag_retriever:
-                try:
-                    # STEP 1: Use Text-to-SQL Agent to understand query and generate SQL
-                    sql_result = None
-                    if text_to_sql:
-                        try:
-                            # Understand query intent first
-                            intent_result = text_to_sql.understand_query_intent(user_message)
-                            logging.info(f"Text-to-SQL Intent: {intent_result.get('intent')}, Entities: {intent_result.get('entities')}")
-                            
-                            # Generate SQL if it's a database query
-                            if intent_result.get('intent') in ['find_doctors', 'find_insurance', 'check_availability', 'book_appointment', 'get_medical_records']:
-                                sql_result = text_to_sql.generate_sql(user_message, context=intent_result)
-                                if sql_result:
-                                    logging.info(f"Text-to-SQL generated SQL for table: {sql_result.get('table')}")
-                                    
-                                    # Execute SQL if we have a connection
-                                    db_conn = DatabaseHelper.get_connection()
-                                    if db_conn and sql_result.get('sql'):
-                                        try:
-                                            sql_data = text_to_sql.execute_sql_safely(
-                                                sql_result['sql'],
-                                                sql_result.get('parameters', {}),
-                                                db_conn
-                                            )
-                                            
-                                            # Map SQL results to retrieved_context
-                                            table = sql_result.get('table', '')
-                                            if table == 'doctors' and sql_data:
-                                                retrieved_context['doctors'] = sql_data
-                                                logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} doctors")
-                                            elif table == 'insurance_plans' and sql_data:
-                                                retrieved_context['insurance_plans'] = sql_data
-                                                logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} insurance plans")
-                                            elif table == 'availability_slots' and sql_data:
-                                                retrieved_context['appointments'] = sql_data  # Map slots to appointments
-                                                logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} availability slots")
-                                            
-                                            DatabaseHelper.return_connection(db_conn)
-                                        except Exception as e:
-                                            logging.error(f"Error executing Text-to-SQL query: {e}")
-                                            DatabaseHelper.return_connection(db_conn)
-                        except Exception as e:
-                            logging.error(f"Text-to-SQL agent failed: {e}")
-                            import traceback
-                            logging.error(traceback.format_exc())
-                    
-                    # STEP 2: Fallback to traditional RAG if Text-to-SQL didn't return data
-                    if not any(retrieved_context.values()):
-                        # Retrieve context using RAG system
-                        retrieved_context = rag_retriever.retrieve_context(
-                            query=user_message,
-                            user_id=user_id,
-                            patient_id=patient_id
-                        )
-                        
-                        # Also retrieve specific data based on query type
-                        msg_lower = user_message.lower()
+                    logging.error(f"Error retrieving insurance: {e}")
+                    retrieved_context['insurance_plans'] = DatabaseHelper._get_sample_insurance_plans()
+                
+                # ALWAYS show insurance plans directly
+                if retrieved_context.get('insurance_plans') and len(retrieved_context['insurance_plans']) > 0:
+                    plans = retrieved_context['insurance_plans']
+                    response = f"✅ **Here are all available insurance plans ({len(plans)}):**\n\n"
+                    for i, plan in enumerate(plans[:5], 1):
+                        response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
+                        # monthly_premium is already formatted as "$150" from database
+                        premium = plan.get('monthly_premium', 'N/A')
+                        if isinstance(premium, str) and not premium.startswith('$'):
+                            premium = f"${premium}"
+                        response += f"   💰 Monthly Premium: {premium}\n"
                         
-                        # If query mentions doctors, retrieve doctors from database
-                        if any(word in msg_lower for word in ["doctor", "physician", "specialist", "suggest", "find", "list"]):
-                            try:
-                                doctors = rag_retriever.retrieve_doctors(user_message, limit=10)
-                                if doctors:
-                                    retrieved_context['doctors'] = doctors
-                                    logging.info(f"RAG: Retrieved {len(doctors)} doctors from database")
-                            except Exception as e:
-                                logging.debug(f"RAG doctor retrieval failed: {e}")
+                        # coverage is already formatted as "80%" from database
+                        coverage = plan.get('coverage', 'N/A')
+                        if isinstance(coverage, (int, float)):
+                            coverage = f"{int(coverage)}%"
+                        elif isinstance(coverage, str) and not coverage.endswith('%'):
+                            coverage = f"{coverage}%"
+                        response += f"   📊 Coverage: {coverage}\n"
                         
-                        # If query mentions insurance, retrieve insurance plans from database
-                        if any(word in msg_lower for word in ["insurance", "plan", "coverage", "benefit"]):
-                            try:
-                                insurance_plans = DatabaseHelper.get_insurance_plans()
-                                if insurance_plans:
-                                    retrieved_context['insurance_plans'] = insurance_plans
-                                    logging.info(f"RAG: Retrieved {len(insurance_plans)} insurance plans from database")
-                            except Exception as e:
-                                logging.debug(f"RAG insurance retrieval failed: {e}")
+                        # deductible is already formatted as "$1000" from database
+                        deductible = plan.get('deductible', 'N/A')
+                        if isinstance(deductible, str) and not deductible.startswith('$'):
+                            deductible = f"${deductible}"
+                        response += f"   💳 Deductible: {deductible}\n"
                         
-                        # If query mentions appointments, retrieve appointments from database
-                        if any(word in msg_lower for word in ["appointment", "book", "schedule"]):
-                            try:
-                                if patient_id:
-                                    appointments = rag_retriever.retrieve_appointments(patient_id=patient_id, limit=10)
-                                    if appointments:
-                                        retrieved_context['appointments'] = appointments
-                                        logging.info(f"RAG: Retrieved {len(appointments)} appointments from database")
-                            except Exception as e:
-                                logging.debug(f"RAG appointment retrieval failed: {e}")
+                        # Features
+                        features = plan.get('features', [])
+                        if features:
+                            if isinstance(features, list):
+                                response += f"   ✨ Features: {', '.join(features[:3])}\n"
+                            elif isinstance(features, str):
+                                response += f"   ✨ Features: {features}\n"
+                        response += "\n"
+                    response += "📋 **Would you like more details about any specific plan?**\n"
+                    response += "Just tell me the plan name or number!"
                     
-                    # Format context for LLM
-                    context_string = rag_retriever.format_context_for_llm(retrieved_context)
-                    logging.info(f"RAG: Retrieved context with {len(retrieved_context)} data types")
-                except Exception as e:
-                    logging.error(f"RAG retrieval failed: {e}")
-                    import traceback
-                    logging.error(traceback.format_exc())
-                    # Continue without RAG context - bot will still work
+                    ctx.dispatcher.utter_message(text=response)
+                    logging.info(f"LLM Router: Displayed {len(plans)} insurance plans directly")
+                    return True
             
-            # Get detected intent and entities for context
-            intent = tracker.latest_message.get("intent", {}).get("name", "")
-            entities = tracker.latest_message.get("entities", [])
+            # Generate response using LLM Router (only if we didn't show data directly)
+            if llm_router:
+                try:
+                    response = llm_router.generate_response(
+                        action=action,
+                        data=retrieved_context,
+                        parameters=parameters,
+                        template=routing_decision.get('response_template')
+                    )
+                    ctx.dispatcher.utter_message(text=response)
+                    logging.info(f"LLM Router generated response for {action}")
+                    return True
+                except Exception as e:
+                    logging.error(f"LLM Router response generation failed: {e}")
+        
+        # Fallback: Use AWS Bedrock for intelligent conversational responses
+        # This enables super intelligent back-and-forth conversations
+        aws_intelligence = self._get_aws_intelligence()
         
-            # Get patient info if available for personalized responses (with timeout protection)
-            patient_info = None
-            appointments = None
+        if aws_intelligence:
             try:
-                user_id = tracker.get_slot("user_id")
-                if user_id:
-                    # Quick timeout for patient info
-                    import signal
-                    def timeout_handler(signum, frame):
-                        raise TimeoutError("Patient info query timed out")
-                    
-                    # Try to get patient info but don't block if it's slow
-                    try:
-                        patient_info = DatabaseHelper.get_patient_info(user_id=user_id)
-                        if patient_info:
-                            appointments = DatabaseHelper.get_appointments(patient_id=patient_info.get('patient_id'))
-                    except Exception as e:
-                        logging.debug(f"Could not fetch patient info (non-critical): {e}")
-                        patient_info = None
-                        appointments = None
+                # Use AWS Intelligence for super intelligent conversational responses
+                # This works for ALL queries - greetings, questions, everything
+                intelligent_response = aws_intelligence.generate_conversational_response(
+                    user_message=ctx.text,
+                    context=retrieved_context,  # Use retrieved context
+                    conversation_history=conversation_history,
+                    medical_entities={},
+                    sentiment=None
+                )
+                
+                # An error message from Bedrock is not shown - the fallbacks answer instead
+                if self._usable_reply(intelligent_response):
+                    ctx.dispatcher.utter_message(text=intelligent_response)
+                    logging.info(f"action_aws_bedrock_chat returning intelligent response: {intelligent_response[:100]}...")
+                    return True
+                logging.debug("Bedrock returned no usable response, using fallback instead")
             except Exception as e:
-                logging.debug(f"Error getting patient context (non-critical): {e}")
-                # Continue without patient info - don't block
-            
-            # RAG STEP 2: Build enhanced message with RAG-retrieved context
-            # This is the core of RAG - augmenting the prompt with retrieved data
-            enhanced_message = f"""User Query: {user_message}
-
-RETRIEVED CONTEXT FROM DATABASE (RAG):
-{context_string}
+                logging.debug(f"AWS Intelligence conversational response failed: {e}")
+        return False
+
+    @CHAT_HANDLERS.handler("small_talk", priority=90, any_of=GREETING_WORDS + THANKS_WORDS + GOODBYE_WORDS,
+                           requires=("conversation_history", "rag_context"))
+    def _handle_small_talk(self, ctx: HandlerContext) -> List[Dict[Text, Any]]:
+        # Greetings, thanks and goodbyes: the LLM paths first, a canned reply if Bedrock is not available
+        if self._reply_with_llm(ctx, dict(ctx.get("rag_context"))):
+            return []
 
-Please provide a comprehensive, intelligent response based on the retrieved context above. Use the specific information (doctors, insurance plans, appointments, patient info, medications, lab results) to give accurate, helpful answers. If the context contains relevant information, reference it specifically. If not, provide general helpful guidance."""
-            
-            # Add intent/entity info
-            context_info = []
-            if intent and intent != "nlu_fallback":
-                context_info.append(f"Intent: {intent}")
-            if entities:
-                entity_info = ", ".join([f"{e.get('entity')}: {e.get('value')}" for e in entities])
-                context_info.append(f"Entities: {entity_info}")
-            
-            if context_info:
-                enhanced_message += f"\n\n[Detected: {', '.join(context_info)}]"
-            
-            # Get conversation history from tracker (for conversational context - back and forth)
-            conversation_history = []
-            for event in tracker.events[-10:]:  # Last 10 events for better conversation context
-                if event.get("event") == "user":
-                    conversation_history.append({
-                        "role": "user",
-                        "content": event.get("text", "")
-                    })
-                elif event.get("event") == "bot":
-                    conversation_history.append({
-                        "role": "assistant",
-                        "content": event.get("text", "")
-                    })
-            
-            # AWS INTELLIGENCE STEP 2: Generate super intelligent conversational response
-            # (Simple queries already handled above, so this is only for complex queries)
-            response = None
-            
-            # COMPLEX QUERIES: Use AWS Bedrock LLM with RAG context for super intelligent responses
-            try:
-                # PRIORITY 1: Use AWS Bedrock with RAG context for intelligent responses
-                if bedrock_helper and context_string:
-                    # Use Bedrock with RAG-retrieved context for intelligent, database-aware responses
-                    enhanced_prompt = f"""User Query: {user_message}
+        if ctx.has(*GREETING_WORDS):
+            response = "Hello! I'm Dr. AI, your super intelligent healthcare assistant. I'm here to help with all your healthcare needs - appointments, insurance, finding doctors, symptom assessment, and more. How can I help you today?"
+        elif ctx.has(*THANKS_WORDS):
+            response = "You're welcome! I'm here whenever you need help with your healthcare needs. Is there anything else I can assist you with?"
+        else:
+            response = "Goodbye! Take care of your health. Feel free to come back anytime you need assistance!"
+        ctx.dispatcher.utter_message(text=response)
+        logging.info(f"action_aws_bedrock_chat returning simple response: {response[:100]}...")
+        return []
 
-RETRIEVED CONTEXT FROM DATABASE (RAG):
-{context_string}
+    @CHAT_HANDLERS.handler("conversation", priority=100,
+                           requires=("conversation_history", "rag_context", "turn_context"))
+    def _handle_conversation(self, ctx: HandlerContext) -> List[Dict[Text, Any]]:
+        # Everything else: LLM routing, then Bedrock with RAG context, then rule-based fallbacks
+        # (the router gets a copy of the turn's RAG context - it adds data to it)
+        if self._reply_with_llm(ctx, dict(ctx.get("rag_context"))):
+            return []
 
-Please provide a comprehensive, intelligent response using the retrieved context above. 
-- If doctors are in the context, reference them specifically by name and specialty
-- If insurance plans are in the context, reference them specifically with details
-- If appointments are in the context, reference them specifically
-- Use the specific information from the database to give accurate, helpful answers
-- If context is available, prioritize it over general knowledge
-- Always cite specific information from the retrieved context when available
+        retrieved_context, context_string = self._retrieve_for_reply(ctx)
+        response = self._rag_reply(ctx, retrieved_context, context_string)
+        if not response:
+            response = FALLBACK_HANDLERS.dispatch(self, ctx.dispatcher, ctx.tracker,
+                                                  provided={"retrieved_context": retrieved_context})
+        if not response:
+            response = self._context_fallback(ctx, retrieved_context)
+
+        # Save conversation history to database - non-critical, errors are ignored
+        intent = ctx.tracker.latest_message.get("intent", {}).get("name", "")
+        entities = ctx.tracker.latest_message.get("entities", [])
+        try:
+            DatabaseHelper.save_conversation_history(ctx.sender_id, ctx.text, response, intent=intent, entities=entities)
+        except Exception:
+            pass
 
-Conversation History:
-{json.dumps(conversation_history[-5:], indent=2) if conversation_history else 'None'}
+        ctx.dispatcher.utter_message(text=response)
+        logging.info(f"action_aws_bedrock_chat returning response: {response[:100]}...")
+        return []
 
-Provide a helpful, empathetic, and comprehensive response."""
-                    
-                    response = bedrock_helper.get_response(enhanced_prompt, conversation_history)
-                    if response and response.strip():
-                        # Check if response is an error message
-                        error_indicators = [
-                            "trouble connecting to my AI brain",
-                            "AWS credentials are configured",
-                            "configuration issue",
-                            "encountered a technical issue"
-                        ]
-                        is_error_response = any(indicator in response for indicator in error_indicators)
-                        if is_error_response:
-                            response = None  # Will use fallback below
-                        else:
-                            logging.info(f"Bedrock with RAG: Generated intelligent response using database context")
-                
-                # PRIORITY 2: Use AWS Intelligence Services if Bedrock direct call didn't work
-                if not response and aws_intelligence:
-                    response = aws_intelligence.generate_conversational_response(
-                        user_message=user_message,
-                        context=retrieved_context,
-                        conversation_history=conversation_history,
-                        medical_entities=medical_entities,
-                        sentiment=sentiment
-                    )
-                else:
-                    response = None
-                
-                # Check if response is an error message - if so, don't use it
-                if response and response.strip():
-                    error_indicators = [
-                        "trouble connecting to my AI brain",
-                        "AWS credentials are configured",
-                        "configuration issue",
-                        "encountered a technical issue"
-                    ]
-                    is_error_response = any(indicator in response for indicator in error_indicators)
-                    
-                    if is_error_response:
-                        # Error response from Bedrock - use fallback instead
-                        logging.debug(f"Bedrock returned error message, using fallback instead")
-                        response = None
-                else:
-                    response = None
-                
+    def _retrieve_for_reply(self, ctx: HandlerContext):
+        """Database context for the reply: Text-to-SQL first, keyword-driven RAG retrieval otherwise.
+        Returns (retrieved_context, context formatted for the LLM)."""
+        rag_retriever = ctx.get("rag_retriever")
+        patient_id = None
+        if ctx.tracker.get_slot("user_id"):
+            try:
+                patient_id = ctx.get("turn_context").patient_id
             except Exception as e:
-                logging.debug(f"AWS Intelligence failed, using intelligent fallback: {e}")
-            # Fallback to intelligent response generation with database context
-            if not response:
-                msg_lower = user_message.lower()
-                
-                # Check for general physician requests first
-                if any(word in msg_lower for word in ["general physician", "general practitioner", "GP", "family doctor", "primary care", "general doctor"]):
-                    specialty = "general medicine"
-                    doctors = None
+                logging.debug(f"Could not get patient info for RAG: {e}")
+
+        retrieved_context = {}
+        context_string = ""
+        
+        # ENHANCED: Use Text-to-SQL Agent for intelligent database queries
+        text_to_sql = self._get_text_to_sql_agent()
+        
+        # Always try to retrieve context from database for intelligent responses
+        if rag_retriever:
+            try:
+                # STEP 1: Use Text-to-SQL Agent to understand query and generate SQL
+                sql_result = None
+                if text_to_sql:
                     try:
-                        doctors = DatabaseHelper.get_doctors(specialty=specialty)
+                        # Understand query intent first
+                        intent_result = text_to_sql.understand_query_intent(ctx.text)
+                        logging.info(f"Text-to-SQL Intent: {intent_result.get('intent')}, Entities: {intent_result.get('entities')}")
+                        
+                        # Generate SQL if it's a database query
+                        if intent_result.get('intent') in ['find_doctors', 'find_insurance', 'check_availability', 'book_appointment', 'get_medical_records']:
+                            sql_result = text_to_sql.generate_sql(ctx.text, context=intent_result)
+                            if sql_result:
+                                logging.info(f"Text-to-SQL generated SQL for table: {sql_result.get('table')}")
+                                
+                                # Execute SQL if we have a connection
+                                db_conn = DatabaseHelper.get_connection(READ, sender_id=ctx.sender_id)
+                                if db_conn and sql_result.get('sql'):
+                                    try:
+                                        sql_data = text_to_sql.execute_sql_safely(
+                                            sql_result['sql'],
+                                            sql_result.get('parameters', {}),
+                                            db_conn
+                                        )
+                                        
+                                        # Map SQL results to retrieved_context
+                                        table = sql_result.get('table', '')
+                                        if table == 'doctors' and sql_data:
+                                            retrieved_context['doctors'] = sql_data
+                                            logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} doctors")
+                                        elif table == 'insurance_plans' and sql_data:
+                                            retrieved_context['insurance_plans'] = sql_data
+                                            logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} insurance plans")
+                                        elif table == 'availability_slots' and sql_data:
+                                            retrieved_context['appointments'] = sql_data  # Map slots to appointments
+                                            logging.info(f"Text-to-SQL: Retrieved {len(sql_data)} availability slots")
+                                        
+                                        DatabaseHelper.return_connection(db_conn)
+                                    except Exception as e:
+                                        logging.error(f"Error executing Text-to-SQL query: {e}")
+                                        DatabaseHelper.return_connection(db_conn)
                     except Exception as e:
-                        logging.debug(f"Could not fetch doctors: {e}")
-                    
-                    if doctors and len(doctors) > 0:
-                        response = f"I found {len(doctors)} general physician(s) available:\n\n"
-                        for i, doc in enumerate(doctors[:5], 1):
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                            response += f"   Department: {doc.get('department', 'General Medicine')}\n"
-                            if doc.get('phone'):
-                                response += f"   Phone: {doc.get('phone')}\n"
-                            response += "\n"
-                        response += "Would you like to book an appointment with any of these general physicians?"
-                    else:
-                        response = "I can help you find a general physician! I can search our database for available general practitioners, show you their contact information, and help you book an appointment. Would you like me to search for available general physicians now?"
+                        logging.error(f"Text-to-SQL agent failed: {e}")
+                        import traceback
+                        logging.error(traceback.format_exc())
                 
-                # Handle "suggest doctors" or "show doctors" queries
-                elif any(word in msg_lower for word in ["suggest", "show", "find", "list"]) and any(word in msg_lower for word in ["doctor", "doctors", "specialist", "physician"]):
-                    # User wants to see doctors - search for them using multiple methods
-                    specialty = None
-                    specialty_display_name = "doctor"
-                    
-                    # Check if viral/symptom was mentioned
-                    if "viral" in msg_lower or "symptom" in msg_lower or "suffering" in msg_lower:
-                        specialty = "general medicine"
-                        specialty_display_name = "general physician"
-                    
-                    doctors = None
+                # STEP 2: Fallback to traditional RAG if Text-to-SQL didn't return data
+                if not any(retrieved_context.values()):
+                    # Reuse the context already retrieved for routing (same query, user and patient)
+                    retrieved_context = dict(ctx.get("rag_context"))
                     
-                    # Attempt 1: Try RAG retriever first
-                    if rag_retriever:
+                    # If query mentions doctors, retrieve doctors from database
+                    if ctx.has(*RAG_DOCTOR_KEYWORDS):
                         try:
-                            doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
+                            doctors = rag_retriever.retrieve_doctors(ctx.text, limit=10)
                             if doctors:
+                                retrieved_context['doctors'] = doctors
                                 logging.info(f"RAG: Retrieved {len(doctors)} doctors from database")
                         except Exception as e:
-                            logging.debug(f"RAG retrieval failed: {e}")
+                            logging.debug(f"RAG doctor retrieval failed: {e}")
                     
-                    # Attempt 2: Try DatabaseHelper
-                    if not doctors or len(doctors) == 0:
+                    # If query mentions insurance, retrieve insurance plans from database
+                    if ctx.has(*RAG_INSURANCE_KEYWORDS):
                         try:
-                            doctors = DatabaseHelper.get_doctors(specialty=specialty)
-                            if doctors:
-                                logging.info(f"DatabaseHelper: Retrieved {len(doctors)} doctors from database")
+                            insurance_plans = DatabaseHelper.get_insurance_plans()
+                            if insurance_plans:
+                                retrieved_context['insurance_plans'] = insurance_plans
+                                logging.info(f"RAG: Retrieved {len(insurance_plans)} insurance plans from database")
                         except Exception as e:
-                            logging.debug(f"DatabaseHelper failed: {e}")
+                            logging.debug(f"RAG insurance retrieval failed: {e}")
                     
-                    # Attempt 3: Try to get ALL doctors if specialty search failed
-                    if not doctors or len(doctors) == 0:
+                    # If query mentions appointments, retrieve appointments from database
+                    if ctx.has(*RAG_APPOINTMENT_KEYWORDS):
                         try:
-                            doctors = DatabaseHelper.get_doctors()  # No specialty filter
-                            if doctors:
-                                logging.info(f"DatabaseHelper: Retrieved {len(doctors)} doctors (all specialties)")
+                            if patient_id:
+                                appointments = rag_retriever.retrieve_appointments(patient_id=patient_id, limit=10)
+                                if appointments:
+                                    retrieved_context['appointments'] = appointments
+                                    logging.info(f"RAG: Retrieved {len(appointments)} appointments from database")
                         except Exception as e:
-                            logging.error(f"Could not fetch any doctors: {e}")
-                            import traceback
-                            logging.error(traceback.format_exc())
-                    
-                    # ALWAYS use sample doctors if database fails (never show generic message)
-                    if not doctors or len(doctors) == 0:
-                        logging.warning(f"No doctors from database, using sample data for specialty: {specialty}")
-                        doctors = DatabaseHelper._get_sample_doctors(specialty)
-                        logging.info(f"Using {len(doctors) if doctors else 0} sample doctors")
-                    
-                    if doctors and len(doctors) > 0:
-                        response = f"✅ **I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''}:**\n\n"
-                        for i, doc in enumerate(doctors[:5], 1):
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
-                            response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
-                            if doc.get('phone'):
-                                response += f"   📞 Phone: {doc.get('phone')}\n"
-                            if doc.get('email'):
-                                response += f"   ✉️ Email: {doc.get('email')}\n"
-                            if doc.get('experience_years') or doc.get('experience'):
-                                exp = doc.get('experience_years') or doc.get('experience')
-                                response += f"   👨‍⚕️ Experience: {exp} years\n"
-                            if doc.get('rating'):
-                                response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
-                            response += "\n"
-                        response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
-                        response += "Just tell me the doctor's name or number and your preferred date/time!"
-                        logging.info(f"Successfully displayed {len(doctors)} doctors to user")
-                    else:
-                        # Final fallback - should never reach here, but just in case
-                        logging.error("CRITICAL: No doctors available even from sample data!")
-                        response = f"I found these {specialty_display_name}s for you:\n\n"
-                        response += "1. Dr. Sarah Johnson - General Medicine\n"
-                        response += "2. Dr. Emily Williams - Gynecology\n"
-                        response += "3. Dr. Michael Chen - Cardiology\n\n"
-                        response += "Would you like to book an appointment with any of these doctors?"
+                            logging.debug(f"RAG appointment retrieval failed: {e}")
                 
-                # Handle "yes" responses intelligently for ALL scenarios using RAG and database
-                elif any(word in msg_lower for word in ["yes", "yeah", "yep", "sure", "ok", "okay"]) and len(msg_lower.strip()) < 10:
-                    # Check conversation context to understand what "yes" refers to
-                    context_lower = " ".join([msg.get("content", "").lower() for msg in conversation_history[-5:]])
-                    
-                    # Use RAG to retrieve relevant data from database
-                    doctors_from_rag = retrieved_context.get('doctors', []) if retrieved_context else []
-                    insurance_plans_from_rag = retrieved_context.get('insurance_plans', []) if retrieved_context else []
-                    appointments_from_rag = retrieved_context.get('appointments', []) if retrieved_context else []
-                    
-                    if "insurance" in context_lower or "plan" in context_lower or "coverage" in context_lower:
-                        # User said yes to insurance - use RAG to retrieve from database
-                        insurance_plans = insurance_plans_from_rag
-                        if not insurance_plans:
-                            try:
-                                insurance_plans = DatabaseHelper.get_insurance_plans()
-                            except Exception as e:
-                                logging.debug(f"Could not fetch insurance plans: {e}")
-                        
-                        # If still no plans, try RAG retriever
-                        if not insurance_plans and rag_retriever:
-                            try:
-                                # RAG will retrieve insurance plans in retrieve_context
-                                pass
-                            except Exception as e:
-                                logging.debug(f"RAG insurance retrieval failed: {e}")
-                        
-                        if insurance_plans and len(insurance_plans) > 0:
-                            response = f"Here are all available insurance plans from our database ({len(insurance_plans)} plans):\n\n"
-                            for i, plan in enumerate(insurance_plans[:5], 1):
-                                response += f"**{i}. {plan.get('name', 'Insurance Plan')}**\n"
-                                response += f"   Monthly Premium: {plan.get('monthly_premium', 'N/A')}\n"
-                                response += f"   Deductible: {plan.get('deductible', 'N/A')}\n"
-                                response += f"   Coverage: {plan.get('coverage', 'N/A')}\n"
-                                features = plan.get('features', [])
-                                if features:
-                                    if isinstance(features, list):
-                                        response += f"   Features: {', '.join(features[:3])}\n"
-                                    else:
-                                        response += f"   Features: {features}\n"
-                                response += "\n"
-                            response += "Would you like more details about any specific plan, or personalized recommendations based on your needs?"
-                        else:
-                            # Fallback to default plans
-                            response = """Here are all available insurance plans:
+                # Format context for LLM
+                context_string = rag_retriever.format_context_for_llm(retrieved_context)
+                logging.info(f"RAG: Retrieved context with {len(retrieved_context)} data types")
+            except Exception as e:
+                logging.error(f"RAG retrieval failed: {e}")
+                import traceback
+                logging.error(traceback.format_exc())
+                # Continue without RAG context - bot will still work
+        return retrieved_context, context_string
+
+    def _rag_reply(self, ctx: HandlerContext, retrieved_context: Dict[Text, Any], context_string: Text) -> Optional[Text]:
+        """Bedrock answer grounded in the retrieved context, else AWS Intelligence's conversational reply"""
+        conversation_history = ctx.get("conversation_history")
+        bedrock_helper = self._get_bedrock_helper()
+        aws_intelligence = self._get_aws_intelligence()
+        try:
+            if bedrock_helper and context_string:
+                enhanced_prompt = f"""User Query: {ctx.text}
 
-**1. Basic Health Plan**
-   Monthly Premium: $150
-   Deductible: $1,000
-   Coverage: 80%
-   Features: Primary care visits, Emergency visits, Basic prescriptions
-   Best for: Budget-conscious individuals
+RETRIEVED CONTEXT FROM DATABASE (RAG):
+{context_string}
 
-**2. Premium Health Plan**
-   Monthly Premium: $300
-   Deductible: $500
-   Coverage: 90%
-   Features: All basic features, Specialist visits, Mental health coverage, Dental & Vision
-   Best for: Regular medical needs
+Please provide a comprehensive, intelligent response using the retrieved context above. 
+- If doctors are in the context, reference them specifically by name and specialty
+- If insurance plans are in the context, reference them specifically with details
+- If appointments are in the context, reference them specifically
+- Use the specific information from the database to give accurate, helpful answers
+- If context is available, prioritize it over general knowledge
+- Always cite specific information from the retrieved context when available
+
+Conversation History:
+{json.dumps(conversation_history[-5:], indent=2) if conversation_history else 'None'}
+
+Provide a helpful, empathetic, and comprehensive response."""
+                
+                response = bedrock_helper.get_response(enhanced_prompt, conversation_history)
+                if self._usable_reply(response):
+                    logging.info(f"Bedrock with RAG: Generated intelligent response using database context")
+                    return response
+
+            if aws_intelligence:
+                # Only what the conversational response uses - each analysis is a separate AWS call
+                medical_entities, sentiment = {}, None
+                try:
+                    medical_entities = aws_intelligence.extract_medical_entities(ctx.text)
+                    sentiment = aws_intelligence.detect_sentiment(ctx.text)
+                except Exception as e:
+                    logging.debug(f"AWS Intelligence analysis failed: {e}")
+                response = aws_intelligence.generate_conversational_response(
+                    user_message=ctx.text,
+                    context=retrieved_context,
+                    conversation_history=conversation_history,
+                    medical_entities=medical_entities,
+                    sentiment=sentiment
+                )
+                if self._usable_reply(response):
+                    return response
+                logging.debug(f"Bedrock returned error message, using fallback instead")
+        except Exception as e:
+            logging.debug(f"AWS Intelligence failed, using intelligent fallback: {e}")
+        return None
+
+    @staticmethod
+    def _context_fallback(ctx: HandlerContext, retrieved_context: Dict[Text, Any]) -> Text:
+        """IntelligentFallback's reply, plus a summary of what the retrieval found"""
+        response = IntelligentFallback.get_fallback_response(ctx.text, ctx.get("conversation_history"), retrieved_context)
+        if retrieved_context.get('doctors'):
+            doctors = retrieved_context['doctors']
+            response += f"\n\nI found {len(doctors)} relevant doctor(s) in our system:\n"
+            for i, doc in enumerate(doctors[:3], 1):
+                response += f"{i}. Dr. {doc.get('name', 'N/A')} - {doc.get('specialty', 'General Medicine')}\n"
+            response += "\nWould you like to book an appointment with any of these doctors?"
+        if retrieved_context.get('insurance_plans'):
+            plans = retrieved_context['insurance_plans']
+            response += f"\n\nI found {len(plans)} insurance plan(s) available. Would you like to see details?"
+        if retrieved_context.get('appointments'):
+            appointments = retrieved_context['appointments']
+            response += f"\n\nYou have {len(appointments)} upcoming appointment(s). Would you like to manage them?"
+        return response
+
+
+    @FALLBACK_HANDLERS.handler("general_physician", priority=10, any_of=GENERAL_PHYSICIAN_KEYWORDS)
+    def _fallback_general_physician(self, ctx: HandlerContext) -> Optional[Text]:
+        # "General physician" and similar: list general medicine doctors
+        response = None
+        specialty = "general medicine"
+        doctors = None
+        try:
+            doctors = DatabaseHelper.get_doctors(specialty=specialty)
+        except Exception as e:
+            logging.debug(f"Could not fetch doctors: {e}")
+
+        if doctors and len(doctors) > 0:
+            response = f"I found {len(doctors)} general physician(s) available:\n\n"
+            for i, doc in enumerate(doctors[:5], 1):
+                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
+                response += f"   Department: {doc.get('department', 'General Medicine')}\n"
+                if doc.get('phone'):
+                    response += f"   Phone: {doc.get('phone')}\n"
+                response += "\n"
+            response += "Would you like to book an appointment with any of these general physicians?"
+        else:
+            response = "I can help you find a general physician! I can search our database for available general practitioners, show you their contact information, and help you book an appointment. Would you like me to search for available general physicians now?"
+        return response
+
+    @FALLBACK_HANDLERS.handler("doctor_suggestions", priority=20, any_of=["suggest", "show", "find", "list"],
+                               predicate=lambda ctx: any(word in ctx.msg_lower for word in ["doctor", "specialist", "physician"]),
+                               requires=("rag_retriever",))
+    def _fallback_doctor_suggestions(self, ctx: HandlerContext) -> Optional[Text]:
+        # "Suggest/show doctors": search RAG, then the database, then sample doctors
+        user_message = ctx.text
+        msg_lower = ctx.msg_lower
+        rag_retriever = ctx.get("rag_retriever")
+        response = None
+        specialty = None
+        specialty_display_name = "doctor"
+
+        # Check if viral/symptom was mentioned
+        if "viral" in msg_lower or "symptom" in msg_lower or "suffering" in msg_lower:
+            specialty = "general medicine"
+            specialty_display_name = "general physician"
+
+        doctors = None
+
+        # Attempt 1: Try RAG retriever first
+        if rag_retriever:
+            try:
+                doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
+                if doctors:
+                    logging.info(f"RAG: Retrieved {len(doctors)} doctors from database")
+            except Exception as e:
+                logging.debug(f"RAG retrieval failed: {e}")
+
+        # Attempt 2: Try DatabaseHelper
+        if not doctors or len(doctors) == 0:
+            try:
+                doctors = DatabaseHelper.get_doctors(specialty=specialty)
+                if doctors:
+                    logging.info(f"DatabaseHelper: Retrieved {len(doctors)} doctors from database")
+            except Exception as e:
+                logging.debug(f"DatabaseHelper failed: {e}")
+
+        # Attempt 3: Try to get ALL doctors if specialty search failed
+        if not doctors or len(doctors) == 0:
+            try:
+                doctors = DatabaseHelper.get_doctors()  # No specialty filter
+                if doctors:
+                    logging.info(f"DatabaseHelper: Retrieved {len(doctors)} doctors (all specialties)")
+            except Exception as e:
+                logging.error(f"Could not fetch any doctors: {e}")
+                import traceback
+                logging.error(traceback.format_exc())
+
+        # ALWAYS use sample doctors if database fails (never show generic message)
+        if not doctors or len(doctors) == 0:
+            logging.warning(f"No doctors from database, using sample data for specialty: {specialty}")
+            doctors = DatabaseHelper._get_sample_doctors(specialty)
+            logging.info(f"Using {len(doctors) if doctors else 0} sample doctors")
+
+        if doctors and len(doctors) > 0:
+            response = f"✅ **I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''}:**\n\n"
+            for i, doc in enumerate(doctors[:5], 1):
+                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
+                response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
+                if doc.get('phone'):
+                    response += f"   📞 Phone: {doc.get('phone')}\n"
+                if doc.get('email'):
+                    response += f"   ✉️ Email: {doc.get('email')}\n"
+                if doc.get('experience_years') or doc.get('experience'):
+                    exp = doc.get('experience_years') or doc.get('experience')
+                    response += f"   👨‍⚕️ Experience: {exp} years\n"
+                if doc.get('rating'):
+                    response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
+                response += "\n"
+            response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
+            response += "Just tell me the doctor's name or number and your preferred date/time!"
+            logging.info(f"Successfully displayed {len(doctors)} doctors to user")
+        else:
+            # Final fallback - should never reach here, but just in case
+            logging.error("CRITICAL: No doctors available even from sample data!")
+            response = f"I found these {specialty_display_name}s for you:\n\n"
+            response += "1. Dr. Sarah Johnson - General Medicine\n"
+            response += "2. Dr. Emily Williams - Gynecology\n"
+            response += "3. Dr. Michael Chen - Cardiology\n\n"
+            response += "Would you like to book an appointment with any of these doctors?"
+        return response
+
+    @FALLBACK_HANDLERS.handler("symptoms", priority=30, any_of=SYMPTOM_KEYWORDS)
+    def _fallback_symptoms(self, ctx: HandlerContext) -> Optional[Text]:
+        # Symptoms: Symptom Analyzer picks the specialty, then matching doctors are listed
+        user_message = ctx.text
+        msg_lower = ctx.msg_lower
+        response = None
+        symptom_analyzer = self._get_symptom_analyzer()
+        analysis_result = None
+        specialty = None
+        specialty_display_name = "General Physician"
+        urgency = "routine"
+        explanation = ""
+
+        if symptom_analyzer:
+            try:
+                analysis_result = symptom_analyzer.analyze_symptoms(user_message)
+                specialty = analysis_result.get('recommended_specialty', 'general_medicine')
+                specialty_display_name = analysis_result.get('specialty_display_name', 'General Physician')
+                urgency = analysis_result.get('urgency', 'routine')
+                explanation = analysis_result.get('explanation', '')
+
+                # Map specialty to database format
+                specialty_map = {
+                    'general_medicine': 'general medicine',
+                    'cardiology': 'cardiology',
+                    'gynecology': 'gynecology',
+                    'neurology': 'neurology',
+                'dermatology': 'dermatology',
+                    'pediatrics': 'pediatrics',
+                    'orthopedics': 'orthopedics',
+                    'psychiatry': 'psychiatry',
+                    'gastroenterology': 'gastroenterology',
+                    'endocrinology': 'endocrinology',
+                    'urology': 'urology',
+                    'ent': 'ent',
+                    'ophthalmology': 'ophthalmology',
+                    'pulmonology': 'pulmonology'
+                }
+                specialty = specialty_map.get(specialty, 'general medicine')
+
+                logging.info(f"Symptom Analyzer: {specialty_display_name} (urgency: {urgency})")
+            except Exception as e:
+                logging.error(f"Symptom Analyzer failed: {e}")
+                import traceback
+                logging.error(traceback.format_exc())
+
+        # Fallback to rule-based if analyzer not available
+        if not analysis_result:
+            if "fever" in msg_lower or "cold" in msg_lower or "cough" in msg_lower or "viral" in msg_lower:
+                specialty = "general medicine"
+                specialty_display_name = "General Physician"
+            elif "blood pressure" in msg_lower or "high-blood" in msg_lower or "hypertension" in msg_lower or "chest pain" in msg_lower:
+                specialty = "cardiology"
+                specialty_display_name = "Cardiologist"
+            elif "sugar" in msg_lower or "diabetes" in msg_lower or "glucose" in msg_lower:
+                specialty = "endocrinology"
+                specialty_display_name = "Endocrinologist"
+            elif "headache" in msg_lower or "migraine" in msg_lower or "dizziness" in msg_lower:
+                specialty = "neurology"
+                specialty_display_name = "Neurologist"
+            elif "skin" in msg_lower or "rash" in msg_lower:
+                specialty = "dermatology"
+                specialty_display_name = "Dermatologist"
+            else:
+                specialty = "general medicine"
+                specialty_display_name = "General Physician"
+
+        # Get doctors for the recommended specialty
+        doctors = None
+        try:
+            doctors = DatabaseHelper.get_doctors(specialty=specialty)
+        except Exception as e:
+            logging.error(f"Could not fetch doctors: {e}")
 
-**3. Family Health Plan**
-   Monthly Premium: $450
-   Deductible: $750
-   Coverage: 85%
-   Features: All premium features, Family coverage, Maternity care, Pediatric care
-   Best for: Families with children
+        # ALWAYS use sample doctors if database fails
+        if not doctors or len(doctors) == 0:
+            logging.warning(f"No doctors from database for specialty: {specialty}, using sample data")
+            doctors = DatabaseHelper._get_sample_doctors(specialty)
 
-Would you like more details about any specific plan, or personalized recommendations?"""
-                    
-                    elif "doctor" in context_lower or "specialist" in context_lower or "physician" in context_lower or "suggest" in context_lower:
-                        # User said yes to finding doctors - use RAG to retrieve from database intelligently
-                        specialty = None
-                        if "viral" in context_lower or "symptom" in context_lower or "suffering" in context_lower:
-                            specialty = "general medicine"
-                        elif "gynecologist" in context_lower or "gynacologist" in context_lower or "gynec" in context_lower or "gynaec" in context_lower:
-                            specialty = "gynecology"
-                        elif "cardiologist" in context_lower:
-                            specialty = "cardiology"
-                        elif "neurologist" in context_lower:
-                            specialty = "neurology"
-                        elif "dermatologist" in context_lower:
-                            specialty = "dermatology"
-                        elif "pediatrician" in context_lower:
-                            specialty = "pediatrics"
-                        
-                        # PRIORITY: Use RAG-retrieved doctors from database
-                        doctors = doctors_from_rag
-                        if not doctors and rag_retriever:
-                            try:
-                                # Use RAG retriever to get doctors from database
-                                doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
-                                logging.info(f"RAG: Retrieved {len(doctors) if doctors else 0} doctors directly from database")
-                            except Exception as e:
-                                logging.error(f"RAG doctor retrieval failed: {e}")
-                                import traceback
-                                logging.error(traceback.format_exc())
-                        
-                        # Fallback to DatabaseHelper if RAG didn't return doctors
-                        if not doctors:
-                            try:
-                                doctors = DatabaseHelper.get_doctors(specialty=specialty)
-                                logging.info(f"DatabaseHelper: Retrieved {len(doctors) if doctors else 0} doctors")
-                            except Exception as e:
-                                logging.error(f"DatabaseHelper failed: {e}")
-                                import traceback
-                                logging.error(traceback.format_exc())
-                        
-                        # ALWAYS use sample doctors if database fails (never show generic message)
-                        if not doctors or len(doctors) == 0:
-                            logging.warning(f"No doctors from database, using sample data for specialty: {specialty}")
-                            doctors = DatabaseHelper._get_sample_doctors(specialty)
-                            logging.info(f"Using {len(doctors) if doctors else 0} sample doctors")
-                        
-                        if doctors and len(doctors) > 0:
-                            response = f"I found {len(doctors)} doctor(s) available in our database:\n\n"
-                            for i, doc in enumerate(doctors[:5], 1):
-                                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                                response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                                if doc.get('department'):
-                                    response += f"   Department: {doc.get('department')}\n"
-                                if doc.get('phone'):
-                                    response += f"   Phone: {doc.get('phone')}\n"
-                                if doc.get('experience_years'):
-                                    response += f"   Experience: {doc.get('experience_years')} years\n"
-                                if doc.get('rating'):
-                                    response += f"   Rating: {doc.get('rating')}/5\n"
-                                response += "\n"
-                            response += "Would you like to book an appointment with any of these doctors? I can help you schedule a visit!"
-                        else:
-                            # ALWAYS use sample doctors if database fails
-                            logging.warning("No doctors from database, using sample data")
-                            doctors = DatabaseHelper._get_sample_doctors()
-                            
-                            if doctors and len(doctors) > 0:
-                                response = f"✅ **I found {len(doctors)} doctor(s) for you:**\n\n"
-                                for i, doc in enumerate(doctors[:5], 1):
-                                    response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                                    response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
-                                    response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
-                                    if doc.get('phone'):
-                                        response += f"   📞 Phone: {doc.get('phone')}\n"
-                                    if doc.get('email'):
-                                        response += f"   ✉️ Email: {doc.get('email')}\n"
-                                    if doc.get('experience_years') or doc.get('experience'):
-                                        exp = doc.get('experience_years') or doc.get('experience')
-                                        response += f"   👨‍⚕️ Experience: {exp} years\n"
-                                    if doc.get('rating'):
-                                        response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
-                                    response += "\n"
-                                response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
-                                response += "Just tell me the doctor's name or number!"
-                            else:
-                                # Final fallback
-                                response = "✅ **I found these doctors for you:**\n\n"
-                                response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
-                                response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
-                                response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n\n"
-                                response += "Would you like to book an appointment with any of these doctors?"
-                    
-                    elif "appointment" in context_lower or "book" in context_lower or "schedule" in context_lower:
-                        # User said yes to booking - use RAG to get available doctors and slots
-                        doctors = doctors_from_rag
-                        if not doctors:
-                            try:
-                                doctors = DatabaseHelper.get_doctors(limit=5)
-                            except Exception as e:
-                                logging.debug(f"Could not fetch doctors: {e}")
-                        
-                        if doctors and len(doctors) > 0:
-                            response = "Great! I can help you book an appointment. Here are available doctors:\n\n"
-                            for i, doc in enumerate(doctors[:3], 1):
-                                response += f"{i}. Dr. {doc.get('name', 'N/A')} - {doc.get('specialty', 'General Medicine')}\n"
-                            response += "\nPlease tell me:\n1. Which doctor you'd like to see\n2. Your preferred date and time\n3. Your symptoms or reason for visit\n\nI'll help you schedule the appointment!"
-                        else:
-                            response = "Great! To book an appointment, please tell me:\n1. Your symptoms or preferred specialty\n2. Preferred date and time (if any)\n3. Any specific doctor preference\n\nI'll find the right doctor and show you available time slots."
-                    
-                    elif "lab" in context_lower or "test" in context_lower or "result" in context_lower:
-                        # User said yes to lab results
-                        response = "I can help you access and understand your lab results:\n\n1. Retrieve your test results from our system\n2. Explain what your results mean\n3. Help you understand your diagnosis\n4. Guide you on next steps\n\nWould you like me to retrieve your recent lab results, or do you have specific test results you'd like me to explain?"
-                    
-                    elif "bill" in context_lower or "billing" in context_lower or "payment" in context_lower:
-                        # User said yes to billing
-                        response = "I can help with billing:\n\n1. Show you billing statements\n2. Explain charges and fees\n3. Help with payment plans\n4. Verify insurance coverage for procedures\n5. Provide cost estimates\n\nWhat billing question can I help with? You can ask about a specific bill, payment options, or cost estimates."
-                    
-                    elif "wellness" in context_lower or "diet" in context_lower or "exercise" in context_lower or "fitness" in context_lower:
-                        # User said yes to wellness
-                        response = "I can help with wellness:\n\n1. Personalized diet recommendations\n2. Exercise and fitness plans\n3. Sleep hygiene tips\n4. Weight management guidance\n5. Nutrition advice\n6. Lifestyle recommendations\n\nWhat aspect of wellness would you like help with? For example, you can ask about diet plans, exercise routines, or sleep tips."
-                    
-                    elif "mental" in context_lower or "therapy" in context_lower or "counselor" in context_lower:
-                        # User said yes to mental health
-                        response = "I can help with mental health support:\n\n1. Provide mental health assessments (GAD-7 for anxiety, PHQ-9 for depression)\n2. Help you find mental health professionals\n3. Provide resources for stress management\n4. Guide you to appropriate care\n\nFor mental health crises, please contact a crisis hotline or seek immediate professional help. How can I assist you with mental health support?"
-                    
-                    elif "location" in context_lower or "hospital" in context_lower or "clinic" in context_lower:
-                        # User said yes to locations
-                        response = "I can help you find healthcare facilities:\n\n1. Find hospitals and clinics near you\n2. Show addresses and contact information\n3. Check hours of operation\n4. Show services available at each location\n\nWhat type of facility are you looking for? You can ask for hospitals, clinics, urgent care centers, or specific specialties."
-                    
-                    else:
-                        # Generic yes - use intelligent fallback with RAG context
-                        response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                        if not response or len(response) < 50:
-                            response = "I'm here to help! Could you please tell me more about what you need? For example:\n• 'I need to find a doctor'\n• 'I want to book an appointment'\n• 'I need help with insurance'\n• 'I have [symptoms]'\n• 'I need lab results'\n• 'I have billing questions'\n\nWhat can I help you with?"
-                
-                # ENHANCED: Check for symptoms - use Symptom Analyzer for intelligent recommendations
-                elif any(word in msg_lower for word in ["fever", "cold", "cough", "suffering", "symptom", "sick", "pain", "viral", "headache", "ache", "nausea", "vomiting", "diarrhea", "rash", "dizziness", "chest", "breathing", "shortness"]):
-                    # Use Symptom Analyzer for intelligent analysis
-                    symptom_analyzer = self._get_symptom_analyzer()
-                    analysis_result = None
-                    specialty = None
-                    specialty_display_name = "General Physician"
-                    urgency = "routine"
-                    explanation = ""
-                    
-                    if symptom_analyzer:
-                        try:
-                            analysis_result = symptom_analyzer.analyze_symptoms(user_message)
-                            specialty = analysis_result.get('recommended_specialty', 'general_medicine')
-                            specialty_display_name = analysis_result.get('specialty_display_name', 'General Physician')
-                            urgency = analysis_result.get('urgency', 'routine')
-                            explanation = analysis_result.get('explanation', '')
-                            
-                            # Map specialty to database format
-                            specialty_map = {
-                                'general_medicine': 'general medicine',
-                                'cardiology': 'cardiology',
-                                'gynecology': 'gynecology',
-                                'neurology': 'neurology',
-                            'dermatology': 'dermatology',
-                                'pediatrics': 'pediatrics',
-                                'orthopedics': 'orthopedics',
-                                'psychiatry': 'psychiatry',
-                                'gastroenterology': 'gastroenterology',
-                                'endocrinology': 'endocrinology',
-                                'urology': 'urology',
-                                'ent': 'ent',
-                                'ophthalmology': 'ophthalmology',
-                                'pulmonology': 'pulmonology'
-                            }
-                            specialty = specialty_map.get(specialty, 'general medicine')
-                            
-                            logging.info(f"Symptom Analyzer: {specialty_display_name} (urgency: {urgency})")
-                        except Exception as e:
-                            logging.error(f"Symptom Analyzer failed: {e}")
-                            import traceback
-                            logging.error(traceback.format_exc())
-                    
-                    # Fallback to rule-based if analyzer not available
-                    if not analysis_result:
-                        if "fever" in msg_lower or "cold" in msg_lower or "cough" in msg_lower or "viral" in msg_lower:
-                            specialty = "general medicine"
-                            specialty_display_name = "General Physician"
-                        elif "blood pressure" in msg_lower or "high-blood" in msg_lower or "hypertension" in msg_lower or "chest pain" in msg_lower:
-                            specialty = "cardiology"
-                            specialty_display_name = "Cardiologist"
-                        elif "sugar" in msg_lower or "diabetes" in msg_lower or "glucose" in msg_lower:
-                            specialty = "endocrinology"
-                            specialty_display_name = "Endocrinologist"
-                        elif "headache" in msg_lower or "migraine" in msg_lower or "dizziness" in msg_lower:
-                            specialty = "neurology"
-                            specialty_display_name = "Neurologist"
-                        elif "skin" in msg_lower or "rash" in msg_lower:
-                            specialty = "dermatology"
-                            specialty_display_name = "Dermatologist"
-                        else:
-                            specialty = "general medicine"
-                            specialty_display_name = "General Physician"
-                    
-                    # Get doctors for the recommended specialty
-                    doctors = None
-                    try:
-                        doctors = DatabaseHelper.get_doctors(specialty=specialty)
-                    except Exception as e:
-                        logging.error(f"Could not fetch doctors: {e}")
-                    
-                    # ALWAYS use sample doctors if database fails
-                    if not doctors or len(doctors) == 0:
-                        logging.warning(f"No doctors from database for specialty: {specialty}, using sample data")
-                        doctors = DatabaseHelper._get_sample_doctors(specialty)
-                    
-                    if doctors and len(doctors) > 0:
-                        # Build intelligent response with symptom analysis
-                        if analysis_result and explanation:
-                            response = f"🔍 **Symptom Analysis:**\n{explanation}\n\n"
-                        else:
-                            response = f"Based on your symptoms, I recommend seeing a **{specialty_display_name}**.\n\n"
-                        
-                        if urgency == 'emergency':
-                            response += "⚠️ **URGENT:** This appears to be an emergency. Please seek immediate medical care or call 911.\n\n"
-                        elif urgency == 'urgent':
-                            response += "⚠️ **URGENT:** This should be addressed soon. I can help you find urgent care or schedule an appointment.\n\n"
-                        
-                        response += f"✅ **I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''} for you:**\n\n"
-                        for i, doc in enumerate(doctors[:5], 1):
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', specialty_display_name))}\n"
-                            response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
-                            if doc.get('phone'):
-                                response += f"   📞 Phone: {doc.get('phone')}\n"
-                            if doc.get('email'):
-                                response += f"   ✉️ Email: {doc.get('email')}\n"
-                            if doc.get('experience_years') or doc.get('experience'):
-                                exp = doc.get('experience_years') or doc.get('experience')
-                                response += f"   👨‍⚕️ Experience: {exp} years\n"
-                            if doc.get('rating'):
-                                response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
-                            response += "\n"
-                        
-                        response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
-                        if urgency == 'emergency':
-                            response += "For emergencies, please call 911 or visit the nearest emergency room immediately."
-                        else:
-                            response += "Just tell me the doctor's name or number and your preferred date/time!"
-                    else:
-                        # Final fallback
-                        response = f"Based on your symptoms, I recommend seeing a **{specialty_display_name}**.\n\n"
-                        response += "✅ **I found these doctors for you:**\n\n"
-                        response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
-                        response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
-                        response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n\n"
-                        response += "Would you like to book an appointment with any of these doctors?"
-                
-                # Lab results and medical records
-                elif any(word in msg_lower for word in ["lab", "test", "result", "report", "blood test", "x-ray", "scan", "medical record", "diagnosis"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Billing and payment
-                elif any(word in msg_lower for word in ["bill", "billing", "payment", "cost", "price", "charge", "invoice", "statement", "pay", "fee"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Emergency and urgent care
-                elif any(word in msg_lower for word in ["emergency", "urgent", "immediate", "critical", "severe", "acute", "911", "ambulance"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Mental health
-                elif any(word in msg_lower for word in ["mental", "depression", "anxiety", "stress", "therapy", "counselor", "psychologist", "psychiatrist", "mental health", "emotional"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Wellness and lifestyle
-                elif any(word in msg_lower for word in ["wellness", "diet", "exercise", "fitness", "nutrition", "sleep", "weight", "lifestyle", "healthy", "wellbeing"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Hospital and location services
-                elif any(word in msg_lower for word in ["hospital", "location", "clinic", "address", "where", "nearby", "near me", "facility"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                # Patient services
-                elif any(word in msg_lower for word in ["patient", "service", "support", "help desk", "customer service", "assistance"]):
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                elif any(word in msg_lower for word in ["insurance", "plan", "coverage", "more about insurance"]):
-                    # Handle insurance queries - check if asking for specific plan details
-                    specific_plan = None
-                    
-                    # Check if asking for details on specific plan
-                    if any(word in msg_lower for word in ["detail", "more about", "tell me about", "information about", "explain"]):
-                        if "premium" in msg_lower or "2" in msg_lower:
-                            specific_plan = "premium"
-                        elif "basic" in msg_lower or "1" in msg_lower:
-                            specific_plan = "basic"
-                        elif "family" in msg_lower or "3" in msg_lower:
-                            specific_plan = "family"
-                    
-                    if specific_plan:
-                        # Show details for specific plan
-                        if specific_plan == "premium":
-                            response = """**Premium Health Plan - Detailed Information**
+        if doctors and len(doctors) > 0:
+            # Build intelligent response with symptom analysis
+            if analysis_result and explanation:
+                response = f"🔍 **Symptom Analysis:**\n{explanation}\n\n"
+            else:
+                response = f"Based on your symptoms, I recommend seeing a **{specialty_display_name}**.\n\n"
+
+            if urgency == 'emergency':
+                response += "⚠️ **URGENT:** This appears to be an emergency. Please seek immediate medical care or call 911.\n\n"
+            elif urgency == 'urgent':
+                response += "⚠️ **URGENT:** This should be addressed soon. I can help you find urgent care or schedule an appointment.\n\n"
+
+            response += f"✅ **I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''} for you:**\n\n"
+            for i, doc in enumerate(doctors[:5], 1):
+                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                response += f"   📋 Specialty: {doc.get('specialty', doc.get('doc_type', specialty_display_name))}\n"
+                response += f"   🏥 Department: {doc.get('department', 'General Medicine')}\n"
+                if doc.get('phone'):
+                    response += f"   📞 Phone: {doc.get('phone')}\n"
+                if doc.get('email'):
+                    response += f"   ✉️ Email: {doc.get('email')}\n"
+                if doc.get('experience_years') or doc.get('experience'):
+                    exp = doc.get('experience_years') or doc.get('experience')
+                    response += f"   👨‍⚕️ Experience: {exp} years\n"
+                if doc.get('rating'):
+                    response += f"   ⭐ Rating: {doc.get('rating')}/5\n"
+                response += "\n"
+
+            response += "📅 **Would you like to book an appointment with any of these doctors?**\n"
+            if urgency == 'emergency':
+                response += "For emergencies, please call 911 or visit the nearest emergency room immediately."
+            else:
+                response += "Just tell me the doctor's name or number and your preferred date/time!"
+        else:
+            # Final fallback
+            response = f"Based on your symptoms, I recommend seeing a **{specialty_display_name}**.\n\n"
+            response += "✅ **I found these doctors for you:**\n\n"
+            response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
+            response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
+            response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n\n"
+            response += "Would you like to book an appointment with any of these doctors?"
+        return response
+
+    @FALLBACK_HANDLERS.handler("general_topics", priority=40, any_of=GENERAL_TOPIC_KEYWORDS,
+                               requires=("conversation_history", "retrieved_context"))
+    def _fallback_general_topics(self, ctx: HandlerContext) -> Optional[Text]:
+        # Topics without a database answer of their own get IntelligentFallback's topic replies
+        return IntelligentFallback.get_fallback_response(ctx.text, ctx.get("conversation_history"), ctx.get("retrieved_context"))
+
+    @FALLBACK_HANDLERS.handler("insurance", priority=50, any_of=["insurance", "plan", "coverage"],
+                               requires=("conversation_history", "retrieved_context"))
+    def _fallback_insurance(self, ctx: HandlerContext) -> Optional[Text]:
+        # Insurance: details for a named plan, otherwise the plan list
+        user_message = ctx.text
+        msg_lower = ctx.msg_lower
+        conversation_history = ctx.get("conversation_history")
+        retrieved_context = ctx.get("retrieved_context")
+        response = None
+        specific_plan = None
+
+        # Check if asking for details on specific plan
+        if any(word in msg_lower for word in ["detail", "more about", "tell me about", "information about", "explain"]):
+            if "premium" in msg_lower or "2" in msg_lower:
+                specific_plan = "premium"
+            elif "basic" in msg_lower or "1" in msg_lower:
+                specific_plan = "basic"
+            elif "family" in msg_lower or "3" in msg_lower:
+                specific_plan = "family"
+
+        if specific_plan:
+            # Show details for specific plan
+            if specific_plan == "premium":
+                response = """**Premium Health Plan - Detailed Information**
 
 💰 **Cost:**
    • Monthly Premium: $300
@@ -2667,8 +2848,8 @@ Would you like to:
 • Get personalized recommendations?
 • Learn about enrollment process?
 • See which doctors accept this plan?"""
-                        elif specific_plan == "basic":
-                            response = """**Basic Health Plan - Detailed Information**
+            elif specific_plan == "basic":
+                response = """**Basic Health Plan - Detailed Information**
 
 💰 **Cost:**
    • Monthly Premium: $150
@@ -2694,8 +2875,8 @@ Would you like to:
    • Those wanting essential coverage only
 
 Would you like to compare with Premium or Family plans?"""
-                        elif specific_plan == "family":
-                            response = """**Family Health Plan - Detailed Information**
+            elif specific_plan == "family":
+                response = """**Family Health Plan - Detailed Information**
 
 💰 **Cost:**
    • Monthly Premium: $450
@@ -2723,9 +2904,9 @@ Would you like to compare with Premium or Family plans?"""
    • Multi-generational households
 
 Would you like to see enrollment details or compare plans?"""
-                    elif "more" in msg_lower or "all" in msg_lower or "available" in msg_lower:
-                        # Show all insurance plans with details
-                        response = """**All Available Insurance Plans:**
+        elif "more" in msg_lower or "all" in msg_lower or "available" in msg_lower:
+            # Show all insurance plans with details
+            response = """**All Available Insurance Plans:**
 
 **1. Basic Health Plan**
    Monthly Premium: $150 | Deductible: $1,000 | Coverage: 80%
@@ -2748,433 +2929,362 @@ Would you like to see enrollment details or compare plans?"""
 • "Compare Basic and Premium plans"
 
 Would you like detailed information about any specific plan?"""
-                    else:
-                        # Use intelligent fallback with context
-                        response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                elif any(word in msg_lower for word in ["appointment", "book", "schedule"]):
-                    # First, check if a specific doctor name is mentioned
-                    doctor_name = None
-                    # Extract doctor name patterns: "book Dr. X", "book Dr X", "book X", "schedule Dr. X", or just typed name
-                    import re
-                    doctor_patterns = [
-                        r'(?:book|schedule|appointment with|want|need)\s+(?:Dr\.?\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
-                        r'Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
-                        r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)$',  # Just a name (e.g., "Lisa Anderson")
-                        r'doctor\s+(\d+)',  # Doctor number (e.g., "doctor 1")
-                    ]
-                    for pattern in doctor_patterns:
-                        match = re.search(pattern, user_message, re.IGNORECASE)
-                        if match:
-                            doctor_name = match.group(1).strip()
-                            # If it's a number, try to get doctor from conversation context
-                            if doctor_name.isdigit():
-                                # Check conversation history for doctor list
-                                if conversation_history:
-                                    for msg in reversed(conversation_history[-5:]):
-                                        if msg.get('role') == 'assistant':
-                                            content = msg.get('content', '')
-                                            # Try to extract doctor name from numbered list
-                                            num_match = re.search(rf'{doctor_name}\.\s+Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)', content, re.IGNORECASE)
-                                            if num_match:
-                                                doctor_name = num_match.group(1).strip()
-                                                break
-                            break
-                    
-                    # If doctor name found, search for that specific doctor
-                    if doctor_name:
-                        try:
-                            doctor = DatabaseHelper.get_doctor_by_name(doctor_name)
-                            if doctor:
-                                # Found the doctor - proceed with booking
-                                response = f"Perfect! I found Dr. {doctor.get('name', doctor_name)}.\n\n"
-                                response += f"Specialty: {doctor.get('specialty', 'General Medicine')}\n"
-                                response += f"Department: {doctor.get('department', 'N/A')}\n"
-                                if doctor.get('phone') and doctor.get('phone') != 'N/A':
-                                    response += f"Phone: {doctor.get('phone')}\n"
-                                response += "\nTo complete your booking, please provide:\n"
-                                response += "1. Your preferred date (e.g., 'tomorrow', 'December 20', 'next Monday')\n"
-                                response += "2. Your preferred time (e.g., '10 AM', '2:30 PM', 'morning')\n\n"
-                                response += "Just tell me the date and time, and I'll book your appointment!"
-                            else:
-                                # Doctor not found - show helpful message
-                                response = f"I couldn't find a doctor named '{doctor_name}' in our system.\n\n"
-                                response += "Would you like me to:\n"
-                                response += "1. Search for doctors by specialty?\n"
-                                response += "2. Show you all available doctors?\n"
-                                response += "3. Help you find a doctor for your symptoms?\n\n"
-                                response += "Please tell me which option you prefer, or type the doctor's name exactly as shown in the list."
-                        except Exception as e:
-                            logging.error(f"Error searching for doctor {doctor_name}: {e}")
-                            response = f"I'm having trouble finding Dr. {doctor_name}. Would you like me to search by specialty instead?"
-                    else:
-                        # No specific doctor name - check if specialty is mentioned
-                        specialty = None
-                        if "cardiologist" in msg_lower or "cardiac" in msg_lower:
-                            specialty = "cardiology"
-                        elif "gynecologist" in msg_lower or "gynacologist" in msg_lower or "gynec" in msg_lower or "gynaec" in msg_lower:
-                            specialty = "gynecology"
-                        elif "neurologist" in msg_lower:
-                            specialty = "neurology"
-                        elif "dermatologist" in msg_lower:
-                            specialty = "dermatology"
-                        elif "pediatrician" in msg_lower:
-                            specialty = "pediatrics"
-                        
-                        if specialty:
-                            # Get doctors for the requested specialty
-                            department = specialty  # Use specialty as department filter
-                            doctors = None
-                            try:
-                                # Pass both specialty and department to ensure proper filtering
-                                doctors = DatabaseHelper.get_doctors(specialty=specialty, department=department)
-                                # Additional filter to ensure only requested department specialists
-                                if doctors:
-                                    doctors = [d for d in doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
-                            except Exception as e:
-                                logging.debug(f"Could not fetch doctors: {e}")
-                            
-                            if doctors and len(doctors) > 0:
-                                specialty_name = specialty.replace('_', ' ').title()
-                                response = f"Great! I can help you book an appointment with a {specialty_name}. Here are available {specialty_name}s:\n\n"
-                                for i, doc in enumerate(doctors[:5], 1):  # Show up to 5
-                                    response += f"{i}. Dr. {doc.get('name', 'N/A')}\n"
-                                    response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                                    if doc.get('phone'):
-                                        response += f"   Phone: {doc.get('phone')}\n"
-                                    response += "\n"
-                                response += "To book an appointment, simply tell me:\n"
-                                response += "1. The doctor's name (e.g., 'book Dr. [Name]' or just type the name)\n"
-                                response += "2. Or the doctor's number (e.g., 'book doctor 1')\n"
-                                response += "3. Then provide your preferred date and time\n\n"
-                                response += "Example: 'book Dr. [Name] tomorrow at 10 AM' or just type '[Name]'"
-                            else:
-                                response = f"I can help you book an appointment with a {specialty.replace('_', ' ').title()}! Let me search for available doctors. Would you like me to find available {specialty.replace('_', ' ').title()}s for you?"
-                        else:
-                            # Generic booking request - provide helpful guidance
-                            response = "I'd be happy to help you book an appointment! Here's how:\n\n"
-                            response += "1. Tell me a specific doctor's name\n"
-                            response += "   Example: 'book Dr. Lisa Anderson' or just type 'Lisa Anderson'\n\n"
-                            response += "2. Tell me the specialty you need\n"
-                            response += "   Example: 'book an appointment with a gynecologist'\n\n"
-                            response += "3. Tell me your symptoms\n"
-                            response += "   Example: 'I need to see a doctor for headaches'\n\n"
-                            response += "What would you like to do?"
-                elif any(word in msg_lower for word in ["show", "all", "list", "available"]) and "doctor" in msg_lower:
-                    # User wants to see all doctors - get all doctors from database
-                    doctors = None
-                    try:
-                        doctors = DatabaseHelper.get_doctors()  # No specialty filter = all doctors
-                    except Exception as e:
-                        logging.debug(f"Could not fetch doctors: {e}")
-                    
-                    # Fallback to API if database doesn't have doctors
-                    if not doctors or len(doctors) == 0:
-                        try:
-                            response_api = requests.get(f"{REACT_APP_DUMMY_API}/doctors/all", timeout=5)
-                            response_api.raise_for_status()
-                            api_doctors = response_api.json()
-                            if api_doctors:
-                                doctors = [{
-                                    'name': d.get('name', 'N/A'),
-                                    'specialty': d.get('specialty', 'General Medicine'),
-                                    'department': d.get('department', d.get('specialty', 'General Medicine')),
-                                    'phone': d.get('phone', 'N/A'),
-                                    'email': d.get('email', 'N/A')
-                                } for d in api_doctors[:10]]
-                        except requests.exceptions.RequestException as e:
-                            logging.debug(f"API call failed: {e}")
-                    
-                    if doctors and len(doctors) > 0:
-                        response = f" **All Available Doctors ({len(doctors)}):**\n\n"
-                        for i, doc in enumerate(doctors[:10], 1):  # Show first 10
-                            response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                            response += f"    Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                            response += f"    Department: {doc.get('department', 'N/A')}\n"
-                            if doc.get('phone') and doc.get('phone') != 'N/A':
-                                response += f"    Phone: {doc.get('phone')}\n"
-                            response += "\n"
-                        response += " **Next Steps:**\n"
-                        response += "1. Would you like to book an appointment with any of these doctors?\n"
-                        response += "2. I can help you find a specific specialist\n"
-                        response += "3. I can assist with scheduling\n\n"
-                        response += "Which doctor would you like to book an appointment with?"
-                    else:
-                        # ALWAYS use sample doctors if database fails
-                        logging.warning("No doctors from database, using sample data")
-                        doctors = DatabaseHelper._get_sample_doctors()
-                        
-                        if doctors and len(doctors) > 0:
-                            response = f"✅ **All Available Doctors ({len(doctors)}):**\n\n"
-                            for i, doc in enumerate(doctors[:10], 1):
-                                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
-                                response += f"    Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
-                                response += f"    Department: {doc.get('department', 'N/A')}\n"
-                                if doc.get('phone') and doc.get('phone') != 'N/A':
-                                    response += f"    Phone: {doc.get('phone')}\n"
-                                response += "\n"
-                            response += " **Next Steps:**\n"
-                            response += "• Would you like to book an appointment with any of these doctors?\n"
-                            response += "• I can help you find a specific specialist\n"
-                            response += "• I can assist with scheduling\n\n"
-                            response += "Which doctor would you like to book an appointment with?"
-                        else:
-                            # Final fallback
-                            response = "✅ **All Available Doctors:**\n\n"
-                            response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
-                            response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
-                            response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n"
-                            response += "4. Dr. Anjali Desai - Neurology - (555) 203-0001\n"
-                            response += "5. Dr. Sneha Kapoor - Dermatology - (555) 204-0001\n\n"
-                            response += "Would you like to book an appointment with any of these doctors?"
-                elif any(word in msg_lower for word in ["find", "doctor", "gynecologist", "gynacologist", "gynec", "gynaec", "obstetric", "specialist", "cardiologist", "neurologist", "dermatologist", "pediatrician", "orthopedic", "psychiatrist", "general physician", "general practitioner", "GP", "family doctor", "help me with", "need a", "is there any", "available doctor", "any doctor", "show me", "list"]):
-                    # First check if a specific doctor name is mentioned
-                    doctor_name = None
-                    import re
-                    # Extract doctor name patterns
-                    doctor_patterns = [
-                        r'Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
-                        r'(?:find|show|list|need)\s+(?:Dr\.?\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
-                    ]
-                    for pattern in doctor_patterns:
-                        match = re.search(pattern, user_message, re.IGNORECASE)
-                        if match:
-                            doctor_name = match.group(1).strip()
-                            break
-                    
-                    # If specific doctor name found, search for that doctor only
-                    if doctor_name:
-                        try:
-                            doctor = DatabaseHelper.get_doctor_by_name(doctor_name)
-                            if doctor:
-                                response = f"✅ **I found Dr. {doctor.get('name', doctor_name)}:**\n\n"
-                                response += f"**Specialty:** {doctor.get('specialty', 'General Medicine')}\n"
-                                response += f"**Department:** {doctor.get('department', 'N/A')}\n"
-                                if doctor.get('phone') and doctor.get('phone') != 'N/A':
-                                    response += f"**Phone:** {doctor.get('phone')}\n"
-                                if doctor.get('email') and doctor.get('email') != 'N/A':
-                                    response += f"**Email:** {doctor.get('email')}\n"
-                                if doctor.get('experience_years'):
-                                    response += f"**Experience:** {doctor.get('experience_years')} years\n"
-                                if doctor.get('rating'):
-                                    response += f"**Rating:** {doctor.get('rating')}/5\n"
-                                response += "\n**Would you like to book an appointment with Dr. " + doctor.get('name', doctor_name) + "?**\n"
-                                response += "Just tell me: 'book Dr. " + doctor.get('name', doctor_name) + "' and your preferred date/time!"
-                            else:
-                                response = f"I couldn't find a doctor named '{doctor_name}' in our system.\n\n"
-                                response += "**Would you like me to:**\n"
-                                response += "1. Search by specialty instead?\n"
-                                response += "2. Show all available doctors?\n"
-                                response += "3. Help you find a doctor for your symptoms?"
-                        except Exception as e:
-                            logging.error(f"Error searching for doctor {doctor_name}: {e}")
-                            response = f"I'm having trouble finding Dr. {doctor_name}. Would you like me to search by specialty instead?"
-                    else:
-                        # No specific doctor name - search by specialty
-                        # Handle doctor finding queries - ALWAYS get actual doctors from database
-                        specialty = None
-                        specialty_display_name = "doctor"
-                        
-                        if "general physician" in msg_lower or "general practitioner" in msg_lower or "GP" in msg_lower or "family doctor" in msg_lower or "primary care" in msg_lower:
-                            specialty = "general medicine"
-                            specialty_display_name = "general physician"
-                        elif "gynecologist" in msg_lower or "gynec" in msg_lower or "obstetric" in msg_lower or "gyanocologist" in msg_lower or "gynaec" in msg_lower:
-                            specialty = "gynecology"
-                            specialty_display_name = "gynecologist"
-                        elif "cardiologist" in msg_lower or "cardiac" in msg_lower or "heart" in msg_lower:
-                            specialty = "cardiology"
-                            specialty_display_name = "cardiologist"
-                        elif "neurologist" in msg_lower or "neurology" in msg_lower or "neuro" in msg_lower:
-                            specialty = "neurology"
-                            specialty_display_name = "neurologist"
-                        elif "dermatologist" in msg_lower or "dermatology" in msg_lower or "skin" in msg_lower:
-                            specialty = "dermatology"
-                            specialty_display_name = "dermatologist"
-                        elif "pediatrician" in msg_lower or "pediatric" in msg_lower or "child" in msg_lower:
-                            specialty = "pediatrics"
-                            specialty_display_name = "pediatrician"
-                        elif "orthopedic" in msg_lower or "orthoped" in msg_lower or "bone" in msg_lower:
-                            specialty = "orthopedics"
-                            specialty_display_name = "orthopedic surgeon"
-                        elif "psychiatrist" in msg_lower or "psychiatry" in msg_lower:
-                            specialty = "psychiatry"
-                            specialty_display_name = "psychiatrist"
-                        
-                        # Try to get doctors from database - MULTIPLE ATTEMPTS for reliability
-                        doctors = None
-                        
-                        # Attempt 1: Use RAG retriever if available
-                        if rag_retriever and specialty:
-                            try:
-                                doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
-                                if doctors:
-                                    logging.info(f"RAG: Retrieved {len(doctors)} {specialty_display_name}s from database")
-                            except Exception as e:
-                                logging.debug(f"RAG retrieval failed: {e}")
-                        
-                        # Set department to match specialty for proper filtering
-                        department = specialty  # Use specialty as department filter
-                        
-                        # Attempt 2: Use DatabaseHelper if RAG didn't work
-                        if not doctors or len(doctors) == 0:
-                            try:
-                                # Pass both specialty and department to ensure proper filtering
-                                doctors = DatabaseHelper.get_doctors(specialty=specialty, department=department)
-                                if doctors:
-                                    # Additional filter to ensure only requested department specialists
-                                    doctors = [d for d in doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
-                                    if doctors:
-                                        logging.info(f"DatabaseHelper: Retrieved {len(doctors)} {specialty_display_name}s from database")
-                            except Exception as e:
-                                logging.debug(f"DatabaseHelper retrieval failed: {e}")
-                        
-                        # Attempt 3: Try without specialty filter to get all doctors, then filter
-                        if not doctors or len(doctors) == 0:
-                            try:
-                                all_doctors = DatabaseHelper.get_doctors()  # Get all doctors
-                                if all_doctors and specialty:
-                                    # Filter by specialty AND department manually
-                                    doctors = [d for d in all_doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
-                                    if doctors:
-                                        logging.info(f"Manual filter: Found {len(doctors)} {specialty_display_name}s")
-                            except Exception as e:
-                                logging.debug(f"Manual filtering failed: {e}")
-                        
-                        # BUILD RESPONSE with database results
-                        if doctors and len(doctors) > 0:
-                            # SUCCESS: Build detailed response with actual doctors from database
-                            response = f"I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''}:\n\n"
-                            for i, doc in enumerate(doctors[:5], 1):  # Show first 5
-                                response += f"{i}. Dr. {doc.get('name', 'N/A')}\n"
-                                response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
-                                response += f"   Department: {doc.get('department', 'N/A')}\n"
-                                if doc.get('phone'):
-                                    response += f"   Phone: {doc.get('phone')}\n"
-                                if doc.get('email'):
-                                    response += f"   Email: {doc.get('email')}\n"
-                                if doc.get('experience_years'):
-                                    response += f"   Experience: {doc.get('experience_years')} years\n"
-                                if doc.get('rating'):
-                                    response += f"   Rating: {doc.get('rating')}/5\n"
-                                response += "\n"
-                            
-                            response += f"Next Steps:\n"
-                            response += f"1. Tell me the doctor's name (e.g., 'book Dr. [Name]')\n"
-                            response += f"2. Or tell me the doctor's number (e.g., 'book doctor 1')\n"
-                            response += f"3. Then provide your preferred date and time\n\n"
-                            response += f"Which {specialty_display_name} would you like to book with?"
-                            
-                            logging.info(f"Successfully showed {len(doctors)} {specialty_display_name}s from database to user")
-                        else:
-                            # NO DOCTORS FOUND: Provide helpful fallback
-                            logging.warning(f"No {specialty_display_name}s found in database for specialty: {specialty}")
-                            response = f"I'm currently searching our database for available {specialty_display_name}s. "
-                            response += f"While I search, here's what I can help you with:\n\n"
-                            response += f"📞 **Immediate Help:**\n"
-                            response += f"1. Call our appointment line: (555) 123-4567\n"
-                            response += f"2. Visit our website to see all available {specialty_display_name}s\n\n"
-                            response += f"💬 **I can also help you:**\n"
-                            response += f"• Describe your symptoms for recommendations\n"
-                            response += f"• Check insurance coverage\n"
-                            response += f"• See all available doctors\n"
-                            response += f"• Book appointments with other specialists\n\n"
-                            response += f"Let me know how you'd like to proceed, or I can continue searching for {specialty_display_name}s!"
-                # Handle "all plans" query specifically
-                elif "all" in msg_lower and "plan" in msg_lower:
-                    # Show all insurance plans with details
-                    response = """Here are all available insurance plans:
+        else:
+            # Use intelligent fallback with context
+            response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
+        return response
+
+    @FALLBACK_HANDLERS.handler("appointments", priority=60, any_of=["appointment", "book", "schedule"],
+                               requires=("conversation_history",))
+    def _fallback_appointments(self, ctx: HandlerContext) -> Optional[Text]:
+        # Appointments: book with a named doctor, or explain how to book
+        user_message = ctx.text
+        msg_lower = ctx.msg_lower
+        conversation_history = ctx.get("conversation_history")
+        response = None
+        doctor_name = None
+        # Extract doctor name patterns: "book Dr. X", "book Dr X", "book X", "schedule Dr. X", or just typed name
+        import re
+        doctor_patterns = [
+            r'(?:book|schedule|appointment with|want|need)\s+(?:Dr\.?\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
+            r'Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
+            r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)$',  # Just a name (e.g., "Lisa Anderson")
+            r'doctor\s+(\d+)',  # Doctor number (e.g., "doctor 1")
+        ]
+        for pattern in doctor_patterns:
+            match = re.search(pattern, user_message, re.IGNORECASE)
+            if match:
+                doctor_name = match.group(1).strip()
+                # If it's a number, try to get doctor from conversation context
+                if doctor_name.isdigit():
+                    # Check conversation history for doctor list
+                    if conversation_history:
+                        for msg in reversed(conversation_history[-5:]):
+                            if msg.get('role') == 'assistant':
+                                content = msg.get('content', '')
+                                # Try to extract doctor name from numbered list
+                                num_match = re.search(rf'{doctor_name}\.\s+Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)', content, re.IGNORECASE)
+                                if num_match:
+                                    doctor_name = num_match.group(1).strip()
+                                    break
+                break
 
-**1. Basic Health Plan**
-   Monthly Premium: $150
-   Deductible: $1,000
-   Coverage: 80%
-   Features: Primary care visits, Emergency visits, Basic prescriptions
-   Best for: Budget-conscious individuals
+        # If doctor name found, search for that specific doctor
+        if doctor_name:
+            try:
+                doctor = DatabaseHelper.get_doctor_by_name(doctor_name)
+                if doctor:
+                    # Found the doctor - proceed with booking
+                    response = f"Perfect! I found Dr. {doctor.get('name', doctor_name)}.\n\n"
+                    response += f"Specialty: {doctor.get('specialty', 'General Medicine')}\n"
+                    response += f"Department: {doctor.get('department', 'N/A')}\n"
+                    if doctor.get('phone') and doctor.get('phone') != 'N/A':
+                        response += f"Phone: {doctor.get('phone')}\n"
+                    response += "\nTo complete your booking, please provide:\n"
+                    response += "1. Your preferred date (e.g., 'tomorrow', 'December 20', 'next Monday')\n"
+                    response += "2. Your preferred time (e.g., '10 AM', '2:30 PM', 'morning')\n\n"
+                    response += "Just tell me the date and time, and I'll book your appointment!"
+                else:
+                    # Doctor not found - show helpful message
+                    response = f"I couldn't find a doctor named '{doctor_name}' in our system.\n\n"
+                    response += "Would you like me to:\n"
+                    response += "1. Search for doctors by specialty?\n"
+                    response += "2. Show you all available doctors?\n"
+                    response += "3. Help you find a doctor for your symptoms?\n\n"
+                    response += "Please tell me which option you prefer, or type the doctor's name exactly as shown in the list."
+            except Exception as e:
+                logging.error(f"Error searching for doctor {doctor_name}: {e}")
+                response = f"I'm having trouble finding Dr. {doctor_name}. Would you like me to search by specialty instead?"
+        else:
+            # No specific doctor name - check if specialty is mentioned
+            specialty = None
+            if "cardiologist" in msg_lower or "cardiac" in msg_lower:
+                specialty = "cardiology"
+            elif "gynecologist" in msg_lower or "gynacologist" in msg_lower or "gynec" in msg_lower or "gynaec" in msg_lower:
+                specialty = "gynecology"
+            elif "neurologist" in msg_lower:
+                specialty = "neurology"
+            elif "dermatologist" in msg_lower:
+                specialty = "dermatology"
+            elif "pediatrician" in msg_lower:
+                specialty = "pediatrics"
 
-**2. Premium Health Plan**
-   Monthly Premium: $300
-   Deductible: $500
-   Coverage: 90%
-   Features: All basic features, Specialist visits, Mental health coverage, Dental & Vision
-   Best for: Regular medical needs
+            if specialty:
+                # Get doctors for the requested specialty
+                department = specialty  # Use specialty as department filter
+                doctors = None
+                try:
+                    # Pass both specialty and department to ensure proper filtering
+                    doctors = DatabaseHelper.get_doctors(specialty=specialty, department=department)
+                    # Additional filter to ensure only requested department specialists
+                    if doctors:
+                        doctors = [d for d in doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
+                except Exception as e:
+                    logging.debug(f"Could not fetch doctors: {e}")
+
+                if doctors and len(doctors) > 0:
+                    specialty_name = specialty.replace('_', ' ').title()
+                    response = f"Great! I can help you book an appointment with a {specialty_name}. Here are available {specialty_name}s:\n\n"
+                    for i, doc in enumerate(doctors[:5], 1):  # Show up to 5
+                        response += f"{i}. Dr. {doc.get('name', 'N/A')}\n"
+                        response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
+                        if doc.get('phone'):
+                            response += f"   Phone: {doc.get('phone')}\n"
+                        response += "\n"
+                    response += "To book an appointment, simply tell me:\n"
+                    response += "1. The doctor's name (e.g., 'book Dr. [Name]' or just type the name)\n"
+                    response += "2. Or the doctor's number (e.g., 'book doctor 1')\n"
+                    response += "3. Then provide your preferred date and time\n\n"
+                    response += "Example: 'book Dr. [Name] tomorrow at 10 AM' or just type '[Name]'"
+                else:
+                    response = f"I can help you book an appointment with a {specialty.replace('_', ' ').title()}! Let me search for available doctors. Would you like me to find available {specialty.replace('_', ' ').title()}s for you?"
+            else:
+                # Generic booking request - provide helpful guidance
+                response = "I'd be happy to help you book an appointment! Here's how:\n\n"
+                response += "1. Tell me a specific doctor's name\n"
+                response += "   Example: 'book Dr. Lisa Anderson' or just type 'Lisa Anderson'\n\n"
+                response += "2. Tell me the specialty you need\n"
+                response += "   Example: 'book an appointment with a gynecologist'\n\n"
+                response += "3. Tell me your symptoms\n"
+                response += "   Example: 'I need to see a doctor for headaches'\n\n"
+                response += "What would you like to do?"
+        return response
+
+    @FALLBACK_HANDLERS.handler("doctor_listing", priority=70, any_of=["show", "all", "list", "available"],
+                               predicate=lambda ctx: "doctor" in ctx.msg_lower)
+    def _fallback_doctor_listing(self, ctx: HandlerContext) -> Optional[Text]:
+        # "Show all doctors": every doctor in the database
+        response = None
+        doctors = None
+        try:
+            doctors = DatabaseHelper.get_doctors()  # No specialty filter = all doctors
+        except Exception as e:
+            logging.debug(f"Could not fetch doctors: {e}")
 
-**3. Family Health Plan**
-   Monthly Premium: $450
-   Deductible: $750
-   Coverage: 85%
-   Features: All premium features, Family coverage, Maternity care, Pediatric care
-   Best for: Families with children
+        # Fallback to API if database doesn't have doctors
+        if not doctors or len(doctors) == 0:
+            try:
+                response_api = dummy_api_get("/doctors/all")
+                api_doctors = response_api.json()
+                if api_doctors:
+                    doctors = [{
+                        'name': d.get('name', 'N/A'),
+                        'specialty': d.get('specialty', 'General Medicine'),
+                        'department': d.get('department', d.get('specialty', 'General Medicine')),
+                        'phone': d.get('phone', 'N/A'),
+                        'email': d.get('email', 'N/A')
+                    } for d in api_doctors[:10]]
+            except (requests.exceptions.RequestException, DependencyUnavailable) as e:
+                logging.debug(f"API call failed: {e}")
 
-Would you like more details about any specific plan, or would you like personalized recommendations?"""
-                else:
-                    # Use intelligent fallback with context (always provides response)
-                    response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-        
-            # Ensure we have a response - use intelligent fallback with context for ALL queries
-            if not response or response.strip() == "":
-                # Use intelligent fallback that handles ALL query types with context
-                response = IntelligentFallback.get_fallback_response(user_message, conversation_history, retrieved_context)
-                
-                # Enhance with retrieved context if available
-                if retrieved_context:
-                    if retrieved_context.get('doctors'):
-                        doctors = retrieved_context['doctors']
-                        if doctors and len(doctors) > 0:
-                            response += f"\n\nI found {len(doctors)} relevant doctor(s) in our system:\n"
-                            for i, doc in enumerate(doctors[:3], 1):
-                                response += f"{i}. Dr. {doc.get('name', 'N/A')} - {doc.get('specialty', 'General Medicine')}\n"
-                            response += "\nWould you like to book an appointment with any of these doctors?"
-                    
-                    if retrieved_context.get('insurance_plans'):
-                        plans = retrieved_context['insurance_plans']
-                        if plans and len(plans) > 0:
-                            response += f"\n\nI found {len(plans)} insurance plan(s) available. Would you like to see details?"
-                    
-                    if retrieved_context.get('appointments'):
-                        appointments_list = retrieved_context['appointments']
-                        if appointments_list and len(appointments_list) > 0:
-                            response += f"\n\nYou have {len(appointments_list)} upcoming appointment(s). Would you like to manage them?"
-            
-                # Final safety check - ensure we ALWAYS have a response
-                if not response or response.strip() == "":
-                    # Ultimate fallback - provide helpful response based on message
-                    msg_lower = user_message.lower()
-                    if any(word in msg_lower for word in ["suffering", "sick", "symptom", "pain", "fever", "cold", "cough", "viral", "infection"]):
-                        response = "I understand you're not feeling well. I can help you find the right doctor based on your symptoms, book an appointment, or provide general health guidance. What specific symptoms are you experiencing?"
-                    elif any(word in msg_lower for word in ["help", "assist", "how can you", "what can you"]):
-                        response = "I'm Dr. AI, your healthcare assistant! I can help you with finding doctors, booking appointments, health questions, insurance information, and more. What would you like help with today?"
-                    else:
-                        response = "I'm here to help with all your healthcare needs - appointments, insurance, health questions, medications, and more. What would you like to know?"
-            
-            # Save conversation history to database (non-blocking, don't wait)
-            # Do this asynchronously - don't block the response
+        if doctors and len(doctors) > 0:
+            response = f" **All Available Doctors ({len(doctors)}):**\n\n"
+            for i, doc in enumerate(doctors[:10], 1):  # Show first 10
+                response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                response += f"    Specialty: {doc.get('specialty', 'General Medicine')}\n"
+                response += f"    Department: {doc.get('department', 'N/A')}\n"
+                if doc.get('phone') and doc.get('phone') != 'N/A':
+                    response += f"    Phone: {doc.get('phone')}\n"
+                response += "\n"
+            response += " **Next Steps:**\n"
+            response += "1. Would you like to book an appointment with any of these doctors?\n"
+            response += "2. I can help you find a specific specialist\n"
+            response += "3. I can assist with scheduling\n\n"
+            response += "Which doctor would you like to book an appointment with?"
+        else:
+            # ALWAYS use sample doctors if database fails
+            logging.warning("No doctors from database, using sample data")
+            doctors = DatabaseHelper._get_sample_doctors()
+
+            if doctors and len(doctors) > 0:
+                response = f"✅ **All Available Doctors ({len(doctors)}):**\n\n"
+                for i, doc in enumerate(doctors[:10], 1):
+                    response += f"**{i}. Dr. {doc.get('name', 'N/A')}**\n"
+                    response += f"    Specialty: {doc.get('specialty', doc.get('doc_type', 'General Medicine'))}\n"
+                    response += f"    Department: {doc.get('department', 'N/A')}\n"
+                    if doc.get('phone') and doc.get('phone') != 'N/A':
+                        response += f"    Phone: {doc.get('phone')}\n"
+                    response += "\n"
+                response += " **Next Steps:**\n"
+                response += "• Would you like to book an appointment with any of these doctors?\n"
+                response += "• I can help you find a specific specialist\n"
+                response += "• I can assist with scheduling\n\n"
+                response += "Which doctor would you like to book an appointment with?"
+            else:
+                # Final fallback
+                response = "✅ **All Available Doctors:**\n\n"
+                response += "1. Dr. Sarah Johnson - General Medicine - (555) 123-4567\n"
+                response += "2. Dr. Emily Williams - Gynecology - (555) 201-0002\n"
+                response += "3. Dr. Michael Chen - Cardiology - (555) 202-0001\n"
+                response += "4. Dr. Anjali Desai - Neurology - (555) 203-0001\n"
+                response += "5. Dr. Sneha Kapoor - Dermatology - (555) 204-0001\n\n"
+                response += "Would you like to book an appointment with any of these doctors?"
+        return response
+
+    @FALLBACK_HANDLERS.handler("doctor_search", priority=80, any_of=DOCTOR_SEARCH_KEYWORDS,
+                               requires=("rag_retriever",))
+    def _fallback_doctor_search(self, ctx: HandlerContext) -> Optional[Text]:
+        # Doctor search by name or specialty
+        user_message = ctx.text
+        msg_lower = ctx.msg_lower
+        rag_retriever = ctx.get("rag_retriever")
+        response = None
+        doctor_name = None
+        import re
+        # Extract doctor name patterns
+        doctor_patterns = [
+            r'Dr\.\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
+            r'(?:find|show|list|need)\s+(?:Dr\.?\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)',
+        ]
+        for pattern in doctor_patterns:
+            match = re.search(pattern, user_message, re.IGNORECASE)
+            if match:
+                doctor_name = match.group(1).strip()
+                break
+
+        # If specific doctor name found, search for that doctor only
+        if doctor_name:
             try:
-                # Just try to save, don't wait for it
-                DatabaseHelper.save_conversation_history(
-                    sender_id, user_message, response,
-                    intent=intent,
-                    entities=entities
-                )
-            except Exception:
-                pass  # Ignore errors - non-critical
-            
-            # Send response (only once) - ensure response is not empty
-            # Response is guaranteed to be set by this point due to fallback logic above
-            if response and response.strip():
-                safe_dispatcher.utter_message(text=response)
-                logging.info(f"action_aws_bedrock_chat returning response: {response[:100]}...")
-                return []  # CRITICAL: Return immediately after sending response
+                doctor = DatabaseHelper.get_doctor_by_name(doctor_name)
+                if doctor:
+                    response = f"✅ **I found Dr. {doctor.get('name', doctor_name)}:**\n\n"
+                    response += f"**Specialty:** {doctor.get('specialty', 'General Medicine')}\n"
+                    response += f"**Department:** {doctor.get('department', 'N/A')}\n"
+                    if doctor.get('phone') and doctor.get('phone') != 'N/A':
+                        response += f"**Phone:** {doctor.get('phone')}\n"
+                    if doctor.get('email') and doctor.get('email') != 'N/A':
+                        response += f"**Email:** {doctor.get('email')}\n"
+                    if doctor.get('experience_years'):
+                        response += f"**Experience:** {doctor.get('experience_years')} years\n"
+                    if doctor.get('rating'):
+                        response += f"**Rating:** {doctor.get('rating')}/5\n"
+                    response += "\n**Would you like to book an appointment with Dr. " + doctor.get('name', doctor_name) + "?**\n"
+                    response += "Just tell me: 'book Dr. " + doctor.get('name', doctor_name) + "' and your preferred date/time!"
+                else:
+                    response = f"I couldn't find a doctor named '{doctor_name}' in our system.\n\n"
+                    response += "**Would you like me to:**\n"
+                    response += "1. Search by specialty instead?\n"
+                    response += "2. Show all available doctors?\n"
+                    response += "3. Help you find a doctor for your symptoms?"
+            except Exception as e:
+                logging.error(f"Error searching for doctor {doctor_name}: {e}")
+                response = f"I'm having trouble finding Dr. {doctor_name}. Would you like me to search by specialty instead?"
+        else:
+            # No specific doctor name - search by specialty
+            # Handle doctor finding queries - ALWAYS get actual doctors from database
+            specialty = None
+            specialty_display_name = "doctor"
+
+            if "general physician" in msg_lower or "general practitioner" in msg_lower or "GP" in msg_lower or "family doctor" in msg_lower or "primary care" in msg_lower:
+                specialty = "general medicine"
+                specialty_display_name = "general physician"
+            elif "gynecologist" in msg_lower or "gynec" in msg_lower or "obstetric" in msg_lower or "gyanocologist" in msg_lower or "gynaec" in msg_lower:
+                specialty = "gynecology"
+                specialty_display_name = "gynecologist"
+            elif "cardiologist" in msg_lower or "cardiac" in msg_lower or "heart" in msg_lower:
+                specialty = "cardiology"
+                specialty_display_name = "cardiologist"
+            elif "neurologist" in msg_lower or "neurology" in msg_lower or "neuro" in msg_lower:
+                specialty = "neurology"
+                specialty_display_name = "neurologist"
+            elif "dermatologist" in msg_lower or "dermatology" in msg_lower or "skin" in msg_lower:
+                specialty = "dermatology"
+                specialty_display_name = "dermatologist"
+            elif "pediatrician" in msg_lower or "pediatric" in msg_lower or "child" in msg_lower:
+                specialty = "pediatrics"
+                specialty_display_name = "pediatrician"
+            elif "orthopedic" in msg_lower or "orthoped" in msg_lower or "bone" in msg_lower:
+                specialty = "orthopedics"
+                specialty_display_name = "orthopedic surgeon"
+            elif "psychiatrist" in msg_lower or "psychiatry" in msg_lower:
+                specialty = "psychiatry"
+                specialty_display_name = "psychiatrist"
+
+            # Try to get doctors from database - MULTIPLE ATTEMPTS for reliability
+            doctors = None
+
+            # Attempt 1: Use RAG retriever if available
+            if rag_retriever and specialty:
+                try:
+                    doctors = rag_retriever.retrieve_doctors(user_message, specialty=specialty, limit=10)
+                    if doctors:
+                        logging.info(f"RAG: Retrieved {len(doctors)} {specialty_display_name}s from database")
+                except Exception as e:
+                    logging.debug(f"RAG retrieval failed: {e}")
+
+            # Set department to match specialty for proper filtering
+            department = specialty  # Use specialty as department filter
+
+            # Attempt 2: Use DatabaseHelper if RAG didn't work
+            if not doctors or len(doctors) == 0:
+                try:
+                    # Pass both specialty and department to ensure proper filtering
+                    doctors = DatabaseHelper.get_doctors(specialty=specialty, department=department)
+                    if doctors:
+                        # Additional filter to ensure only requested department specialists
+                        doctors = [d for d in doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
+                        if doctors:
+                            logging.info(f"DatabaseHelper: Retrieved {len(doctors)} {specialty_display_name}s from database")
+                except Exception as e:
+                    logging.debug(f"DatabaseHelper retrieval failed: {e}")
+
+            # Attempt 3: Try without specialty filter to get all doctors, then filter
+            if not doctors or len(doctors) == 0:
+                try:
+                    all_doctors = DatabaseHelper.get_doctors()  # Get all doctors
+                    if all_doctors and specialty:
+                        # Filter by specialty AND department manually
+                        doctors = [d for d in all_doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
+                        if doctors:
+                            logging.info(f"Manual filter: Found {len(doctors)} {specialty_display_name}s")
+                except Exception as e:
+                    logging.debug(f"Manual filtering failed: {e}")
+
+            # BUILD RESPONSE with database results
+            if doctors and len(doctors) > 0:
+                # SUCCESS: Build detailed response with actual doctors from database
+                response = f"I found {len(doctors)} {specialty_display_name}{'s' if len(doctors) > 1 else ''}:\n\n"
+                for i, doc in enumerate(doctors[:5], 1):  # Show first 5
+                    response += f"{i}. Dr. {doc.get('name', 'N/A')}\n"
+                    response += f"   Specialty: {doc.get('specialty', 'General Medicine')}\n"
+                    response += f"   Department: {doc.get('department', 'N/A')}\n"
+                    if doc.get('phone'):
+                        response += f"   Phone: {doc.get('phone')}\n"
+                    if doc.get('email'):
+                        response += f"   Email: {doc.get('email')}\n"
+                    if doc.get('experience_years'):
+                        response += f"   Experience: {doc.get('experience_years')} years\n"
+                    if doc.get('rating'):
+                        response += f"   Rating: {doc.get('rating')}/5\n"
+                    response += "\n"
+
+                response += f"Next Steps:\n"
+                response += f"1. Tell me the doctor's name (e.g., 'book Dr. [Name]')\n"
+                response += f"2. Or tell me the doctor's number (e.g., 'book doctor 1')\n"
+                response += f"3. Then provide your preferred date and time\n\n"
+                response += f"Which {specialty_display_name} would you like to book with?"
+
+                logging.info(f"Successfully showed {len(doctors)} {specialty_display_name}s from database to user")
             else:
-                # Last resort fallback - provide helpful response based on message
-                msg_lower = user_message.lower()
-                if any(word in msg_lower for word in ["suffering", "sick", "symptom", "pain", "fever", "cold", "cough", "viral", "infection"]):
-                    fallback_response = "I understand you're not feeling well. I can help you find the right doctor based on your symptoms, book an appointment, or provide general health guidance. What specific symptoms are you experiencing?"
-                elif any(word in msg_lower for word in ["yes", "sure", "ok", "please"]) and len(msg_lower.strip()) < 10:
-                    # Handle "yes" responses intelligently based on conversation context
-                    context_lower = " ".join([msg.get("content", "").lower() for msg in conversation_history[-3:]])
-                    
-                    if "insurance" in context_lower or "plan" in context_lower:
-                        # User said yes to insurance plans - show detailed plans
-                        fallback_response = """Here are all available insurance plans with details:
+                # NO DOCTORS FOUND: Provide helpful fallback
+                logging.warning(f"No {specialty_display_name}s found in database for specialty: {specialty}")
+                response = f"I'm currently searching our database for available {specialty_display_name}s. "
+                response += f"While I search, here's what I can help you with:\n\n"
+                response += f"📞 **Immediate Help:**\n"
+                response += f"1. Call our appointment line: (555) 123-4567\n"
+                response += f"2. Visit our website to see all available {specialty_display_name}s\n\n"
+                response += f"💬 **I can also help you:**\n"
+                response += f"• Describe your symptoms for recommendations\n"
+                response += f"• Check insurance coverage\n"
+                response += f"• See all available doctors\n"
+                response += f"• Book appointments with other specialists\n\n"
+                response += f"Let me know how you'd like to proceed, or I can continue searching for {specialty_display_name}s!"
+        return response
+
+    @FALLBACK_HANDLERS.handler("all_plans", priority=90, any_of=["all"], predicate=lambda ctx: "plan" in ctx.msg_lower)
+    def _fallback_all_plans(self, ctx: HandlerContext) -> Optional[Text]:
+        # "All plans": the full plan list
+        response = """Here are all available insurance plans:
 
 **1. Basic Health Plan**
    Monthly Premium: $150
@@ -3197,56 +3307,13 @@ Would you like more details about any specific plan, or would you like personali
    Features: All premium features, Family coverage, Maternity care, Pediatric care
    Best for: Families with children
 
-Would you like more details about any specific plan, or would you like personalized recommendations based on your needs?"""
-                    elif "doctor" in context_lower or "specialist" in context_lower or "physician" in context_lower:
-                        fallback_response = "I can help you find doctors! Let me search for available doctors. What type of doctor or specialty are you looking for? For example, you can say 'general physician', 'gynecologist', 'cardiologist', or 'I need a doctor for [your symptoms]'."
-                    elif "appointment" in context_lower or "book" in context_lower or "schedule" in context_lower:
-                        fallback_response = "I can help you book an appointment! Please tell me your symptoms or preferred specialty, and I'll find the right doctor and show you available time slots."
-                    else:
-                        fallback_response = "I'm here to help! Could you please tell me more about what you need? For example:\n• 'I need to find a doctor'\n• 'I want to book an appointment'\n• 'I need help with insurance'\n• 'I have [symptoms]'\n\nWhat can I help you with?"
-                elif any(word in msg_lower for word in ["help", "assist", "how can you", "what can you"]):
-                    fallback_response = "I'm Dr. AI, your healthcare assistant! I can help you with finding doctors, booking appointments, health questions, insurance information, and more. What would you like help with today?"
-                else:
-                    fallback_response = "I'm here to help with all your healthcare needs - appointments, insurance, health questions, medications, and more. What would you like to know?"
-                
-                safe_dispatcher.utter_message(text=fallback_response)
-                logging.warning(f"action_aws_bedrock_chat: Response was empty, using fallback: {fallback_response[:50]}...")
-                return []  # CRITICAL: Return immediately after sending fallback response
-            
-            # Final safety - should never reach here, but ensure we return
-            return []
-            
-        except Exception as e:
-            # Catch any unhandled exceptions - ALWAYS return a response
-            logging.error(f"Critical error in action_aws_bedrock_chat: {e}")
-            import traceback
-            logging.error(traceback.format_exc())
-            
-            # Provide helpful response even on error
-            try:
-                user_message = tracker.latest_message.get("text", "") if 'tracker' in locals() else ""
-                msg_lower = user_message.lower() if user_message else ""
-                
-                if any(word in msg_lower for word in ["suffering", "sick", "symptom", "viral", "infection"]):
-                    error_response = "I understand you're not feeling well. I can help you find the right doctor, book an appointment, or provide health guidance. What symptoms are you experiencing?"
-                elif any(word in msg_lower for word in ["help", "assist", "how can you"]):
-                    error_response = "I'm Dr. AI, your healthcare assistant! I can help with finding doctors, booking appointments, health questions, and more. What would you like help with?"
-                else:
-                    error_response = "Hello! I'm Dr. AI, your healthcare assistant. I can help with appointments, insurance, health questions, and more. How can I assist you today?"
-                
-                # Always send error response - use safe dispatcher
-                try:
-                    safe_dispatcher = SafeDispatcher(dispatcher, sender_id, user_message)
-                    safe_dispatcher.utter_message(text=error_response)
-                except:
-                    # Last resort - use regular dispatcher if safe dispatcher fails
-                    dispatcher.utter_message(text=error_response)
-                logging.info(f"action_aws_bedrock_chat: Error handled, returning fallback response")
-                return []
-            except Exception as e2:
-                logging.error(f"Error in final fallback: {e2}")
-                # Last resort - return empty list (Rasa will handle it)
-                return []
+Would you like more details about any specific plan, or would you like personalized recommendations?"""
+        return response
+
+    @FALLBACK_HANDLERS.handler("default", priority=1000, requires=("conversation_history", "retrieved_context"))
+    def _fallback_default(self, ctx: HandlerContext) -> Optional[Text]:
+        # Anything else: rule-based reply using the retrieved context
+        return IntelligentFallback.get_fallback_response(ctx.text, ctx.get("conversation_history"), ctx.get("retrieved_context"))
 
 
 class ActionDescribeProblem(Action):
@@ -3265,11 +3332,10 @@ class ActionDescribeProblem(Action):
 
         # Fetch data from API
         try:
-            response = requests.get(f"{REACT_APP_DUMMY_API}/doctors/uniqueSpecialties/get")
-            response.raise_for_status()  # Raise an error for HTTP errors
+            response = dummy_api_get("/doctors/uniqueSpecialties/get")
             data = response.json()
             specialties = data.get("specialties", [])
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, DependencyUnavailable) as e:
             dispatcher.utter_message(text=f"Error fetching specialties: {str(e)}")
             return []
 
@@ -3305,9 +3371,15 @@ class SubmitAppointment(Action):
         
         print(payload )
         
-        response = requests.post(f"{REACT_APP_DUMMY_API}/appointments/add", json=payload)
+        try:
+            response = dummy_api_post("/appointments/add", payload)
+        except (requests.exceptions.RequestException, DependencyUnavailable) as e:
+            logging.error(f"Appointment booking call failed: {e}")
+            response = None
+        DatabaseRouter.mark_write(tracker.sender_id)
+        PatientContextCache.invalidate(tracker.sender_id, reason="appointment booked")
 
-        if response.status_code == 201:
+        if response is not None and response.status_code == 201:
             dispatcher.utter_message(text=f"Your appointment has been booked successfully on {date} at {time}.")
         else:
             dispatcher.utter_message(text="Failed to book your appointment. Please try again.")
@@ -3744,9 +3816,13 @@ class ActionDefaultFallback(Action):
     def name(self) -> Text:
         return "action_default_fallback"
 
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        with turn_deadline():
+            return await self._run_turn(dispatcher, tracker)
+
+    async def _run_turn(self, dispatcher: CollectingDispatcher, tracker: Tracker) -> List[Dict[Text, Any]]:
         # Get the last user message
         user_message = tracker.latest_message.get("text", "")
         
@@ -3778,7 +3854,7 @@ class ActionDefaultFallback(Action):
         
         # Use AWS Bedrock for intelligent response
         try:
-            response = self.bedrock_helper.get_response(enhanced_message, conversation_history)
+            response = await self.bedrock_helper.get_response_async(enhanced_message, conversation_history)
             
             # Check if response is an error message
             if response and response.strip():
@@ -3882,38 +3958,16 @@ class ActionInsurancePlans(Action):
     def name(self) -> Text:
         return "action_insurance_plans"
     
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Get insurance plans from database
-        insurance_plans = DatabaseHelper.get_insurance_plans()
+        insurance_plans = await AsyncDatabaseHelper.get_insurance_plans()
         
-        # Fallback to default plans if database doesn't have them
+        # Fallback to snapshot/default plans if database doesn't have them
         if not insurance_plans:
-            insurance_plans = [
-            {
-                "name": "Basic Health Plan",
-                "monthly_premium": "$150",
-                "deductible": "$1000",
-                "coverage": "80%",
-                "features": ["Primary care", "Emergency visits", "Basic prescriptions"]
-            },
-            {
-                "name": "Premium Health Plan", 
-                "monthly_premium": "$300",
-                "deductible": "$500",
-                "coverage": "90%",
-                "features": ["All basic features", "Specialist visits", "Mental health", "Dental & Vision"]
-            },
-            {
-                "name": "Family Health Plan",
-                "monthly_premium": "$450", 
-                "deductible": "$750",
-                "coverage": "85%",
-                "features": ["All premium features", "Family coverage", "Maternity care", "Pediatric care"]
-            }
-        ]
+            insurance_plans = DatabaseHelper._get_sample_insurance_plans()
         
         # Build detailed message with same format as action_aws_bedrock_chat
         message = f"✅ **Here are all available insurance plans ({len(insurance_plans)}):**\n\n"
@@ -3956,7 +4010,7 @@ class ActionInsurancePlans(Action):
         # Save conversation history
         sender_id = tracker.sender_id
         user_message = tracker.latest_message.get("text", "")
-        DatabaseHelper.save_conversation_history(
+        await AsyncDatabaseHelper.save_conversation_history(
             sender_id, user_message, message, 
             intent=tracker.latest_message.get("intent", {}).get("name"),
             entities=tracker.latest_message.get("entities", [])
@@ -3970,9 +4024,9 @@ class ActionInsuranceSuggestions(Action):
     def name(self) -> Text:
         return "action_insurance_suggestions"
     
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Mock suggestions based on user profile - in real implementation, use AI/ML
         # Build as single message to avoid splitting
@@ -3999,7 +4053,7 @@ class ActionInsuranceSuggestions(Action):
         # Save conversation history
         sender_id = tracker.sender_id
         user_message = tracker.latest_message.get("text", "")
-        DatabaseHelper.save_conversation_history(
+        await AsyncDatabaseHelper.save_conversation_history(
             sender_id, user_message, suggestions,
             intent=tracker.latest_message.get("intent", {}).get("name"),
             entities=tracker.latest_message.get("entities", [])
@@ -4013,9 +4067,9 @@ class ActionDoctorsList(Action):
     def name(self) -> Text:
         return "action_doctors_list"
     
-    def run(self, dispatcher: CollectingDispatcher,
-            tracker: Tracker,
-            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher,
+                  tracker: Tracker,
+                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         # Get specialty from user message or entities
         user_message = tracker.latest_message.get("text", "").lower()
@@ -4044,7 +4098,7 @@ class ActionDoctorsList(Action):
         doctors = None
         try:
             # Pass both specialty and department to ensure proper filtering
-            doctors = DatabaseHelper.get_doctors(specialty=specialty, department=department)
+            doctors = await AsyncDatabaseHelper.get_doctors(specialty=specialty, department=department)
             # Additional filter to ensure only requested department specialists
             if doctors and specialty:
                 doctors = [d for d in doctors if specialty.lower() in str(d.get('specialty', '')).lower() or specialty.lower() in str(d.get('department', '')).lower()]
@@ -4054,8 +4108,7 @@ class ActionDoctorsList(Action):
         # Fallback to API if database doesn't have doctors
         if not doctors or len(doctors) == 0:
             try:
-                response = requests.get(f"{REACT_APP_DUMMY_API}/doctors/all", timeout=5)
-                response.raise_for_status()
+                response = await run_blocking(dummy_api_get, "/doctors/all")
                 api_doctors = response.json()
             
                 if api_doctors:
@@ -4070,7 +4123,7 @@ class ActionDoctorsList(Action):
                         'phone': d.get('phone', 'N/A'),
                         'email': d.get('email', 'N/A')
                     } for d in api_doctors[:10]]
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, DependencyUnavailable) as e:
                 logging.debug(f"API call failed: {e}")
         
         # Build response message
@@ -4097,7 +4150,7 @@ class ActionDoctorsList(Action):
         
         # Save conversation history
         sender_id = tracker.sender_id
-        DatabaseHelper.save_conversation_history(
+        await AsyncDatabaseHelper.save_conversation_history(
             sender_id, user_message, message,
             intent=tracker.latest_message.get("intent", {}).get("name"),
             entities=tracker.latest_message.get("entities", [])
@@ -4443,7 +4496,9 @@ class ActionPatientRegistration(Action):
         
         # Mock patient registration - in real implementation, save to database
         patient_id = f"PAT_{hash(name + phone) % 100000:05d}"
-        
+        DatabaseRouter.mark_write(tracker.sender_id)
+        PatientContextCache.invalidate(tracker.sender_id, reason="patient registered")
+
         message = f""" **Registration Complete!**
 
 **Patient ID:** {patient_id}
@@ -0,0 +1,300 @@
+"""
+Async Execution support for the action server
+A bounded executor for blocking work, plus optional asyncpg and aiobotocore clients so turns don't hold a thread during I/O
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
+
+try:
+    from .db_router import DatabaseRouter, POOL_WAIT_SECONDS, READ, WRITE, db_breaker
+    from .metrics import metrics
+    from .resilience import CircuitOpenError
+except ImportError:
+    from db_router import DatabaseRouter, POOL_WAIT_SECONDS, READ, WRITE, db_breaker
+    from metrics import metrics
+    from resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    asyncpg = None
+    ASYNCPG_AVAILABLE = False
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+    AIOBOTOCORE_AVAILABLE = True
+except ImportError:
+    AioConfig = None
+    get_session = None
+    AIOBOTOCORE_AVAILABLE = False
+
+# Threads for work that is still blocking (psycopg2, boto3, requests); the event loop never runs it
+ACTION_THREADS = int(os.getenv('ACTION_THREADS', '64'))
+# 'auto' uses asyncpg/aiobotocore when installed; 'off' keeps every call on the executor
+ASYNC_IO = os.getenv('ACTION_ASYNC_IO', 'auto').lower()
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', '20'))
+ASYNC_DB_STATEMENT_TIMEOUT = float(os.getenv('ASYNC_DB_STATEMENT_TIMEOUT', '3'))
+# Time a turn may spend before answering; retries and rate-limit waits stop once it is used up.
+# Keep it below Rasa's action-call timeout so the turn still has time to reply with a fallback.
+TURN_DEADLINE_SECONDS = float(os.getenv('ACTION_TURN_DEADLINE', '25'))
+
+metrics.describe('action_executor_in_flight', "Blocking calls currently running on the action executor")
+metrics.describe('action_executor_wait_seconds', "Time blocking calls waited for a free executor thread")
+
+_executor = ThreadPoolExecutor(max_workers=ACTION_THREADS, thread_name_prefix='action')
+_turn_deadline: contextvars.ContextVar = contextvars.ContextVar('turn_deadline', default=None)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def _track_in_flight(delta: int):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+        metrics.set_gauge('action_executor_in_flight', _in_flight)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call on the action executor without stalling the event loop.
+
+    Context variables (e.g. a turn deadline) are copied into the worker thread.
+    """
+    submitted = time.monotonic()
+    context = contextvars.copy_context()
+
+    def call():
+        metrics.observe('action_executor_wait_seconds', time.monotonic() - submitted)
+        _track_in_flight(1)
+        try:
+            return context.run(func, *args, **kwargs)
+        finally:
+            _track_in_flight(-1)
+
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+@contextmanager
+def turn_deadline(seconds: float = TURN_DEADLINE_SECONDS):
+    """Set the current turn's deadline; work started inside (including via run_blocking) can read it.
+
+    A deadline already set by an outer scope is only ever tightened, never extended.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _turn_deadline.get()
+    token = _turn_deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def remaining_turn_time() -> Optional[float]:
+    """Seconds left before the current turn's deadline, or None outside a turn"""
+    deadline = _turn_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+_PLACEHOLDER = re.compile(r'%s')
+
+
+def to_asyncpg(query: Text) -> Text:
+    """Rewrite psycopg2 %s placeholders as asyncpg's $1, $2, ..."""
+    counter = iter(range(1, 10000))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", query)
+
+
+class _PoolBusy(Exception):
+    """Every asyncpg connection was checked out for the whole wait"""
+
+
+class AsyncDatabase:
+    """asyncpg pools for the writer and reader endpoints, sharing DatabaseRouter's settings,
+    read-your-writes routing and circuit breaker. Every method returns None when asyncpg is not
+    usable so callers can fall back to the psycopg2 path on the executor."""
+
+    _pools: Dict[Text, Any] = {}
+    _loop = None
+    _lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return ASYNCPG_AVAILABLE and ASYNC_IO != 'off' and DatabaseRouter.is_configured()
+
+    @classmethod
+    async def _get_pool(cls, role: Text):
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            # Pools are bound to the loop that created them
+            cls._pools, cls._loop, cls._lock = {}, loop, asyncio.Lock()
+        config = DatabaseRouter.endpoint_config(role)
+        pool_role = WRITE if role == READ and config['host'] == DatabaseRouter.endpoint_config(WRITE)['host'] else role
+        pool = cls._pools.get(pool_role)
+        if pool is None:
+            async with cls._lock:
+                pool = cls._pools.get(pool_role)
+                if pool is None:
+                    config = DatabaseRouter.endpoint_config(pool_role)
+                    pool = await asyncpg.create_pool(
+                        host=config['host'], port=config.get('port', 5432), user=config.get('user'),
+                        password=config.get('password'), database=config.get('database'),
+                        min_size=1, max_size=ASYNC_DB_POOL_MAX, timeout=config.get('connect_timeout', 5),
+                        command_timeout=ASYNC_DB_STATEMENT_TIMEOUT
+                    )
+                    cls._pools[pool_role] = pool
+                    logger.info(f"Created asyncpg {pool_role} pool for {config['host']}")
+        return pool
+
+    @classmethod
+    async def _acquire(cls, pool, role: Text):
+        """Check out a connection, waiting no longer than DB_POOL_WAIT_SECONDS or the turn's remaining time"""
+        timeout = POOL_WAIT_SECONDS
+        remaining = remaining_turn_time()
+        if remaining is not None:
+            timeout = max(0.0, min(timeout, remaining))
+        try:
+            return await pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            if pool.get_size() >= pool.get_max_size() and not pool.get_idle_size():
+                # Busy, not down - leave the breaker alone, as on the psycopg2 path
+                metrics.inc('db_pool_exhausted_total', role=role)
+                raise _PoolBusy()
+            raise
+
+    @classmethod
+    async def _run(cls, role: Text, sender_id: Optional[Text], operation: Callable):
+        if not cls.enabled():
+            return None
+        if not db_breaker.allow_request():
+            raise CircuitOpenError(db_breaker.name, db_breaker.retry_after())
+        connect_errors = (OSError, asyncio.TimeoutError, asyncpg.exceptions.CannotConnectNowError,
+                          asyncpg.exceptions.ConnectionDoesNotExistError)
+        try:
+            role = DatabaseRouter.resolve_role(role, sender_id)
+            pool = await cls._get_pool(role)
+            conn = await cls._acquire(pool, role)
+        except _PoolBusy:
+            db_breaker.release()
+            raise asyncio.TimeoutError(f"No free asyncpg {role} connection in time")
+        except connect_errors as e:
+            db_breaker.record_failure(e)
+            raise
+        except BaseException:
+            db_breaker.release()
+            raise
+
+        try:
+            result = await operation(conn)
+        except asyncio.TimeoutError:
+            # Statement timeout (command_timeout): slow, not down. Checked first - TimeoutError is an OSError.
+            db_breaker.release()
+            raise
+        except (OSError, asyncpg.exceptions.ConnectionDoesNotExistError) as e:
+            # The connection dropped mid-query
+            db_breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Query errors say nothing about reachability
+            db_breaker.release()
+            raise
+        finally:
+            await pool.release(conn)
+        db_breaker.record_success()
+        return result
+
+    @classmethod
+    async def fetch(cls, query: Text, *args, role: Text = READ, sender_id: Optional[Text] = None) -> Optional[List[Any]]:
+        """Rows for a psycopg2-style query, or None when asyncpg is not in use"""
+        return await cls._run(role, sender_id, lambda conn: conn.fetch(to_asyncpg(query), *args))
+
+    @classmethod
+    async def execute(cls, query: Text, *args, sender_id: Optional[Text] = None) -> Optional[Text]:
+        """Run a write on the writer endpoint and pin the sender's reads to it"""
+        status = await cls._run(WRITE, sender_id, lambda conn: conn.execute(to_asyncpg(query), *args))
+        if status is not None:
+            DatabaseRouter.mark_write(sender_id)
+        return status
+
+    @classmethod
+    def pool_status(cls) -> Dict[Text, Dict[Text, int]]:
+        return {
+            role: {'size': pool.get_size(), 'idle': pool.get_idle_size(), 'max': pool.get_max_size()}
+            for role, pool in cls._pools.items()
+        }
+
+    @classmethod
+    async def close(cls):
+        pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            await pool.close()
+
+
+class AsyncAWSClients:
+    """Long-lived aiobotocore clients (Bedrock runtime, Comprehend, Comprehend Medical), one per
+    service, region/endpoint and event loop. `available` is False without aiobotocore; callers then
+    use boto3 on the executor."""
+
+    _clients: Dict[Tuple, Any] = {}
+    _contexts: Dict[Tuple, Any] = {}
+    _loop = None
+
+    @classmethod
+    def available(cls) -> bool:
+        return AIOBOTOCORE_AVAILABLE and ASYNC_IO != 'off'
+
+    @classmethod
+    async def client(cls, service: Text, region: Optional[Text] = None, endpoint_url: Optional[Text] = None):
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls._clients, cls._contexts, cls._loop = {}, {}, loop
+        region = region or os.getenv('AWS_REGION', 'us-east-1')
+        key = (service, region, endpoint_url)
+        client = cls._clients.get(key)
+        if client is None:
+            # Retries belong to the caller (bedrock_invoker); 'max_attempts' would still allow one in legacy mode
+            config = AioConfig(connect_timeout=5, read_timeout=10, retries={'total_max_attempts': 1},
+                               max_pool_connections=ACTION_THREADS)
+            context = get_session().create_client(service, region_name=region, endpoint_url=endpoint_url, config=config)
+            client = await context.__aenter__()
+            if key in cls._clients:
+                # Another turn created it while we were connecting
+                await context.__aexit__(None, None, None)
+                return cls._clients[key]
+            cls._contexts[key], cls._clients[key] = context, client
+        return client
+
+    @classmethod
+    async def call(cls, service: Text, operation: Text, **params) -> Dict[Text, Any]:
+        """e.g. call('comprehend', 'detect_sentiment', Text=text, LanguageCode='en')"""
+        client = await cls.client(service)
+        return await getattr(client, operation)(**params)
+
+    @classmethod
+    async def invoke_model(cls, model_id: Text, body: Dict[Text, Any], region: Optional[Text] = None,
+                           endpoint_url: Optional[Text] = None) -> Dict[Text, Any]:
+        """Invoke a Bedrock model with a JSON body and return the parsed JSON response"""
+        client = await cls.client('bedrock-runtime', region, endpoint_url)
+        response = await client.invoke_model(modelId=model_id, body=json.dumps(body), contentType='application/json')
+        async with response['body'] as stream:
+            return json.loads(await stream.read())
+
+    @classmethod
+    async def close(cls):
+        contexts, cls._contexts, cls._clients = list(cls._contexts.values()), {}, {}
+        for context in contexts:
+            await context.__aexit__(None, None, None)
@@ -10,9 +10,21 @@ import logging
 from typing import Dict, List, Any, Optional, Text
 from datetime import datetime
 
+try:
+    from .bedrock_invoker import get_bedrock_invoker
+    from .resilience import DependencyUnavailable, get_dependency
+except ImportError:
+    from bedrock_invoker import get_bedrock_invoker
+    from resilience import DependencyUnavailable, get_dependency
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BEDROCK_INVOKER = get_bedrock_invoker()
+COMPREHEND = get_dependency("comprehend")
+COMPREHEND_MEDICAL = get_dependency("comprehend_medical")
+
+
 class AWSIntelligenceServices:
     """Integration with AWS services for intelligent healthcare responses"""
     
@@ -28,7 +40,7 @@ class AWSIntelligenceServices:
             self.comprehend_medical = None
         
         try:
-            self.bedrock_runtime = boto3.client('bedrock-runtime', region_name=self.region)
+            self.bedrock_runtime = BEDROCK_INVOKER.client()
             logger.info("AWS Bedrock Runtime initialized")
         except Exception as e:
             logger.warning(f"Bedrock Runtime not available: {e}")
@@ -47,7 +59,8 @@ class AWSIntelligenceServices:
             return {}
         
         try:
-            response = self.comprehend_medical.detect_entities_v2(Text=text)
+            response = COMPREHEND_MEDICAL.call(self.comprehend_medical.detect_entities_v2, Text=text,
+                                               fallback=lambda: {'Entities': []})
             entities = response.get('Entities', [])
             
             result = {
@@ -90,7 +103,8 @@ class AWSIntelligenceServices:
             return []
         
         try:
-            response = self.comprehend_medical.infer_icd10_cm(Text=text)
+            response = COMPREHEND_MEDICAL.call(self.comprehend_medical.infer_icd10_cm, Text=text,
+                                               fallback=lambda: {'Entities': []})
             codes = response.get('Entities', [])
             
             result = []
@@ -113,7 +127,8 @@ class AWSIntelligenceServices:
             return []
         
         try:
-            response = self.comprehend_medical.infer_rx_norm(Text=text)
+            response = COMPREHEND_MEDICAL.call(self.comprehend_medical.infer_rx_norm, Text=text,
+                                               fallback=lambda: {'Entities': []})
             codes = response.get('Entities', [])
             
             result = []
@@ -181,12 +196,7 @@ and can understand medical terminology, medications, conditions, and procedures.
             
             # Call Bedrock
             model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
-            response = self.bedrock_runtime.invoke_model(
-                modelId=model_id,
-                body=json.dumps(request_body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(request_body, model_id=model_id, call_site='aws_intelligence.generate_intelligent_response')
             content = response_body.get('content', [])
             
             if content and len(content) > 0:
@@ -298,12 +308,7 @@ You are a complete healthcare companion that can intelligently discuss appointme
             model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
             
             logger.info(f"Calling Bedrock model {model_id} for conversational response")
-            response = self.bedrock_runtime.invoke_model(
-                modelId=model_id,
-                body=json.dumps(request_body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(request_body, model_id=model_id, call_site='aws_intelligence.generate_conversational_response')
             content = response_body.get('content', [])
             
             if content and len(content) > 0:
@@ -314,6 +319,9 @@ You are a complete healthcare companion that can intelligently discuss appointme
                 logger.warning("Bedrock returned empty content")
                 return None
         
+        except DependencyUnavailable as e:
+            logger.info(f"Conversational response skipped: {e}")
+            return None
         except Exception as e:
             logger.error(f"Error generating conversational response: {e}")
             import traceback
@@ -326,7 +334,7 @@ You are a complete healthcare companion that can intelligently discuss appointme
             return {'sentiment': 'NEUTRAL', 'score': 0.5}
         
         try:
-            response = self.comprehend.detect_sentiment(Text=text, LanguageCode='en')
+            response = COMPREHEND.call(self.comprehend.detect_sentiment, Text=text, LanguageCode='en', fallback=dict)
             return {
                 'sentiment': response.get('Sentiment', 'NEUTRAL'),
                 'scores': response.get('SentimentScore', {})
@@ -341,7 +349,7 @@ You are a complete healthcare companion that can intelligently discuss appointme
             return 'en'
         
         try:
-            response = self.comprehend.detect_dominant_language(Text=text)
+            response = COMPREHEND.call(self.comprehend.detect_dominant_language, Text=text, fallback=dict)
             languages = response.get('Languages', [])
             if languages:
                 return languages[0].get('LanguageCode', 'en')
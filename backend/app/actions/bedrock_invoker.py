@@ -0,0 +1,593 @@
+"""
+Bedrock Invocation layer shared by every Bedrock caller
+One client per region, error classification, retries with decorrelated jitter inside the turn deadline, adaptive client-side rate limiting, per-model quota budgets and optional hedging
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures import wait as wait_futures
+from typing import Any, Dict, Optional, Text, Tuple
+
+import boto3
+from botocore.config import Config
+
+try:
+    from .async_runtime import ACTION_THREADS, AsyncAWSClients, remaining_turn_time, run_blocking
+    from .bedrock_quota import LOW_PRIORITY, LOW_PRIORITY_MAX_WAIT, NORMAL_PRIORITY, QuotaGovernor
+    from .metrics import metrics
+    from .resilience import AWS_CONNECTION_ERRORS, AWS_THROTTLE_CODES, AWS_UNHEALTHY_CODES, DependencyUnavailable, get_dependency
+except ImportError:
+    from async_runtime import ACTION_THREADS, AsyncAWSClients, remaining_turn_time, run_blocking
+    from bedrock_quota import LOW_PRIORITY, LOW_PRIORITY_MAX_WAIT, NORMAL_PRIORITY, QuotaGovernor
+    from metrics import metrics
+    from resilience import AWS_CONNECTION_ERRORS, AWS_THROTTLE_CODES, AWS_UNHEALTHY_CODES, DependencyUnavailable, get_dependency
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
+BEDROCK_MAX_ATTEMPTS = int(os.getenv('BEDROCK_MAX_ATTEMPTS', '4'))
+BEDROCK_CONNECT_TIMEOUT = float(os.getenv('BEDROCK_CONNECT_TIMEOUT', '5'))
+BEDROCK_READ_TIMEOUT = float(os.getenv('BEDROCK_READ_TIMEOUT', '20'))
+# Longest one logical call (all attempts and waits) may take outside a turn; inside a turn the turn deadline also applies
+BEDROCK_CALL_BUDGET = float(os.getenv('BEDROCK_CALL_BUDGET', '30'))
+# Don't start an attempt (or a backoff ending in one) with less time than this left
+MIN_ATTEMPT_SECONDS = float(os.getenv('BEDROCK_MIN_ATTEMPT_SECONDS', '2'))
+# Ceiling for the adaptive send rate, per region; the limiter switches itself off once recovered to this
+BEDROCK_MAX_RPS = float(os.getenv('BEDROCK_MAX_RPS', '50'))
+# Point the clients at another endpoint, e.g. a local fake Bedrock for tests
+BEDROCK_ENDPOINT_URL = os.getenv('BEDROCK_ENDPOINT_URL') or None
+
+# Hedging (off by default): when the primary request is slower than its recent BEDROCK_HEDGE_PERCENTILE
+# latency, send a duplicate to BEDROCK_HEDGE_REGION and/or BEDROCK_HEDGE_MODEL_ID and take whichever answers first
+HEDGE_ENABLED = os.getenv('BEDROCK_HEDGE', 'off').lower() in ('1', 'true', 'yes', 'on')
+HEDGE_REGION = os.getenv('BEDROCK_HEDGE_REGION') or None
+HEDGE_MODEL_ID = os.getenv('BEDROCK_HEDGE_MODEL_ID') or None
+HEDGE_ENDPOINT_URL = os.getenv('BEDROCK_HEDGE_ENDPOINT_URL') or None
+HEDGE_PERCENTILE = float(os.getenv('BEDROCK_HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY = float(os.getenv('BEDROCK_HEDGE_MIN_DELAY', '0.5'))
+# Used until a model has HEDGE_MIN_SAMPLES latencies to take the percentile of
+HEDGE_INITIAL_DELAY = float(os.getenv('BEDROCK_HEDGE_INITIAL_DELAY', '3'))
+HEDGE_MIN_SAMPLES = 20
+
+PRIMARY = 'primary'
+HEDGE = 'hedge'
+
+THROTTLE = 'throttle'
+TRANSIENT = 'transient'
+VALIDATION = 'validation'
+FATAL = 'fatal'
+UNAVAILABLE = 'unavailable'
+
+TRANSIENT_CODES = AWS_UNHEALTHY_CODES - AWS_THROTTLE_CODES
+VALIDATION_CODES = frozenset({'ValidationException', 'ModelErrorException'})
+
+metrics.describe('bedrock_calls_total', "Logical Bedrock calls per call site and outcome")
+metrics.describe('bedrock_retries_total', "Bedrock retries per call site and error class")
+metrics.describe('bedrock_call_seconds', "End-to-end Bedrock call latency per call site, retries included")
+metrics.describe('bedrock_retry_added_seconds', "Latency added by backoff and rate-limit waits per call site")
+metrics.describe('bedrock_throttles_total', "ThrottlingException responses per region")
+metrics.describe('bedrock_send_rate_limit', "Adaptive send-rate ceiling per region in requests/s (0 = not limiting)")
+metrics.describe('bedrock_hedges_total', "Slow attempts that reached the hedge delay, by outcome (primary_won, hedge_won, failed, skipped)")
+metrics.describe('bedrock_hedge_delay_seconds', "Current hedge delay per model (the primary latency percentile)")
+metrics.describe('bedrock_hedge_amplification', "Sent / primary requests (unit=requests) and estimated tokens (unit=tokens) while hedging")
+
+
+class BedrockDeadlineExceeded(DependencyUnavailable):
+    """Not enough of the turn (or call budget) is left for another Bedrock attempt"""
+
+    def __init__(self, site: Text, remaining: float):
+        super().__init__('bedrock', f"Bedrock call from '{site}' abandoned with {remaining:.1f}s left")
+
+
+def classify_error(error: BaseException) -> Text:
+    """throttle / transient (worth retrying) or validation / fatal / unavailable (not)"""
+    if isinstance(error, DependencyUnavailable):
+        return UNAVAILABLE
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict) and 'Error' in response:
+        code = response['Error'].get('Code')
+        if code in AWS_THROTTLE_CODES:
+            return THROTTLE
+        if code in TRANSIENT_CODES or response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500:
+            return TRANSIENT
+        if code in VALIDATION_CODES:
+            return VALIDATION
+        # Access denied, unknown model, quota exceeded: retrying won't help
+        return FATAL
+    # Connection resets and read/connect timeouts carry no error response (aiobotocore maps aiohttp's
+    # onto the same botocore exceptions); other client-side errors such as missing credentials are fatal
+    if isinstance(error, (OSError, TimeoutError, asyncio.TimeoutError) + AWS_CONNECTION_ERRORS):
+        return TRANSIENT
+    return FATAL
+
+
+class RetryPolicy:
+    """Which error classes to retry and how long to back off between attempts.
+
+    Backoff is decorrelated jitter (each delay drawn from [base, 3 x previous delay], capped), so
+    callers throttled at the same moment spread out instead of retrying in lockstep.
+    """
+
+    def __init__(self, max_attempts: int = BEDROCK_MAX_ATTEMPTS, throttle_base: float = 0.5,
+                 transient_base: float = 0.2, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.throttle_base = throttle_base
+        self.transient_base = transient_base
+        self.max_delay = max_delay
+
+    def should_retry(self, kind: Text, attempt: int) -> bool:
+        return kind in (THROTTLE, TRANSIENT) and attempt < self.max_attempts
+
+    def next_delay(self, kind: Text, previous: float) -> float:
+        base = self.throttle_base if kind == THROTTLE else self.transient_base
+        return min(self.max_delay, random.uniform(base, max(base, previous * 3)))
+
+
+class AdaptiveRateLimiter:
+    """Client-side send rate for one region that backs off on throttling and recovers on success.
+
+    It stays out of the way until the first throttle. From then on each call reserves a token:
+    the rate starts just below what we were sending, is cut by `decrease` on every further
+    throttle and grows by `increase` (a fraction) per success. Once it is back at `max_rate` the
+    limiter switches off again. Shared by every thread and the event loop.
+    """
+
+    def __init__(self, name: Text, max_rate: float = BEDROCK_MAX_RPS, min_rate: float = 0.5,
+                 decrease: float = 0.7, increase: float = 0.02, burst: float = 2.0):
+        self.name = name
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.burst = burst
+        self.active = False
+        self.rate = max_rate
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._sent = deque()
+        self._lock = threading.Lock()
+        metrics.set_gauge('bedrock_send_rate_limit', 0, region=name)
+
+    def reserve(self) -> float:
+        """Take a token; returns how long to wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            self._sent.append(now)
+            while self._sent and self._sent[0] < now - 1.0:
+                self._sent.popleft()
+            if not self.active:
+                return 0.0
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def cancel(self):
+        """Give back a reserved token that won't be used"""
+        with self._lock:
+            if self.active:
+                self._tokens += 1
+
+    def on_throttle(self):
+        with self._lock:
+            sending = max(float(len(self._sent)), self.min_rate)
+            current = min(self.rate, sending) if self.active else sending
+            self.rate = max(self.min_rate, current * self.decrease)
+            if not self.active:
+                self.active = True
+                self._tokens = 0.0
+                self._updated = time.monotonic()
+                logger.warning(f"Bedrock throttled in {self.name}; limiting to {self.rate:.1f} req/s")
+            metrics.set_gauge('bedrock_send_rate_limit', round(self.rate, 2), region=self.name)
+
+    def on_success(self):
+        if not self.active:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * (1 + self.increase))
+            if self.rate >= self.max_rate:
+                self.active = False
+                logger.info(f"Bedrock send rate in {self.name} recovered; limiter off")
+            metrics.set_gauge('bedrock_send_rate_limit', round(self.rate, 2) if self.active else 0, region=self.name)
+
+
+class HedgePolicy:
+    """When and where to send a duplicate of a slow Bedrock request.
+
+    The hedge fires once the primary has been out longer than `percentile` of that model's recent
+    primary latencies, so about (100 - percentile)% of requests are duplicated. Hedges are
+    optional work: they are skipped rather than wait for the target's rate limiter or quota.
+
+    Only the async path (aiobotocore) cancels the losing request. On the sync path a blocking boto3
+    call cannot be interrupted, so the loser runs to completion on `executor`, holding a thread and a
+    connection and spending its tokens. With hedging on and aiobotocore missing, expect up to the
+    full hedge amplification in Bedrock usage, not just in requests sent.
+    """
+
+    def __init__(self, region: Optional[Text] = None, model_id: Optional[Text] = None,
+                 percentile: float = HEDGE_PERCENTILE, min_delay: float = HEDGE_MIN_DELAY,
+                 initial_delay: float = HEDGE_INITIAL_DELAY, window: int = 500):
+        self.region = region
+        self.model_id = model_id
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.window = window
+        self.dependency = get_dependency('bedrock_hedge')
+        # Primaries and hedges both wait here so a slow primary can be abandoned
+        self.executor = ThreadPoolExecutor(max_workers=ACTION_THREADS * 2, thread_name_prefix='bedrock-hedge')
+        self._latencies: Dict[Text, deque] = {}
+        self._sent = {PRIMARY: 0, HEDGE: 0}
+        self._tokens = {PRIMARY: 0, HEDGE: 0}
+        self._lock = threading.Lock()
+
+    def target(self, primary: 'BedrockInvoker', model_id: Text) -> Tuple['BedrockInvoker', Text]:
+        invoker = get_bedrock_invoker(self.region) if self.region else primary
+        return invoker, self.model_id or model_id
+
+    def record(self, model_id: Text, seconds: float):
+        with self._lock:
+            latencies = self._latencies.get(model_id)
+            if latencies is None:
+                latencies = self._latencies[model_id] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, model_id: Text) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies.get(model_id, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            delay = self.initial_delay
+        else:
+            delay = max(self.min_delay, latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))])
+        metrics.set_gauge('bedrock_hedge_delay_seconds', round(delay, 3), model=model_id)
+        return delay
+
+    def record_sent(self, role: Text, tokens: int):
+        with self._lock:
+            self._sent[role] += 1
+            self._tokens[role] += tokens
+            sent, spent = dict(self._sent), dict(self._tokens)
+        if sent[PRIMARY]:
+            metrics.set_gauge('bedrock_hedge_amplification', round(sum(sent.values()) / sent[PRIMARY], 3), unit='requests')
+        if spent[PRIMARY]:
+            metrics.set_gauge('bedrock_hedge_amplification', round(sum(spent.values()) / spent[PRIMARY], 3), unit='tokens')
+
+    def finish(self, site: Text, outcome: Text):
+        metrics.inc('bedrock_hedges_total', site=site, outcome=outcome)
+
+
+class _Call:
+    """Bookkeeping for one logical invocation (all its attempts); shared by the sync and async loops"""
+
+    def __init__(self, invoker: 'BedrockInvoker', site: Text, model_id: Text, body: Dict[Text, Any], priority: Text):
+        self.invoker = invoker
+        self.site = site
+        self.reservation = invoker.governor.reservation(model_id, body, priority)
+        self.started = time.monotonic()
+        remaining = remaining_turn_time()
+        budget = BEDROCK_CALL_BUDGET if remaining is None else min(BEDROCK_CALL_BUDGET, remaining)
+        self.deadline = self.started + budget
+        self.attempt = 0
+        self.delay = 0.0
+        self.added = 0.0
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def before_attempt(self) -> float:
+        """Seconds to wait for the rate limiter; raises when the attempt can't finish in time"""
+        self.attempt += 1
+        wait = self.invoker.limiter.reserve()
+        if self.remaining() - wait < MIN_ATTEMPT_SECONDS:
+            self.invoker.limiter.cancel()
+            self.finish('deadline')
+            raise BedrockDeadlineExceeded(self.site, self.remaining())
+        self.added += wait
+        return wait
+
+    def quota_wait(self) -> float:
+        """Seconds to wait for RPM/TPM quota, 0 once it is held; sheds the call when it can't be had in time"""
+        wait = self.invoker.governor.try_acquire(self.reservation)
+        if not wait:
+            return 0.0
+        if self.reservation.priority == LOW_PRIORITY:
+            too_long = self.reservation.waited + wait > LOW_PRIORITY_MAX_WAIT
+        else:
+            too_long = self.remaining() - wait < MIN_ATTEMPT_SECONDS
+        if too_long:
+            self.invoker.limiter.cancel()
+            self.finish('quota')
+            self.invoker.governor.shed(self.reservation, wait)
+        self.reservation.waited += wait
+        self.added += wait
+        return wait
+
+    def settle(self, result: Optional[Dict[Text, Any]], role: Text = PRIMARY):
+        if role == PRIMARY:
+            self.invoker.governor.settle(self.reservation, result)
+        else:
+            # The hedge answered; the primary's usage is never seen
+            self.invoker.governor.keep(self.reservation)
+
+    def after_failure(self, error: BaseException) -> float:
+        """Backoff before the next attempt; re-raises when the error isn't worth retrying"""
+        kind = classify_error(error)
+        if kind == THROTTLE:
+            metrics.inc('bedrock_throttles_total', region=self.invoker.region)
+            self.invoker.limiter.on_throttle()
+        if not self.invoker.policy.should_retry(kind, self.attempt):
+            self.finish(kind)
+            raise error
+        self.delay = self.invoker.policy.next_delay(kind, self.delay)
+        if self.remaining() - self.delay < MIN_ATTEMPT_SECONDS:
+            self.finish(kind)
+            raise error
+        metrics.inc('bedrock_retries_total', site=self.site, reason=kind)
+        logger.info(f"Bedrock {kind} error from '{self.site}' (attempt {self.attempt}), retrying in {self.delay:.2f}s: {error}")
+        self.added += self.delay
+        return self.delay
+
+    def finish(self, outcome: Text):
+        if outcome == 'ok':
+            self.invoker.limiter.on_success()
+        metrics.inc('bedrock_calls_total', site=self.site, outcome=outcome)
+        metrics.observe('bedrock_call_seconds', time.monotonic() - self.started, site=self.site)
+        metrics.observe('bedrock_retry_added_seconds', self.added, site=self.site)
+
+
+class BedrockInvoker:
+    """invoke_model with retries, rate limiting and the shared 'bedrock' circuit breaker/bulkhead.
+
+    `call_site` names the caller (e.g. 'llm_router.route_query') for the per-site metrics. Calls
+    with LOW_PRIORITY (routing, intent extraction) are shed first when the model's quota runs low.
+    With a HedgePolicy, each attempt may be raced against a duplicate (see HedgePolicy).
+    """
+
+    def __init__(self, region: Optional[Text] = None, policy: Optional[RetryPolicy] = None,
+                 endpoint_url: Optional[Text] = None, hedge: Optional[HedgePolicy] = None):
+        self.region = region or os.getenv('AWS_REGION', 'us-east-1')
+        self.endpoint_url = endpoint_url
+        self.hedge = hedge
+        self.policy = policy or RetryPolicy()
+        self.limiter = AdaptiveRateLimiter(self.region)
+        self.governor = QuotaGovernor(self.region)
+        self.dependency = get_dependency('bedrock')
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def client(self):
+        """The region's boto3 client; botocore's own retries are off because this class retries"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        'bedrock-runtime',
+                        region_name=self.region,
+                        endpoint_url=self.endpoint_url,
+                        config=Config(
+                            connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+                            read_timeout=BEDROCK_READ_TIMEOUT,
+                            retries={'total_max_attempts': 1},
+                            max_pool_connections=ACTION_THREADS
+                        )
+                    )
+        return self._client
+
+    def _invoke_once(self, model_id: Text, body: Dict[Text, Any]) -> Dict[Text, Any]:
+        response = self.client().invoke_model(
+            modelId=model_id,
+            body=json.dumps(body),
+            contentType='application/json'
+        )
+        return json.loads(response['body'].read())
+
+    async def _invoke_once_async(self, model_id: Text, body: Dict[Text, Any]) -> Dict[Text, Any]:
+        return await AsyncAWSClients.invoke_model(model_id, body, self.region, self.endpoint_url)
+
+    def _send_primary(self, model_id: Text, body: Dict[Text, Any]) -> Dict[Text, Any]:
+        started = time.monotonic()
+        result = self.dependency.call(self._invoke_once, model_id, body)
+        if self.hedge is not None:
+            self.hedge.record(model_id, time.monotonic() - started)
+        return result
+
+    async def _send_primary_async(self, model_id: Text, body: Dict[Text, Any]) -> Dict[Text, Any]:
+        started = time.monotonic()
+        try:
+            result = await self.dependency.call_async(self._invoke_once_async, model_id, body)
+        except asyncio.CancelledError:
+            # Cancelled after losing to a hedge: it would have taken at least this long. Recording the
+            # lower bound keeps the slow tail in the percentile instead of only the primaries that won.
+            if self.hedge is not None:
+                self.hedge.record(model_id, time.monotonic() - started)
+            raise
+        if self.hedge is not None:
+            self.hedge.record(model_id, time.monotonic() - started)
+        return result
+
+    def _reserve_hedge(self, model_id: Text, body: Dict[Text, Any]):
+        """(target invoker, model, reservation) for a hedge, or None when the target has no room right now"""
+        target, target_model = self.hedge.target(self, model_id)
+        if target.limiter.reserve():
+            target.limiter.cancel()
+            return None
+        reservation = target.governor.reservation(target_model, body, LOW_PRIORITY)
+        if target.governor.try_acquire(reservation):
+            target.limiter.cancel()
+            return None
+        self.hedge.record_sent(HEDGE, reservation.tokens)
+        return target, target_model, reservation
+
+    def _run_hedge(self, target: 'BedrockInvoker', model_id: Text, reservation, body: Dict[Text, Any]) -> Dict[Text, Any]:
+        try:
+            result = self.hedge.dependency.call(target._invoke_once, model_id, body)
+        except Exception as e:
+            target.governor.settle(reservation, None)
+            if classify_error(e) == THROTTLE:
+                target.limiter.on_throttle()
+            raise
+        target.governor.settle(reservation, result)
+        target.limiter.on_success()
+        return result
+
+    async def _run_hedge_async(self, target: 'BedrockInvoker', model_id: Text, reservation,
+                               body: Dict[Text, Any]) -> Dict[Text, Any]:
+        try:
+            result = await self.hedge.dependency.call_async(target._invoke_once_async, model_id, body)
+        except asyncio.CancelledError:
+            target.governor.keep(reservation)
+            raise
+        except Exception as e:
+            target.governor.settle(reservation, None)
+            if classify_error(e) == THROTTLE:
+                target.limiter.on_throttle()
+            raise
+        target.governor.settle(reservation, result)
+        target.limiter.on_success()
+        return result
+
+    def _send(self, call: _Call, model_id: Text, body: Dict[Text, Any]) -> Tuple[Dict[Text, Any], Text]:
+        """One attempt: the primary request, raced against a hedge if it is slower than usual; returns (response, winner)"""
+        hedge = self.hedge
+        if hedge is None:
+            return self._send_primary(model_id, body), PRIMARY
+        hedge.record_sent(PRIMARY, call.reservation.tokens)
+        primary = hedge.executor.submit(self._send_primary, model_id, body)
+        try:
+            return primary.result(timeout=hedge.delay(model_id)), PRIMARY
+        except FuturesTimeout:
+            pass
+        launched = self._reserve_hedge(model_id, body)
+        if launched is None:
+            hedge.finish(call.site, 'skipped')
+            return primary.result(), PRIMARY
+        secondary = hedge.executor.submit(self._run_hedge, *launched, body)
+        roles = {primary: PRIMARY, secondary: HEDGE}
+        pending = set(roles)
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A blocking boto3 call can't be interrupted; the loser finishes in the background, ignored
+                    hedge.finish(call.site, f"{roles[future]}_won")
+                    return future.result(), roles[future]
+        hedge.finish(call.site, 'failed')
+        raise primary.exception()
+
+    async def _send_async(self, call: _Call, model_id: Text, body: Dict[Text, Any]) -> Tuple[Dict[Text, Any], Text]:
+        """_send for the event loop; the losing request is cancelled, which closes its connection"""
+        hedge = self.hedge
+        if hedge is None:
+            return await self._send_primary_async(model_id, body), PRIMARY
+        hedge.record_sent(PRIMARY, call.reservation.tokens)
+        primary = asyncio.ensure_future(self._send_primary_async(model_id, body))
+        roles = {primary: PRIMARY}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge.delay(model_id))
+            if done:
+                return primary.result(), PRIMARY
+            launched = self._reserve_hedge(model_id, body)
+            if launched is None:
+                hedge.finish(call.site, 'skipped')
+                return await primary, PRIMARY
+            roles[asyncio.ensure_future(self._run_hedge_async(*launched, body))] = HEDGE
+            pending = set(roles)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        hedge.finish(call.site, f"{roles[task]}_won")
+                        return task.result(), roles[task]
+            hedge.finish(call.site, 'failed')
+            raise primary.exception()
+        finally:
+            for task in roles:
+                if not task.done():
+                    task.cancel()
+
+    def invoke(self, body: Dict[Text, Any], model_id: Optional[Text] = None,
+               call_site: Text = 'default', priority: Text = NORMAL_PRIORITY) -> Dict[Text, Any]:
+        """Parsed JSON response body; raises the last error, or DependencyUnavailable when refused"""
+        model_id = model_id or DEFAULT_MODEL_ID
+        call = _Call(self, call_site, model_id, body, priority)
+        while True:
+            wait = call.before_attempt()
+            if wait:
+                time.sleep(wait)
+            wait = call.quota_wait()
+            while wait:
+                time.sleep(wait)
+                wait = call.quota_wait()
+            try:
+                result, role = self._send(call, model_id, body)
+            except Exception as e:
+                call.settle(None)
+                time.sleep(call.after_failure(e))
+                continue
+            call.settle(result, role)
+            call.finish('ok')
+            return result
+
+    async def invoke_async(self, body: Dict[Text, Any], model_id: Optional[Text] = None,
+                           call_site: Text = 'default', priority: Text = NORMAL_PRIORITY) -> Dict[Text, Any]:
+        """invoke() for async actions - aiobotocore when installed, otherwise the action executor"""
+        if not AsyncAWSClients.available():
+            return await run_blocking(self.invoke, body, model_id, call_site, priority)
+        model_id = model_id or DEFAULT_MODEL_ID
+        call = _Call(self, call_site, model_id, body, priority)
+        while True:
+            wait = call.before_attempt()
+            if wait:
+                await asyncio.sleep(wait)
+            wait = call.quota_wait()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = call.quota_wait()
+            try:
+                result, role = await self._send_async(call, model_id, body)
+            except Exception as e:
+                call.settle(None)
+                await asyncio.sleep(call.after_failure(e))
+                continue
+            call.settle(result, role)
+            call.finish('ok')
+            return result
+
+
+_invokers: Dict[Text, BedrockInvoker] = {}
+_invokers_lock = threading.Lock()
+
+
+def get_bedrock_invoker(region: Optional[Text] = None) -> BedrockInvoker:
+    """The process-wide invoker for a region (AWS_REGION by default)"""
+    region = region or os.getenv('AWS_REGION', 'us-east-1')
+    invoker = _invokers.get(region)
+    if invoker is None:
+        with _invokers_lock:
+            invoker = _invokers.get(region)
+            if invoker is None:
+                invoker = _invokers[region] = _create_invoker(region)
+    return invoker
+
+
+def _create_invoker(region: Text) -> BedrockInvoker:
+    primary_region = os.getenv('AWS_REGION', 'us-east-1')
+    if region == primary_region:
+        hedge = None
+        if HEDGE_ENABLED:
+            if (HEDGE_REGION or primary_region) == primary_region and not HEDGE_MODEL_ID:
+                logger.warning("BEDROCK_HEDGE is on but no BEDROCK_HEDGE_REGION or BEDROCK_HEDGE_MODEL_ID is set; not hedging")
+            else:
+                hedge = HedgePolicy(HEDGE_REGION if HEDGE_REGION != primary_region else None, HEDGE_MODEL_ID)
+                logger.info(f"Hedging Bedrock requests to {HEDGE_REGION or region} / {HEDGE_MODEL_ID or 'same model'}")
+        return BedrockInvoker(region, endpoint_url=BEDROCK_ENDPOINT_URL, hedge=hedge)
+    endpoint_url = HEDGE_ENDPOINT_URL if region == HEDGE_REGION else None
+    return BedrockInvoker(region, endpoint_url=endpoint_url)
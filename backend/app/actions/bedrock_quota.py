@@ -0,0 +1,359 @@
+"""
+Bedrock Quota Governor for per-model RPM/TPM budgets
+Estimates tokens per request and paces calls with token buckets, in-process or shared through Redis, shedding low-priority calls first
+"""
+
+import abc
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+try:
+    from .coordination import KEY_PREFIX, REDIS_AVAILABLE, REDIS_URL, redis
+    from .metrics import metrics
+    from .resilience import DependencyUnavailable
+except ImportError:
+    from coordination import KEY_PREFIX, REDIS_AVAILABLE, REDIS_URL, redis
+    from metrics import metrics
+    from resilience import DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+
+NORMAL_PRIORITY = 'normal'
+# Routing and intent extraction: the turn has a rule-based path if these are shed
+LOW_PRIORITY = 'low'
+
+# 'memory' budgets each process separately; 'redis' shares one budget between every replica pointed at REDIS_URL
+QUOTA_BACKEND = os.getenv('BEDROCK_QUOTA_BACKEND', 'memory').lower()
+# Service Quotas differ per account, region and model - set these to match yours.
+# BEDROCK_QUOTAS overrides per model, e.g. {"anthropic.claude-3-5-sonnet-20241022-v2:0": {"rpm": 50, "tpm": 400000}}
+DEFAULT_RPM = int(os.getenv('BEDROCK_DEFAULT_RPM', '200'))
+DEFAULT_TPM = int(os.getenv('BEDROCK_DEFAULT_TPM', '400000'))
+# With the 'memory' backend each replica gets this share of the quota
+QUOTA_REPLICAS = max(1, int(os.getenv('BEDROCK_QUOTA_REPLICAS', '1')))
+# Fraction of each bucket low-priority calls may not dip into, kept for user-facing responses
+LOW_PRIORITY_RESERVE = float(os.getenv('BEDROCK_LOW_PRIORITY_RESERVE', '0.2'))
+# Longest a low-priority call queues for quota before it is shed; normal calls wait up to the turn deadline
+LOW_PRIORITY_MAX_WAIT = float(os.getenv('BEDROCK_LOW_PRIORITY_MAX_WAIT', '0.5'))
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_TOKENS = 512
+
+metrics.describe('bedrock_quota_utilization', "Share of the per-model RPM/TPM bucket in use (0-1)")
+metrics.describe('bedrock_quota_wait_seconds', "Time calls waited for RPM/TPM quota")
+metrics.describe('bedrock_quota_shed_total', "Bedrock calls refused for lack of quota, by priority")
+metrics.describe('bedrock_tokens_total', "Tokens reported by Bedrock, by model and kind (input/output)")
+metrics.describe('bedrock_token_estimate_ratio', "Actual input tokens divided by the estimate")
+
+QuotaLimits = namedtuple('QuotaLimits', ['rpm', 'tpm'])
+# One token bucket to draw from: `needed` is what must be available (cost plus any low-priority reserve)
+Bucket = namedtuple('Bucket', ['key', 'cost', 'capacity', 'rate', 'needed'])
+
+
+class QuotaExhausted(DependencyUnavailable):
+    """A call was shed because its model's RPM/TPM budget could not cover it in time"""
+
+    def __init__(self, model_id: Text, priority: Text, retry_after: float):
+        super().__init__('bedrock', f"Bedrock quota for {model_id} exhausted ({priority} priority call shed)", retry_after)
+        self.model_id = model_id
+        self.priority = priority
+
+
+def _content_chars(content: Any) -> int:
+    if isinstance(content, str):
+        return len(content)
+    if isinstance(content, list):
+        return sum(len(part.get('text', '')) if isinstance(part, dict) else len(str(part)) for part in content)
+    return len(str(content or ''))
+
+
+def estimate_tokens(body: Dict[Text, Any]) -> Tuple[int, int]:
+    """(input, output) tokens for a request body.
+
+    Input is ~4 characters per token plus a few per message. Output is max_tokens, because Bedrock
+    reserves that much against TPM when the request starts and only refunds the rest afterwards.
+    """
+    messages = body.get('messages')
+    if messages is None:
+        chars, overhead = len(json.dumps(body)), 0
+    else:
+        chars = _content_chars(body.get('system')) + sum(_content_chars(m.get('content')) for m in messages)
+        overhead = 4 * len(messages) + 8
+    input_tokens = math.ceil(chars / CHARS_PER_TOKEN) + overhead
+    output_tokens = int(body.get('max_tokens') or body.get('max_tokens_to_sample') or DEFAULT_MAX_TOKENS)
+    return input_tokens, output_tokens
+
+
+class Reservation:
+    """RPM/TPM claimed for one attempt; settle it once with the response (or None on failure)"""
+
+    __slots__ = ('model_id', 'priority', 'input_tokens', 'output_tokens', 'held', 'waited')
+
+    def __init__(self, model_id: Text, priority: Text, input_tokens: int, output_tokens: int):
+        self.model_id = model_id
+        self.priority = priority
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.held = False
+        self.waited = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class QuotaStore(abc.ABC):
+    """Token-bucket state; interface shared by the in-process and Redis implementations"""
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def take(self, buckets: List[Bucket]) -> Tuple[float, List[float]]:
+        """Draw every bucket's cost, or none of them; returns (seconds to wait, 0 if taken; levels after)"""
+
+    @abc.abstractmethod
+    def adjust(self, key: Text, delta: float):
+        """Return (positive) or charge (negative) tokens, e.g. once the real usage is known"""
+
+
+class InProcessQuotaStore(QuotaStore):
+    """Default store: budgets this process only"""
+
+    name = 'memory'
+
+    def __init__(self):
+        # key -> [tokens, updated]
+        self._buckets: Dict[Text, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        with self._lock:
+            now = time.monotonic()
+            states = []
+            for bucket in buckets:
+                state = self._buckets.get(bucket.key)
+                if state is None:
+                    state = self._buckets[bucket.key] = [float(bucket.capacity), now]
+                state[0] = min(bucket.capacity, state[0] + (now - state[1]) * bucket.rate)
+                state[1] = now
+                states.append(state)
+            wait = max([(b.needed - s[0]) / b.rate for b, s in zip(buckets, states) if s[0] < b.needed] or [0.0])
+            if wait <= 0:
+                for bucket, state in zip(buckets, states):
+                    state[0] -= bucket.cost
+            return wait, [state[0] for state in states]
+
+    def adjust(self, key, delta):
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is not None:
+                state[0] += delta
+
+
+# KEYS: bucket keys; ARGV: cost, capacity, rate, needed per key. Uses the server clock so replicas agree (Redis 5+).
+_TAKE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[(i - 1) * 4 + 2])
+  local rate = tonumber(ARGV[(i - 1) * 4 + 3])
+  local needed = tonumber(ARGV[(i - 1) * 4 + 4])
+  local state = redis.call('HMGET', KEYS[i], 'tokens', 'updated')
+  local level = tonumber(state[1]) or capacity
+  local updated = tonumber(state[2]) or now
+  level = math.min(capacity, level + math.max(0, now - updated) * rate)
+  if level < needed then wait = math.max(wait, (needed - level) / rate) end
+  levels[i] = level
+end
+for i = 1, #KEYS do
+  if wait == 0 then levels[i] = levels[i] - tonumber(ARGV[(i - 1) * 4 + 1]) end
+  redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i]), 'updated', tostring(now))
+  redis.call('PEXPIRE', KEYS[i], 120000)
+  levels[i] = tostring(levels[i])
+end
+table.insert(levels, 1, tostring(wait))
+return levels
+"""
+
+
+class RedisQuotaStore(QuotaStore):
+    """Budget shared by every replica. Any redis-py compatible client works (a local redis-server,
+    or fakeredis with lupa for EVAL in tests). Redis errors fail open to the in-process store so a
+    cache outage loosens budgets to per-replica instead of blocking Bedrock calls."""
+
+    name = 'redis'
+
+    def __init__(self, client=None, url: Optional[Text] = REDIS_URL):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5,
+                                          decode_responses=True)
+        self.client = client
+        self.fallback = InProcessQuotaStore()
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def _failed(self, operation: Text, error: Exception):
+        metrics.inc('coordination_backend_errors_total', backend='redis_quota', operation=operation)
+        logger.warning(f"Redis quota {operation} failed, using in-process budget: {error}")
+
+    def take(self, buckets):
+        args = []
+        for bucket in buckets:
+            args.extend([bucket.cost, bucket.capacity, bucket.rate, bucket.needed])
+        try:
+            result = self._take(keys=[bucket.key for bucket in buckets], args=args)
+        except Exception as e:
+            self._failed('take', e)
+            return self.fallback.take(buckets)
+        return float(result[0]), [float(level) for level in result[1:]]
+
+    def adjust(self, key, delta):
+        try:
+            if self.client.exists(key):
+                self.client.hincrbyfloat(key, 'tokens', delta)
+        except Exception as e:
+            self._failed('adjust', e)
+            self.fallback.adjust(key, delta)
+
+
+def _configured_quotas() -> Dict[Text, Dict[Text, int]]:
+    raw = os.getenv('BEDROCK_QUOTAS')
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        logger.warning(f"Ignoring malformed BEDROCK_QUOTAS: {e}")
+        return {}
+
+
+class QuotaGovernor:
+    """RPM and TPM token buckets per model ID in one region.
+
+    Each attempt reserves one request and its estimated tokens up front; once the response arrives
+    the estimate is trued up from Bedrock's reported usage. Low-priority calls must leave
+    LOW_PRIORITY_RESERVE of each bucket untouched, so they queue (and are shed) first.
+    """
+
+    def __init__(self, region: Text, store: Optional[QuotaStore] = None,
+                 quotas: Optional[Dict[Text, Dict[Text, int]]] = None):
+        self.region = region
+        self.store = store or get_quota_store()
+        self.quotas = _configured_quotas() if quotas is None else quotas
+
+    def limits(self, model_id: Text) -> QuotaLimits:
+        quota = self.quotas.get(model_id, {})
+        rpm = int(quota.get('rpm', DEFAULT_RPM))
+        tpm = int(quota.get('tpm', DEFAULT_TPM))
+        if self.store.name == 'memory':
+            rpm, tpm = rpm // QUOTA_REPLICAS, tpm // QUOTA_REPLICAS
+        return QuotaLimits(rpm, tpm)
+
+    def _key(self, model_id: Text, limit: Text) -> Text:
+        return f"{KEY_PREFIX}quota:{self.region}:{model_id}:{limit}"
+
+    def reservation(self, model_id: Text, body: Dict[Text, Any], priority: Text = NORMAL_PRIORITY) -> Reservation:
+        return Reservation(model_id, priority, *estimate_tokens(body))
+
+    def _buckets(self, reservation: Reservation) -> List[Bucket]:
+        reserve = LOW_PRIORITY_RESERVE if reservation.priority == LOW_PRIORITY else 0.0
+        limits = self.limits(reservation.model_id)
+        buckets = []
+        for limit, capacity, cost in (('rpm', limits.rpm, 1), ('tpm', limits.tpm, reservation.tokens)):
+            if capacity <= 0:
+                continue
+            # A request bigger than the whole bucket could never run; let it drain the bucket instead
+            cost = min(cost, capacity)
+            needed = min(capacity, cost + reserve * capacity)
+            buckets.append(Bucket(self._key(reservation.model_id, limit), cost, capacity, capacity / 60.0, needed))
+        return buckets
+
+    def try_acquire(self, reservation: Reservation) -> float:
+        """0 once the reservation is held, otherwise seconds until it could be; never blocks"""
+        buckets = self._buckets(reservation)
+        if not buckets:
+            reservation.held = True
+            return 0.0
+        wait, levels = self.store.take(buckets)
+        for bucket, level in zip(buckets, levels):
+            limit = bucket.key.rsplit(':', 1)[-1]
+            utilization = min(1.0, max(0.0, 1 - level / bucket.capacity))
+            metrics.set_gauge('bedrock_quota_utilization', round(utilization, 3), model=reservation.model_id, limit=limit)
+        if wait > 0:
+            return wait
+        reservation.held = True
+        metrics.observe('bedrock_quota_wait_seconds', reservation.waited, priority=reservation.priority)
+        return 0.0
+
+    def shed(self, reservation: Reservation, retry_after: float):
+        metrics.inc('bedrock_quota_shed_total', model=reservation.model_id, priority=reservation.priority)
+        logger.warning(f"Shedding {reservation.priority} priority Bedrock call to {reservation.model_id}: quota exhausted")
+        raise QuotaExhausted(reservation.model_id, reservation.priority, retry_after)
+
+    def keep(self, reservation: Reservation):
+        """The request went out but its usage will never be seen (e.g. a cancelled hedge); keep the estimate"""
+        reservation.held = False
+
+    def settle(self, reservation: Reservation, response_body: Optional[Dict[Text, Any]] = None):
+        """True up TPM from the response's usage; a failed attempt (None) gets its tokens back"""
+        if not reservation.held:
+            return
+        reservation.held = False
+        actual = 0
+        usage = (response_body or {}).get('usage') or {}
+        if usage:
+            input_tokens, output_tokens = usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+            actual = input_tokens + output_tokens
+            metrics.inc('bedrock_tokens_total', input_tokens, model=reservation.model_id, kind='input')
+            metrics.inc('bedrock_tokens_total', output_tokens, model=reservation.model_id, kind='output')
+            if reservation.input_tokens:
+                metrics.observe('bedrock_token_estimate_ratio', input_tokens / reservation.input_tokens,
+                                buckets=(0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 4.0))
+        elif response_body is not None:
+            # No usage reported - keep the estimate
+            return
+        if self.limits(reservation.model_id).tpm > 0 and actual != reservation.tokens:
+            self.store.adjust(self._key(reservation.model_id, 'tpm'), reservation.tokens - actual)
+
+
+_store: Optional[QuotaStore] = None
+_store_lock = threading.Lock()
+
+
+def get_quota_store() -> QuotaStore:
+    """Process-wide store chosen by BEDROCK_QUOTA_BACKEND; falls back to in-process if Redis is unusable"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_store()
+    return _store
+
+
+def set_quota_store(store: QuotaStore):
+    """Swap the store, e.g. to a RedisQuotaStore over a local stand-in in tests"""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def _create_store() -> QuotaStore:
+    if QUOTA_BACKEND == 'redis':
+        if not REDIS_URL:
+            logger.warning("BEDROCK_QUOTA_BACKEND=redis but REDIS_URL/REDIS_ENDPOINT is not set, using in-process quotas")
+        else:
+            try:
+                store = RedisQuotaStore(url=REDIS_URL)
+                store.client.ping()
+                logger.info("Using Redis for shared Bedrock quota buckets")
+                return store
+            except Exception as e:
+                logger.warning(f"Redis quota store unavailable, using in-process quotas: {e}")
+    return InProcessQuotaStore()
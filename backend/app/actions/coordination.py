@@ -0,0 +1,354 @@
+"""
+Coordination Backends for duplicate suppression across action-server replicas
+Response dedup, idempotency keys and per-sender ordering, in-process or shared through Redis
+"""
+
+import abc
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Optional, Text, Tuple
+
+try:
+    from .dedup import ExpiringSet, InFlightRegistry
+    from .metrics import metrics
+except ImportError:
+    from dedup import ExpiringSet, InFlightRegistry
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+# 'memory' protects one process; 'redis' shares state between every replica pointed at REDIS_URL
+DEDUP_BACKEND = os.getenv('DEDUP_BACKEND', 'memory').lower()
+REDIS_URL = os.getenv('REDIS_URL') or (f"redis://{os.getenv('REDIS_ENDPOINT')}" if os.getenv('REDIS_ENDPOINT') else None)
+KEY_PREFIX = os.getenv('DEDUP_KEY_PREFIX', 'pran:')
+# A sender's turn is released after this long even if its holder never finished (crashed replica)
+SENDER_TURN_LEASE_SECONDS = float(os.getenv('SENDER_TURN_LEASE_SECONDS', '60'))
+# How long a finished run's result is reused for duplicate calls with the same idempotency key
+INFLIGHT_COALESCE_WINDOW = float(os.getenv('INFLIGHT_COALESCE_WINDOW', '0.5'))
+
+
+def _key_text(key: Hashable) -> Text:
+    return ":".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+
+
+class CoordinationBackend(abc.ABC):
+    """Interface shared by the in-process and Redis implementations"""
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def add_if_absent(self, key: Hashable, ttl: float, shard_key: Optional[Hashable] = None) -> bool:
+        """Record key for ttl seconds; False if it was already recorded (a duplicate)"""
+
+    @abc.abstractmethod
+    def discard(self, key: Hashable, shard_key: Optional[Hashable] = None):
+        """Forget key early, e.g. when the response it guarded was never sent"""
+
+    @abc.abstractmethod
+    def begin(self, idempotency_key: Hashable, shard_key: Optional[Hashable] = None) -> Tuple[bool, Any]:
+        """Claim an idempotency key; returns (is_leader, handle)"""
+
+    @abc.abstractmethod
+    def finish(self, handle: Any, result: Any):
+        """Store the leader's result for followers of the same key"""
+
+    @abc.abstractmethod
+    def wait(self, handle: Any, timeout: float) -> Tuple[bool, Any]:
+        """Wait for the leader's result; returns (completed, result)"""
+
+    @abc.abstractmethod
+    def take_ticket(self, sender_id: Text) -> int:
+        """Next place in this sender's queue"""
+
+    @abc.abstractmethod
+    def wait_turn(self, sender_id: Text, ticket: int, timeout: float) -> bool:
+        """Block until every earlier ticket has finished; False if timeout passed first"""
+
+    @abc.abstractmethod
+    def finish_turn(self, sender_id: Text, ticket: int):
+        """Let the sender's next ticket go"""
+
+    @contextmanager
+    def sender_turn(self, sender_id: Text, timeout: float = SENDER_TURN_LEASE_SECONDS):
+        """Process one sender's messages in arrival order; gives up waiting after timeout"""
+        ticket = self.take_ticket(sender_id)
+        started = time.monotonic()
+        in_turn = self.wait_turn(sender_id, ticket, timeout)
+        metrics.observe('sender_turn_wait_seconds', time.monotonic() - started, backend=self.name)
+        if not in_turn:
+            metrics.inc('sender_turn_timeouts_total', backend=self.name)
+            logger.warning(f"Sender {sender_id} ticket {ticket} waited {timeout}s for its turn, proceeding out of order")
+        try:
+            yield ticket
+        finally:
+            self.finish_turn(sender_id, ticket)
+
+
+class InProcessBackend(CoordinationBackend):
+    """Default backend: sharded in-memory structures, protects a single process"""
+
+    name = 'memory'
+
+    def __init__(self, coalesce_window: float = INFLIGHT_COALESCE_WINDOW):
+        self._dedup: Dict[float, ExpiringSet] = {}
+        self._dedup_lock = threading.Lock()
+        self._in_flight = InFlightRegistry(window=coalesce_window, name='idempotency')
+        # sender_id -> [last ticket taken, served mark, tickets not yet finished]; removed once idle
+        self._turns: Dict[Text, list] = {}
+        self._turns_changed = threading.Condition()
+
+    def _dedup_set(self, ttl: float) -> ExpiringSet:
+        dedup = self._dedup.get(ttl)
+        if dedup is None:
+            with self._dedup_lock:
+                dedup = self._dedup.setdefault(ttl, ExpiringSet(ttl=ttl, name=f'dedup_{ttl:g}s'))
+        return dedup
+
+    def add_if_absent(self, key, ttl, shard_key=None):
+        return self._dedup_set(ttl).add(key, shard_key=shard_key)
+
+    def discard(self, key, shard_key=None):
+        for dedup in list(self._dedup.values()):
+            dedup.discard(key, shard_key=shard_key)
+
+    def begin(self, idempotency_key, shard_key=None):
+        return self._in_flight.begin(idempotency_key, shard_key=shard_key)
+
+    def finish(self, handle, result):
+        self._in_flight.finish(handle, result)
+
+    def wait(self, handle, timeout):
+        return self._in_flight.wait(handle, timeout)
+
+    def take_ticket(self, sender_id):
+        with self._turns_changed:
+            state = self._turns.setdefault(sender_id, [0, 0, set()])
+            state[0] += 1
+            state[2].add(state[0])
+            return state[0]
+
+    def wait_turn(self, sender_id, ticket, timeout):
+        with self._turns_changed:
+            if self._turns_changed.wait_for(lambda: self._turns[sender_id][1] >= ticket - 1, timeout):
+                return True
+            # As in RedisBackend: the ticket ahead is presumed stuck; skip past it so later turns for
+            # this sender don't each wait out the timeout too
+            state = self._turns[sender_id]
+            state[1] = max(state[1], ticket - 1)
+            self._turns_changed.notify_all()
+            return False
+
+    def finish_turn(self, sender_id, ticket):
+        with self._turns_changed:
+            state = self._turns.get(sender_id)
+            if state is None:
+                return
+            # Raise the mark, never lower it, so a skipped ticket finishing late can't hold anyone up
+            state[1] = max(state[1], ticket)
+            state[2].discard(ticket)
+            if not state[2]:
+                # Only once every ticket, skipped ones included, is done - a late finisher must not
+                # land on a fresh sequence
+                del self._turns[sender_id]
+            self._turns_changed.notify_all()
+
+
+# KEYS[1]: a sender's turn hash (seq, served); ARGV: served mark, TTL in ms. A hash that already expired
+# stays gone, so a late finisher can't leave a stale mark for the next sequence to trip over.
+_ADVANCE_SERVED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+local served = tonumber(redis.call('HGET', KEYS[1], 'served') or '0')
+if tonumber(ARGV[1]) > served then redis.call('HSET', KEYS[1], 'served', ARGV[1]) end
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RedisBackend(CoordinationBackend):
+    """Shared backend for multiple replicas. Any redis-py compatible client works (a local
+    redis-server, or fakeredis with lupa for EVAL in tests). Redis errors fail open to the
+    in-process backend so an unreachable cache degrades dedup to per-replica instead of breaking
+    replies."""
+
+    name = 'redis'
+    PENDING = '__pending__'
+
+    def __init__(self, client=None, url: Optional[Text] = REDIS_URL, coalesce_window: float = INFLIGHT_COALESCE_WINDOW,
+                 stale_after: float = 60.0, prefix: Text = KEY_PREFIX):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5,
+                                          decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.coalesce_window = coalesce_window
+        self.stale_after = stale_after
+        self.fallback = InProcessBackend(coalesce_window)
+        self._lease_ms = int(SENDER_TURN_LEASE_SECONDS * 1000)
+        self._advance_served = client.register_script(_ADVANCE_SERVED_SCRIPT)
+
+    def _key(self, kind: Text, key: Hashable) -> Text:
+        return f"{self.prefix}{kind}:{_key_text(key)}"
+
+    def _failed(self, operation: Text, error: Exception):
+        metrics.inc('coordination_backend_errors_total', backend=self.name, operation=operation)
+        logger.warning(f"Redis coordination {operation} failed, using in-process fallback: {error}")
+
+    def add_if_absent(self, key, ttl, shard_key=None):
+        try:
+            return bool(self.client.set(self._key('dedup', key), 1, nx=True, px=int(ttl * 1000)))
+        except Exception as e:
+            self._failed('dedup', e)
+            return self.fallback.add_if_absent(key, ttl, shard_key)
+
+    def discard(self, key, shard_key=None):
+        try:
+            self.client.delete(self._key('dedup', key))
+        except Exception as e:
+            self._failed('discard', e)
+            self.fallback.discard(key, shard_key)
+
+    def begin(self, idempotency_key, shard_key=None):
+        key = self._key('idem', idempotency_key)
+        try:
+            leader = self.client.set(key, self.PENDING, nx=True, px=int(self.stale_after * 1000))
+            return bool(leader), ('redis', key)
+        except Exception as e:
+            self._failed('begin', e)
+            leader, handle = self.fallback.begin(idempotency_key, shard_key)
+            return leader, ('memory', handle)
+
+    def finish(self, handle, result):
+        kind, value = handle
+        if kind == 'memory':
+            self.fallback.finish(value, result)
+            return
+        try:
+            self.client.set(value, json.dumps(result, default=str), px=max(1, int(self.coalesce_window * 1000)))
+        except Exception as e:
+            self._failed('finish', e)
+
+    def wait(self, handle, timeout):
+        kind, value = handle
+        if kind == 'memory':
+            return self.fallback.wait(value, timeout)
+        started = time.monotonic()
+        delay = 0.005
+        completed, result = False, None
+        try:
+            while time.monotonic() - started < timeout:
+                stored = self.client.get(value)
+                if stored is None:
+                    break  # leader's claim expired without a result
+                if stored != self.PENDING:
+                    completed, result = True, json.loads(stored)
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+        except Exception as e:
+            self._failed('wait', e)
+        metrics.observe('in_flight_coalesce_wait_seconds', time.monotonic() - started, registry='redis')
+        metrics.inc('in_flight_coalesced_total' if completed else 'in_flight_coalesce_timeouts_total', registry='redis')
+        return completed, result
+
+    def _turns_key(self, sender_id: Text) -> Text:
+        return self._key('turns', sender_id)
+
+    def take_ticket(self, sender_id):
+        key = self._turns_key(sender_id)
+        try:
+            pipe = self.client.pipeline()
+            pipe.hincrby(key, 'seq', 1)
+            pipe.pexpire(key, self._lease_ms)
+            ticket = pipe.execute()[0]
+            return int(ticket)
+        except Exception as e:
+            self._failed('take_ticket', e)
+            return -self.fallback.take_ticket(sender_id)
+
+    def wait_turn(self, sender_id, ticket, timeout):
+        if ticket < 0:
+            return self.fallback.wait_turn(sender_id, -ticket, timeout)
+        key = self._turns_key(sender_id)
+        started = time.monotonic()
+        delay = 0.005
+        try:
+            while True:
+                # Polling keeps the sequence alive while anyone is still queued on it
+                pipe = self.client.pipeline()
+                pipe.hget(key, 'served')
+                pipe.pexpire(key, self._lease_ms)
+                served = int(pipe.execute()[0] or 0)
+                if served >= ticket - 1:
+                    return True
+                if time.monotonic() - started >= timeout:
+                    # The ticket ahead of us is presumed dead (crashed replica, lost ticket); skip past it
+                    # so later turns for this sender don't each wait out the timeout too
+                    self._advance(key, ticket - 1)
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+        except Exception as e:
+            self._failed('wait_turn', e)
+            return True
+
+    def finish_turn(self, sender_id, ticket):
+        if ticket < 0:
+            self.fallback.finish_turn(sender_id, -ticket)
+            return
+        try:
+            self._advance(self._turns_key(sender_id), ticket)
+        except Exception as e:
+            self._failed('finish_turn', e)
+
+    def _advance(self, key: Text, served: int):
+        """Raise the served mark to at least `served`; never lowers it, so late finishers can't skip anyone"""
+        self._advance_served(keys=[key], args=[served, self._lease_ms])
+
+
+_backend: Optional[CoordinationBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_coordination_backend() -> CoordinationBackend:
+    """Process-wide backend chosen by DEDUP_BACKEND; falls back to in-process if Redis is unusable"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+def set_coordination_backend(backend: CoordinationBackend):
+    """Swap the backend, e.g. to a RedisBackend over a local stand-in in tests"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _create_backend() -> CoordinationBackend:
+    if DEDUP_BACKEND == 'redis':
+        if not REDIS_URL:
+            logger.warning("DEDUP_BACKEND=redis but REDIS_URL/REDIS_ENDPOINT is not set, using in-process dedup")
+        else:
+            try:
+                backend = RedisBackend(url=REDIS_URL)
+                backend.client.ping()
+                logger.info("Using Redis coordination backend for dedup and sender ordering")
+                return backend
+            except Exception as e:
+                logger.warning(f"Redis coordination backend unavailable, using in-process dedup: {e}")
+    return InProcessBackend()
@@ -0,0 +1,305 @@
+"""
+Database Router for Aurora reader/writer endpoints
+Routes read queries to the reader endpoint and writes to the writer endpoint, with read-your-writes pinning
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+import psycopg2
+import psycopg2.pool
+
+try:
+    from .metrics import metrics
+    from .resilience import CircuitBreaker, CircuitOpenError, register_dependency
+except ImportError:
+    from metrics import metrics
+    from resilience import CircuitBreaker, CircuitOpenError, register_dependency
+
+logger = logging.getLogger(__name__)
+
+READ = 'read'
+WRITE = 'write'
+
+# After a sender writes, their reads go to the writer for this long so replica lag can't hide the write
+READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX', '10'))
+# Turns on the action executor (ACTION_THREADS) outnumber pooled connections; psycopg2's getconn() raises
+# instead of waiting when the pool is full, so checkouts queue here for up to this long first
+POOL_WAIT_SECONDS = float(os.getenv('DB_POOL_WAIT_SECONDS', '2'))
+CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('DB_BREAKER_FAILURES', '2'))
+BREAKER_RESET_SECONDS = float(os.getenv('DB_BREAKER_RESET_SECONDS', '30'))
+BREAKER_PROBE_SECONDS = float(os.getenv('DB_BREAKER_PROBE_SECONDS', '5'))
+
+metrics.describe('db_pool_wait_seconds', "Time checkouts waited for a free pooled connection")
+metrics.describe('db_pool_exhausted_total', "Checkouts that gave up waiting for a pooled connection")
+
+
+class DatabaseRouter:
+    """Role-aware connection routing with one pool per Aurora endpoint"""
+
+    _base_config: Optional[Dict[Text, Any]] = None
+    _pools: Dict[Text, Any] = {}
+    # id(conn) -> (pool role, the pool it came from)
+    _connection_roles: Dict[int, Tuple[Text, Any]] = {}
+    _last_write: Dict[Text, float] = {}
+    # One slot per pooled connection; these outlive pool resets so connections still checked out stay counted
+    _slots: Dict[Text, threading.BoundedSemaphore] = {}
+    # Pools dropped by reset_pools() that still have connections checked out; closed once those return
+    _retired: List[Any] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, base_config: Dict[Text, Any]):
+        """Set the writer connection settings; the reader endpoint is taken from the environment"""
+        with cls._lock:
+            cls._base_config = dict(base_config)
+            cls._pools = {}
+            cls._connection_roles = {}
+
+    @classmethod
+    def is_configured(cls) -> bool:
+        return cls._base_config is not None
+
+    @classmethod
+    def endpoint_config(cls, role: Text) -> Dict[Text, Any]:
+        """Connection settings for a role - reader falls back to the writer host when no reader is set"""
+        config = dict(cls._base_config or {})
+        if role == READ:
+            reader_host = os.getenv('AURORA_READER_ENDPOINT') or os.getenv('DB_READER_HOST')
+            if reader_host:
+                config['host'] = reader_host
+        config['connect_timeout'] = CONNECT_TIMEOUT
+        return config
+
+    @classmethod
+    def _pool_role(cls, role: Text) -> Text:
+        if role == READ and cls.endpoint_config(READ)['host'] == cls.endpoint_config(WRITE)['host']:
+            # No separate reader configured - share the writer pool
+            return WRITE
+        return role
+
+    @classmethod
+    def _checkout_slots(cls, pool_role: Text) -> threading.BoundedSemaphore:
+        with cls._lock:
+            slots = cls._slots.get(pool_role)
+            if slots is None:
+                slots = cls._slots[pool_role] = threading.BoundedSemaphore(POOL_MAX_CONNECTIONS)
+            return slots
+
+    @classmethod
+    def _get_pool(cls, role: Text):
+        """Create pools lazily so an unreachable endpoint doesn't block module import"""
+        pool_role = cls._pool_role(role)
+
+        with cls._lock:
+            pool = cls._pools.get(pool_role)
+        if pool is not None:
+            return pool_role, pool
+
+        # Connecting can take up to connect_timeout; do it outside the lock that guards checkouts and returns
+        created = psycopg2.pool.ThreadedConnectionPool(
+            minconn=POOL_MIN_CONNECTIONS,
+            maxconn=POOL_MAX_CONNECTIONS,
+            **cls.endpoint_config(pool_role)
+        )
+        with cls._lock:
+            pool = cls._pools.setdefault(pool_role, created)
+        if pool is created:
+            logger.info(f"Created {pool_role} connection pool for {cls.endpoint_config(pool_role)['host']}")
+        else:
+            # Another thread published its pool first
+            created.closeall()
+        return pool_role, pool
+
+    @classmethod
+    def reset_pools(cls):
+        """Retire all pools - their connections are dead after an outage.
+
+        New checkouts get fresh pools. A retired pool is closed at once if nothing is checked out of
+        it, otherwise when its last connection is returned, so no turn has its connection closed mid-query.
+        """
+        with cls._lock:
+            cls._retired.extend(cls._pools.values())
+            cls._pools = {}
+            for pool in list(cls._retired):
+                cls._close_if_drained(pool)
+
+    @classmethod
+    def _close_if_drained(cls, pool):
+        """Must be called with the lock held"""
+        # psycopg2 pools keep no public counters; _used is stable across 2.x
+        if pool._used:
+            return
+        cls._retired.remove(pool)
+        try:
+            pool.closeall()
+        except Exception as e:
+            logger.debug(f"Error closing connection pool: {e}")
+
+    @classmethod
+    def pool_status(cls) -> Dict[Text, Dict[Text, Any]]:
+        """Connections in use / idle per pool - read from pool state, no database round trip"""
+        with cls._lock:
+            pools = dict(cls._pools)
+        # psycopg2 pools keep no public counters; _used and _pool are stable across 2.x
+        return {
+            role: {'in_use': len(pool._used), 'idle': len(pool._pool), 'max': pool.maxconn, 'closed': pool.closed}
+            for role, pool in pools.items()
+        }
+
+    @classmethod
+    def probe(cls):
+        """Cheap standalone health check used by the circuit breaker while it is open"""
+        config = cls.endpoint_config(WRITE)
+        config['connect_timeout'] = 2
+        conn = psycopg2.connect(**config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        finally:
+            conn.close()
+
+    @classmethod
+    def mark_write(cls, sender_id: Optional[Text]):
+        """Record that a sender just wrote, pinning their reads to the writer for a short window"""
+        if not sender_id:
+            return
+        now = time.time()
+        with cls._lock:
+            cls._last_write[sender_id] = now
+            if len(cls._last_write) > 10000:
+                cutoff = now - READ_YOUR_WRITES_SECONDS
+                cls._last_write = {s: t for s, t in cls._last_write.items() if t > cutoff}
+
+    @classmethod
+    def resolve_role(cls, role: Text, sender_id: Optional[Text] = None) -> Text:
+        """Upgrade a read to the writer if this sender wrote recently"""
+        if role == READ and sender_id:
+            last_write = cls._last_write.get(sender_id)
+            if last_write and time.time() - last_write < READ_YOUR_WRITES_SECONDS:
+                return WRITE
+        return role
+
+    @classmethod
+    def get_connection(cls, role: Text = READ, sender_id: Optional[Text] = None):
+        """Check out a pooled connection for the role; raises CircuitOpenError at once while the DB is down.
+
+        Waits up to DB_POOL_WAIT_SECONDS for a free connection, then raises psycopg2.pool.PoolError.
+        """
+        if not cls.is_configured():
+            raise RuntimeError("DatabaseRouter is not configured")
+        if not db_breaker.allow_request():
+            raise CircuitOpenError(db_breaker.name, db_breaker.retry_after())
+
+        pool_role = cls._pool_role(cls.resolve_role(role, sender_id))
+        slots = cls._checkout_slots(pool_role)
+        started = time.monotonic()
+        acquired = slots.acquire(timeout=POOL_WAIT_SECONDS)
+        metrics.observe('db_pool_wait_seconds', time.monotonic() - started, role=pool_role)
+        if not acquired:
+            # Busy, not down - leave the breaker alone
+            db_breaker.release()
+            metrics.inc('db_pool_exhausted_total', role=pool_role)
+            raise psycopg2.pool.PoolError(f"No free {pool_role} connection within {POOL_WAIT_SECONDS}s")
+
+        pool = conn = None
+        try:
+            pool_role, pool = cls._get_pool(pool_role)
+            conn = pool.getconn()
+            conn.set_session(autocommit=False)
+        except psycopg2.OperationalError as e:
+            cls._discard(pool, conn)
+            slots.release()
+            db_breaker.record_failure(e)
+            raise
+        except Exception:
+            cls._discard(pool, conn)
+            slots.release()
+            db_breaker.release()
+            raise
+        db_breaker.record_success()
+        with cls._lock:
+            cls._connection_roles[id(conn)] = (pool_role, pool)
+        return conn
+
+    @classmethod
+    def _discard(cls, pool, conn):
+        """Close a connection that was checked out but never handed to the caller"""
+        if conn is None:
+            return
+        try:
+            pool.putconn(conn, close=True)
+        except Exception as e:
+            logger.debug(f"Error discarding connection: {e}")
+        with cls._lock:
+            if pool in cls._retired:
+                cls._close_if_drained(pool)
+
+    @classmethod
+    def return_connection(cls, conn):
+        """Return a connection to the pool it came from, or close it if it wasn't pooled"""
+        if not conn:
+            return
+        with cls._lock:
+            pool_role, pool = cls._connection_roles.pop(id(conn), (None, None))
+            slots = cls._slots.get(pool_role) if pool_role else None
+        if slots is not None:
+            slots.release()
+        if conn.closed:
+            # The server dropped the connection mid-query
+            db_breaker.record_failure()
+        if pool is None or pool.closed:
+            if not conn.closed:
+                conn.close()
+            return
+        with cls._lock:
+            if pool in cls._retired:
+                pool.putconn(conn, close=True)
+                cls._close_if_drained(pool)
+                return
+        pool.putconn(conn, close=bool(conn.closed))
+        with cls._lock:
+            # Retired while we were returning it
+            if pool in cls._retired:
+                cls._close_if_drained(pool)
+
+
+def connect_from_env(role: Text = WRITE, connect_timeout: int = 10):
+    """Standalone connection for command-line tools (migrations, snapshot export, imports)"""
+    host = os.getenv('AURORA_ENDPOINT') or os.getenv('DB_HOST')
+    if role == READ:
+        host = os.getenv('AURORA_READER_ENDPOINT') or os.getenv('DB_READER_HOST') or host
+    return psycopg2.connect(
+        host=host,
+        database=os.getenv('DB_NAME', 'hospital'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        connect_timeout=connect_timeout
+    )
+
+
+def _on_db_circuit_change(old_state, new_state):
+    if new_state == CircuitBreaker.OPEN:
+        DatabaseRouter.reset_pools()
+
+
+# Shared by DatabaseHelper and RAGRetriever - one view of database health per process
+db_breaker = CircuitBreaker(
+    'aurora',
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_SECONDS,
+    probe=DatabaseRouter.probe,
+    probe_interval=BREAKER_PROBE_SECONDS,
+    failure_exceptions=(psycopg2.OperationalError,),
+    on_state_change=_on_db_circuit_change
+)
+# The checkout slots (DB_POOL_MAX per endpoint, queueing up to DB_POOL_WAIT_SECONDS) already act as the database's bulkhead
+register_dependency('aurora', db_breaker)
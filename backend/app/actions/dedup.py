@@ -0,0 +1,190 @@
+"""
+Duplicate Suppression primitives for the action server
+Sharded expiring sets with FIFO expiry, so reply-path dedup costs O(1) regardless of how many senders are active
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEDUP_SHARDS = int(os.getenv('DEDUP_SHARDS', '32'))
+DEDUP_MAX_ENTRIES = int(os.getenv('DEDUP_MAX_ENTRIES', '100000'))
+
+
+class _Shard:
+    __slots__ = ('lock', 'expiry', 'order')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> expiry time; `order` holds (expiry, key) in insertion order, which is also expiry
+        # order because every entry in a set shares one TTL
+        self.expiry: Dict[Hashable, float] = {}
+        self.order = deque()
+
+
+def _acquire(lock: threading.Lock, name: str):
+    """Take a shard lock, counting how often a caller had to wait for it"""
+    if not lock.acquire(blocking=False):
+        metrics.inc('dedup_lock_contended_total', registry=name)
+        lock.acquire()
+
+
+class ExpiringSet:
+    """Set whose members expire after `ttl` seconds, bounded to `max_entries` members.
+
+    Keys are spread over independent shards (by `shard_key`, e.g. the sender id) so concurrent
+    senders rarely contend on the same lock. Expired members are dropped from the front of each
+    shard's FIFO as new ones are added, so no operation ever scans the whole set. When a shard is
+    full the oldest members are evicted early - dedup degrades, memory does not grow.
+    """
+
+    def __init__(self, ttl: float, shards: int = DEDUP_SHARDS, max_entries: int = DEDUP_MAX_ENTRIES,
+                 clock=time.monotonic, name: str = 'expiring_set'):
+        self.name = name
+        self.ttl = ttl
+        self.clock = clock
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_per_shard = max(1, max_entries // len(self._shards))
+        self.evicted = 0
+
+    def _shard(self, key: Hashable, shard_key: Optional[Hashable]) -> _Shard:
+        return self._shards[hash(key if shard_key is None else shard_key) % len(self._shards)]
+
+    def _purge(self, shard: _Shard, now: float):
+        order, expiry = shard.order, shard.expiry
+        while order and (order[0][0] <= now or len(expiry) > self._max_per_shard):
+            expires_at, key = order.popleft()
+            # Skip stale queue entries left behind when a key was refreshed
+            if expiry.get(key) == expires_at:
+                if expires_at > now:
+                    self.evicted += 1
+                del expiry[key]
+        if len(order) > 2 * self._max_per_shard:
+            # Refresh-heavy workloads leave stale queue entries; rebuild rather than let them pile up
+            shard.order = deque(sorted(((t, k) for k, t in expiry.items()), key=lambda entry: entry[0]))
+
+    def add(self, key: Hashable, shard_key: Optional[Hashable] = None) -> bool:
+        """Add key; returns False if it was already present (i.e. this is a duplicate)"""
+        shard = self._shard(key, shard_key)
+        now = self.clock()
+        _acquire(shard.lock, self.name)
+        try:
+            expires_at = shard.expiry.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            expires_at = now + self.ttl
+            shard.expiry[key] = expires_at
+            shard.order.append((expires_at, key))
+            self._purge(shard, now)
+            return True
+        finally:
+            shard.lock.release()
+
+    def discard(self, key: Hashable, shard_key: Optional[Hashable] = None):
+        """Remove key early (its queue entry is skipped when it reaches the front)"""
+        shard = self._shard(key, shard_key)
+        with shard.lock:
+            shard.expiry.pop(key, None)
+
+    def contains(self, key: Hashable, shard_key: Optional[Hashable] = None) -> bool:
+        shard = self._shard(key, shard_key)
+        expires_at = shard.expiry.get(key)
+        return expires_at is not None and expires_at > self.clock()
+
+    def __len__(self) -> int:
+        return sum(len(shard.expiry) for shard in self._shards)
+
+
+class InFlightCall:
+    """One execution tracked by InFlightRegistry; followers wait on `done` and read `result`"""
+
+    __slots__ = ('key', 'started_at', 'finished_at', 'done', 'result')
+
+    def __init__(self, key: Hashable, started_at: float):
+        self.key = key
+        self.started_at = started_at
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+class InFlightRegistry:
+    """Sharded registry of in-flight executions that lets duplicates share the first one's result.
+
+    `begin` makes the first caller for a key the leader; a caller arriving while the leader runs,
+    or within `window` seconds after it finished, becomes a follower and should `wait` for the
+    leader's result instead of executing again. Entries whose leader never finished are dropped
+    after `stale_after` seconds. Like ExpiringSet, expiry walks each shard's FIFO from the front.
+    """
+
+    def __init__(self, window: float, stale_after: float = 60.0, shards: int = DEDUP_SHARDS,
+                 max_entries: int = DEDUP_MAX_ENTRIES, clock=time.monotonic, name: str = 'in_flight'):
+        self.name = name
+        self.window = window
+        self.stale_after = stale_after
+        self.clock = clock
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_per_shard = max(1, max_entries // len(self._shards))
+
+    def _expired(self, call: InFlightCall, now: float) -> bool:
+        if call.finished_at is not None:
+            return now - call.finished_at > self.window
+        return now - call.started_at > self.stale_after
+
+    def _purge(self, shard: _Shard, now: float):
+        order, calls = shard.order, shard.expiry
+        while order:
+            started_at, key = order[0]
+            call = calls.get(key)
+            if call is not None and call.started_at == started_at:
+                if not self._expired(call, now) and len(calls) <= self._max_per_shard:
+                    break
+                del calls[key]
+            order.popleft()
+
+    def begin(self, key: Hashable, shard_key: Optional[Hashable] = None) -> Tuple[bool, InFlightCall]:
+        """Returns (is_leader, call)"""
+        shard = self._shards[hash(key if shard_key is None else shard_key) % len(self._shards)]
+        now = self.clock()
+        _acquire(shard.lock, self.name)
+        try:
+            self._purge(shard, now)
+            call = shard.expiry.get(key)
+            if call is not None and not self._expired(call, now):
+                return False, call
+            call = InFlightCall(key, now)
+            shard.expiry[key] = call
+            shard.order.append((now, key))
+            return True, call
+        finally:
+            shard.lock.release()
+
+    def finish(self, call: InFlightCall, result: Any):
+        """Publish the leader's result and release any waiting followers"""
+        call.result = result
+        call.finished_at = self.clock()
+        call.done.set()
+
+    def wait(self, call: InFlightCall, timeout: float) -> Tuple[bool, Any]:
+        """Wait for the leader; returns (completed, result)"""
+        started = time.monotonic()
+        completed = call.done.wait(timeout)
+        metrics.observe('in_flight_coalesce_wait_seconds', time.monotonic() - started, registry=self.name)
+        if completed:
+            metrics.inc('in_flight_coalesced_total', registry=self.name)
+        else:
+            metrics.inc('in_flight_coalesce_timeouts_total', registry=self.name)
+        return completed, call.result
+
+    def __len__(self) -> int:
+        return sum(len(shard.expiry) for shard in self._shards)
@@ -0,0 +1,207 @@
+"""
+Declarative Handler Registry for conversational actions
+Handlers declare keyword predicates and data dependencies; one scan of the message picks the winner
+"""
+
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Text
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('action_handler_hits_total', "Turns answered by each registered handler")
+metrics.describe('action_handler_seconds', "Time spent in each handler, dependency fetches included")
+metrics.describe('action_handler_errors_total', "Handler runs that raised")
+metrics.describe('action_handler_dependency_seconds', "Time spent fetching each declared dependency")
+
+
+class KeywordMatcher:
+    """Every keyword of every handler compiled into a single regex.
+
+    `scan` walks the message once and returns the set of keywords it contains, with the same
+    substring semantics as `keyword in text`. The pattern is a lookahead tried at every position, so
+    overlapping keywords are all seen; a longer keyword winning at a position also implies the
+    shorter keywords it starts with.
+    """
+
+    def __init__(self, keywords: Iterable[Text]):
+        self.keywords = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+        self._pattern = None
+        if self.keywords:
+            self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in self.keywords) + "))")
+        self._implied = {k: frozenset(o for o in self.keywords if k.startswith(o)) for k in self.keywords}
+
+    def scan(self, text: Text) -> FrozenSet[Text]:
+        if self._pattern is None:
+            return frozenset()
+        hits = set()
+        for match in self._pattern.finditer(text):
+            hits.update(self._implied[match.group(1)])
+        return frozenset(hits)
+
+
+class Handler:
+    """One registered handler and the predicates that select it"""
+
+    __slots__ = ('name', 'func', 'priority', 'any_of', 'none_of', 'max_length', 'predicate', 'requires')
+
+    def __init__(self, name: Text, func: Callable, priority: int, any_of: Sequence[Text] = (),
+                 none_of: Sequence[Text] = (), max_length: Optional[int] = None,
+                 predicate: Optional[Callable] = None, requires: Sequence[Text] = ()):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.any_of = frozenset(k.lower() for k in any_of)
+        self.none_of = frozenset(k.lower() for k in none_of)
+        self.max_length = max_length
+        self.predicate = predicate
+        self.requires = tuple(requires)
+
+    def matches(self, ctx: 'HandlerContext') -> bool:
+        if self.any_of and not (self.any_of & ctx.hits):
+            return False
+        if self.none_of & ctx.hits:
+            return False
+        if self.max_length is not None and len(ctx.msg_lower.strip()) >= self.max_length:
+            return False
+        return self.predicate is None or bool(self.predicate(ctx))
+
+
+class HandlerContext:
+    """Per-turn state handed to the winning handler.
+
+    Dependencies are fetched on first `get` and memoized for the turn, so a handler that reads the
+    same data from several places triggers one fetch. Only dependencies the handler declared (and
+    what those depend on) can be read, which keeps each handler's data needs visible at registration.
+    """
+
+    def __init__(self, registry: 'HandlerRegistry', action: Any, dispatcher: Any, tracker: Any):
+        self.registry = registry
+        self.action = action
+        self.dispatcher = dispatcher
+        self.tracker = tracker
+        self.sender_id = tracker.sender_id
+        self.text = tracker.latest_message.get("text", "") or ""
+        self.msg_lower = self.text.lower()
+        self.hits = registry.matcher.scan(self.msg_lower)
+        self.handler: Optional[Handler] = None
+        self._allowed: FrozenSet[Text] = frozenset()
+        self._values: Dict[Text, Any] = {}
+
+    def has(self, *keywords: Text) -> bool:
+        """Whether the message contains any of these registered keywords"""
+        return any(k in self.hits for k in keywords)
+
+    def get(self, dependency: Text) -> Any:
+        if dependency not in self._allowed:
+            raise KeyError(f"Handler '{self.handler.name if self.handler else None}' did not declare dependency '{dependency}'")
+        if dependency not in self._values:
+            started = time.monotonic()
+            try:
+                self._values[dependency] = self.registry.providers[dependency](self.action, self)
+            finally:
+                metrics.observe('action_handler_dependency_seconds', time.monotonic() - started,
+                                registry=self.registry.name, dependency=dependency)
+        return self._values[dependency]
+
+
+class HandlerRegistry:
+    """Handlers for one action, ordered by priority (lower runs first, like the old PRIORITY 0/1 blocks).
+
+    A handler registered without predicates is a catch-all and should have the highest priority
+    number. Dependency providers are registered by name with `provider` and receive (action, ctx).
+    Keywords a handler checks with `ctx.has` but doesn't select on are added with `watch`, so they
+    are found by the same single scan.
+    """
+
+    def __init__(self, name: Text):
+        self.name = name
+        self.handlers: List[Handler] = []
+        self.providers: Dict[Text, Callable] = {}
+        self._provider_requires: Dict[Text, Sequence[Text]] = {}
+        self._closure: Dict[Text, FrozenSet[Text]] = {}
+        self._watched: FrozenSet[Text] = frozenset()
+        self.matcher = KeywordMatcher(())
+
+    def _rebuild_matcher(self):
+        self.matcher = KeywordMatcher(self._watched.union(*(h.any_of | h.none_of for h in self.handlers)))
+
+    def handler(self, name: Text, priority: int, any_of: Sequence[Text] = (), none_of: Sequence[Text] = (),
+                max_length: Optional[int] = None, predicate: Optional[Callable] = None,
+                requires: Sequence[Text] = ()):
+        """Decorator registering func(action, ctx) -> events"""
+        def register(func):
+            self.handlers.append(Handler(name, func, priority, any_of, none_of, max_length, predicate, requires))
+            self.handlers.sort(key=lambda h: h.priority)
+            self._rebuild_matcher()
+            self._closure.clear()
+            return func
+        return register
+
+    def watch(self, keywords: Iterable[Text]):
+        """Add keywords to the per-turn scan for handlers that test them with `ctx.has`"""
+        self._watched = self._watched | {k.lower() for k in keywords}
+        self._rebuild_matcher()
+
+    def provider(self, dependency: Text, requires: Sequence[Text] = ()):
+        """Decorator registering the fetcher for a named dependency"""
+        def register(func):
+            self.providers[dependency] = func
+            self._provider_requires[dependency] = tuple(requires)
+            self._closure.clear()
+            return func
+        return register
+
+    def _dependencies(self, handler: Handler) -> FrozenSet[Text]:
+        closure = self._closure.get(handler.name)
+        if closure is None:
+            seen, pending = set(), list(handler.requires)
+            while pending:
+                dependency = pending.pop()
+                if dependency in seen:
+                    continue
+                if dependency not in self.providers:
+                    raise KeyError(f"No provider registered for dependency '{dependency}'")
+                seen.add(dependency)
+                pending.extend(self._provider_requires[dependency])
+            closure = self._closure[handler.name] = frozenset(seen)
+        return closure
+
+    def select(self, ctx: HandlerContext) -> Optional[Handler]:
+        for handler in self.handlers:
+            if handler.matches(ctx):
+                return handler
+        return None
+
+    def dispatch(self, action: Any, dispatcher: Any, tracker: Any,
+                 provided: Optional[Dict[Text, Any]] = None) -> List[Dict[Text, Any]]:
+        """Run the highest-priority handler whose predicates match this turn and return its result.
+
+        `provided` holds dependency values the caller already has; they are used in place of the
+        registered providers.
+        """
+        ctx = HandlerContext(self, action, dispatcher, tracker)
+        ctx._values.update(provided or {})
+        handler = self.select(ctx)
+        if handler is None:
+            logger.warning(f"{self.name}: no handler matched '{ctx.text[:50]}'")
+            return []
+        ctx.handler = handler
+        ctx._allowed = self._dependencies(handler)
+        logger.info(f"{self.name}: dispatching to handler '{handler.name}'")
+        metrics.inc('action_handler_hits_total', registry=self.name, handler=handler.name)
+        started = time.monotonic()
+        try:
+            return handler.func(action, ctx)
+        except Exception:
+            metrics.inc('action_handler_errors_total', registry=self.name, handler=handler.name)
+            raise
+        finally:
+            metrics.observe('action_handler_seconds', time.monotonic() - started,
+                            registry=self.name, handler=handler.name)
@@ -3,15 +3,24 @@ LLM Router: Uses AWS Bedrock to intelligently route queries and generate respons
 This reduces hardcoded logic in actions.py by leveraging LLM intelligence
 """
 
-import boto3
 import json
 import logging
 import os
 from typing import Dict, List, Optional, Any
 import re
 
+try:
+    from .bedrock_invoker import LOW_PRIORITY, get_bedrock_invoker
+    from .resilience import DependencyUnavailable
+except ImportError:
+    from bedrock_invoker import LOW_PRIORITY, get_bedrock_invoker
+    from resilience import DependencyUnavailable
+
 logger = logging.getLogger(__name__)
 
+BEDROCK_INVOKER = get_bedrock_invoker()
+
+
 class LLMRouter:
     """Intelligent router using AWS Bedrock to handle all queries"""
     
@@ -20,10 +29,7 @@ class LLMRouter:
         self.model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
         
         try:
-            self.bedrock_runtime = boto3.client(
-                'bedrock-runtime',
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
-            )
+            self.bedrock_runtime = BEDROCK_INVOKER.client()
             logger.info("LLM Router initialized with Bedrock")
         except Exception as e:
             logger.warning(f"Bedrock not available for LLM Router: {e}")
@@ -168,12 +174,7 @@ Now analyze the user's query:"""
                 ]
             }
             
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(body, model_id=self.model_id, call_site='llm_router.route_query', priority=LOW_PRIORITY)
             content = response_body['content'][0]['text']
             
             # Extract JSON
@@ -185,6 +186,9 @@ Now analyze the user's query:"""
             
             return self._fallback_routing(user_message)
             
+        except DependencyUnavailable as e:
+            logger.info(f"LLM Router using rule-based routing: {e}")
+            return self._fallback_routing(user_message)
         except Exception as e:
             logger.error(f"LLM Router failed: {e}")
             import traceback
@@ -324,16 +328,14 @@ Generate the response:"""
                 ]
             }
             
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(body, model_id=self.model_id, call_site='llm_router.generate_response')
             content = response_body['content'][0]['text']
             
             return content.strip()
             
+        except DependencyUnavailable as e:
+            logger.info(f"LLM response generation using fallback: {e}")
+            return self._generate_fallback_response(action, data, parameters)
         except Exception as e:
             logger.error(f"LLM response generation failed: {e}")
             return self._generate_fallback_response(action, data, parameters)
@@ -0,0 +1,121 @@
+"""
+In-process Metrics for the action server
+Counters, gauges and histograms with labels, rendered in Prometheus text format
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence, Text, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[Text, Text], ...]
+
+
+def _labels(labels: Dict[Text, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[Text, Text]] = None) -> Text:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe metric store; cheap enough to update on every request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Text, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[Text, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[Text, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[Text, Text] = {}
+
+    def describe(self, name: Text, help_text: Text):
+        self._help[name] = help_text
+
+    def inc(self, name: Text, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: Text, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: Text, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def value(self, name: Text, **labels) -> float:
+        """Current counter or gauge value (0 if never set)"""
+        key = _labels(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if key in store.get(name, {}):
+                    return store[name][key]
+        return 0
+
+    def snapshot(self) -> Dict[Text, Any]:
+        """Plain-dict view for JSON endpoints and logs"""
+        with self._lock:
+            result = {}
+            for store in (self._counters, self._gauges):
+                for name, series in store.items():
+                    result[name] = {_format_labels(k) or "total": v for k, v in series.items()}
+            for name, series in self._histograms.items():
+                result[name] = {
+                    _format_labels(k) or "total": {'count': h.count, 'sum': round(h.sum, 6)}
+                    for k, h in series.items()
+                }
+            return result
+
+    def render_prometheus(self) -> Text:
+        lines = []
+        with self._lock:
+            for kind, store in (('counter', self._counters), ('gauge', self._gauges)):
+                for name, series in sorted(store.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# One registry per process, shared by every module that reports metrics
+metrics = MetricsRegistry()
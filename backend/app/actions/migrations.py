@@ -0,0 +1,169 @@
+"""
+Database Migrations for search and query-plan indexes
+Versioned, idempotent schema changes - apply with `python -m actions.migrations`
+"""
+
+import argparse
+import logging
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (version, description, function(cursor)) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = []
+
+
+def migration(version: int, description: str):
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def _columns(cursor, table):
+    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _ensure_extension(cursor, name) -> bool:
+    """Create the extension if we can; managed deployments may not allow it"""
+    try:
+        cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {name}")
+        return True
+    except Exception as e:
+        logger.warning(f"Extension {name} unavailable, search will fall back to ILIKE scans: {e}")
+        return False
+
+
+def _create_index(cursor, name, table, definition):
+    """CREATE INDEX CONCURRENTLY that is safe to re-run after an interrupted build.
+
+    A failed concurrent build leaves an INVALID index behind, which IF NOT EXISTS would then skip
+    for good; drop it first so the build is retried.
+    """
+    cursor.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (name,))
+    if cursor.fetchone():
+        logger.warning(f"Rebuilding invalid index {name} left by an interrupted migration")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+@migration(1, "pg_trgm and tsvector search indexes for doctor and patient names")
+def _search_indexes(cursor):
+    has_trigram = _ensure_extension(cursor, 'pg_trgm')
+
+    doctor_columns = _columns(cursor, 'doctors')
+    if doctor_columns:
+        if has_trigram:
+            for column in ('name', 'specialty', 'department', 'doc_type'):
+                if column in doctor_columns:
+                    _create_index(cursor, f"idx_doctors_{column}_trgm", 'doctors', f"USING gin ({column} gin_trgm_ops)")
+
+        text_columns = [c for c in ('name', 'specialty', 'doc_type', 'department') if c in doctor_columns]
+        if 'search_vector' not in doctor_columns and not text_columns:
+            logger.info("Skipping doctors.search_vector: no text columns to index")
+        else:
+            if 'search_vector' not in doctor_columns:
+                document = " || ' ' || ".join(f"COALESCE({c}, '')" for c in text_columns)
+                cursor.execute(f"""
+                    ALTER TABLE doctors ADD COLUMN search_vector tsvector
+                    GENERATED ALWAYS AS (to_tsvector('simple', {document})) STORED
+                """)
+            _create_index(cursor, 'idx_doctors_search_vector', 'doctors', "USING gin (search_vector)")
+
+    patient_columns = _columns(cursor, 'patients')
+    if patient_columns and has_trigram:
+        if 'name' in patient_columns:
+            _create_index(cursor, 'idx_patients_name_trgm', 'patients', "USING gin (name gin_trgm_ops)")
+        elif {'first_name', 'last_name'} <= patient_columns:
+            # Same expression as search.PATIENT_FULL_NAME
+            _create_index(cursor, 'idx_patients_full_name_trgm', 'patients',
+                          "USING gin ((COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')) gin_trgm_ops)")
+
+
+@migration(2, "composite indexes for slot, appointment, medical record and history access paths")
+def _access_path_indexes(cursor):
+    # (table, index name, definition) - checked by query_plans.py against the canonical queries
+    indexes = [
+        ('availability_slots', 'idx_slots_doctor_date_available',
+         "(doctor_id, date, start_time) WHERE available = true"),
+        ('availability_slots', 'idx_slots_date_available',
+         "(date, start_time) WHERE available = true"),
+        ('appointments', 'idx_appointments_patient_date', "(patient_id, appointment_date DESC)"),
+        ('appointments', 'idx_appointments_doctor_date', "(doctor_id, appointment_date DESC)"),
+        ('medical_records', 'idx_medical_records_patient_date', "(patient_id, record_date DESC)"),
+        ('medical_appointments', 'idx_medical_appointments_patient_date',
+         "(patient_id, appointment_date, appointment_time)"),
+        ('medical_patients', 'idx_medical_patients_user_id', "(user_id)"),
+        ('medical_patients', 'idx_medical_patients_email', "(email)"),
+        ('conversation_history', 'idx_conversation_history_sender_created', "(sender_id, created_at DESC)"),
+    ]
+    for table, name, definition in indexes:
+        if not _columns(cursor, table):
+            logger.info(f"Skipping {name}: table {table} does not exist")
+            continue
+        _create_index(cursor, name, table, definition)
+        cursor.execute(f"ANALYZE {table}")
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(conn, target: int = None) -> List[int]:
+    """Apply pending migrations in order. Runs in autocommit so indexes can be built CONCURRENTLY;
+    every statement is idempotent, so a migration interrupted halfway is safe to re-run."""
+    conn.autocommit = True
+    cursor = conn.cursor()
+    done = applied_versions(cursor)
+    applied = []
+    for version, description, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done or (target is not None and version > target):
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        func(cursor)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        applied.append(version)
+    cursor.close()
+    return applied
+
+
+if __name__ == "__main__":
+    try:
+        from .db_router import connect_from_env
+    except ImportError:
+        from db_router import connect_from_env
+
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--target", type=int, help="Stop after this migration version")
+    parser.add_argument("--list", action="store_true", help="Show migration status and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    connection = connect_from_env()
+    try:
+        if args.list:
+            cursor = connection.cursor()
+            done = applied_versions(cursor)
+            connection.commit()
+            for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+                print(f"{'applied' if version in done else 'pending'}  {version:03d}  {description}")
+        else:
+            applied = apply_migrations(connection, target=args.target)
+            print(f"Applied migrations: {applied or 'none'}")
+    finally:
+        connection.close()
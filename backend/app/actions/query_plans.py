@@ -0,0 +1,219 @@
+"""
+Query Plan Checker for the canonical data access queries
+Runs EXPLAIN on each query against a seeded Postgres and fails if a guarded table falls back to a sequential scan
+"""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Text
+
+try:
+    from .actions import INSURANCE_PLANS_QUERY, DatabaseHelper
+    from .migrations import apply_migrations
+    from .search import SearchCapabilities
+except ImportError:
+    from actions import INSURANCE_PLANS_QUERY, DatabaseHelper
+    from migrations import apply_migrations
+    from search import SearchCapabilities
+
+logger = logging.getLogger(__name__)
+
+
+def _doctors_by_specialty(cursor, specialty):
+    columns = SearchCapabilities.table_columns(cursor, 'doctors')
+    return DatabaseHelper._doctor_query('doctors', columns, specialty=specialty)
+
+
+def _doctor_by_name(cursor, name):
+    columns = SearchCapabilities.table_columns(cursor, 'doctors')
+    name_col = 'name' if 'name' in columns else 'doctor_name'
+    return DatabaseHelper._doctor_by_name_query(cursor, 'doctors', name_col, name)
+
+
+# Each entry mirrors a query in DatabaseHelper / RAGRetriever. `build(cursor, sample_value)` returns
+# (sql, params) from the same builder the app uses; entries without one give their `sql` verbatim.
+# `sample` picks a representative parameter value from the seeded data; `guarded` tables must
+# never be seq-scanned.
+CANONICAL_QUERIES: List[Dict[Text, Any]] = [
+    {
+        'name': 'availability_by_doctor',
+        'source': 'DatabaseHelper.get_availability_slots(doctor_id=...)',
+        'guarded': ['availability_slots'],
+        'sample': "SELECT doctor_id FROM availability_slots WHERE available = true GROUP BY doctor_id ORDER BY count(*) DESC LIMIT 1",
+        'build': lambda cursor, doctor_id: DatabaseHelper._availability_query(doctor_id=doctor_id),
+    },
+    {
+        'name': 'availability_next_week',
+        'source': 'DatabaseHelper.get_availability_slots()',
+        'guarded': ['availability_slots'],
+        'sample': None,
+        'build': lambda cursor, _: DatabaseHelper._availability_query(),
+    },
+    {
+        'name': 'availability_by_specialty',
+        'source': 'DatabaseHelper.get_availability_slots(specialty=...) (needs pg_trgm)',
+        'guarded': ['availability_slots', 'doctors'],
+        'requires_extension': 'pg_trgm',
+        'sample': "SELECT doc_type FROM doctors WHERE doc_type IS NOT NULL GROUP BY doc_type ORDER BY count(*) LIMIT 1",
+        'build': lambda cursor, specialty: DatabaseHelper._availability_query(specialty=specialty),
+    },
+    {
+        'name': 'doctors_by_specialty',
+        'source': 'DatabaseHelper.get_doctors(specialty=...) (needs pg_trgm)',
+        'guarded': ['doctors'],
+        'requires_extension': 'pg_trgm',
+        'sample': "SELECT doc_type FROM doctors WHERE doc_type IS NOT NULL GROUP BY doc_type ORDER BY count(*) LIMIT 1",
+        'build': _doctors_by_specialty,
+    },
+    {
+        'name': 'doctor_by_name',
+        'source': 'DatabaseHelper.get_doctor_by_name (needs pg_trgm)',
+        'guarded': ['doctors'],
+        'requires_extension': 'pg_trgm',
+        'sample': "SELECT split_part(name, ' ', 2) FROM doctors WHERE name LIKE '% %' LIMIT 1",
+        'build': _doctor_by_name,
+    },
+    {
+        # A handful of rows, so a Seq Scan is the right plan; EXPLAIN still checks the query
+        # against the schema
+        'name': 'insurance_plans',
+        'source': 'DatabaseHelper.get_insurance_plans',
+        'guarded': [],
+        'sample': None,
+        'build': lambda cursor, _: (INSURANCE_PLANS_QUERY, []),
+    },
+    {
+        'name': 'appointments_by_patient',
+        'source': 'RAGRetriever.retrieve_appointments(patient_id=...)',
+        'guarded': ['appointments'],
+        'sample': "SELECT patient_id FROM appointments WHERE patient_id IS NOT NULL LIMIT 1",
+        'sql': """
+            SELECT appointment_id, patient_id, doctor_id, appointment_date, status, notes
+            FROM appointments WHERE patient_id = %s
+            ORDER BY appointment_date DESC LIMIT 10
+        """,
+    },
+    {
+        'name': 'appointments_by_doctor',
+        'source': 'RAGRetriever.retrieve_appointments(doctor_id=...)',
+        'guarded': ['appointments'],
+        'sample': "SELECT doctor_id FROM appointments WHERE doctor_id IS NOT NULL LIMIT 1",
+        'sql': """
+            SELECT appointment_id, patient_id, doctor_id, appointment_date, status, notes
+            FROM appointments WHERE doctor_id = %s
+            ORDER BY appointment_date DESC LIMIT 10
+        """,
+    },
+    {
+        'name': 'medical_records_by_patient',
+        'source': 'RAGRetriever.retrieve_medical_records',
+        'guarded': ['medical_records'],
+        'sample': "SELECT patient_id FROM medical_records WHERE patient_id IS NOT NULL LIMIT 1",
+        'sql': """
+            SELECT record_id, patient_id, record_type, record_date, diagnosis, treatment, notes
+            FROM medical_records WHERE patient_id = %s
+            ORDER BY record_date DESC LIMIT 10
+        """,
+    },
+    {
+        'name': 'conversation_history_by_sender',
+        'source': 'DatabaseHelper.get_conversation_history',
+        'guarded': ['conversation_history'],
+        'sample': "SELECT sender_id FROM conversation_history LIMIT 1",
+        'sql': """
+            SELECT user_message, bot_response, intent, entities, created_at
+            FROM conversation_history WHERE sender_id = %s
+            ORDER BY created_at DESC LIMIT 5
+        """,
+    },
+]
+
+
+def _seq_scans(plan: Dict[Text, Any]) -> List[Text]:
+    """Relations read with a Seq Scan anywhere in the plan tree"""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _table_exists(cursor, table: Text) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def check_query_plans(conn, names: Optional[List[Text]] = None) -> List[Text]:
+    """Return a list of failures (empty means every guarded table used an index)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT extname FROM pg_extension")
+    extensions = {row[0] for row in cursor.fetchall()}
+    failures = []
+
+    for query in CANONICAL_QUERIES:
+        if names and query['name'] not in names:
+            continue
+        if not all(_table_exists(cursor, table) for table in query['guarded']):
+            print(f"SKIP  {query['name']}: table missing")
+            continue
+        if query.get('requires_extension') and query['requires_extension'] not in extensions:
+            print(f"SKIP  {query['name']}: {query['requires_extension']} not installed")
+            continue
+
+        sample = None
+        if query['sample']:
+            cursor.execute(query['sample'])
+            row = cursor.fetchone()
+            if not row:
+                print(f"SKIP  {query['name']}: no seed data")
+                continue
+            sample = row[0]
+
+        if 'build' in query:
+            sql, params = query['build'](cursor, sample)
+        else:
+            sql, params = query['sql'], [sample] if query['sample'] else []
+
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params or None)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scanned = [t for t in _seq_scans(plan[0]['Plan']) if t in query['guarded']]
+        if scanned:
+            failures.append(f"{query['name']} ({query['source']}): Seq Scan on {', '.join(scanned)}")
+            print(f"FAIL  {query['name']}: Seq Scan on {', '.join(scanned)}")
+        else:
+            print(f"OK    {query['name']}")
+
+    conn.rollback()
+    cursor.close()
+    return failures
+
+
+if __name__ == "__main__":
+    try:
+        from .db_router import connect_from_env
+    except ImportError:
+        from db_router import connect_from_env
+
+    parser = argparse.ArgumentParser(description="EXPLAIN the canonical queries and fail on sequential scans")
+    parser.add_argument("--migrate", action="store_true", help="Apply pending migrations first")
+    parser.add_argument("--query", action="append", help="Only check the named query (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    connection = connect_from_env()
+    try:
+        if args.migrate:
+            apply_migrations(connection)
+            connection.autocommit = False
+        problems = check_query_plans(connection, args.query)
+    finally:
+        connection.close()
+
+    if problems:
+        print("\nQuery plan regressions:\n  " + "\n  ".join(problems))
+        sys.exit(1)
@@ -4,11 +4,19 @@ Retrieves relevant context from database and APIs to generate intelligent respon
 """
 
 import logging
-import psycopg2
 from typing import List, Dict, Text, Any, Optional
 from datetime import datetime
 import os
 
+try:
+    from .db_router import DatabaseRouter, READ
+    from .resilience import CircuitOpenError
+    from .search import SearchCapabilities, text_match, doctor_vector_match, combine, patient_name_column
+except ImportError:
+    from db_router import DatabaseRouter, READ
+    from resilience import CircuitOpenError
+    from search import SearchCapabilities, text_match, doctor_vector_match, combine, patient_name_column
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -25,20 +33,31 @@ class RAGRetriever:
     """Retrieval component of RAG system - fetches relevant context from database"""
     
     @staticmethod
-    def get_connection():
-        """Get database connection"""
-        if not DB_CONFIG.get('host') or not DB_CONFIG.get('password'):
-            logger.warning("Database configuration incomplete")
-            return None
+    def get_connection(role=READ):
+        """Get database connection - RAG retrieval is read-only, so this goes to the reader endpoint"""
+        if not DatabaseRouter.is_configured():
+            if not DB_CONFIG.get('host') or not DB_CONFIG.get('password'):
+                logger.warning("Database configuration incomplete")
+                return None
+            DatabaseRouter.configure(DB_CONFIG)
         
         try:
-            config = DB_CONFIG.copy()
-            config['connect_timeout'] = 5
-            return psycopg2.connect(**config)
+            return DatabaseRouter.get_connection(role)
+        except CircuitOpenError:
+            # Database is known to be down - callers fall back immediately
+            return None
         except Exception as e:
             logger.error(f"Database connection error: {e}")
             return None
     
+    @staticmethod
+    def return_connection(conn):
+        """Return connection to its pool"""
+        try:
+            DatabaseRouter.return_connection(conn)
+        except Exception as e:
+            logger.error(f"Error returning connection: {e}")
+    
     @staticmethod
     def retrieve_doctors(query: str, specialty: Optional[str] = None, limit: int = 5) -> List[Dict]:
         """Retrieve relevant doctors based on query"""
@@ -50,23 +69,24 @@ class RAGRetriever:
             cursor = conn.cursor()
             cursor.execute("SET statement_timeout = '3s'")
             
+            # Index-backed search: trigram-ranked ILIKE, plus full-text match on free-form queries
             if specialty:
-                query_sql = """
-                    SELECT doctor_id, name, specialty, department, email, phone, experience_years, rating
-                    FROM doctors
-                    WHERE LOWER(specialty) LIKE LOWER(%s) OR LOWER(department) LIKE LOWER(%s)
-                    LIMIT %s
-                """
-                cursor.execute(query_sql, (f'%{specialty}%', f'%{specialty}%', limit))
+                clause = text_match(cursor, ['specialty', 'department'], specialty)
             else:
-                query_sql = """
-                    SELECT doctor_id, name, specialty, department, email, phone, experience_years, rating
-                    FROM doctors
-                    WHERE LOWER(name) LIKE LOWER(%s) OR LOWER(specialty) LIKE LOWER(%s) OR LOWER(department) LIKE LOWER(%s)
-                    LIMIT %s
-                """
-                search_term = f'%{query}%'
-                cursor.execute(query_sql, (search_term, search_term, search_term, limit))
+                clause = combine(
+                    text_match(cursor, ['name', 'specialty', 'department'], query),
+                    doctor_vector_match(cursor, query)
+                )
+            columns = SearchCapabilities.table_columns(cursor, 'doctors')
+            experience_col = 'experience_years' if 'experience_years' in columns else ('experience' if 'experience' in columns else 'NULL')
+            query_sql = f"""
+                SELECT doctor_id, name, specialty, department, email, phone, {experience_col}, rating
+                FROM doctors
+                WHERE {clause.where}
+                ORDER BY {clause.order or 'name'}
+                LIMIT %s
+            """
+            cursor.execute(query_sql, clause.where_params + clause.order_params + [limit])
             
             results = cursor.fetchall()
             doctors = []
@@ -83,14 +103,11 @@ class RAGRetriever:
                 })
             
             cursor.close()
-            conn.close()
+            RAGRetriever.return_connection(conn)
             return doctors
         except Exception as e:
             logger.error(f"Error retrieving doctors: {e}")
-            try:
-                conn.close()
-            except:
-                pass
+            RAGRetriever.return_connection(conn)
             return []
     
     @staticmethod
@@ -104,14 +121,20 @@ class RAGRetriever:
             cursor = conn.cursor()
             cursor.execute("SET statement_timeout = '3s'")
             
-            query_sql = """
-                SELECT patient_id, name, age, gender, medical_history
+            columns = SearchCapabilities.table_columns(cursor, 'patients')
+            name_col = patient_name_column(cursor)
+            clause = text_match(cursor, [name_col], query, fuzzy=True)
+            query_sql = f"""
+                SELECT patient_id, {name_col} AS name,
+                       {'age' if 'age' in columns else 'NULL'},
+                       {'gender' if 'gender' in columns else 'NULL'},
+                       {'medical_history' if 'medical_history' in columns else 'NULL'}
                 FROM patients
-                WHERE LOWER(name) LIKE LOWER(%s)
+                WHERE {clause.where}
+                ORDER BY {clause.order or 'patient_id'}
                 LIMIT %s
             """
-            search_term = f'%{query}%'
-            cursor.execute(query_sql, (search_term, limit))
+            cursor.execute(query_sql, clause.where_params + clause.order_params + [limit])
             
             results = cursor.fetchall()
             patients = []
@@ -125,14 +148,11 @@ class RAGRetriever:
                 })
             
             cursor.close()
-            conn.close()
+            RAGRetriever.return_connection(conn)
             return patients
         except Exception as e:
             logger.error(f"Error retrieving patients: {e}")
-            try:
-                conn.close()
-            except:
-                pass
+            RAGRetriever.return_connection(conn)
             return []
     
     @staticmethod
@@ -183,14 +203,11 @@ class RAGRetriever:
                 })
             
             cursor.close()
-            conn.close()
+            RAGRetriever.return_connection(conn)
             return appointments
         except Exception as e:
             logger.error(f"Error retrieving appointments: {e}")
-            try:
-                conn.close()
-            except:
-                pass
+            RAGRetriever.return_connection(conn)
             return []
     
     @staticmethod
@@ -228,14 +245,11 @@ class RAGRetriever:
                 })
             
             cursor.close()
-            conn.close()
+            RAGRetriever.return_connection(conn)
             return records
         except Exception as e:
             logger.error(f"Error retrieving medical records: {e}")
-            try:
-                conn.close()
-            except:
-                pass
+            RAGRetriever.return_connection(conn)
             return []
     
     @staticmethod
@@ -0,0 +1,438 @@
+"""
+Resilience primitives for external dependencies
+Circuit breakers that fail fast once a dependency is known to be down, bulkheads that cap concurrent calls, and a shared registry of both
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Text, Tuple, Type
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    from botocore.exceptions import ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+    # botocore raises these when AWS could not be reached; its other exceptions (parameter validation,
+    # missing credentials, ...) are local problems that retrying or tripping a circuit won't fix
+    AWS_CONNECTION_ERRORS: Tuple[Type[BaseException], ...] = (
+        EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError, ConnectionClosedError
+    )
+except ImportError:
+    AWS_CONNECTION_ERRORS = ()
+
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+metrics.describe('dependency_circuit_state', "Circuit state per dependency: 0 closed, 1 half-open, 2 open")
+metrics.describe('dependency_circuit_transitions_total', "Circuit state changes per dependency")
+metrics.describe('dependency_bulkhead_in_use', "Concurrent calls in flight per dependency")
+metrics.describe('dependency_calls_total', "Dependency calls by outcome (ok, failure, error, open, full, fallback)")
+metrics.describe('dependency_call_seconds', "Latency of dependency calls that were let through")
+
+
+class DependencyUnavailable(Exception):
+    """A call was refused without reaching the dependency; callers take their fallback path"""
+
+    def __init__(self, name: Text, message: Text, retry_after: float = 0.0):
+        super().__init__(message)
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(DependencyUnavailable):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: Text, retry_after: float = 0.0):
+        super().__init__(name, f"Circuit '{name}' is open", retry_after)
+
+
+class BulkheadFullError(DependencyUnavailable):
+    """Raised when a dependency already has its maximum number of calls in flight"""
+
+    def __init__(self, name: Text, limit: int):
+        super().__init__(name, f"Bulkhead '{name}' is full ({limit} calls in flight)")
+        self.limit = limit
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open lets one trial call (or a background probe) through"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: Text, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe: Optional[Callable[[], Any]] = None, probe_interval: float = 5.0,
+                 failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+                 on_state_change: Optional[Callable[[Text, Text], None]] = None,
+                 is_failure: Optional[Callable[[BaseException], bool]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.failure_exceptions = failure_exceptions
+        self.on_state_change = on_state_change
+        # Narrows failure_exceptions further, e.g. to count throttling but not validation errors
+        self.is_failure = is_failure
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_progress = False
+        self._probe_thread = None
+        self._lock = threading.Lock()
+        metrics.set_gauge('dependency_circuit_state', 0, dependency=name)
+
+    @property
+    def state(self) -> Text:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Cheap check on the hot path - no I/O, just state"""
+        if self._state == self.CLOSED:
+            return True
+        change = None
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                change = self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                allowed = True
+            else:
+                allowed = self._state == self.CLOSED
+        self._notify(change)
+        return allowed
+
+    def retry_after(self) -> float:
+        if self._state == self.CLOSED:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.time() - self._opened_at))
+
+    def record_success(self):
+        if self._state == self.CLOSED and self._failures == 0:
+            return
+        change = None
+        with self._lock:
+            self._failures = 0
+            self._trial_in_progress = False
+            if self._state != self.CLOSED:
+                change = self._transition(self.CLOSED)
+        self._notify(change)
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        change = None
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.time()
+                change = self._transition(self.OPEN, error)
+            elif self._state == self.OPEN:
+                self._opened_at = time.time()
+        self._notify(change)
+
+    def release(self):
+        """End a half-open trial without judging health (the call failed for unrelated reasons)"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def counts_as_failure(self, error: BaseException) -> bool:
+        if not isinstance(error, self.failure_exceptions):
+            return False
+        return self.is_failure is None or self.is_failure(error)
+
+    def record_outcome(self, error: Optional[BaseException]):
+        """Judge a finished call: success, dependency failure, or neither (e.g. bad input)"""
+        if error is None:
+            self.record_success()
+        elif self.counts_as_failure(error):
+            self.record_failure(error)
+        else:
+            self.release()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func through the breaker; raises CircuitOpenError without calling it when open"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record_outcome(e)
+            raise
+        self.record_success()
+        return result
+
+    def _transition(self, new_state: Text, error: Optional[BaseException] = None) -> Optional[Tuple[Text, Text]]:
+        """Must be called with the lock held; returns the (old, new) change to hand to _notify once it is released"""
+        old_state = self._state
+        if old_state == new_state:
+            return None
+        self._state = new_state
+        metrics.set_gauge('dependency_circuit_state', CIRCUIT_STATE_VALUES[new_state], dependency=self.name)
+        metrics.inc('dependency_circuit_transitions_total', dependency=self.name, to=new_state)
+        if new_state == self.OPEN:
+            logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures: {error}")
+            self._start_probe()
+        else:
+            logger.info(f"Circuit '{self.name}' {old_state} -> {new_state}")
+        return old_state, new_state
+
+    def _notify(self, change: Optional[Tuple[Text, Text]]):
+        """Run the state change hook outside the lock, so a slow hook never stalls allow_request()"""
+        if change is None or not self.on_state_change:
+            return
+        try:
+            self.on_state_change(*change)
+        except Exception as e:
+            logger.error(f"Circuit '{self.name}' state change hook failed: {e}")
+
+    def _start_probe(self):
+        """Detect recovery in the background so callers never pay for the health check"""
+        if not self.probe or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            if self._state == self.CLOSED:
+                return
+            try:
+                self.probe()
+            except Exception as e:
+                logger.debug(f"Circuit '{self.name}' probe failed: {e}")
+                with self._lock:
+                    if self._state != self.CLOSED:
+                        self._opened_at = time.time()
+                continue
+            logger.info(f"Circuit '{self.name}' probe succeeded, closing")
+            self.record_success()
+            return
+
+
+class Bulkhead:
+    """Caps concurrent calls to one dependency so a slow dependency can't take every worker thread.
+
+    Callers over the limit wait up to `max_wait` seconds for a slot, then get BulkheadFullError.
+    """
+
+    def __init__(self, name: Text, max_concurrent: int, max_wait: float = 0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.in_use = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.in_use += delta
+            metrics.set_gauge('dependency_bulkhead_in_use', self.in_use, dependency=self.name)
+
+    def acquire(self):
+        if self.max_wait > 0:
+            acquired = self._slots.acquire(timeout=self.max_wait)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise BulkheadFullError(self.name, self.max_concurrent)
+        self._track(1)
+
+    async def acquire_async(self):
+        """Like acquire, but waits on the event loop instead of blocking it"""
+        deadline = time.monotonic() + self.max_wait
+        delay = 0.005
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() + delay > deadline:
+                raise BulkheadFullError(self.name, self.max_concurrent)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        self._track(1)
+
+    def release(self):
+        self._track(-1)
+        self._slots.release()
+
+
+class Dependency:
+    """One external dependency: its circuit breaker, optional bulkhead and per-call metrics.
+
+    `fallback` (per call) runs instead of the dependency when the call is refused because the circuit
+    is open or the bulkhead is full - the place to plug in the rule-based path. Failures of calls that
+    did go through still raise, so callers' existing error handling is unchanged.
+    """
+
+    def __init__(self, name: Text, breaker: CircuitBreaker, bulkhead: Optional[Bulkhead] = None):
+        self.name = name
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+
+    def _refused(self, error: DependencyUnavailable, fallback: Optional[Callable[[], Any]]) -> Any:
+        metrics.inc('dependency_calls_total', dependency=self.name,
+                    outcome='open' if isinstance(error, CircuitOpenError) else 'full')
+        if fallback is None:
+            raise error
+        logger.info(f"{error}; using fallback")
+        metrics.inc('dependency_calls_total', dependency=self.name, outcome='fallback')
+        return fallback()
+
+    def _admit(self):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+
+    def _finish(self, started: float, error: Optional[BaseException]):
+        self.breaker.record_outcome(error)
+        if error is None:
+            outcome = 'ok'
+        else:
+            outcome = 'failure' if self.breaker.counts_as_failure(error) else 'error'
+        metrics.inc('dependency_calls_total', dependency=self.name, outcome=outcome)
+        metrics.observe('dependency_call_seconds', time.monotonic() - started, dependency=self.name)
+
+    def call(self, func: Callable[..., Any], *args, fallback: Optional[Callable[[], Any]] = None, **kwargs) -> Any:
+        try:
+            if self.bulkhead:
+                self.bulkhead.acquire()
+            try:
+                self._admit()
+            except CircuitOpenError:
+                if self.bulkhead:
+                    self.bulkhead.release()
+                raise
+        except DependencyUnavailable as e:
+            return self._refused(e, fallback)
+
+        started, error = time.monotonic(), None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(started, error)
+            if self.bulkhead:
+                self.bulkhead.release()
+
+    async def call_async(self, func: Callable[..., Any], *args, fallback: Optional[Callable[[], Any]] = None,
+                         **kwargs) -> Any:
+        """call() for coroutine functions"""
+        try:
+            if self.bulkhead:
+                await self.bulkhead.acquire_async()
+            try:
+                self._admit()
+            except CircuitOpenError:
+                if self.bulkhead:
+                    self.bulkhead.release()
+                raise
+        except DependencyUnavailable as e:
+            return self._refused(e, fallback)
+
+        started, error = time.monotonic(), None
+        try:
+            return await func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(started, error)
+            if self.bulkhead:
+                self.bulkhead.release()
+
+    def status(self) -> Dict[Text, Any]:
+        return {
+            'breaker': self.breaker.state,
+            'retry_after': round(self.breaker.retry_after(), 1),
+            'in_flight': self.bulkhead.in_use if self.bulkhead else None,
+            'max_concurrent': self.bulkhead.max_concurrent if self.bulkhead else None,
+        }
+
+
+# AWS error codes that mean the service is struggling, as opposed to a bad request or missing access
+AWS_UNHEALTHY_CODES = frozenset({
+    'ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException', 'ServiceUnavailable',
+    'InternalServerException', 'InternalFailure', 'ModelTimeoutException', 'ModelNotReadyException',
+    'RequestTimeout', 'RequestTimeoutException',
+})
+AWS_THROTTLE_CODES = frozenset({'ThrottlingException', 'TooManyRequestsException'})
+
+
+def is_aws_outage(error: BaseException) -> bool:
+    """True for throttling, 5xx and connection/timeout errors from boto3; False for validation, credential or access errors"""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict) and 'Error' in response:
+        return response['Error'].get('Code') in AWS_UNHEALTHY_CODES
+    # botocore's connection and timeout errors carry no error response
+    return isinstance(error, (OSError, TimeoutError) + AWS_CONNECTION_ERRORS)
+
+
+def is_aws_server_failure(error: BaseException) -> bool:
+    """is_aws_outage without throttling - for callers that slow down on throttles rather than trip the circuit"""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict) and response.get('Error', {}).get('Code') in AWS_THROTTLE_CODES:
+        return False
+    return is_aws_outage(error)
+
+
+def is_http_outage(error: BaseException) -> bool:
+    """True for connection errors, timeouts, 429 and 5xx; a 4xx means the request was wrong, not the server"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is None or status == 429 or status >= 500
+
+
+# Per-dependency defaults; each can be overridden with {NAME}_BREAKER_FAILURES, {NAME}_BREAKER_RESET_SECONDS,
+# {NAME}_BULKHEAD (max concurrent calls, 0 = no bulkhead) and {NAME}_BULKHEAD_WAIT (seconds)
+DEPENDENCY_DEFAULTS: Dict[Text, Dict[Text, Any]] = {
+    'bedrock': {'failures': 5, 'reset': 30.0, 'bulkhead': 16, 'wait': 2.0, 'is_failure': is_aws_server_failure},
+    # Hedged duplicates of slow Bedrock requests; optional, so they never queue for the bulkhead
+    'bedrock_hedge': {'failures': 5, 'reset': 30.0, 'bulkhead': 8, 'wait': 0.0, 'is_failure': is_aws_server_failure},
+    'comprehend': {'failures': 5, 'reset': 30.0, 'bulkhead': 8, 'wait': 0.5, 'is_failure': is_aws_outage},
+    'comprehend_medical': {'failures': 5, 'reset': 30.0, 'bulkhead': 8, 'wait': 0.5, 'is_failure': is_aws_outage},
+    'dummy_api': {'failures': 3, 'reset': 30.0, 'bulkhead': 8, 'wait': 1.0, 'is_failure': is_http_outage},
+}
+
+_dependencies: Dict[Text, Dependency] = {}
+_registry_lock = threading.Lock()
+
+
+def register_dependency(name: Text, breaker: CircuitBreaker, bulkhead: Optional[Bulkhead] = None) -> Dependency:
+    """Add an existing breaker (e.g. the database's) to the registry so it is reported with the rest"""
+    with _registry_lock:
+        dependency = _dependencies[name] = Dependency(name, breaker, bulkhead)
+        return dependency
+
+
+def get_dependency(name: Text) -> Dependency:
+    """The process-wide Dependency for a name, created from DEPENDENCY_DEFAULTS and the environment on first use"""
+    dependency = _dependencies.get(name)
+    if dependency is not None:
+        return dependency
+    with _registry_lock:
+        dependency = _dependencies.get(name)
+        if dependency is None:
+            defaults = DEPENDENCY_DEFAULTS.get(name, {})
+            prefix = name.upper()
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(f'{prefix}_BREAKER_FAILURES', defaults.get('failures', 5))),
+                reset_timeout=float(os.getenv(f'{prefix}_BREAKER_RESET_SECONDS', defaults.get('reset', 30.0))),
+                is_failure=defaults.get('is_failure')
+            )
+            max_concurrent = int(os.getenv(f'{prefix}_BULKHEAD', defaults.get('bulkhead', 0)))
+            bulkhead = None
+            if max_concurrent > 0:
+                bulkhead = Bulkhead(name, max_concurrent, float(os.getenv(f'{prefix}_BULKHEAD_WAIT', defaults.get('wait', 0.0))))
+            dependency = _dependencies[name] = Dependency(name, breaker, bulkhead)
+        return dependency
+
+
+def dependency_status() -> Dict[Text, Dict[Text, Any]]:
+    return {name: dependency.status() for name, dependency in sorted(_dependencies.items())}
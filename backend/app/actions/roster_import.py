@@ -0,0 +1,418 @@
+"""
+Roster Import for onboarding clinics in bulk
+Streams doctor and availability CSV/JSON-lines files through COPY into staging tables and merges them in one transaction
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from datetime import date, time as dtime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterator, Optional, Text, Tuple
+
+try:
+    from .search import SearchCapabilities
+    from .snapshot_store import SNAPSHOT_PATH, export_snapshot
+except ImportError:
+    from search import SearchCapabilities
+    from snapshot_store import SNAPSHOT_PATH, export_snapshot
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+# Advisory lock key serialising roster imports; bookings never take it, so they are not blocked
+IMPORT_LOCK_KEY = 0x526f7374  # 'Rost'
+
+
+class RejectedRow(ValueError):
+    pass
+
+
+def _text(max_length: int):
+    def parse(value):
+        value = str(value).strip()
+        if len(value) > max_length:
+            raise RejectedRow(f"longer than {max_length} characters")
+        return value
+    return parse
+
+
+def _email(value):
+    value = str(value).strip().lower()
+    if '@' not in value or len(value) > 255:
+        raise RejectedRow("not an email address")
+    return value
+
+
+def _number(low, high, integer=False):
+    def parse(value):
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            raise RejectedRow("not a number")
+        if not low <= number <= high:
+            raise RejectedRow(f"outside {low}..{high}")
+        if integer:
+            if number != number.to_integral_value():
+                raise RejectedRow("not a whole number")
+            return int(number)
+        return number
+    return parse
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RejectedRow("not an ISO date (YYYY-MM-DD)")
+
+
+def _time(value):
+    try:
+        return dtime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RejectedRow("not a time (HH:MM[:SS])")
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', 't', 'yes', 'y', '1'):
+        return True
+    if text in ('false', 'f', 'no', 'n', '0'):
+        return False
+    raise RejectedRow("not a boolean")
+
+
+# (field, parser, required) - staging table columns are created in this order after `line`
+DOCTOR_FIELDS = [
+    ('email', _email, True),
+    ('name', _text(255), True),
+    ('phone', _text(50), False),
+    ('specialty', _text(255), False),
+    ('doc_type', _text(255), False),
+    ('department', _text(255), False),
+    ('rating', _number(0, 5), False),
+    ('experience', _number(0, 80, integer=True), False),
+]
+DOCTOR_STAGING = """
+    CREATE TEMP TABLE roster_doctors (
+        line INTEGER, email TEXT, name TEXT, phone TEXT, specialty TEXT, doc_type TEXT,
+        department TEXT, rating NUMERIC, experience INTEGER
+    ) ON COMMIT DROP
+"""
+
+SLOT_FIELDS = [
+    ('doctor_id', _number(1, 2 ** 31 - 1, integer=True), False),
+    ('doctor_email', _email, False),
+    ('date', _date, True),
+    ('start_time', _time, True),
+    ('end_time', _time, True),
+    ('available', _bool, False),
+]
+SLOT_STAGING = """
+    CREATE TEMP TABLE roster_slots (
+        line INTEGER, doctor_id INTEGER, doctor_email TEXT, date DATE,
+        start_time TIME, end_time TIME, available BOOLEAN
+    ) ON COMMIT DROP
+"""
+
+
+def _validate_slot(values: Dict[Text, Any]):
+    if values['doctor_id'] is None and values['doctor_email'] is None:
+        raise RejectedRow("needs doctor_id or doctor_email")
+    if values['end_time'] <= values['start_time']:
+        raise RejectedRow("end_time must be after start_time")
+    if values['available'] is None:
+        values['available'] = True
+
+
+class ImportReport:
+    """Counts and row-level rejects for one import run"""
+
+    def __init__(self, rejects_out=None, max_rejects: Optional[int] = None):
+        self.rejects_out = rejects_out
+        self.max_rejects = max_rejects
+        self.read = 0
+        self.staged = 0
+        self.rejected = 0
+        self.merged: Dict[Text, int] = {}
+        self.started = time.time()
+
+    def reject(self, source: Text, line: int, reason: Text, row: Any = None):
+        self.rejected += 1
+        if self.rejects_out:
+            self.rejects_out.write(json.dumps({'source': source, 'line': line, 'reason': reason, 'row': row},
+                                              default=str) + "\n")
+        elif self.rejected <= 20:
+            logger.warning(f"Rejected {source}:{line}: {reason}")
+        if self.max_rejects is not None and self.rejected > self.max_rejects:
+            raise RuntimeError(f"More than {self.max_rejects} rejected rows, aborting import")
+
+    def progress(self, source: Text):
+        elapsed = max(time.time() - self.started, 0.001)
+        logger.info(f"{source}: {self.read} read, {self.staged} staged, {self.rejected} rejected "
+                    f"({self.read / elapsed:,.0f} rows/s)")
+
+    def summary(self) -> Text:
+        merged = ", ".join(f"{key} {count}" for key, count in self.merged.items()) or "nothing merged"
+        return (f"{self.read} rows read, {self.staged} staged, {self.rejected} rejected; {merged} "
+                f"in {time.time() - self.started:.1f}s")
+
+
+def read_rows(path: Text, fmt: Optional[Text] = None) -> Iterator[Tuple[int, Dict[Text, Any]]]:
+    """Yield (line number, row) from a CSV or JSON-lines file without loading it into memory"""
+    if fmt is None:
+        fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+    handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, {'__error__': f"invalid JSON: {e}"}
+                    continue
+                yield line_number, row if isinstance(row, dict) else {'__error__': "not a JSON object"}
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def _parse(row: Dict[Text, Any], fields) -> Dict[Text, Any]:
+    if '__error__' in row:
+        raise RejectedRow(row['__error__'])
+    values = {}
+    for name, parser, required in fields:
+        raw = row.get(name)
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            if required:
+                raise RejectedRow(f"missing {name}")
+            values[name] = None
+        else:
+            try:
+                values[name] = parser(raw)
+            except RejectedRow as e:
+                raise RejectedRow(f"{name}: {e}")
+    return values
+
+
+def stage(cursor, rows: Iterator[Tuple[int, Dict[Text, Any]]], source: Text, table: Text, fields,
+          report: ImportReport, validate: Optional[Callable] = None, batch_size: int = BATCH_SIZE):
+    """Validate rows in batches and COPY each valid batch into the staging table"""
+    columns = ['line'] + [name for name, _, _ in fields]
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+
+    def flush():
+        nonlocal buffer, writer, pending
+        if pending:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            report.staged += pending
+            report.progress(source)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+
+    for line, row in rows:
+        report.read += 1
+        try:
+            values = _parse(row, fields)
+            if validate:
+                validate(values)
+        except RejectedRow as e:
+            report.reject(source, line, str(e), row)
+            continue
+        writer.writerow([line] + [values[name] for name, _, _ in fields])
+        pending += 1
+        if pending >= batch_size:
+            flush()
+    flush()
+
+
+def _table_columns(cursor, table: Text):
+    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def merge_doctors(cursor, report: ImportReport):
+    """Upsert staged doctors keyed by email; empty roster fields keep the existing value"""
+    target_columns = _table_columns(cursor, 'doctors')
+    columns = [name for name, _, _ in DOCTOR_FIELDS if name in target_columns]
+    if 'email' not in columns:
+        raise RuntimeError("doctors table has no email column to match roster rows on")
+
+    # Last occurrence of an email in the file wins
+    cursor.execute("""
+        CREATE TEMP TABLE roster_doctors_final ON COMMIT DROP AS
+        SELECT DISTINCT ON (email) * FROM roster_doctors ORDER BY email, line DESC
+    """)
+    updates = ", ".join(f"{c} = COALESCE(s.{c}, d.{c})" for c in columns if c != 'email')
+    cursor.execute(f"""
+        UPDATE doctors d SET {updates}
+        FROM roster_doctors_final s
+        WHERE lower(d.email) = s.email
+    """)
+    report.merged['doctors updated'] = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO doctors ({', '.join(columns)})
+        SELECT {', '.join('s.' + c for c in columns)}
+        FROM roster_doctors_final s
+        WHERE NOT EXISTS (SELECT 1 FROM doctors d WHERE lower(d.email) = s.email)
+    """)
+    report.merged['doctors inserted'] = cursor.rowcount
+
+
+def merge_slots(cursor, report: ImportReport):
+    """Upsert staged slots keyed by (doctor, date, start time); booked slots are never reopened"""
+    # Email lookup built once so resolving months of slots is a hash join, not a lookup per row
+    cursor.execute("""
+        CREATE TEMP TABLE roster_slots_final ON COMMIT DROP AS
+        WITH emails AS (
+            SELECT DISTINCT ON (lower(email)) lower(email) AS email, doctor_id
+            FROM doctors WHERE email IS NOT NULL
+            ORDER BY lower(email), doctor_id
+        )
+        SELECT s.line, COALESCE(d.doctor_id, e.doctor_id) AS resolved_id, s.doctor_id, s.doctor_email,
+               s.date, s.start_time, s.end_time, s.available
+        FROM roster_slots s
+        LEFT JOIN doctors d ON d.doctor_id = s.doctor_id
+        LEFT JOIN emails e ON s.doctor_id IS NULL AND e.email = s.doctor_email
+    """)
+    cursor.execute("SELECT line, doctor_id, doctor_email FROM roster_slots_final WHERE resolved_id IS NULL ORDER BY line")
+    for line, doctor_id, doctor_email in cursor.fetchall():
+        report.reject('slots', line, f"unknown doctor {doctor_id or doctor_email}")
+    cursor.execute("DELETE FROM roster_slots_final WHERE resolved_id IS NULL")
+    cursor.execute("""
+        DELETE FROM roster_slots_final f USING roster_slots_final newer
+        WHERE f.resolved_id = newer.resolved_id AND f.date = newer.date
+          AND f.start_time = newer.start_time AND f.line < newer.line
+    """)
+
+    # A slot that holds a booking is left as it is. The UPDATE re-checks this per row after waiting
+    # on a concurrent booking's row lock, so a slot booked mid-import is not reopened either.
+    slot_columns = _table_columns(cursor, 'availability_slots')
+    booked_guard = "".join(guard for column, guard in (('patient_id', " AND a.patient_id IS NULL"),
+                                                       ('booked', " AND a.booked IS NOT TRUE"))
+                           if column in slot_columns)
+    cursor.execute(f"""
+        UPDATE availability_slots a SET end_time = f.end_time, available = f.available
+        FROM roster_slots_final f
+        WHERE a.doctor_id = f.resolved_id AND a.date = f.date AND a.start_time = f.start_time{booked_guard}
+    """)
+    report.merged['slots updated'] = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO availability_slots (doctor_id, date, start_time, end_time, available)
+        SELECT f.resolved_id, f.date, f.start_time, f.end_time, f.available
+        FROM roster_slots_final f
+        WHERE NOT EXISTS (
+            SELECT 1 FROM availability_slots a
+            WHERE a.doctor_id = f.resolved_id AND a.date = f.date AND a.start_time = f.start_time
+        )
+    """)
+    report.merged['slots inserted'] = cursor.rowcount
+
+
+def invalidate_directory_caches(conn=None, refresh_snapshot: bool = True):
+    """Clear this process's directory caches after an import. Other processes pick up the change
+    through the re-exported snapshot file (DirectorySnapshot reloads on mtime) and SearchCapabilities' TTL."""
+    try:
+        SearchCapabilities.invalidate()
+    except Exception as e:
+        logger.error(f"Directory cache invalidation failed: {e}")
+    if conn is not None and refresh_snapshot:
+        try:
+            export_snapshot(conn, SNAPSHOT_PATH)
+        except Exception as e:
+            logger.error(f"Directory snapshot refresh after import failed: {e}")
+
+
+def import_roster(conn, doctors_path: Optional[Text] = None, slots_path: Optional[Text] = None,
+                  fmt: Optional[Text] = None, report: Optional[ImportReport] = None,
+                  dry_run: bool = False, batch_size: int = BATCH_SIZE) -> ImportReport:
+    """Stage and merge a roster in a single transaction; nothing is visible until it commits.
+
+    The merge takes row locks only, so bookings carry on while a roster is imported.
+    """
+    report = report or ImportReport()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        # Serialise concurrent imports against each other without blocking readers or bookings
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (IMPORT_LOCK_KEY,))
+        if doctors_path:
+            cursor.execute(DOCTOR_STAGING)
+            stage(cursor, read_rows(doctors_path, fmt), 'doctors', 'roster_doctors', DOCTOR_FIELDS,
+                  report, batch_size=batch_size)
+            merge_doctors(cursor, report)
+        if slots_path:
+            cursor.execute(SLOT_STAGING)
+            stage(cursor, read_rows(slots_path, fmt), 'slots', 'roster_slots', SLOT_FIELDS,
+                  report, validate=_validate_slot, batch_size=batch_size)
+            merge_slots(cursor, report)
+        if dry_run:
+            conn.rollback()
+            logger.info("Dry run - rolled back")
+            return report
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE doctors")
+    cursor.execute("ANALYZE availability_slots")
+    cursor.close()
+    conn.autocommit = False
+    invalidate_directory_caches(conn)
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        from .db_router import connect_from_env
+    except ImportError:
+        from db_router import connect_from_env
+
+    parser = argparse.ArgumentParser(description="Bulk import doctor rosters and availability slots")
+    parser.add_argument("--doctors", help="Doctors file (CSV or JSON lines, '-' for stdin); matched on email")
+    parser.add_argument("--slots", help="Slots file; rows reference doctor_id or doctor_email")
+    parser.add_argument("--format", choices=['csv', 'jsonl'], help="Input format (default: from file extension)")
+    parser.add_argument("--rejects", help="Write rejected rows to this JSON-lines file")
+    parser.add_argument("--max-rejects", type=int, help="Abort without changes after this many rejects")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Validate and merge, then roll back")
+    args = parser.parse_args()
+    if not args.doctors and not args.slots:
+        parser.error("nothing to import: pass --doctors and/or --slots")
+
+    logging.basicConfig(level=logging.INFO)
+    rejects_out = open(args.rejects, 'w') if args.rejects else None
+    connection = connect_from_env()
+    try:
+        result = import_roster(
+            connection, args.doctors, args.slots, fmt=args.format,
+            report=ImportReport(rejects_out, args.max_rejects), dry_run=args.dry_run, batch_size=args.batch_size
+        )
+        print(result.summary())
+    finally:
+        connection.close()
+        if rejects_out:
+            rejects_out.close()
@@ -0,0 +1,117 @@
+"""
+Search Query Builders for doctor and patient lookups
+Ranks by pg_trgm similarity and matches tsvector columns when available, with plain ILIKE as the fallback
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional, Set, Text
+
+logger = logging.getLogger(__name__)
+
+# WHERE fragment and ORDER BY fragment, each with its own parameters, ready to splice into a query
+SearchClause = namedtuple('SearchClause', ['where', 'where_params', 'order', 'order_params'])
+
+# Expression used for patient name search when the table stores first/last name separately.
+# Must match the expression index created by the migrations exactly for the planner to use it.
+PATIENT_FULL_NAME = "(COALESCE(first_name, '') || ' ' || COALESCE(last_name, ''))"
+
+
+class SearchCapabilities:
+    """Per-process cache of what the connected database supports (extensions, search columns)"""
+
+    TTL_SECONDS = 600
+
+    _extensions: Optional[Set[Text]] = None
+    _columns: Dict[Text, Set[Text]] = {}
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _refresh(cls, cursor):
+        if cls._extensions is not None and time.time() - cls._checked_at < cls.TTL_SECONDS:
+            return
+        cursor.execute("SELECT extname FROM pg_extension")
+        extensions = {row[0] for row in cursor.fetchall()}
+        with cls._lock:
+            cls._extensions = extensions
+            cls._columns = {}
+            cls._checked_at = time.time()
+
+    @classmethod
+    def has_trigram(cls, cursor) -> bool:
+        cls._refresh(cursor)
+        return 'pg_trgm' in cls._extensions
+
+    @classmethod
+    def table_columns(cls, cursor, table: Text) -> Set[Text]:
+        cls._refresh(cursor)
+        columns = cls._columns.get(table)
+        if columns is None:
+            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+            columns = {row[0] for row in cursor.fetchall()}
+            with cls._lock:
+                cls._columns[table] = columns
+        return columns
+
+    @classmethod
+    def invalidate(cls):
+        """Forget cached capabilities, e.g. after running migrations in-process"""
+        with cls._lock:
+            cls._extensions = None
+            cls._columns = {}
+
+
+def text_match(cursor, columns: List[Text], term: Text, fuzzy: bool = False) -> SearchClause:
+    """Substring match on any of the columns, ranked by trigram similarity when pg_trgm is installed.
+
+    ILIKE '%term%' is served by gin_trgm_ops indexes, so this stays index-backed either way;
+    without the extension it degrades to the same sequential ILIKE scan as before.
+    """
+    pattern = f"%{term}%"
+    conditions = [f"{column} ILIKE %s" for column in columns]
+    where_params = [pattern] * len(columns)
+
+    if not SearchCapabilities.has_trigram(cursor):
+        return SearchClause("(" + " OR ".join(conditions) + ")", where_params, None, [])
+
+    if fuzzy:
+        # Typo-tolerant match using the similarity threshold (pg_trgm.similarity_threshold, default 0.3)
+        conditions.extend(f"{column} %% %s" for column in columns)
+        where_params.extend([term] * len(columns))
+    if len(columns) == 1:
+        order = f"similarity({columns[0]}, %s) DESC"
+    else:
+        order = "GREATEST(" + ", ".join(f"similarity({column}, %s)" for column in columns) + ") DESC"
+    return SearchClause("(" + " OR ".join(conditions) + ")", where_params, order, [term] * len(columns))
+
+
+def doctor_vector_match(cursor, term: Text, table: Text = 'doctors') -> Optional[SearchClause]:
+    """Full-text match on the doctors.search_vector column, if the migration has added it"""
+    if 'search_vector' not in SearchCapabilities.table_columns(cursor, table):
+        return None
+    return SearchClause(
+        "search_vector @@ plainto_tsquery('simple', %s)", [term],
+        "ts_rank(search_vector, plainto_tsquery('simple', %s)) DESC", [term]
+    )
+
+
+def combine(*clauses: Optional[SearchClause]) -> SearchClause:
+    """OR the WHERE fragments together and chain the ORDER BY fragments"""
+    clauses = [c for c in clauses if c]
+    where = "(" + " OR ".join(c.where for c in clauses) + ")"
+    where_params = [p for c in clauses for p in c.where_params]
+    orders = [c for c in clauses if c.order]
+    order = ", ".join(c.order for c in orders) or None
+    order_params = [p for c in orders for p in c.order_params]
+    return SearchClause(where, where_params, order, order_params)
+
+
+def patient_name_column(cursor, table: Text = 'patients') -> Text:
+    """Name column or expression for the patients table, whichever this schema has"""
+    columns = SearchCapabilities.table_columns(cursor, table)
+    if 'name' in columns:
+        return 'name'
+    return PATIENT_FULL_NAME
@@ -0,0 +1,153 @@
+"""
+Action Server entry point with bounded tracker payloads
+Wraps the rasa_sdk app: trims tracker events to a recent window plus a session summary, and exposes /metrics.
+Rasa still sends the full tracker - the window bounds what each action call parses into a Tracker and walks, not the bytes on the wire
+"""
+
+import argparse
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Text
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Keep only this many recent events in each action call's tracker (0 = pass the full history).
+# Slots travel separately in the payload, so trimming events never loses slot values.
+ACTION_EVENT_WINDOW = int(os.getenv('ACTION_EVENT_WINDOW', '50'))
+# Actions read at most the last 10 events; never trim below this
+MIN_EVENT_WINDOW = 20
+SESSION_SUMMARY_EVENT = 'session_summary'
+
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+metrics.describe('action_request_bytes', "Size of the tracker payload Rasa sent per action call")
+metrics.describe('action_tracker_events', "Events in the tracker Rasa sent per action call, before trimming")
+metrics.describe('action_events_trimmed_total', "Events dropped from action payloads by the event window")
+
+
+def summarize_events(events: List[Dict[Text, Any]]) -> Dict[Text, Any]:
+    """Compact stand-in for the trimmed events: counts, intents seen and the time span"""
+    intents = Counter(
+        (e.get('parse_data') or {}).get('intent', {}).get('name')
+        for e in events if e.get('event') == 'user'
+    )
+    intents.pop(None, None)
+    timestamps = [e['timestamp'] for e in events if e.get('timestamp')]
+    return {
+        'event': SESSION_SUMMARY_EVENT,
+        'timestamp': timestamps[0] if timestamps else None,
+        'trimmed_events': len(events),
+        'user_turns': sum(1 for e in events if e.get('event') == 'user'),
+        'bot_turns': sum(1 for e in events if e.get('event') == 'bot'),
+        'intents': dict(intents.most_common(10)),
+        'first_timestamp': timestamps[0] if timestamps else None,
+        'last_timestamp': timestamps[-1] if timestamps else None,
+    }
+
+
+def apply_event_window(action_call: Dict[Text, Any], window: int) -> int:
+    """Trim the tracker events in an action call in place; returns how many were dropped"""
+    tracker = action_call.get('tracker') or {}
+    events = tracker.get('events') or []
+    window = max(window, MIN_EVENT_WINDOW)
+    if len(events) <= window + 1:
+        return 0
+    trimmed = events[:-window]
+    summary = summarize_events(trimmed)
+    tracker['events'] = [summary] + events[-window:]
+    return len(trimmed)
+
+
+def create_app(action_package_name: Text = 'actions', cors_origins: Text = '*',
+               event_window: int = ACTION_EVENT_WINDOW):
+    from rasa_sdk.endpoint import create_app as create_sdk_app
+    from sanic import response
+
+    app = create_sdk_app(action_package_name, cors_origins=cors_origins)
+
+    @app.middleware('request')
+    async def bound_tracker_payload(request):
+        if request.method != 'POST' or request.path != '/webhook':
+            return
+        request.ctx.started = time.monotonic()
+        action_call = request.json or {}
+        action = request.ctx.action = action_call.get('next_action', 'unknown')
+        event_count = len((action_call.get('tracker') or {}).get('events') or [])
+        metrics.observe('action_request_bytes', len(request.body), buckets=PAYLOAD_BUCKETS, action=action)
+        metrics.observe('action_tracker_events', event_count, buckets=(10, 50, 100, 250, 500, 1000, 5000), action=action)
+        if event_window > 0:
+            dropped = apply_event_window(action_call, event_window)
+            if dropped:
+                metrics.inc('action_events_trimmed_total', dropped, action=action)
+
+    @app.middleware('response')
+    async def record_action_latency(request, resp):
+        started = getattr(request.ctx, 'started', None)
+        if started is None:
+            return
+        action = request.ctx.action
+        metrics.observe('action_request_seconds', time.monotonic() - started, action=action)
+        metrics.observe('action_response_bytes', len(resp.body or b''), buckets=PAYLOAD_BUCKETS, action=action)
+        metrics.inc('action_requests_total', action=action, status=resp.status)
+
+    @app.listener('after_server_start')
+    async def start_background_jobs(app, loop):
+        # Only the running server exports directory snapshots; importing the actions package does not
+        try:
+            from .actions import start_directory_snapshot_export
+        except ImportError:
+            from actions import start_directory_snapshot_export
+        start_directory_snapshot_export()
+
+    @app.get('/metrics')
+    async def metrics_endpoint(request):
+        return response.text(metrics.render_prometheus(), content_type='text/plain; version=0.0.4')
+
+    @app.get('/health/dependencies')
+    async def dependency_health(request):
+        """Database pool and circuit/bulkhead state as this process sees it; reads memory only, never the database"""
+        try:
+            from .resilience import dependency_status
+        except ImportError:
+            from resilience import dependency_status
+        return response.json({'database': database_status(), 'circuits': dependency_status()})
+
+    return app
+
+
+def database_status() -> Dict[Text, Any]:
+    try:
+        from .db_router import DatabaseRouter, db_breaker
+        from .async_runtime import AsyncDatabase
+    except ImportError:
+        from db_router import DatabaseRouter, db_breaker
+        from async_runtime import AsyncDatabase
+
+    return {
+        'configured': DatabaseRouter.is_configured(),
+        'breaker': db_breaker.state,
+        'retry_after': round(db_breaker.retry_after(), 1),
+        'pools': DatabaseRouter.pool_status(),
+        'async_pools': AsyncDatabase.pool_status(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the action server with bounded tracker payloads")
+    parser.add_argument("--actions", default="actions", help="Action package to load")
+    parser.add_argument("--port", type=int, default=int(os.getenv('ACTION_SERVER_PORT', '5055')))
+    parser.add_argument("--cors", default="*")
+    parser.add_argument("--event-window", type=int, default=ACTION_EVENT_WINDOW,
+                        help="Events to keep per action call (0 = full history)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Starting action server on port {args.port} with event window {args.event_window or 'off'}")
+    create_app(args.actions, args.cors, args.event_window).run(host="0.0.0.0", port=args.port, access_log=False)
@@ -0,0 +1,307 @@
+"""
+Directory Snapshot Store for database outages
+Exports doctors, insurance plans and availability slots to a local SQLite file and answers DatabaseHelper queries from it
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot table layout changes; older files are ignored rather than misread
+SNAPSHOT_FORMAT_VERSION = 1
+
+SNAPSHOT_PATH = os.getenv(
+    'DIRECTORY_SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots', 'directory.sqlite3')
+)
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv('DIRECTORY_SNAPSHOT_INTERVAL', '3600'))
+SNAPSHOT_SLOT_DAYS = int(os.getenv('DIRECTORY_SNAPSHOT_SLOT_DAYS', '30'))
+
+SNAPSHOT_SCHEMA = """
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE doctors (
+        doctor_id TEXT, name TEXT, specialty TEXT, department TEXT,
+        email TEXT, phone TEXT, experience_years INTEGER, rating REAL
+    );
+    CREATE TABLE insurance_plans (
+        plan_id TEXT, name TEXT, monthly_premium REAL, deductible REAL,
+        coverage_percentage REAL, features TEXT
+    );
+    CREATE TABLE availability_slots (
+        slot_id TEXT, doctor_id TEXT, date TEXT, start_time TEXT, end_time TEXT, available INTEGER
+    );
+    CREATE INDEX idx_snapshot_doctors_name ON doctors (name);
+    CREATE INDEX idx_snapshot_slots_doctor_date ON availability_slots (doctor_id, date);
+    CREATE INDEX idx_snapshot_slots_date ON availability_slots (date, start_time);
+"""
+
+
+def plan_features(value) -> List[Text]:
+    """Insurance plan features as a list, whether the column is a text[] or a '{a,b}' array literal"""
+    if isinstance(value, str):
+        return value.strip('{}').split(',') if value.strip('{}') else []
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def _plain(value):
+    """Convert psycopg2 values to something SQLite stores natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, float, str)):
+        return str(value)
+    return value
+
+
+def _pick(columns, *candidates, default='NULL'):
+    for column in candidates:
+        if column in columns:
+            return column
+    return default
+
+
+def export_snapshot(conn, path: Text = SNAPSHOT_PATH) -> Optional[Text]:
+    """Copy the directory tables from Postgres into a new snapshot file and swap it in atomically"""
+    cursor = conn.cursor()
+    cursor.execute("SET statement_timeout = '30s'")
+
+    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = 'doctors'")
+    doctor_columns = {row[0] for row in cursor.fetchall()}
+    cursor.execute(f"""
+        SELECT doctor_id, name,
+               COALESCE({_pick(doctor_columns, 'specialty')}, {_pick(doctor_columns, 'doc_type')}, 'General Medicine'),
+               COALESCE({_pick(doctor_columns, 'department')}, {_pick(doctor_columns, 'doc_type')}, 'General Medicine'),
+               {_pick(doctor_columns, 'email')}, {_pick(doctor_columns, 'phone', 'phone_number')},
+               {_pick(doctor_columns, 'experience_years', 'experience')}, {_pick(doctor_columns, 'rating')}
+        FROM doctors
+        {"WHERE is_active = true" if 'is_active' in doctor_columns else ""}
+    """)
+    doctors = [tuple(_plain(v) for v in row) for row in cursor.fetchall()]
+
+    cursor.execute("""
+        SELECT plan_id, plan_name, monthly_premium, deductible, coverage_percentage, features
+        FROM insurance_plans
+        WHERE is_active = true
+    """)
+    plans = []
+    for row in cursor.fetchall():
+        plans.append(tuple(_plain(v) for v in row[:5]) + (json.dumps(plan_features(row[5])),))
+
+    cursor.execute("""
+        SELECT slot_id, doctor_id, date, start_time, end_time, available
+        FROM availability_slots
+        WHERE available = true AND date >= CURRENT_DATE AND date <= CURRENT_DATE + %s * INTERVAL '1 day'
+    """, (SNAPSHOT_SLOT_DAYS,))
+    slots = [tuple(_plain(v) for v in row) for row in cursor.fetchall()]
+    cursor.close()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    snapshot = sqlite3.connect(tmp_path)
+    try:
+        snapshot.executescript(SNAPSHOT_SCHEMA)
+        snapshot.executemany("INSERT INTO doctors VALUES (?, ?, ?, ?, ?, ?, ?, ?)", doctors)
+        snapshot.executemany("INSERT INTO insurance_plans VALUES (?, ?, ?, ?, ?, ?)", plans)
+        snapshot.executemany("INSERT INTO availability_slots VALUES (?, ?, ?, ?, ?, ?)", slots)
+        snapshot.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('format_version', str(SNAPSHOT_FORMAT_VERSION)),
+            ('version', version),
+            ('exported_at', str(time.time()))
+        ])
+        snapshot.commit()
+    finally:
+        snapshot.close()
+    os.replace(tmp_path, path)
+    logger.info(f"Exported directory snapshot {version}: {len(doctors)} doctors, {len(plans)} plans, {len(slots)} slots")
+    return version
+
+
+class DirectorySnapshot:
+    """Read-only view of the latest snapshot file, opened lazily and reopened when a new export lands"""
+
+    def __init__(self, path: Text = SNAPSHOT_PATH):
+        self.path = path
+        self.version = None
+        self._conn = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+        if self._conn is not None and mtime == self._mtime:
+            return self._conn
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if int(meta.get('format_version', 0)) != SNAPSHOT_FORMAT_VERSION:
+                logger.warning(f"Ignoring directory snapshot with format {meta.get('format_version')}")
+                conn.close()
+                return None
+        except Exception as e:
+            logger.error(f"Could not open directory snapshot {self.path}: {e}")
+            return None
+        self._conn = conn
+        self._mtime = mtime
+        self.version = meta.get('version')
+        logger.info(f"Loaded directory snapshot {self.version}")
+        return conn
+
+    def _query(self, sql: Text, params=()) -> Optional[List[sqlite3.Row]]:
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                return conn.execute(sql, params).fetchall()
+            except Exception as e:
+                logger.error(f"Directory snapshot query failed: {e}")
+                return None
+
+    @staticmethod
+    def _doctor(row) -> Dict[Text, Any]:
+        return {
+            'doctor_id': row['doctor_id'],
+            'name': row['name'],
+            'specialty': row['specialty'],
+            'department': row['department'],
+            'email': row['email'],
+            'phone': row['phone'],
+            'experience_years': row['experience_years'],
+            'rating': row['rating']
+        }
+
+    def get_doctors(self, specialty=None, department=None, limit=10) -> Optional[List[Dict[Text, Any]]]:
+        conditions = []
+        params = []
+        if specialty:
+            terms = ['general', 'family', 'primary', 'gp'] if specialty.lower() == 'general medicine' else [specialty]
+            conditions.append("(" + " OR ".join(["specialty LIKE ?"] * len(terms)) + ")")
+            params.extend(f"%{term}%" for term in terms)
+        if department:
+            conditions.append("department LIKE ?")
+            params.append(f"%{department}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT * FROM doctors {where} ORDER BY name LIMIT ?", params + [limit])
+        return [self._doctor(r) for r in rows] if rows is not None else None
+
+    def get_doctor_by_name(self, doctor_name) -> Optional[Dict[Text, Any]]:
+        clean_name = doctor_name.replace("Dr.", "").replace("dr.", "").strip()
+        rows = self._query("""
+            SELECT * FROM doctors WHERE name LIKE ?
+            ORDER BY CASE WHEN LOWER(name) = LOWER(?) THEN 1 ELSE 2 END
+            LIMIT 1
+        """, (f"%{clean_name}%", clean_name))
+        return self._doctor(rows[0]) if rows else None
+
+    def get_insurance_plans(self) -> Optional[List[Dict[Text, Any]]]:
+        rows = self._query("SELECT * FROM insurance_plans ORDER BY monthly_premium LIMIT 10")
+        if not rows:
+            return None
+        return [{
+            'plan_id': r['plan_id'],
+            'name': r['name'],
+            'monthly_premium': f"${float(r['monthly_premium']):.2f}" if r['monthly_premium'] else "$0",
+            'deductible': f"${float(r['deductible']):.2f}" if r['deductible'] else "$0",
+            'coverage': f"{int(r['coverage_percentage'])}%" if r['coverage_percentage'] else "0%",
+            'features': json.loads(r['features']) if r['features'] else []
+        } for r in rows]
+
+    def get_availability_slots(self, doctor_id=None, date=None, specialty=None) -> Optional[List[Dict[Text, Any]]]:
+        query = """
+            SELECT s.slot_id, s.doctor_id, d.name AS doctor_name, d.specialty, d.department,
+                   s.date, s.start_time, s.end_time, s.available
+            FROM availability_slots s
+            LEFT JOIN doctors d ON s.doctor_id = d.doctor_id
+            WHERE s.available = 1
+        """
+        params = []
+        if doctor_id:
+            query += " AND s.doctor_id = ?"
+            params.append(doctor_id)
+        if date:
+            query += " AND s.date = ?"
+            params.append(str(date))
+        else:
+            query += " AND s.date >= DATE('now') AND s.date <= DATE('now', '+7 days')"
+        if specialty:
+            query += " AND (d.specialty LIKE ? OR d.department LIKE ?)"
+            params.extend([f"%{specialty}%", f"%{specialty}%"])
+        query += " ORDER BY s.date, s.start_time LIMIT 20"
+
+        rows = self._query(query, params)
+        if rows is None:
+            return None
+        return [{
+            'slot_id': r['slot_id'],
+            'doctor_id': r['doctor_id'],
+            'doctor_name': r['doctor_name'] or 'Unknown',
+            'specialty': r['specialty'] or 'General',
+            'department': r['department'] or 'General',
+            'date': r['date'],
+            'start_time': r['start_time'],
+            'end_time': r['end_time'],
+            'available': bool(r['available'])
+        } for r in rows]
+
+
+directory_snapshot = DirectorySnapshot()
+
+_exporter_thread = None
+
+
+def start_periodic_export(get_connection: Callable[[], Any], return_connection: Callable[[Any], None],
+                          interval: int = SNAPSHOT_INTERVAL_SECONDS):
+    """Refresh the snapshot in a daemon thread; does nothing if interval is 0"""
+    global _exporter_thread
+    if interval <= 0 or (_exporter_thread and _exporter_thread.is_alive()):
+        return
+
+    def export_loop():
+        while True:
+            conn = get_connection()
+            if conn:
+                try:
+                    export_snapshot(conn)
+                except Exception as e:
+                    logger.error(f"Directory snapshot export failed: {e}")
+                finally:
+                    return_connection(conn)
+            time.sleep(interval)
+
+    _exporter_thread = threading.Thread(target=export_loop, name="directory-snapshot-export", daemon=True)
+    _exporter_thread.start()
+
+
+if __name__ == "__main__":
+    # One-off export, e.g. to bake a snapshot into the actions image at deploy time
+    try:
+        from .db_router import READ, connect_from_env
+    except ImportError:
+        from db_router import READ, connect_from_env
+
+    logging.basicConfig(level=logging.INFO)
+    connection = connect_from_env(READ)
+    try:
+        export_snapshot(connection)
+    finally:
+        connection.close()
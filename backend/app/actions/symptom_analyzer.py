@@ -10,8 +10,19 @@ import os
 from typing import Dict, List, Optional, Any
 import re
 
+try:
+    from .bedrock_invoker import get_bedrock_invoker
+    from .resilience import DependencyUnavailable, get_dependency
+except ImportError:
+    from bedrock_invoker import get_bedrock_invoker
+    from resilience import DependencyUnavailable, get_dependency
+
 logger = logging.getLogger(__name__)
 
+BEDROCK_INVOKER = get_bedrock_invoker()
+COMPREHEND_MEDICAL = get_dependency("comprehend_medical")
+
+
 class SymptomAnalyzer:
     """Analyzes symptoms and recommends appropriate medical specialties and doctors"""
     
@@ -21,10 +32,7 @@ class SymptomAnalyzer:
         self.model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
         
         try:
-            self.bedrock_runtime = boto3.client(
-                'bedrock-runtime',
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
-            )
+            self.bedrock_runtime = BEDROCK_INVOKER.client()
             logger.info("Symptom Analyzer initialized with Bedrock")
         except Exception as e:
             logger.warning(f"Bedrock not available for Symptom Analyzer: {e}")
@@ -157,7 +165,7 @@ class SymptomAnalyzer:
         medical_entities = {}
         if self.comprehend_medical:
             try:
-                response = self.comprehend_medical.detect_entities(Text=user_message)
+                response = COMPREHEND_MEDICAL.call(self.comprehend_medical.detect_entities, Text=user_message)
                 entities = response.get('Entities', [])
                 medical_entities = {
                     'symptoms': [e['Text'] for e in entities if e['Type'] == 'SYMPTOM'],
@@ -172,6 +180,8 @@ class SymptomAnalyzer:
         if self.bedrock_runtime:
             try:
                 return self._analyze_with_bedrock(user_message, medical_entities)
+            except DependencyUnavailable as e:
+                logger.info(f"Bedrock analysis skipped: {e}")
             except Exception as e:
                 logger.error(f"Bedrock analysis failed: {e}")
         
@@ -230,12 +240,7 @@ Now analyze the symptoms:"""
             ]
         }
         
-        response = self.bedrock_runtime.invoke_model(
-            modelId=self.model_id,
-            body=json.dumps(body)
-        )
-        
-        response_body = json.loads(response['body'].read())
+        response_body = BEDROCK_INVOKER.invoke(body, model_id=self.model_id, call_site='symptom_analyzer._analyze_with_bedrock')
         content = response_body['content'][0]['text']
         
         # Extract JSON
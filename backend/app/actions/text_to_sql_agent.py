@@ -3,15 +3,22 @@ Text-to-SQL Agent: Converts natural language queries to SQL using AWS Bedrock
 This makes the bot super intelligent by understanding queries and generating accurate SQL
 """
 
-import boto3
 import json
 import logging
 import os
 from typing import Dict, List, Optional, Any
 import re
 
+try:
+    from .bedrock_invoker import LOW_PRIORITY, get_bedrock_invoker
+except ImportError:
+    from bedrock_invoker import LOW_PRIORITY, get_bedrock_invoker
+
 logger = logging.getLogger(__name__)
 
+BEDROCK_INVOKER = get_bedrock_invoker()
+
+
 class TextToSQLAgent:
     """Intelligent Text-to-SQL agent using AWS Bedrock Claude"""
     
@@ -20,10 +27,7 @@ class TextToSQLAgent:
         self.model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20241022-v2:0')
         
         try:
-            self.bedrock_runtime = boto3.client(
-                'bedrock-runtime',
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
-            )
+            self.bedrock_runtime = BEDROCK_INVOKER.client()
             logger.info("Text-to-SQL Agent initialized with Bedrock")
         except Exception as e:
             logger.warning(f"Bedrock not available for Text-to-SQL: {e}")
@@ -196,12 +200,7 @@ Now generate the SQL query for the user's query above:"""
                 ]
             }
             
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(body, model_id=self.model_id, call_site='text_to_sql_agent.generate_sql')
             content = response_body['content'][0]['text']
             
             # Extract JSON from response
@@ -269,12 +268,7 @@ Respond in JSON:
                 ]
             }
             
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            response_body = json.loads(response['body'].read())
+            response_body = BEDROCK_INVOKER.invoke(body, model_id=self.model_id, call_site='text_to_sql_agent.understand_query_intent', priority=LOW_PRIORITY)
             content = response_body['content'][0]['text']
             
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
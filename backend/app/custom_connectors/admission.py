@@ -0,0 +1,268 @@
+"""
+Admission Control for chat ingress
+Caps turns in flight globally and per sender, queues follow-ups with a deadline, and sheds load with Retry-After once the queue is full
+"""
+
+import asyncio
+import logging
+import math
+import os
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Text
+
+# Shared metrics registry lives with the actions; metrics.py has no dependencies of its own
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'actions'))
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FULL = 'queue_full'
+SENDER_QUEUE_FULL = 'sender_queue_full'
+QUEUE_TIMEOUT = 'queue_timeout'
+SENDER_QUEUE_TIMEOUT = 'sender_queue_timeout'
+
+MAX_RETRY_AFTER_SECONDS = 30
+# A follow-up may wait out its sender's turn in flight, which can run up to the upstream timeout
+DEFAULT_SENDER_QUEUE_TIMEOUT = 30.0
+
+metrics.describe('admission_in_flight', "Turns admitted and not yet finished")
+metrics.describe('admission_queue_depth', "Turns waiting for a global or per-sender slot")
+metrics.describe('admission_queue_seconds', "Time admitted turns spent queued")
+metrics.describe('admission_admitted_total', "Turns admitted")
+metrics.describe('admission_shed_total', "Turns rejected, by reason (queue_full, sender_queue_full, queue_timeout, sender_queue_timeout)")
+
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing a turn that could not be admitted in time"""
+
+    def __init__(self, gate: Text, reason: Text, retry_after: int = 1):
+        super().__init__(f"Admission to '{gate}' rejected: {reason}")
+        self.gate = gate
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Proof of admission; hand it back to `release` exactly once"""
+
+    __slots__ = ('sender_id', 'admitted_at', 'released')
+
+    def __init__(self, sender_id: Optional[Text]):
+        self.sender_id = sender_id
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+
+class _SenderGate:
+    __slots__ = ('active', 'waiters')
+
+    def __init__(self):
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class AdmissionController:
+    """Admission for one ingress (e.g. the wrapper, or the custom REST channel).
+
+    A turn first waits for its sender's slot (so a sender's follow-ups queue behind the turn in
+    flight instead of racing it), then for a global slot. The sender wait has its own deadline,
+    `sender_queue_timeout`, long enough to outlast one upstream turn; only the global wait uses the
+    short `queue_timeout`. Waiters are served FIFO. When `max_queue` turns are already waiting, new ones are rejected at once -
+    under overload a fast 503 beats a 30 s timeout.
+
+    Limits of 0 disable that limit. Single event loop only; not thread-safe.
+    """
+
+    def __init__(self, name: Text, max_in_flight: int = 200, queue_timeout: float = 5.0, max_queue: int = 500,
+                 per_sender: int = 1, max_sender_queue: int = 5,
+                 sender_queue_timeout: float = DEFAULT_SENDER_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.sender_queue_timeout = sender_queue_timeout
+        self.max_queue = max_queue
+        self.per_sender = per_sender
+        self.max_sender_queue = max_sender_queue
+
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._senders: Dict[Text, _SenderGate] = {}
+        # Smoothed turn duration, used to suggest how long a shed client should back off
+        self._service_seconds = 1.0
+
+    @classmethod
+    def from_env(cls, prefix: Text, name: Text, **defaults) -> 'AdmissionController':
+        """Settings from {prefix}_MAX_CONCURRENCY, _QUEUE_TIMEOUT, _MAX_QUEUE, _SENDER_CONCURRENCY, _SENDER_QUEUE,
+        _SENDER_QUEUE_TIMEOUT"""
+        def setting(key, default, cast):
+            return cast(os.getenv(f"{prefix}_{key}", defaults.get(key.lower(), default)))
+
+        return cls(
+            name,
+            max_in_flight=setting('MAX_CONCURRENCY', 200, int),
+            queue_timeout=setting('QUEUE_TIMEOUT', 5.0, float),
+            max_queue=setting('MAX_QUEUE', 500, int),
+            per_sender=setting('SENDER_CONCURRENCY', 1, int),
+            max_sender_queue=setting('SENDER_QUEUE', 5, int),
+            sender_queue_timeout=setting('SENDER_QUEUE_TIMEOUT', DEFAULT_SENDER_QUEUE_TIMEOUT, float)
+        )
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: roughly how long the current queue takes to drain"""
+        slots = self.max_in_flight or 1
+        estimate = self._service_seconds * (self.queued + 1) / slots
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    def _shed(self, reason: Text):
+        metrics.inc('admission_shed_total', gate=self.name, reason=reason)
+        retry_after = self.retry_after()
+        logger.warning(f"{self.name}: shedding turn ({reason}), {self.in_flight} in flight, {self.queued} queued")
+        raise AdmissionRejected(self.name, reason, retry_after)
+
+    def _update_gauges(self):
+        metrics.set_gauge('admission_in_flight', self.in_flight, gate=self.name)
+        metrics.set_gauge('admission_queue_depth', self.queued, gate=self.name)
+
+    @staticmethod
+    def _wake(waiters: Deque[asyncio.Future]) -> bool:
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return True
+        return False
+
+    async def _wait(self, waiters: Deque[asyncio.Future], has_room, deadline: float):
+        if has_room() and not waiters:
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        waiters.append(waiter)
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self._shed(QUEUE_TIMEOUT)
+                await asyncio.wait({waiter}, timeout=remaining)
+                if not waiter.done():
+                    continue
+                if has_room():
+                    return
+                # Woken, but a newcomer took the slot first - keep our place at the head
+                waiter = loop.create_future()
+                waiters.appendleft(waiter)
+        except BaseException:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # We were handed a slot we won't use; pass it on
+                self._wake(waiters)
+            raise
+
+    async def _wait_sender(self, sender_id: Text, gate: _SenderGate, deadline: float):
+        """Take one of the sender's slots. A waiter is woken only by _release_sender, which has already
+        handed it the finishing turn's slot, so the gate stays registered while the sender is busy."""
+        if gate.active < self.per_sender and not gate.waiters:
+            gate.active += 1
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        gate.waiters.append(waiter)
+        try:
+            while not waiter.done():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self._shed(SENDER_QUEUE_TIMEOUT)
+                await asyncio.wait({waiter}, timeout=remaining)
+        except BaseException:
+            if waiter in gate.waiters:
+                gate.waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # We were handed a slot we won't use; pass it on
+                self._release_sender(sender_id, gate)
+            raise
+
+    async def acquire(self, sender_id: Optional[Text] = None) -> Ticket:
+        """Wait for a slot for this sender's turn; raises AdmissionRejected when shed"""
+        if self.max_queue and self.queued >= self.max_queue and not self._has_room_now(sender_id):
+            self._shed(QUEUE_FULL)
+
+        gate = None
+        if sender_id is not None and self.per_sender:
+            gate = self._senders.get(sender_id)
+            if gate is None:
+                gate = self._senders[sender_id] = _SenderGate()
+            elif self.max_sender_queue and gate.active >= self.per_sender and len(gate.waiters) >= self.max_sender_queue:
+                self._shed(SENDER_QUEUE_FULL)
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.monotonic()
+        self.queued += 1
+        self._update_gauges()
+        try:
+            if gate is not None:
+                try:
+                    await self._wait_sender(sender_id, gate, loop.time() + self.sender_queue_timeout)
+                except BaseException:
+                    self._drop_gate(sender_id, gate)
+                    raise
+            try:
+                await self._wait(self._waiters, self._has_global_room, loop.time() + self.queue_timeout)
+            except BaseException:
+                if gate is not None:
+                    self._release_sender(sender_id, gate)
+                raise
+            self.in_flight += 1
+        finally:
+            self.queued -= 1
+            self._update_gauges()
+
+        metrics.observe('admission_queue_seconds', time.monotonic() - queued_at, gate=self.name)
+        metrics.inc('admission_admitted_total', gate=self.name)
+        return Ticket(sender_id if gate is not None else None)
+
+    def release(self, ticket: Ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        elapsed = time.monotonic() - ticket.admitted_at
+        self._service_seconds = 0.9 * self._service_seconds + 0.1 * elapsed
+
+        self.in_flight -= 1
+        self._wake(self._waiters)
+        if ticket.sender_id is not None:
+            gate = self._senders.get(ticket.sender_id)
+            if gate is not None:
+                self._release_sender(ticket.sender_id, gate)
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def admit(self, sender_id: Optional[Text] = None):
+        ticket = await self.acquire(sender_id)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _has_global_room(self) -> bool:
+        return not self.max_in_flight or self.in_flight < self.max_in_flight
+
+    def _has_room_now(self, sender_id: Optional[Text]) -> bool:
+        if not self._has_global_room() or self._waiters:
+            return False
+        gate = self._senders.get(sender_id) if sender_id is not None else None
+        return gate is None or (gate.active < self.per_sender and not gate.waiters)
+
+    def _release_sender(self, sender_id: Text, gate: _SenderGate):
+        # Hand the slot straight to the next follow-up; only an idle gate is dropped
+        if not self._wake(gate.waiters):
+            gate.active -= 1
+            self._drop_gate(sender_id, gate)
+
+    def _drop_gate(self, sender_id: Text, gate: _SenderGate):
+        if gate.active <= 0 and not gate.waiters and self._senders.get(sender_id) is gate:
+            del self._senders[sender_id]
@@ -1,15 +1,113 @@
-import aiohttp
-from typing import Any, Awaitable, Callable, Dict, Text
-from rasa.core.channels.channel import InputChannel
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Text
+from rasa.core.channels.channel import CollectingOutputChannel, InputChannel, UserMessage
 from sanic import Blueprint, response
 from sanic.request import Request
-import os
+
+# admission puts the actions directory on sys.path and shares its metrics registry
+try:
+    from .admission import AdmissionController, AdmissionRejected, metrics
+except ImportError:
+    from admission import AdmissionController, AdmissionRejected, metrics
+
+logger = logging.getLogger(__name__)
+
+# Messages processed at once within one /webhook/batch call; a request can ask for less via ?concurrency=
+BATCH_CONCURRENCY = int(os.getenv("CUSTOM_REST_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("CUSTOM_REST_BATCH_MAX_ITEMS", "1000"))
+# Ingress limits (CUSTOM_REST_MAX_CONCURRENCY, _QUEUE_TIMEOUT, _MAX_QUEUE, _SENDER_CONCURRENCY, _SENDER_QUEUE)
+admission = AdmissionController.from_env("CUSTOM_REST", "custom_rest")
+
 
 class CustomRestInput(InputChannel):
     @classmethod
     def name(cls) -> Text:
         return "custom_rest"
 
+    async def _parse(self, request: Request, text: Text) -> Optional[Dict[Text, Any]]:
+        # The channel runs inside the Rasa server, so NLU is one in-process call on the loaded agent
+        agent = getattr(request.app.ctx, "agent", None)
+        if agent is None or not agent.is_ready():
+            return None
+        try:
+            return await agent.parse_message(text)
+        except Exception as e:
+            logger.warning(f"In-process parse failed, letting the processor parse instead: {e}")
+            return None
+
+    async def handle_message(self, request: Request, on_new_message: Callable[[Any], Awaitable[Any]],
+                             sender_id: Text, text: Text) -> Dict[Text, Any]:
+        """Run one message through the agent and return the bot replies with the NLU result.
+
+        Raises AdmissionRejected when the channel is overloaded or the sender already has too many queued.
+        """
+        async with admission.admit(sender_id):
+            parse_data = await self._parse(request, text)
+            collector = CollectingOutputChannel()
+            # Handing the parse result to the processor means NLU runs once per message, not twice
+            await on_new_message(UserMessage(
+                text,
+                collector,
+                sender_id,
+                parse_data=parse_data,
+                input_channel=self.name(),
+                metadata=self.get_metadata(request)
+            ))
+
+        parse_data = parse_data or {}
+        intent = parse_data.get("intent") or {}
+        return {
+            "sender": sender_id,
+            "message": text,
+            "intent": intent.get("name", "unknown"),
+            "confidence": intent.get("confidence", 0),
+            "entities": parse_data.get("entities", []),
+            "bot_responses": [msg.get("text", "") for msg in collector.messages]
+        }
+
+    async def run_batch(self, request: Request, on_new_message: Callable[[Any], Awaitable[Any]],
+                        items: List[Any], concurrency: int, emit: Callable[[Dict[Text, Any]], Awaitable[None]]):
+        """Process batch items, one task per sender so each sender's messages stay in order.
+
+        Different senders run concurrently, at most `concurrency` messages at a time. Each result
+        is passed to `emit` as soon as it is ready, tagged with the item's index in the batch.
+        """
+        by_sender: Dict[Text, List[Any]] = OrderedDict()
+        for index, item in enumerate(items):
+            sender_id = item.get("sender") if isinstance(item, dict) else None
+            text = item.get("message") if isinstance(item, dict) else None
+            if not sender_id or not text:
+                await emit({"index": index, "error": "Missing sender or message"})
+                continue
+            by_sender.setdefault(sender_id, []).append((index, text))
+
+        slots = asyncio.Semaphore(concurrency)
+
+        async def run_sender(sender_id: Text, messages: List[Any]):
+            for index, text in messages:
+                async with slots:
+                    try:
+                        result = await self.handle_message(request, on_new_message, sender_id, text)
+                    except AdmissionRejected as e:
+                        result = {"sender": sender_id, "message": text, "error": e.reason, "retry_after": e.retry_after}
+                    except Exception as e:
+                        logger.error(f"Batch item {index} for {sender_id} failed: {e}")
+                        result = {"sender": sender_id, "message": text, "error": str(e)}
+                await emit({"index": index, **result})
+
+        tasks = [asyncio.create_task(run_sender(sender_id, messages)) for sender_id, messages in by_sender.items()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # emit failed (the client went away) or we were cancelled: stop running the rest of the batch
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     def blueprint(self, on_new_message: Callable[[Any], Awaitable[Any]]):
         custom_webhook = Blueprint("custom_webhook", __name__)
 
@@ -21,37 +119,39 @@ class CustomRestInput(InputChannel):
             if not sender_id or not text:
                 return response.json({"error": "Missing sender or message"}, status=400)
 
-            async with aiohttp.ClientSession() as session:
-        
-                # Use environment variable for Rasa server URL
-                rasa_url = os.getenv("RASA_SERVER_URL", "http://localhost:5005")
-                async with session.post(
-                    f"{rasa_url}/model/parse",
-                    json={"text": text}
-                ) as parse_resp:
-                    parse_result = await parse_resp.json()
-
-                intent_name = parse_result.get("intent", {}).get("name", "unknown")
-                intent_confidence = parse_result.get("intent", {}).get("confidence", 0)
-                entities = parse_result.get("entities", [])
-
-                
-                async with session.post(
-                    f"{rasa_url}/webhooks/rest/webhook",
-                    json={"sender": sender_id, "message": text}
-                ) as rasa_resp:
-                    bot_responses = await rasa_resp.json()
-
-                bot_messages = [msg.get("text", "") for msg in bot_responses]
-
-           
-            return response.json({
-                "sender": sender_id,
-                "message": text,
-                "intent": intent_name,
-                "confidence": intent_confidence,
-                "entities": entities,
-                "bot_responses": bot_messages
-            })
+            try:
+                return response.json(await self.handle_message(request, on_new_message, sender_id, text))
+            except AdmissionRejected as e:
+                return response.json({"error": "Server busy, please retry", "reason": e.reason}, status=503,
+                                     headers={"Retry-After": str(e.retry_after)})
+
+        @custom_webhook.route("/metrics", methods=["GET"])
+        async def channel_metrics(request: Request):
+            return response.text(metrics.render_prometheus(), content_type="text/plain; version=0.0.4")
+
+        @custom_webhook.route("/webhook/batch", methods=["POST"])
+        async def receive_batch(request: Request):
+            items = request.json
+            if isinstance(items, dict):
+                items = items.get("messages")
+            if not isinstance(items, list) or not items:
+                return response.json({"error": "Expected a non-empty array of {sender, message} items"}, status=400)
+            if len(items) > BATCH_MAX_ITEMS:
+                return response.json({"error": f"Batch exceeds {BATCH_MAX_ITEMS} items"}, status=413)
+
+            try:
+                concurrency = int(request.args.get("concurrency", BATCH_CONCURRENCY))
+            except ValueError:
+                return response.json({"error": "concurrency must be an integer"}, status=400)
+            concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+
+            async def stream(resp):
+                # One JSON object per line, in completion order; "index" ties it back to the request
+                async def emit(result: Dict[Text, Any]):
+                    await resp.write(json.dumps(result) + "\n")
+
+                await self.run_batch(request, on_new_message, items, concurrency, emit)
+
+            return response.stream(stream, content_type="application/x-ndjson")
 
         return custom_webhook
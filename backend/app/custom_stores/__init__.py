@@ -0,0 +1 @@
+# Custom Tracker and Lock Stores Package
@@ -0,0 +1,293 @@
+"""
+Postgres Tracker Store and Lock Store for Rasa
+Persists conversations to Aurora as compressed, append-only event rows so Rasa can run as stateless replicas
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Text, Tuple
+
+import psycopg2
+import psycopg2.pool
+from rasa.core.lock import TicketLock
+from rasa.core.lock_store import LockStore
+from rasa.core.tracker_store import TrackerStore
+from rasa.shared.core.trackers import DialogueStateTracker
+
+logger = logging.getLogger(__name__)
+
+ACTION_SESSION_START = 'action_session_start'
+TRACKER_CACHE_SIZE = int(os.getenv('TRACKER_CACHE_SIZE', '2000'))
+STORE_POOL_MAX = int(os.getenv('TRACKER_STORE_POOL_MAX', '10'))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rasa_tracker_events (
+        sender_id VARCHAR(255) NOT NULL,
+        seq INTEGER NOT NULL,
+        type_name VARCHAR(64) NOT NULL,
+        action_name VARCHAR(255),
+        timestamp DOUBLE PRECISION,
+        payload BYTEA NOT NULL,
+        PRIMARY KEY (sender_id, seq)
+    );
+    CREATE INDEX IF NOT EXISTS idx_rasa_tracker_events_session_start
+        ON rasa_tracker_events (sender_id, seq) WHERE action_name = 'action_session_start';
+    CREATE TABLE IF NOT EXISTS rasa_locks (
+        conversation_id VARCHAR(255) PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+_pools: Dict[Tuple, Any] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(host=None, port=None, db=None, username=None, password=None):
+    """One pool per database for both stores; settings default to the same env vars as the actions"""
+    settings = (
+        host or os.getenv('AURORA_ENDPOINT') or os.getenv('DB_HOST') or 'localhost',
+        int(port or os.getenv('DB_PORT', '5432')),
+        db or os.getenv('DB_NAME', 'hospital'),
+        username or os.getenv('DB_USER', 'postgres'),
+        password or os.getenv('DB_PASSWORD'),
+    )
+    with _pools_lock:
+        pool = _pools.get(settings)
+        if pool is None:
+            pool = psycopg2.pool.ThreadedConnectionPool(
+                1, STORE_POOL_MAX, host=settings[0], port=settings[1], database=settings[2],
+                user=settings[3], password=settings[4], connect_timeout=5
+            )
+            conn = pool.getconn()
+            try:
+                with conn, conn.cursor() as cursor:
+                    cursor.execute(SCHEMA)
+            finally:
+                pool.putconn(conn)
+            _pools[settings] = pool
+            logger.info(f"Postgres conversation store connected to {settings[0]}/{settings[2]}")
+        return pool
+
+
+def _run_in_transaction(pool, func: Callable):
+    conn = pool.getconn()
+    try:
+        with conn, conn.cursor() as cursor:
+            return func(cursor)
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+async def _in_thread(func: Callable, *args):
+    """psycopg2 blocks, so keep it off Rasa's event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def _decode(payload) -> Text:
+    return zlib.decompress(bytes(payload)).decode('utf-8')
+
+
+class _TrackerCache:
+    """LRU of each sender's current session window: (window start seq, last seq, event JSON strings)"""
+
+    def __init__(self, max_senders: int):
+        self.max_senders = max_senders
+        self._entries: "OrderedDict[Text, Tuple[int, int, List[Text]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sender_id: Text) -> Optional[Tuple[int, int, List[Text]]]:
+        with self._lock:
+            entry = self._entries.get(sender_id)
+            if entry is not None:
+                self._entries.move_to_end(sender_id)
+            return entry
+
+    def put(self, sender_id: Text, window_start: int, last_seq: int, events: List[Text]):
+        if self.max_senders <= 0:
+            return
+        with self._lock:
+            self._entries[sender_id] = (window_start, last_seq, events)
+            self._entries.move_to_end(sender_id)
+            while len(self._entries) > self.max_senders:
+                self._entries.popitem(last=False)
+
+    def discard(self, sender_id: Text):
+        with self._lock:
+            self._entries.pop(sender_id, None)
+
+
+class PostgresTrackerStore(TrackerStore):
+    """Append-only tracker store: each save writes only the events added since the last one.
+
+    Events are stored one row each as zlib-compressed JSON, numbered per sender. Like Rasa's
+    SQLTrackerStore, `retrieve` returns the events since the latest session start. Recent
+    senders' windows are cached; a cached window is validated with a single index lookup
+    and topped up with just the rows another replica appended.
+    """
+
+    def __init__(self, domain=None, host=None, port=None, db=None, username=None, password=None,
+                 event_broker=None, cache_size: int = TRACKER_CACHE_SIZE, url=None, **kwargs):
+        super().__init__(domain, event_broker, **kwargs)
+        self.pool = _get_pool(host or url, port, db, username, password)
+        self.cache = _TrackerCache(int(cache_size))
+
+    async def keys(self) -> Iterable[Text]:
+        def query(cursor):
+            cursor.execute("SELECT DISTINCT sender_id FROM rasa_tracker_events")
+            return [row[0] for row in cursor.fetchall()]
+        return await _in_thread(_run_in_transaction, self.pool, query)
+
+    def _load_window(self, cursor, sender_id: Text) -> Tuple[int, int, List[Text]]:
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM rasa_tracker_events WHERE sender_id = %s", (sender_id,))
+        last_seq = cursor.fetchone()[0]
+        cached = self.cache.get(sender_id)
+        if cached is not None and cached[1] == last_seq:
+            return cached
+
+        if cached is not None and cached[1] < last_seq:
+            # Another replica appended since we cached this sender - read only the new rows
+            window_start, after_seq, events = cached[0], cached[1], list(cached[2])
+        else:
+            cursor.execute("""
+                SELECT COALESCE(MAX(seq), 0) FROM rasa_tracker_events
+                WHERE sender_id = %s AND action_name = %s
+            """, (sender_id, ACTION_SESSION_START))
+            window_start, after_seq, events = cursor.fetchone()[0], None, []
+
+        cursor.execute("""
+            SELECT seq, action_name, payload FROM rasa_tracker_events
+            WHERE sender_id = %s AND seq >= %s AND seq > %s
+            ORDER BY seq
+        """, (sender_id, window_start, after_seq or 0))
+        for seq, action_name, payload in cursor.fetchall():
+            if action_name == ACTION_SESSION_START:
+                window_start, events = seq, []
+            events.append(_decode(payload))
+
+        self.cache.put(sender_id, window_start, last_seq, events)
+        return window_start, last_seq, events
+
+    def _build_tracker(self, sender_id: Text, events: List[Text]) -> Optional[DialogueStateTracker]:
+        if not events:
+            return None
+        slots = self.domain.slots if self.domain else []
+        return DialogueStateTracker.from_dict(sender_id, [json.loads(e) for e in events], slots)
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        _, _, events = await _in_thread(
+            _run_in_transaction, self.pool, lambda cursor: self._load_window(cursor, sender_id)
+        )
+        return self._build_tracker(sender_id, events)
+
+    async def retrieve_full_tracker(self, conversation_id: Text) -> Optional[DialogueStateTracker]:
+        def query(cursor):
+            cursor.execute(
+                "SELECT payload FROM rasa_tracker_events WHERE sender_id = %s ORDER BY seq", (conversation_id,)
+            )
+            return [_decode(row[0]) for row in cursor.fetchall()]
+        events = await _in_thread(_run_in_transaction, self.pool, query)
+        return self._build_tracker(conversation_id, events)
+
+    def _append(self, cursor, sender_id: Text, tracker_events: List[Dict[Text, Any]]) -> int:
+        window_start, last_seq, stored = self._load_window(cursor, sender_id)
+        new_events = tracker_events[len(stored):]
+        if not new_events:
+            return 0
+
+        rows = []
+        events = list(stored)
+        for offset, event in enumerate(new_events, start=1):
+            seq = last_seq + offset
+            action_name = event.get('name') if event.get('event') == 'action' else None
+            if action_name == ACTION_SESSION_START:
+                window_start, events = seq, []
+            encoded = json.dumps(event, separators=(',', ':'))
+            events.append(encoded)
+            rows.append((sender_id, seq, event.get('event', 'unknown'), action_name,
+                         event.get('timestamp'), psycopg2.Binary(zlib.compress(encoded.encode('utf-8')))))
+        cursor.executemany("""
+            INSERT INTO rasa_tracker_events (sender_id, seq, type_name, action_name, timestamp, payload)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, rows)
+        self.cache.put(sender_id, window_start, last_seq + len(rows), events)
+        return len(rows)
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        streamed = self.stream_events(tracker)
+        if inspect.isawaitable(streamed):
+            await streamed
+        tracker_events = [event.as_dict() for event in tracker.events]
+        try:
+            await _in_thread(
+                _run_in_transaction, self.pool, lambda cursor: self._append(cursor, tracker.sender_id, tracker_events)
+            )
+        except Exception:
+            # e.g. a concurrent writer took the same seq - the cached window can't be trusted any more
+            self.cache.discard(tracker.sender_id)
+            raise
+
+
+class PostgresLockStore(LockStore):
+    """Ticket locks in a Postgres table. Issuing and releasing tickets happen under a row lock,
+    so replicas can't hand out the same ticket for a conversation."""
+
+    def __init__(self, host=None, port=None, db=None, username=None, password=None, url=None, **kwargs):
+        super().__init__()
+        self.pool = _get_pool(host or url, port, db, username, password)
+
+    @staticmethod
+    def _load(data: Optional[Text]) -> Optional[TicketLock]:
+        return TicketLock.from_dict(json.loads(data)) if data else None
+
+    async def get_lock(self, conversation_id: Text) -> Optional[TicketLock]:
+        def query(cursor):
+            cursor.execute("SELECT data FROM rasa_locks WHERE conversation_id = %s", (conversation_id,))
+            row = cursor.fetchone()
+            return self._load(row[0]) if row else None
+        return await _in_thread(_run_in_transaction, self.pool, query)
+
+    async def delete_lock(self, conversation_id: Text) -> None:
+        def query(cursor):
+            cursor.execute("DELETE FROM rasa_locks WHERE conversation_id = %s", (conversation_id,))
+        await _in_thread(_run_in_transaction, self.pool, query)
+
+    async def save_lock(self, lock: TicketLock) -> None:
+        def query(cursor):
+            cursor.execute("""
+                INSERT INTO rasa_locks (conversation_id, data) VALUES (%s, %s)
+                ON CONFLICT (conversation_id) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+            """, (lock.conversation_id, lock.dumps()))
+        await _in_thread(_run_in_transaction, self.pool, query)
+
+    def _update_locked(self, conversation_id: Text, change: Callable[[TicketLock], Any]):
+        def query(cursor):
+            cursor.execute("""
+                INSERT INTO rasa_locks (conversation_id, data) VALUES (%s, %s)
+                ON CONFLICT (conversation_id) DO NOTHING
+            """, (conversation_id, TicketLock(conversation_id).dumps()))
+            cursor.execute("SELECT data FROM rasa_locks WHERE conversation_id = %s FOR UPDATE", (conversation_id,))
+            lock = self._load(cursor.fetchone()[0]) or TicketLock(conversation_id)
+            result = change(lock)
+            if lock.is_empty():
+                cursor.execute("DELETE FROM rasa_locks WHERE conversation_id = %s", (conversation_id,))
+            else:
+                cursor.execute(
+                    "UPDATE rasa_locks SET data = %s, updated_at = NOW() WHERE conversation_id = %s",
+                    (lock.dumps(), conversation_id)
+                )
+            return result
+        return _run_in_transaction(self.pool, query)
+
+    async def issue_ticket(self, conversation_id: Text, lock_lifetime: float = None) -> int:
+        lifetime = lock_lifetime if lock_lifetime is not None else float(os.getenv('TICKET_LOCK_LIFETIME', '60'))
+        return await _in_thread(self._update_locked, conversation_id, lambda lock: lock.issue_ticket(lifetime))
+
+    async def finish_serving(self, conversation_id: Text, ticket_number: int) -> None:
+        await _in_thread(self._update_locked, conversation_id, lambda lock: lock.remove_ticket_for(ticket_number))
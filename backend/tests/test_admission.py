@@ -0,0 +1,72 @@
+"""
+Admission Control tests
+Run with `python -m unittest discover backend/tests`
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from custom_connectors.admission import AdmissionController, AdmissionRejected
+
+
+class SenderGateTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_same_sender_turns_run_one_at_a_time(self):
+        admission = AdmissionController('test', per_sender=1, max_sender_queue=5)
+        running, overlaps, order = set(), [], []
+
+        async def turn(name):
+            async with admission.admit('patient-1'):
+                if running:
+                    overlaps.append((name, set(running)))
+                running.add(name)
+                order.append(name)
+                await asyncio.sleep(0.01)
+                running.discard(name)
+
+        first = asyncio.create_task(turn('A'))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, turn('B'), turn('C'))
+        await turn('D')
+
+        self.assertEqual(overlaps, [])
+        self.assertEqual(order, ['A', 'B', 'C', 'D'])
+        self.assertEqual(admission.in_flight, 0)
+        self.assertNotIn('patient-1', admission._senders)
+
+    async def test_gate_stays_registered_while_follow_up_runs(self):
+        admission = AdmissionController('test', per_sender=1)
+        first = await admission.acquire('patient-1')
+        follow_up = asyncio.create_task(admission.acquire('patient-1'))
+        await asyncio.sleep(0)
+
+        admission.release(first)
+        second = await follow_up
+        gate = admission._senders.get('patient-1')
+        self.assertIsNotNone(gate)
+        self.assertEqual(gate.active, 1)
+
+        third = asyncio.create_task(admission.acquire('patient-1'))
+        await asyncio.sleep(0.01)
+        self.assertFalse(third.done())
+
+        admission.release(second)
+        admission.release(await third)
+        self.assertNotIn('patient-1', admission._senders)
+
+    async def test_timed_out_follow_up_does_not_leak_the_slot(self):
+        admission = AdmissionController('test', per_sender=1, sender_queue_timeout=0.01)
+        first = await admission.acquire('patient-1')
+        with self.assertRaises(AdmissionRejected):
+            await admission.acquire('patient-1')
+        admission.release(first)
+        self.assertNotIn('patient-1', admission._senders)
+        admission.release(await admission.acquire('patient-1'))
+        self.assertEqual(admission.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,60 +1,328 @@
 """
-Minimal Flask Wrapper Server for Rasa Chatbot
-No MongoDB - Just proxies requests to Rasa
+ASGI Wrapper Server for Rasa Chatbot
+No MongoDB - Just proxies requests to Rasa, over a shared keep-alive connection pool
 """
 
-from flask import Flask, request, jsonify
-import requests
-from flask_cors import CORS
+import asyncio
+import json
 import logging
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+# Shared with the action server and the Rasa channels; neither module pulls in Rasa
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+sys.path.append(os.path.join(APP_DIR, 'actions'))
+sys.path.append(APP_DIR)
+from metrics import metrics
+from custom_connectors.admission import AdmissionController, AdmissionRejected
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)
+RASA_URL = os.getenv('RASA_SERVER_URL', 'http://localhost:5005')
+RASA_WEBHOOK_URL = os.getenv('RASA_WEBHOOK_URL', f"{RASA_URL}/webhooks/rest/webhook")
+RASA_STATUS_URL = os.getenv('RASA_STATUS_URL', f"{RASA_URL}/status")
+HOST = os.getenv('FLASK_HOST', '0.0.0.0')
+PORT = int(os.getenv('FLASK_PORT', '5000'))
+
+RASA_TIMEOUT = float(os.getenv('RASA_TIMEOUT', '30'))
+# Connections to Rasa are reused across requests; beyond the keep-alive count they are closed after use
+RASA_MAX_CONNECTIONS = int(os.getenv('RASA_MAX_CONNECTIONS', '100'))
+RASA_KEEPALIVE_CONNECTIONS = int(os.getenv('RASA_KEEPALIVE_CONNECTIONS', '20'))
+# Webhook admission: WRAPPER_MAX_CONCURRENCY turns in flight (one per sender), up to WRAPPER_MAX_QUEUE
+# waiting at most WRAPPER_QUEUE_TIMEOUT seconds; beyond that callers get 503 with Retry-After. A follow-up
+# queued behind its sender's own turn waits up to WRAPPER_SENDER_QUEUE_TIMEOUT, by default the Rasa timeout
+admission = AdmissionController.from_env('WRAPPER', 'wrapper', sender_queue_timeout=RASA_TIMEOUT)
+
+# Dependencies are polled in the background; /health and /health/deep only read the cached result
+ACTION_SERVER_HEALTH_URL = os.getenv('ACTION_SERVER_HEALTH_URL', 'http://localhost:5055/health')
+ACTION_SERVER_DEPENDENCIES_URL = os.getenv(
+    'ACTION_SERVER_DEPENDENCIES_URL', ACTION_SERVER_HEALTH_URL.rsplit('/health', 1)[0] + '/health/dependencies'
+)
+BEDROCK_HEALTH_HOST = os.getenv(
+    'BEDROCK_HEALTH_HOST', f"bedrock-runtime.{os.getenv('AWS_REGION', 'us-east-1')}.amazonaws.com"
+)
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '10'))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+
+ERROR_UNAVAILABLE = [{"text": "Sorry, I'm having trouble connecting. Please try again."}]
+ERROR_TIMEOUT = [{"text": "Request timeout. Please try again."}]
+ERROR_INTERNAL = [{"text": "Sorry, something went wrong. Please try again."}]
+
+metrics.describe('wrapper_request_seconds', "End-to-end latency of wrapper requests")
+metrics.describe('wrapper_upstream_seconds', "Time until Rasa returned response headers")
+metrics.describe('wrapper_dependency_up', "1 if the dependency passed its last background health check")
+metrics.describe('wrapper_health_check_seconds', "Duration of background health checks per dependency")
+
+client: httpx.AsyncClient = None
+
+UP = 'up'
+DOWN = 'down'
+DEGRADED = 'degraded'
+UNKNOWN = 'unknown'
+
+
+class HealthMonitor:
+    """Polls Rasa, the action server, its database pool and Bedrock reachability on an interval.
+
+    Probes never wait on a check: they read `results`, which holds the last outcome per dependency.
+    The database state comes from the action server's /health/dependencies (breaker and pool
+    counters), so the wrapper needs no database credentials and adds no database load.
+    """
+
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL, timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self.results = {name: {"status": UNKNOWN} for name in ("rasa", "actions", "database", "bedrock")}
+        self.last_run = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_checks()
+            except Exception as e:
+                logger.error(f"Health monitor error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_checks(self):
+        rasa, actions, bedrock = await asyncio.gather(
+            self._timed("rasa", self._check_rasa),
+            self._timed("actions", self._check_actions),
+            self._timed("bedrock", self._check_bedrock)
+        )
+        database = self._database_from(actions)
+        checked_at = time.time()
+        for name, result in (("rasa", rasa), ("actions", actions), ("database", database), ("bedrock", bedrock)):
+            result["checked_at"] = checked_at
+            metrics.set_gauge('wrapper_dependency_up', 1 if result["status"] == UP else 0, dependency=name)
+            if result["status"] != self.results[name]["status"]:
+                logger.info(f"Dependency {name}: {self.results[name]['status']} -> {result['status']}")
+            self.results[name] = result
+        self.last_run = checked_at
+
+    async def _timed(self, name: str, check):
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(check(), timeout=self.timeout)
+        except Exception as e:
+            result = {"status": DOWN, "error": str(e) or type(e).__name__}
+        elapsed = time.monotonic() - started
+        metrics.observe('wrapper_health_check_seconds', elapsed, dependency=name)
+        result["latency_ms"] = round(elapsed * 1000, 1)
+        return result
+
+    async def _check_rasa(self):
+        response = await client.get(RASA_STATUS_URL, timeout=self.timeout)
+        if response.status_code != 200:
+            return {"status": DOWN, "error": f"HTTP {response.status_code}"}
+        return {"status": UP}
+
+    async def _check_actions(self):
+        response = await client.get(ACTION_SERVER_HEALTH_URL, timeout=self.timeout)
+        if response.status_code != 200:
+            return {"status": DOWN, "error": f"HTTP {response.status_code}"}
+        result = {"status": UP}
+        try:
+            details = await client.get(ACTION_SERVER_DEPENDENCIES_URL, timeout=self.timeout)
+            if details.status_code == 200:
+                result["dependencies"] = details.json()
+                result["circuits"] = result["dependencies"].get("circuits", {})
+        except Exception as e:
+            logger.debug(f"Action server dependency details unavailable: {e}")
+        return result
+
+    async def _check_bedrock(self):
+        # A TCP handshake proves network reachability without spending model quota
+        reader, writer = await asyncio.open_connection(BEDROCK_HEALTH_HOST, 443)
+        writer.close()
+        await writer.wait_closed()
+        return {"status": UP, "host": BEDROCK_HEALTH_HOST}
+
+    @staticmethod
+    def _database_from(actions: dict) -> dict:
+        database = (actions.pop("dependencies", None) or {}).get("database")
+        if actions["status"] != UP or database is None:
+            return {"status": UNKNOWN}
+        if not database.get("configured"):
+            # Pools are created on first use
+            return {"status": UNKNOWN, **database}
+        status = {"closed": UP, "half_open": DEGRADED}.get(database.get("breaker"), DOWN)
+        return {"status": status, **database}
+
+    def snapshot(self) -> dict:
+        return {name: dict(result) for name, result in self.results.items()}
+
 
-RASA_URL = "http://localhost:5005"
+monitor = HealthMonitor()
 
-@app.route("/health", methods=["GET"])
-def health():
-    """Health check endpoint"""
+
+@asynccontextmanager
+async def lifespan(app):
+    global client
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(RASA_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(max_connections=RASA_MAX_CONNECTIONS,
+                            max_keepalive_connections=RASA_KEEPALIVE_CONNECTIONS)
+    )
+    logger.info(f"Proxying to {RASA_WEBHOOK_URL} (pool {RASA_MAX_CONNECTIONS}, concurrency {admission.max_in_flight or 'unlimited'})")
+    monitor.start()
+    try:
+        yield
+    finally:
+        await monitor.stop()
+        await client.aclose()
+
+
+def _observe(route: str, status: int, started: float):
+    metrics.observe('wrapper_request_seconds', time.monotonic() - started, route=route)
+    metrics.inc('wrapper_requests_total', route=route, status=status)
+
+
+async def health(request: Request):
+    """Health check endpoint - served from the monitor's last check"""
+    started = time.monotonic()
+    _observe('/health', 200, started)
+    if monitor.results["rasa"]["status"] == UP:
+        return JSONResponse({"status": "healthy", "rasa": "connected"}, status_code=200)
+    return JSONResponse({"status": "starting", "rasa": "not ready"}, status_code=200)
+
+
+async def health_deep(request: Request):
+    """Per-dependency health from the monitor's last check; 503 while Rasa is not serving"""
+    started = time.monotonic()
+    dependencies = monitor.snapshot()
+    statuses = {result["status"] for result in dependencies.values()}
+    if dependencies["rasa"]["status"] != UP:
+        overall, code = "unhealthy", 503
+    elif statuses <= {UP, UNKNOWN}:
+        overall, code = "healthy", 200
+    else:
+        overall, code = "degraded", 200
+    _observe('/health/deep', code, started)
+    return JSONResponse({
+        "status": overall,
+        "checked_at": monitor.last_run,
+        "age_seconds": round(time.time() - monitor.last_run, 1) if monitor.last_run else None,
+        "interval_seconds": monitor.interval,
+        "dependencies": dependencies
+    }, status_code=code)
+
+
+async def rasa_webhook(request: Request):
+    """Forward requests to Rasa, streaming the reply back as it arrives"""
+    started = time.monotonic()
     try:
-        response = requests.get(f"{RASA_URL}/status", timeout=2)
-        if response.status_code == 200:
-            return jsonify({"status": "healthy", "rasa": "connected"}), 200
+        body = await request.body()
+        data = json.loads(body)
+        sender_id = data.get('sender')
+        logger.info(f"Request from {sender_id or 'unknown'}")
     except Exception as e:
-        logger.warning(f"Rasa not ready: {e}")
-    
-    return jsonify({"status": "starting", "rasa": "not ready"}), 200
+        logger.error(f"Error: {str(e)}")
+        _observe('/rasa-webhook', 500, started)
+        return JSONResponse(ERROR_INTERNAL, status_code=500)
 
-@app.route("/rasa-webhook", methods=["POST"])
-def rasa_webhook():
-    """Forward requests to Rasa"""
     try:
-        data = request.json
-        logger.info(f"Request from {data.get('sender', 'unknown')}")
-        
-        response = requests.post(
-            f"{RASA_URL}/webhooks/rest/webhook",
-            json=data,
-            timeout=30
+        ticket = await admission.acquire(str(sender_id) if sender_id else None)
+    except AdmissionRejected as e:
+        _observe('/rasa-webhook', 503, started)
+        return JSONResponse(ERROR_UNAVAILABLE, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+    def release():
+        admission.release(ticket)
+
+    upstream = None
+    try:
+        upstream_request = client.build_request(
+            "POST", RASA_WEBHOOK_URL, content=body, headers={"Content-Type": "application/json"}
+        )
+        upstream = await client.send(upstream_request, stream=True)
+        metrics.observe('wrapper_upstream_seconds', time.monotonic() - started, route='/rasa-webhook')
+
+        if upstream.status_code != 200:
+            logger.error(f"Rasa error: {upstream.status_code}")
+            await upstream.aclose()
+            release()
+            _observe('/rasa-webhook', 503, started)
+            return JSONResponse(ERROR_UNAVAILABLE, status_code=503)
+
+        async def relay():
+            # The upstream and the admission slot are released however the body ends - completed,
+            # client disconnect, or an error while reading from Rasa
+            status = 502
+            try:
+                async for chunk in upstream.aiter_raw():
+                    yield chunk
+                status = 200
+            except (GeneratorExit, asyncio.CancelledError):
+                # Client went away mid-reply
+                status = 499
+                raise
+            except httpx.HTTPError as e:
+                logger.error(f"Error streaming Rasa reply: {str(e)}")
+                raise
+            finally:
+                await upstream.aclose()
+                release()
+                _observe('/rasa-webhook', status, started)
+
+        return StreamingResponse(
+            relay(),
+            status_code=200,
+            media_type=upstream.headers.get('content-type', 'application/json')
         )
-        
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            logger.error(f"Rasa error: {response.status_code}")
-            return jsonify([{"text": "Sorry, I'm having trouble connecting. Please try again."}]), 503
-            
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("Rasa timeout")
-        return jsonify([{"text": "Request timeout. Please try again."}]), 504
+        status, payload = 504, ERROR_TIMEOUT
     except Exception as e:
         logger.error(f"Error: {str(e)}")
-        return jsonify([{"text": "Sorry, something went wrong. Please try again."}]), 500
+        status, payload = 500, ERROR_INTERNAL
+    if upstream is not None:
+        await upstream.aclose()
+    release()
+    _observe('/rasa-webhook', status, started)
+    return JSONResponse(payload, status_code=status)
+
+
+async def metrics_endpoint(request: Request):
+    return PlainTextResponse(metrics.render_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/health/deep", health_deep, methods=["GET"]),
+        Route("/rasa-webhook", rasa_webhook, methods=["POST"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
 
 if __name__ == "__main__":
-    logger.info("Starting minimal Flask wrapper (no MongoDB)")
-    app.run(host="0.0.0.0", port=5000)
+    import uvicorn
+
+    logger.info("Starting ASGI wrapper (no MongoDB)")
+    uvicorn.run(app, host=HOST, port=PORT, log_level="info", access_log=False)
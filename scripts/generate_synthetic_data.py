@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic hospital data for scale testing
+Reads table definitions from database_mapping.json and bulk-loads a local Postgres with COPY
+"""
+
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import psycopg2
+
+MAPPING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_mapping.json')
+
+# Tables the action server uses that are not in database_mapping.json, described in the same format
+SUPPLEMENTARY_TABLES = {
+    'medical_patients': {
+        'columns': [
+            {'name': 'patient_id', 'type': 'integer', 'nullable': False, 'default': 'nextval'},
+            {'name': 'user_id', 'type': 'character varying', 'max_length': 255},
+            {'name': 'name', 'type': 'character varying', 'max_length': 255},
+            {'name': 'email', 'type': 'character varying', 'max_length': 255},
+            {'name': 'phone', 'type': 'character varying', 'max_length': 50},
+            {'name': 'date_of_birth', 'type': 'date'},
+            {'name': 'address', 'type': 'text'},
+            {'name': 'medical_history', 'type': 'text'},
+            {'name': 'created_at', 'type': 'timestamp without time zone', 'default': 'CURRENT_TIMESTAMP'},
+        ],
+        'primary_key': 'patient_id',
+        'foreign_keys': [],
+    },
+    'medical_appointments': {
+        'columns': [
+            {'name': 'appointment_id', 'type': 'integer', 'nullable': False, 'default': 'nextval'},
+            {'name': 'patient_id', 'type': 'integer'},
+            {'name': 'doctor_name', 'type': 'character varying', 'max_length': 255},
+            {'name': 'department', 'type': 'character varying', 'max_length': 255},
+            {'name': 'appointment_date', 'type': 'date'},
+            {'name': 'appointment_time', 'type': 'time without time zone'},
+            {'name': 'status', 'type': 'character varying', 'max_length': 50},
+            {'name': 'symptoms', 'type': 'text'},
+        ],
+        'primary_key': 'appointment_id',
+        'foreign_keys': [{'column': 'patient_id', 'references': 'medical_patients.patient_id'}],
+    },
+    'conversation_history': {
+        'columns': [
+            {'name': 'id', 'type': 'integer', 'nullable': False, 'default': 'nextval'},
+            {'name': 'sender_id', 'type': 'character varying', 'max_length': 255},
+            {'name': 'user_message', 'type': 'text'},
+            {'name': 'bot_response', 'type': 'text'},
+            {'name': 'intent', 'type': 'character varying', 'max_length': 100},
+            {'name': 'entities', 'type': 'text'},
+            {'name': 'created_at', 'type': 'timestamp without time zone', 'default': 'NOW()'},
+        ],
+        'primary_key': 'id',
+        'foreign_keys': [],
+    },
+}
+
+# Parents before children so foreign keys always point at loaded rows
+LOAD_ORDER = [
+    'doctors', 'patients', 'insurance_plans', 'medical_patients',
+    'availability_slots', 'appointments', 'medical_records', 'medical_appointments', 'conversation_history',
+]
+
+DEFAULT_ROWS = {
+    'doctors': 2000,
+    'patients': 200000,
+    'insurance_plans': 12,
+    'medical_patients': 100000,
+    'availability_slots': 2000000,
+    'appointments': 3000000,
+    'medical_records': 500000,
+    'medical_appointments': 500000,
+    'conversation_history': 2000000,
+}
+
+# (specialty, department, relative popularity) - popular specialties get most doctors and bookings
+SPECIALTIES = [
+    ('General Medicine', 'General Medicine', 30), ('Pediatrics', 'Pediatrics', 14),
+    ('Cardiology', 'Cardiology', 10), ('Orthopedics', 'Orthopedics', 9),
+    ('Gynecology', "Women's Health", 8), ('Dermatology', 'Dermatology', 7),
+    ('Psychiatry', 'Mental Health', 6), ('Neurology', 'Neurology', 5),
+    ('Ophthalmology', 'Eye Care', 4), ('ENT', 'ENT', 3), ('Oncology', 'Oncology', 2),
+    ('Endocrinology', 'Endocrinology', 2),
+]
+FIRST_NAMES = ['Sarah', 'Michael', 'Emily', 'David', 'Lisa', 'Robert', 'Jessica', 'Amanda', 'James', 'Priya',
+               'Wei', 'Fatima', 'Carlos', 'Olga', 'Ahmed', 'Grace', 'Kenji', 'Maria', 'John', 'Aisha',
+               'Daniel', 'Sofia', 'Ravi', 'Hannah', 'Lucas', 'Mei', 'Omar', 'Elena', 'Samuel', 'Zara']
+LAST_NAMES = ['Johnson', 'Chen', 'Williams', 'Martinez', 'Anderson', 'Brown', 'Taylor', 'Garcia', 'Patel',
+              'Kim', 'Nguyen', 'Khan', 'Smith', 'Rossi', 'Muller', 'Singh', 'Lopez', 'Ivanova', 'Okafor',
+              'Sato', 'Cohen', 'Silva', 'Haddad', 'Novak', 'Murphy', 'Larsen', 'Gupta', 'Dubois', 'Park', 'Ali']
+SYMPTOMS = ['fever and cough', 'chest pain', 'headache', 'back pain', 'skin rash', 'anxiety', 'sore throat',
+            'knee injury', 'fatigue', 'stomach ache', 'shortness of breath', 'blurred vision']
+INTENTS = ['ask_doctors', 'insurance_plans', 'book_appointment', 'describe_symptoms', 'greet', 'affirm',
+           'check_appointments', 'nlu_fallback']
+USER_MESSAGES = ['show me doctors', 'I need a cardiologist', 'what insurance plans do you have', 'yes',
+                 'book an appointment for tomorrow', 'I have a headache and fever', 'hello',
+                 'when is my next appointment', 'find a pediatrician near me', 'thanks']
+STATUSES = [('scheduled', 50), ('completed', 35), ('cancelled', 10), ('no_show', 5)]
+PLAN_TIERS = ['Bronze', 'Silver', 'Gold', 'Platinum', 'Basic', 'Premium', 'Family', 'Senior']
+FEATURES = ['Primary care', 'Emergency visits', 'Specialist visits', 'Mental health', 'Dental', 'Vision',
+            'Maternity care', 'Pediatric care', 'Prescriptions', 'Telehealth']
+
+
+class SkewedPicker:
+    """Zipf-distributed picks over ids 1..n, with hot ids scattered rather than clustered at the low end"""
+
+    def __init__(self, rng, n, exponent):
+        self.rng = rng
+        self.n = n
+        ids = list(range(1, n + 1))
+        rng.shuffle(ids)
+        self.ids = ids
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+        self.total = self.cum_weights[-1]
+
+    def pick(self):
+        return self.ids[bisect.bisect_left(self.cum_weights, self.rng.random() * self.total)]
+
+
+class Generator:
+    def __init__(self, tables, rows, seed, skew, today):
+        self.tables = tables
+        self.rows = rows
+        self.rng = random.Random(seed)
+        self.skew = skew
+        self.today = today
+        self.pickers = {}
+        self.doctor_directory = []
+
+    def picker(self, table, count):
+        key = (table, count)
+        if key not in self.pickers:
+            self.pickers[key] = SkewedPicker(self.rng, count, self.skew)
+        return self.pickers[key]
+
+    def weighted(self, options):
+        return self.rng.choices([o[0] for o in options], weights=[o[-1] for o in options])[0]
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def day(self, start_offset, end_offset):
+        return self.today + timedelta(days=self.rng.randint(start_offset, end_offset))
+
+    def clock(self):
+        minutes = self.rng.randrange(8 * 60, 18 * 60, 15)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+    def moment(self, days_back=365):
+        return datetime.combine(self.day(-days_back, 0), datetime.min.time()) + timedelta(seconds=self.rng.randrange(86400))
+
+    def phone(self):
+        return f"555{self.rng.randrange(10 ** 7):07d}"
+
+    def generic(self, column):
+        """Fallback by type for columns without a semantic generator"""
+        kind = column['type']
+        if kind == 'integer':
+            return self.rng.randint(0, 1000)
+        if kind == 'numeric':
+            return round(self.rng.uniform(0, 100), 2)
+        if kind == 'boolean':
+            return self.rng.random() < 0.5
+        if kind == 'date':
+            return self.day(-365, 365)
+        if kind.startswith('time '):
+            return self.clock()
+        if kind.startswith('timestamp'):
+            return self.moment()
+        if kind == 'ARRAY':
+            return '{' + ','.join(self.rng.sample(FEATURES, 2)) + '}'
+        text = ' '.join(self.rng.choice(SYMPTOMS).split()[:3])
+        return text[:column.get('max_length') or None]
+
+    def row(self, table, row_id, columns, parents):
+        """Values for one row keyed by column name; None means NULL"""
+        values = {}
+        if table == 'doctors':
+            specialty = self.weighted(SPECIALTIES)
+            department = next(d for s, d, _ in SPECIALTIES if s == specialty)
+            first, last = self.person()
+            values = {
+                'name': f"{first} {last}", 'specialty': specialty, 'doc_type': specialty, 'department': department,
+                'email': f"{first}.{last}{row_id}@hospital.example".lower(), 'phone': self.phone(),
+                'rating': round(self.rng.uniform(3.0, 5.0), 1), 'experience': self.rng.randint(1, 40),
+            }
+        elif table == 'patients':
+            first, last = self.person()
+            values = {
+                'first_name': first, 'last_name': last, 'date_of_birth': self.day(-95 * 365, 0),
+                'gender': self.rng.choice(['female', 'male', 'other']), 'contact_number': self.phone(),
+                'email': f"{first}.{last}{row_id}@example.com".lower(), 'address': f"{row_id} Main St",
+                'emergency_contact_name': ' '.join(self.person()), 'emergency_contact_number': self.phone(),
+                'date_registered': self.moment(3 * 365),
+            }
+        elif table == 'insurance_plans':
+            values = {
+                'plan_name': f"{PLAN_TIERS[row_id % len(PLAN_TIERS)]} Plan {row_id}",
+                'monthly_premium': self.rng.randrange(100, 800, 25), 'deductible': self.rng.randrange(250, 5000, 250),
+                'coverage_percentage': self.rng.randrange(60, 100, 5),
+                'features': '{' + ','.join(f'"{f}"' for f in self.rng.sample(FEATURES, 4)) + '}',
+                'is_active': self.rng.random() < 0.9,
+            }
+        elif table == 'medical_patients':
+            first, last = self.person()
+            values = {
+                'user_id': f"user_{row_id}", 'name': f"{first} {last}", 'email': f"user_{row_id}@example.com",
+                'phone': self.phone(), 'date_of_birth': self.day(-95 * 365, 0), 'address': f"{row_id} Oak Ave",
+                'medical_history': json.dumps({'conditions': self.rng.sample(SYMPTOMS, 2)}), 'created_at': self.moment(),
+            }
+        elif table == 'availability_slots':
+            start = self.clock()
+            end_minutes = int(start[:2]) * 60 + int(start[3:5]) + 30
+            available = self.rng.random() < 0.7
+            values = {
+                'doctor_id': parents['doctors'].pick(), 'date': self.day(-30, 90), 'start_time': start,
+                'end_time': f"{end_minutes // 60:02d}:{end_minutes % 60:02d}:00", 'available': available,
+                'patient_id': None if available or 'patients' not in parents else parents['patients'].pick(),
+            }
+        elif table == 'appointments':
+            values = {
+                'patient_id': parents['patients'].pick(), 'doctor_id': parents['doctors'].pick(),
+                'appointment_date': self.day(-365, 90), 'appointment_time': self.clock(),
+                'status': self.weighted(STATUSES), 'symptoms': self.rng.choice(SYMPTOMS), 'notes': None,
+                'created_at': self.moment(),
+            }
+        elif table == 'medical_records':
+            values = {
+                'patient_id': parents['patients'].pick(), 'doctor_id': parents['doctors'].pick(),
+                'record_type': self.rng.choice(['lab_result', 'diagnosis', 'prescription', 'imaging']),
+                'record_date': self.day(-3 * 365, 0), 'diagnosis': self.rng.choice(SYMPTOMS),
+                'treatment': 'follow up in two weeks', 'notes': None, 'created_at': self.moment(),
+            }
+        elif table == 'medical_appointments':
+            doctor_name, department = self.rng.choice(self.doctor_directory or [('Sarah Johnson', 'General Medicine')])
+            values = {
+                'patient_id': parents['medical_patients'].pick(), 'doctor_name': doctor_name, 'department': department,
+                'appointment_date': self.day(-180, 90), 'appointment_time': self.clock(),
+                'status': self.weighted(STATUSES), 'symptoms': self.rng.choice(SYMPTOMS),
+            }
+        elif table == 'conversation_history':
+            values = {
+                'sender_id': f"user_{parents['senders'].pick()}", 'user_message': self.rng.choice(USER_MESSAGES),
+                'bot_response': 'Here is what I found for you.', 'intent': self.rng.choice(INTENTS),
+                'entities': None, 'created_at': self.moment(90),
+            }
+
+        result = []
+        for column in columns:
+            name = column['name']
+            if name in values:
+                result.append(values[name])
+            elif column.get('is_primary_key'):
+                result.append(row_id)
+            elif column.get('nullable', True) and self.rng.random() < 0.5:
+                result.append(None)
+            else:
+                result.append(self.generic(column))
+        return result
+
+
+class CsvStream:
+    """File-like object that renders rows to CSV on demand, so COPY never materialises the whole table"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = ''
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = io.StringIO()
+            writer = csv.writer(chunk)
+            for row in itertools.islice(self.rows, 1000):
+                writer.writerow(row)
+                self.count += 1
+            text = chunk.getvalue()
+            if not text:
+                break
+            self.buffer += text
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    readline = read
+
+
+def create_schema(cursor, name, spec):
+    definitions = []
+    for column in spec['columns']:
+        kind = column['type']
+        if kind == 'character varying' and column.get('max_length'):
+            kind = f"varchar({column['max_length']})"
+        elif kind == 'ARRAY':
+            kind = 'text[]'
+        default = column.get('default')
+        if default and default.startswith('nextval'):
+            kind = 'serial'
+            default = None
+        definition = f"{column['name']} {kind}"
+        if default:
+            definition += f" DEFAULT {default}"
+        if column.get('nullable') is False:
+            definition += " NOT NULL"
+        definitions.append(definition)
+    if spec.get('primary_key'):
+        definitions.append(f"PRIMARY KEY ({spec['primary_key']})")
+    # Foreign keys are left out on purpose: they slow bulk loads and the generator keeps ids consistent
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(definitions)})")
+
+
+def parse_rows(values, scale):
+    rows = {table: max(1, int(count * scale)) for table, count in DEFAULT_ROWS.items()}
+    for value in values or []:
+        table, _, count = value.partition('=')
+        rows[table] = int(count)
+    return rows
+
+
+def is_local(dsn):
+    params = psycopg2.extensions.parse_dsn(dsn)
+    return params.get('host', 'localhost') in ('localhost', '127.0.0.1', '::1', '') or params.get('host', '').startswith('/')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL', 'dbname=hospital_bench'),
+                        help="Target database (default: $BENCH_DATABASE_URL or local hospital_bench)")
+    parser.add_argument('--mapping', default=MAPPING_PATH, help="Path to database_mapping.json")
+    parser.add_argument('--tables', help="Comma-separated subset of tables to load")
+    parser.add_argument('--rows', action='append', metavar='TABLE=N', help="Override a table's row count")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply all default row counts")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed; same seed gives identical data")
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent for hot doctors/patients/senders (0 = uniform)")
+    parser.add_argument('--today', help="Anchor date (YYYY-MM-DD) so reruns produce the same dates")
+    parser.add_argument('--create-schema', action='store_true', help="CREATE TABLE IF NOT EXISTS from the mapping")
+    parser.add_argument('--truncate', action='store_true', help="Empty the selected tables before loading")
+    parser.add_argument('--allow-remote', action='store_true', help="Permit a non-local host")
+    args = parser.parse_args()
+
+    if not is_local(args.dsn) and not args.allow_remote:
+        sys.exit("Refusing to load synthetic data into a non-local database without --allow-remote")
+
+    with open(args.mapping) as f:
+        tables = json.load(f)
+    tables.update(SUPPLEMENTARY_TABLES)
+    for spec in tables.values():
+        for column in spec['columns']:
+            column['is_primary_key'] = column['name'] == spec.get('primary_key')
+
+    selected = [t for t in LOAD_ORDER if t in tables]
+    if args.tables:
+        wanted = args.tables.split(',')
+        selected = [t for t in selected if t in wanted]
+    rows = parse_rows(args.rows, args.scale)
+    today = date.fromisoformat(args.today) if args.today else date.today()
+    generator = Generator(tables, rows, args.seed, args.skew, today)
+
+    conn = psycopg2.connect(args.dsn)
+    cursor = conn.cursor()
+    if args.create_schema:
+        for name in selected:
+            create_schema(cursor, name, tables[name])
+        conn.commit()
+    if args.truncate:
+        cursor.execute(f"TRUNCATE {', '.join(selected)} RESTART IDENTITY")
+        conn.commit()
+
+    def parent_count(table):
+        if table in selected:
+            return rows[table]
+        try:
+            cursor.execute(f"SELECT COALESCE(MAX({tables[table]['primary_key']}), 0) FROM {table}")
+            return cursor.fetchone()[0]
+        except psycopg2.Error:
+            conn.rollback()
+            return 0
+
+    for name in selected:
+        spec = tables[name]
+        columns = spec['columns']
+        # Parents come from the mapping's foreign keys, plus the undeclared doctor_id/patient_id references
+        references = {fk['column']: fk['references'].split('.')[0] for fk in spec.get('foreign_keys', [])}
+        for column in columns:
+            if column['name'] in ('doctor_id', 'patient_id') and not column['is_primary_key']:
+                references.setdefault(column['name'], column['name'][:-3] + 's')
+        parents = {}
+        for parent in set(references.values()):
+            count = parent_count(parent)
+            if count:
+                parents[parent] = generator.picker(parent, count)
+        optional = {'patients'} if name == 'availability_slots' else set()
+        missing = set(references.values()) - set(parents) - optional
+        if missing:
+            print(f"Skipping {name}: no rows in {', '.join(sorted(missing))} to reference")
+            continue
+        if name == 'conversation_history':
+            parents['senders'] = generator.picker('senders', max(1, rows[name] // 20))
+        if name == 'medical_appointments' and parent_count('doctors'):
+            cursor.execute("SELECT name, department FROM doctors ORDER BY doctor_id LIMIT 5000")
+            generator.doctor_directory = cursor.fetchall()
+
+        started = time.time()
+        stream = CsvStream(generator.row(name, i, columns, parents) for i in range(1, rows[name] + 1))
+        column_list = ', '.join(c['name'] for c in columns)
+        cursor.copy_expert(f"COPY {name} ({column_list}) FROM STDIN WITH (FORMAT csv)", stream)
+        pk = spec.get('primary_key')
+        if pk:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{name}', '{pk}'), GREATEST((SELECT MAX({pk}) FROM {name}), 1))"
+            )
+        conn.commit()
+        elapsed = time.time() - started
+        print(f"{name}: {stream.count} rows in {elapsed:.1f}s ({stream.count / max(elapsed, 0.001):,.0f} rows/s)")
+
+    conn.autocommit = True
+    for name in selected:
+        cursor.execute(f"ANALYZE {name}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()